@@ -0,0 +1,253 @@
+import datetime
+import hashlib
+import sqlite3
+
+import pandas as pd
+
+from tabela_circuitos import TabelaCircuitos
+
+CAMINHO_PADRAO = 'projetos.sqlite'
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS projetos (
+    id INTEGER PRIMARY KEY,
+    nome TEXT NOT NULL UNIQUE,
+    criado_em TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS revisoes (
+    id INTEGER PRIMARY KEY,
+    projeto_id INTEGER NOT NULL REFERENCES projetos(id),
+    numero INTEGER NOT NULL,
+    criada_em TEXT NOT NULL,
+    descricao TEXT,
+    fases_qd INTEGER,
+    custo_total REAL,
+    UNIQUE (projeto_id, numero)
+);
+CREATE TABLE IF NOT EXISTS circuitos (
+    revisao_id INTEGER NOT NULL REFERENCES revisoes(id) ON DELETE CASCADE,
+    nome TEXT NOT NULL,
+    quadro TEXT,
+    potencia REAL,
+    tensao REAL,
+    fator_potencia REAL,
+    num_fases INTEGER,
+    num_fases1 TEXT,
+    temperatura REAL,
+    num_circuitos INTEGER,
+    comprimento REAL,
+    met_instala TEXT,
+    dr INTEGER,
+    fases TEXT,
+    secao REAL,
+    disjuntor REAL,
+    queda_tensao REAL,
+    corrente_nominal REAL,
+    corrente_corrigida REAL
+);
+CREATE INDEX IF NOT EXISTS idx_circuitos_revisao ON circuitos (revisao_id);
+CREATE INDEX IF NOT EXISTS idx_circuitos_disjuntor ON circuitos (disjuntor, revisao_id);
+CREATE INDEX IF NOT EXISTS idx_circuitos_secao ON circuitos (secao, revisao_id, quadro);
+CREATE TABLE IF NOT EXISTS quadros (
+    revisao_id INTEGER NOT NULL REFERENCES revisoes(id) ON DELETE CASCADE,
+    quadro TEXT NOT NULL,
+    disjuntor_geral REAL,
+    PRIMARY KEY (revisao_id, quadro)
+);
+CREATE TABLE IF NOT EXISTS orcamento (
+    revisao_id INTEGER NOT NULL REFERENCES revisoes(id) ON DELETE CASCADE,
+    codigo INTEGER,
+    descricao TEXT,
+    quantidade REAL,
+    custo_unitario REAL,
+    custo_total REAL
+);
+CREATE INDEX IF NOT EXISTS idx_orcamento_revisao ON orcamento (revisao_id);
+CREATE INDEX IF NOT EXISTS idx_orcamento_codigo ON orcamento (codigo, revisao_id);
+CREATE TABLE IF NOT EXISTS artefatos (
+    revisao_id INTEGER NOT NULL REFERENCES revisoes(id) ON DELETE CASCADE,
+    nome TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    tamanho INTEGER NOT NULL,
+    conteudo BLOB NOT NULL,
+    PRIMARY KEY (revisao_id, nome)
+);
+CREATE VIEW IF NOT EXISTS ultimas_revisoes AS
+    SELECT r.* FROM revisoes r
+    WHERE r.numero = (SELECT MAX(numero) FROM revisoes WHERE projeto_id = r.projeto_id);
+"""
+
+# Colunas da tabela 'circuitos' -> chave no dicionário de circuito do app
+CAMPOS_CIRCUITO = {
+    'nome': 'nome',
+    'quadro': 'Quadro',
+    'potencia': 'potencia',
+    'tensao': 'tensao',
+    'fator_potencia': 'fator_potencia',
+    'num_fases': 'num_fases',
+    'num_fases1': 'num_fases1',
+    'temperatura': 'temperatura',
+    'num_circuitos': 'num_circuitos',
+    'comprimento': 'comprimento',
+    'met_instala': 'met_instala',
+    'dr': 'DR',
+    'fases': 'Fases',
+    'secao': 'Seção do Condutor (mm²)',
+    'disjuntor': 'Disjuntor (Ampere)',
+    'queda_tensao': 'Queda de Tensão (Volts)',
+    'corrente_nominal': 'Corrente Nominal',
+    'corrente_corrigida': 'Corrente corrigida',
+}
+
+
+def _valor(v):
+    # sqlite3 não aceita tipos NumPy; NaN vira NULL
+    if v is None:
+        return None
+    if hasattr(v, 'item'):
+        v = v.item()
+    if isinstance(v, float) and v != v:
+        return None
+    return v
+
+
+def _linhas_circuitos(revisao_id, circuitos, colunas):
+    if isinstance(circuitos, TabelaCircuitos):
+        # Lê coluna a coluna, sem montar um dicionário por circuito
+        valores = [circuitos[CAMPOS_CIRCUITO[col]] if CAMPOS_CIRCUITO[col] in circuitos
+                   else [None] * len(circuitos) for col in colunas]
+        return [(revisao_id, *(_valor(v) for v in linha)) for linha in zip(*valores)]
+    return [(revisao_id, *(_valor(c.get(CAMPOS_CIRCUITO[col])) for col in colunas)) for c in circuitos]
+
+
+class ArmazemProjetos:
+    """
+    Banco SQLite com as revisões de cada projeto: circuitos dimensionados, disjuntores
+    gerais, orçamento SINAPI e arquivos gerados (xlsx, dxf, tex). Os índices em seção e
+    disjuntor permitem consultas entre projetos sem refazer o cálculo.
+    """
+
+    def __init__(self, caminho=CAMINHO_PADRAO):
+        self.caminho = caminho
+        self.conexao = sqlite3.connect(caminho, check_same_thread=False)
+        self.conexao.execute('PRAGMA foreign_keys = ON')
+        if caminho != ':memory:':
+            self.conexao.execute('PRAGMA journal_mode = WAL')
+        self.conexao.executescript(ESQUEMA)
+
+    def fechar(self):
+        self.conexao.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+    # ------------------------------------------------------------------ gravação
+    def salvar_revisao(self, projeto, circuitos, disjuntores_gerais=None, orcamento=None,
+                       artefatos=None, descricao='', fases_qd=None):
+        """
+        Grava uma nova revisão do projeto e retorna o número dela.
+        circuitos: TabelaCircuitos (ou lista) após calcular_parametros_circuitos.
+        orcamento: DataFrame de montar_orcamento. artefatos: {nome_arquivo: bytes}.
+        """
+        agora = datetime.datetime.now().isoformat(timespec='seconds')
+        custo_total = float(orcamento['Custo Total'].sum()) if orcamento is not None else None
+        with self.conexao:
+            cur = self.conexao.cursor()
+            cur.execute('INSERT OR IGNORE INTO projetos (nome, criado_em) VALUES (?, ?)', (projeto, agora))
+            projeto_id = cur.execute('SELECT id FROM projetos WHERE nome = ?', (projeto,)).fetchone()[0]
+            numero = cur.execute('SELECT COALESCE(MAX(numero), 0) + 1 FROM revisoes WHERE projeto_id = ?',
+                                 (projeto_id,)).fetchone()[0]
+            cur.execute('INSERT INTO revisoes (projeto_id, numero, criada_em, descricao, fases_qd, custo_total) '
+                        'VALUES (?, ?, ?, ?, ?, ?)', (projeto_id, numero, agora, descricao, fases_qd, custo_total))
+            revisao_id = cur.lastrowid
+
+            colunas = list(CAMPOS_CIRCUITO)
+            cur.executemany(
+                f"INSERT INTO circuitos (revisao_id, {', '.join(colunas)}) VALUES (?{', ?' * len(colunas)})",
+                _linhas_circuitos(revisao_id, circuitos, colunas))
+            if disjuntores_gerais:
+                cur.executemany('INSERT INTO quadros (revisao_id, quadro, disjuntor_geral) VALUES (?, ?, ?)',
+                                [(revisao_id, str(q), _valor(d)) for q, d in disjuntores_gerais.items()])
+            if orcamento is not None:
+                cur.executemany(
+                    'INSERT INTO orcamento (revisao_id, codigo, descricao, quantidade, custo_unitario, custo_total) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    [(revisao_id, _valor(r['Codigo']), _valor(r.get('Descrição da Composição')),
+                      _valor(r['Quantidade']), _valor(r.get('Custo Unitário')), _valor(r.get('Custo Total')))
+                     for r in orcamento.to_dict('records')])
+            for nome, conteudo in (artefatos or {}).items():
+                cur.execute('INSERT INTO artefatos (revisao_id, nome, sha256, tamanho, conteudo) VALUES (?, ?, ?, ?, ?)',
+                            (revisao_id, nome, hashlib.sha256(conteudo).hexdigest(), len(conteudo),
+                             sqlite3.Binary(conteudo)))
+        return numero
+
+    # ------------------------------------------------------------------ leitura
+    def _revisao_id(self, projeto, numero=None):
+        if numero is None:
+            linha = self.conexao.execute(
+                'SELECT u.id FROM ultimas_revisoes u JOIN projetos p ON p.id = u.projeto_id WHERE p.nome = ?',
+                (projeto,)).fetchone()
+        else:
+            linha = self.conexao.execute(
+                'SELECT r.id FROM revisoes r JOIN projetos p ON p.id = r.projeto_id WHERE p.nome = ? AND r.numero = ?',
+                (projeto, numero)).fetchone()
+        if linha is None:
+            raise KeyError(f"Revisão não encontrada para o projeto '{projeto}'.")
+        return linha[0]
+
+    def consultar(self, sql, parametros=()):
+        return pd.read_sql_query(sql, self.conexao, params=parametros)
+
+    def projetos(self):
+        return self.consultar(
+            'SELECT p.nome AS projeto, u.numero AS ultima_revisao, u.criada_em, u.custo_total '
+            'FROM projetos p JOIN ultimas_revisoes u ON u.projeto_id = p.id ORDER BY p.nome')
+
+    def revisoes(self, projeto):
+        return self.consultar(
+            'SELECT r.numero, r.criada_em, r.descricao, r.fases_qd, r.custo_total FROM revisoes r '
+            'JOIN projetos p ON p.id = r.projeto_id WHERE p.nome = ? ORDER BY r.numero', (projeto,))
+
+    def carregar_circuitos(self, projeto, numero=None):
+        return self.consultar('SELECT * FROM circuitos WHERE revisao_id = ? ORDER BY rowid',
+                              (self._revisao_id(projeto, numero),)).drop(columns='revisao_id')
+
+    def carregar_quadros(self, projeto, numero=None):
+        return self.consultar('SELECT quadro, disjuntor_geral FROM quadros WHERE revisao_id = ?',
+                              (self._revisao_id(projeto, numero),))
+
+    def carregar_orcamento(self, projeto, numero=None):
+        return self.consultar('SELECT * FROM orcamento WHERE revisao_id = ? ORDER BY rowid',
+                              (self._revisao_id(projeto, numero),)).drop(columns='revisao_id')
+
+    def carregar_artefato(self, projeto, nome, numero=None):
+        linha = self.conexao.execute('SELECT conteudo FROM artefatos WHERE revisao_id = ? AND nome = ?',
+                                     (self._revisao_id(projeto, numero), nome)).fetchone()
+        if linha is None:
+            raise KeyError(f"Artefato '{nome}' não encontrado.")
+        return bytes(linha[0])
+
+    # ------------------------------------------------------------------ consultas entre projetos
+    def _filtro_revisao(self, todas_revisoes):
+        if todas_revisoes:
+            return 'revisoes'
+        return 'ultimas_revisoes'
+
+    def circuitos_com_disjuntor_acima(self, corrente, todas_revisoes=False):
+        """Circuitos com disjuntor > corrente em todos os projetos (por padrão só na última revisão)."""
+        return self.consultar(
+            f"SELECT p.nome AS projeto, r.numero AS revisao, c.quadro, c.nome, c.disjuntor, c.secao "
+            f"FROM circuitos c JOIN {self._filtro_revisao(todas_revisoes)} r ON r.id = c.revisao_id "
+            f"JOIN projetos p ON p.id = r.projeto_id WHERE c.disjuntor > ? "
+            f"ORDER BY p.nome, r.numero, c.quadro, c.nome", (corrente,))
+
+    def quadros_com_secao(self, secao, todas_revisoes=False):
+        """Quadros que usam a seção informada em algum circuito."""
+        return self.consultar(
+            f"SELECT p.nome AS projeto, r.numero AS revisao, c.quadro, COUNT(*) AS circuitos "
+            f"FROM circuitos c JOIN {self._filtro_revisao(todas_revisoes)} r ON r.id = c.revisao_id "
+            f"JOIN projetos p ON p.id = r.projeto_id WHERE c.secao = ? "
+            f"GROUP BY p.nome, r.numero, c.quadro ORDER BY p.nome, r.numero, c.quadro", (secao,))
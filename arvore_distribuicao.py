@@ -0,0 +1,304 @@
+import numpy as np
+import pandas as pd
+
+from motor_vetorizado import compilar_tabelas, indices_metodos, preparar_arrays, dimensionar_lote, MENSAGENS_ERRO
+
+METODO_ALIMENTADOR = "3 condutores carregados – método B1"
+
+
+class ArvoreDistribuicao:
+    """
+    Árvore QGBT -> QDs -> subquadros -> circuitos terminais.
+
+    Cada quadro guarda a soma da potência demandada dos filhos; o fator de demanda
+    (tabela FatordeDemanda, pelo número de filhos) é aplicado nessa soma e o alimentador
+    do quadro é dimensionado com as mesmas regras dos circuitos. Alterar um circuito
+    atualiza apenas os quadros do caminho até a raiz. A queda de tensão acumulada é
+    calculada sob demanda subindo pelo caminho, então nunca precisa ser propagada
+    para os descendentes.
+    """
+
+    def __init__(self, data_tables, tensao_nominal=127, fator_potencia=0.9, fases=3,
+                 queda_percentual_max=0.05):
+        self.tabelas = compilar_tabelas(data_tables)
+        fd = data_tables['FatordeDemanda'].sort_values('num_circuitos')
+        self._fd_num = fd['num_circuitos'].to_numpy(dtype=float)
+        self._fd_fator = fd['FatordeDemanda'].to_numpy(dtype=float)
+        self.tensao_nominal = tensao_nominal
+        self.fator_potencia = fator_potencia
+        self.fases = fases
+        self.queda_percentual_max = queda_percentual_max
+        self.nos = {}
+        self.raiz = None
+
+    # ------------------------------------------------------------------ estrutura
+    def adicionar_quadro(self, nome, pai=None, comprimento=0.0, met_instala=METODO_ALIMENTADOR,
+                         temperatura=30, num_circuitos=1):
+        """Adiciona um quadro. comprimento é o do alimentador, em km. Sem pai, vira a raiz (QGBT)."""
+        if nome in self.nos:
+            raise ValueError(f"Quadro '{nome}' já existe na árvore.")
+        if pai is None:
+            if self.raiz is not None:
+                raise ValueError("A árvore já possui um quadro raiz.")
+            self.raiz = nome
+        elif pai not in self.nos or self.nos[pai]['tipo'] != 'quadro':
+            raise ValueError(f"Quadro pai '{pai}' não encontrado.")
+        self.nos[nome] = {
+            'tipo': 'quadro', 'pai': pai, 'filhos': set(),
+            'comprimento': comprimento, 'met_instala': met_instala,
+            'temperatura': temperatura, 'num_circuitos': num_circuitos,
+            'soma_instalada': 0.0, 'soma_demandada': 0.0,
+            'potencia_instalada': 0.0, 'potencia_demandada': 0.0,
+        }
+        if pai is not None:
+            self._ligar(nome, pai, 0.0, 0.0)
+        self._dimensionar_quadro(nome)
+
+    def _verificar_chave(self, quadro, nome):
+        if (quadro, nome) in self.nos:
+            raise ValueError(f"Circuito '{nome}' já existe no quadro '{quadro}'.")
+        if quadro not in self.nos or self.nos[quadro]['tipo'] != 'quadro':
+            raise ValueError(f"Quadro '{quadro}' não encontrado.")
+
+    def adicionar_circuito(self, circuito):
+        """
+        Adiciona um circuito já preparado (num_fases, comprimento em km, queda_tensao_max_admitida).
+        Como em adicionar_circuitos, um circuito que não pode ser dimensionado entra com o código
+        de erro; só chave repetida, quadro inexistente ou campos ausentes levantam exceção, e
+        nesse caso a árvore não é alterada.
+        """
+        self._verificar_chave(circuito['Quadro'], circuito['nome'])
+        no = self._novo_circuito(circuito)
+        self._inserir_circuito(no)
+
+    def adicionar_circuitos(self, circuitos):
+        """Inserção em lote: dimensiona todos os circuitos de uma vez e reagrega cada quadro uma única vez."""
+        if not circuitos:
+            return
+        novas = set()
+        for circuito in circuitos:
+            chave = (circuito['Quadro'], circuito['nome'])
+            if chave in novas:
+                raise ValueError(f"Circuito '{circuito['nome']}' repetido no quadro '{circuito['Quadro']}'.")
+            self._verificar_chave(*chave)
+            novas.add(chave)
+        arrays = preparar_arrays(circuitos, self.tabelas)
+        r = dimensionar_lote(
+            arrays['potencia'], arrays['tensao'], arrays['fator_potencia'], arrays['num_fases'],
+            arrays['temperatura'], arrays['num_circuitos'], arrays['comprimento'],
+            arrays['queda_tensao_max'], arrays['indice_metodo'], arrays['iluminacao'], self.tabelas)
+        queda = np.nan_to_num(r['queda_tensao'])
+        for i, circuito in enumerate(circuitos):
+            chave = (circuito['Quadro'], circuito['nome'])
+            potencia = float(circuito['potencia'])
+            self.nos[chave] = {
+                'tipo': 'circuito', 'pai': circuito['Quadro'], 'circuito': dict(circuito),
+                'potencia_instalada': potencia, 'potencia_demandada': potencia,
+                'corrente': float(r['corrente_nominal'][i]), 'secao': float(r['secao'][i]),
+                'disjuntor': float(r['disjuntor'][i]), 'queda_tensao': float(queda[i]),
+                'erro': int(r['erro'][i]),
+            }
+            self.nos[circuito['Quadro']]['filhos'].add(chave)
+        self.reagregar()
+
+    def reagregar(self):
+        """Recalcula todos os quadros de baixo para cima (pós-ordem), cada um uma única vez."""
+        if self.raiz is None:
+            return
+        ordem, pilha = [], [self.raiz]
+        while pilha:
+            nome = pilha.pop()
+            ordem.append(nome)
+            pilha.extend(f for f in self.nos[nome]['filhos'] if self.nos[f]['tipo'] == 'quadro')
+        for nome in reversed(ordem):
+            no = self.nos[nome]
+            filhos = [self.nos[f] for f in no['filhos']]
+            no['soma_instalada'] = sum(f['potencia_instalada'] for f in filhos)
+            no['soma_demandada'] = sum(f['potencia_demandada'] for f in filhos)
+            self._dimensionar_quadro(nome)
+
+    def atualizar_circuito(self, quadro, nome, /, **campos):
+        """Altera campos de um circuito (inclusive nome e Quadro) e reagrega só os quadros ancestrais."""
+        chave = (quadro, nome)
+        no = self.nos[chave]
+        nova_chave = (campos.get('Quadro', quadro), campos.get('nome', nome))
+        if nova_chave != chave:
+            self._verificar_chave(*nova_chave)
+        # Dimensiona a versão nova antes de mexer na árvore: se falhar, o circuito fica como estava
+        novo = self._novo_circuito(dict(no['circuito'], **campos))
+        if nova_chave != chave:
+            # Mudou de quadro ou de nome: o nó muda de chave, então sai e entra de novo
+            self.remover_circuito(quadro, nome)
+            self._inserir_circuito(novo)
+            return
+        self.nos[chave] = novo
+        self._propagar(novo['pai'], novo['potencia_instalada'] - no['potencia_instalada'],
+                       novo['potencia_demandada'] - no['potencia_demandada'])
+
+    def remover_circuito(self, quadro, nome):
+        no = self.nos.pop((quadro, nome))
+        pai = self.nos[no['pai']]
+        pai['filhos'].discard((quadro, nome))
+        self._propagar(no['pai'], -no['potencia_instalada'], -no['potencia_demandada'])
+
+    # ------------------------------------------------------------------ agregação
+    def _fator_demanda(self, num_filhos):
+        if num_filhos == 0:
+            return 1.0
+        idx = np.searchsorted(self._fd_num, num_filhos, side='right') - 1
+        return float(self._fd_fator[max(idx, 0)])
+
+    def _ligar(self, chave, pai, instalada, demandada):
+        self.nos[pai]['filhos'].add(chave)
+        # O número de filhos mudou: o fator de demanda do pai precisa ser reaplicado
+        self._propagar(pai, instalada, demandada)
+
+    def _propagar(self, nome, delta_instalada, delta_demandada):
+        # Sobe até a raiz atualizando somas e redimensionando cada alimentador do caminho
+        while nome is not None:
+            no = self.nos[nome]
+            no['soma_instalada'] += delta_instalada
+            no['soma_demandada'] += delta_demandada
+            antes_instalada, antes_demandada = no['potencia_instalada'], no['potencia_demandada']
+            self._dimensionar_quadro(nome)
+            delta_instalada = no['potencia_instalada'] - antes_instalada
+            delta_demandada = no['potencia_demandada'] - antes_demandada
+            nome = no['pai']
+
+    def _dimensionar_quadro(self, nome):
+        no = self.nos[nome]
+        no['fator_demanda'] = self._fator_demanda(len(no['filhos']))
+        no['potencia_instalada'] = no['soma_instalada']
+        no['potencia_demandada'] = no['soma_demandada'] * no['fator_demanda']
+        alimentador = {
+            'potencia': no['potencia_demandada'], 'tensao': self.tensao_nominal,
+            'fator_potencia': self.fator_potencia, 'num_fases': self.fases,
+            'temperatura': no['temperatura'], 'num_circuitos': no['num_circuitos'],
+            'comprimento': no['comprimento'],
+            'queda_tensao_max_admitida': self.queda_percentual_max * self.tensao_nominal,
+            'met_instala': no['met_instala'], 'nome': nome,
+        }
+        self._aplicar_dimensionamento(no, alimentador)
+
+    def _novo_circuito(self, circuito):
+        # Nó dimensionado, ainda fora da árvore
+        no = {'tipo': 'circuito', 'pai': circuito['Quadro'], 'circuito': dict(circuito)}
+        no['potencia_instalada'] = no['potencia_demandada'] = float(circuito['potencia'])
+        self._aplicar_dimensionamento(no, circuito)
+        return no
+
+    def _inserir_circuito(self, no):
+        chave = (no['pai'], no['circuito']['nome'])
+        self.nos[chave] = no
+        self._ligar(chave, no['pai'], no['potencia_instalada'], no['potencia_demandada'])
+
+    def _aplicar_dimensionamento(self, no, c):
+        if c['potencia'] <= 0:
+            no.update(corrente=0.0, secao=np.nan, disjuntor=np.nan, queda_tensao=0.0, erro=0)
+            return
+        r = dimensionar_lote(
+            [c['potencia']], [c['tensao']], [c['fator_potencia']], [c['num_fases']],
+            [c['temperatura']], [c['num_circuitos']], [c['comprimento']],
+            [c['queda_tensao_max_admitida']], indices_metodos([c['met_instala']], self.tabelas),
+            ["iluminação" in str(c['nome']).lower()], self.tabelas)
+        # Fases inválidas viram código de erro, como no lote, em vez de exceção
+        no.update(
+            corrente=float(r['corrente_nominal'][0]),
+            secao=float(r['secao'][0]), disjuntor=float(r['disjuntor'][0]),
+            queda_tensao=float(np.nan_to_num(r['queda_tensao'][0])), erro=int(r['erro'][0]),
+        )
+
+    # ------------------------------------------------------------------ consultas
+    def caminho(self, chave):
+        """Nós de chave até a raiz (inclusive)."""
+        nos = []
+        while chave is not None:
+            nos.append(chave)
+            chave = self.nos[chave]['pai']
+        return nos
+
+    def queda_percentual(self, chave):
+        """Queda de tensão do trecho do nó em % da tensão nominal desse trecho."""
+        no = self.nos[chave]
+        tensao = no['circuito']['tensao'] if no['tipo'] == 'circuito' else self.tensao_nominal
+        return 100.0 * no['queda_tensao'] / tensao
+
+    def queda_acumulada(self, chave):
+        """
+        Queda de tensão (%) somada do QGBT até o nó, incluindo o trecho do próprio nó. Cada trecho
+        entra em % da sua própria tensão, já que alimentadores e circuitos podem ter tensões diferentes.
+        """
+        return sum(self.queda_percentual(c) for c in self.caminho(chave))
+
+    def quadro(self, nome):
+        no = self.nos[nome]
+        return {
+            'Quadro': nome,
+            'Quadro pai': no['pai'],
+            'Filhos': len(no['filhos']),
+            'Potência instalada (W)': no['potencia_instalada'],
+            'Fator de demanda': no['fator_demanda'],
+            'Potência demandada (W)': no['potencia_demandada'],
+            'Corrente (A)': no['corrente'],
+            'Seção do alimentador (mm²)': no['secao'],
+            'Disjuntor geral (A)': no['disjuntor'],
+            'Queda de tensão (V)': no['queda_tensao'],
+            'Queda acumulada (%)': self.queda_acumulada(nome),
+            'Erro': MENSAGENS_ERRO.get(no['erro'], ''),
+        }
+
+    def resumo_quadros(self):
+        """Tabela de todos os quadros, da raiz para as folhas."""
+        ordem, pilha = [], [self.raiz] if self.raiz is not None else []
+        while pilha:
+            nome = pilha.pop()
+            ordem.append(nome)
+            pilha.extend(sorted(f for f in self.nos[nome]['filhos'] if not isinstance(f, tuple)))
+        return pd.DataFrame([self.quadro(nome) for nome in ordem])
+
+    def resumo_circuitos(self):
+        """Circuitos terminais com a queda acumulada desde o QGBT e a verificação do limite."""
+        limite = 100.0 * self.queda_percentual_max
+        linhas = []
+        for chave, no in self.nos.items():
+            if no['tipo'] != 'circuito':
+                continue
+            acumulada = self.queda_acumulada(chave)
+            linhas.append({
+                'Quadro': chave[0],
+                'Nome do Circuito': chave[1],
+                'Seção do Condutor (mm²)': no['secao'],
+                'Disjuntor': no['disjuntor'],
+                'Queda de Tensão (Volts)': no['queda_tensao'],
+                'Queda acumulada (%)': acumulada,
+                'Excede limite': acumulada > limite,
+            })
+        return pd.DataFrame(linhas)
+
+    @classmethod
+    def de_circuitos(cls, circuitos, data_tables, hierarquia=None, comprimentos=None, raiz='QGBT', **kwargs):
+        """
+        Monta a árvore a partir da lista de circuitos do app.
+        hierarquia: {quadro: quadro_pai}; quadros sem pai informado ficam ligados à raiz.
+        comprimentos: {quadro: comprimento do alimentador em km}.
+        """
+        hierarquia = hierarquia or {}
+        comprimentos = comprimentos or {}
+        arvore = cls(data_tables, **kwargs)
+        arvore.adicionar_quadro(raiz, comprimento=comprimentos.get(raiz, 0.0))
+        quadros = set(c['Quadro'] for c in circuitos) | set(hierarquia) | set(hierarquia.values())
+        quadros.discard(raiz)
+
+        def adicionar(nome, visitados=()):
+            if nome in arvore.nos:
+                return
+            if nome in visitados:
+                raise ValueError(f"Hierarquia de quadros com ciclo em '{nome}'.")
+            pai = hierarquia.get(nome, raiz)
+            adicionar(pai, visitados + (nome,))
+            arvore.adicionar_quadro(nome, pai=pai, comprimento=comprimentos.get(nome, 0.0))
+
+        for nome in sorted(quadros):
+            adicionar(nome)
+        arvore.adicionar_circuitos(list(circuitos))
+        return arvore
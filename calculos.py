@@ -0,0 +1,677 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from catalogo_protecao import disjuntores_mapping, obter_catalogo, catalogo_padrao
+from tabela_circuitos import TabelaCircuitos
+
+
+# Funções para cálculos elétricos
+def calcular_corrente_nominal(potencia, tensao, fator_potencia, num_fases):
+    if num_fases == 1:
+        return potencia * fator_potencia / (tensao)
+    elif num_fases == 2:
+        return potencia * fator_potencia / (np.sqrt(3) * tensao)
+    elif num_fases == 3:
+        return potencia * fator_potencia / (3 * tensao)
+    else:
+        raise ValueError("Número de fases inválido.")
+
+def encontrar_fator_correcao(temperatura, tabela_temperatura):
+    coluna_temperatura = tabela_temperatura.columns[0]
+    coluna_fator = tabela_temperatura.columns[1]
+    fatores = tabela_temperatura[tabela_temperatura[coluna_temperatura] <= temperatura]
+    if not fatores.empty:
+        return fatores.iloc[-1][coluna_fator]
+    else:
+        raise ValueError("Temperatura fora do alcance da tabela.")
+
+def encontrar_fator_agrupamento(num_circuitos, tabela_agrupamento):
+    fatores = tabela_agrupamento[tabela_agrupamento['Agrupamento de circuitos'] <= num_circuitos]
+    if not fatores.empty:
+        return fatores.iloc[-1]['FatordeAgrupamento']
+    else:
+        raise ValueError("Número de circuitos fora do alcance da tabela.")
+
+def determinar_secao_condutor(corrente, tabela_capacidade, metodo_instalacao, nome_circuito):
+    coluna_capacidade = [col for col in tabela_capacidade.columns if metodo_instalacao in col][0]
+    secoes_suportadas = tabela_capacidade[tabela_capacidade[coluna_capacidade] >= corrente]
+
+    # Filtrar 1.5 mm² se o nome do circuito não contém "iluminação"
+    if "iluminação" not in nome_circuito.lower():
+        secoes_suportadas = secoes_suportadas[secoes_suportadas['Seção do condutor'] != 1.5]
+
+    if not secoes_suportadas.empty:
+        return secoes_suportadas.iloc[0]['Seção do condutor']
+    else:
+        raise ValueError(f"Corrente muito alta para as seções disponíveis. Nenhuma seção adequada encontrada para o circuito '{nome_circuito}'.")
+
+def encontrar_capacidade_corrente(secao_condutor, tabela_capacidade, metodo_instalacao):
+    colunas_validas = [col for col in tabela_capacidade.columns if metodo_instalacao in col]
+    if not colunas_validas:
+        raise ValueError(f"O método de instalação '{metodo_instalacao}' não foi encontrado na tabela de capacidade.")
+    coluna_capacidade = colunas_validas[0]
+    capacidade = tabela_capacidade.loc[tabela_capacidade['Seção do condutor'] == secao_condutor, coluna_capacidade].iloc[0]
+    return capacidade
+
+def _proxima_secao_maior(secao_atual, tabela_capacidade):
+    secoes = sorted(tabela_capacidade['Seção do condutor'].unique())
+    for s in secoes:
+        if s > secao_atual:
+            return s
+    return None  # não há maior
+
+def _capacidade_da_secao(secao, tabela_capacidade, metodo_instalacao):
+    colunas_validas = [c for c in tabela_capacidade.columns if metodo_instalacao in c]
+    if not colunas_validas:
+        raise ValueError(f"Método de instalação '{metodo_instalacao}' não encontrado na tabela.")
+    col = colunas_validas[0]
+    linha = tabela_capacidade.loc[tabela_capacidade['Seção do condutor'] == secao]
+    if linha.empty:
+        raise ValueError(f"Seção {secao} mm² não encontrada na tabela de capacidade.")
+    return float(linha[col].iloc[0])
+
+def _disjuntores_padrao_por_tipo(tabela_disjuntores, numero_fases):
+    if numero_fases == 1:
+        tipo = 'Monopolar'
+    elif numero_fases == 2:
+        tipo = 'Bipolar'
+    elif numero_fases == 3:
+        tipo = 'Tripolar'
+    else:
+        raise ValueError("Número de fases inválido. Deve ser 1, 2 ou 3.")
+
+    padroes = obter_catalogo(tabela_disjuntores).padroes(numero_fases)
+    if not padroes:
+        raise ValueError(f"Não há disjuntores cadastrados para o tipo '{tipo}'.")
+    return padroes
+
+def escolher_disjuntor_seguro(corrente_corrigida,
+                              secao_inicial,
+                              tabela_disjuntores,
+                              tabela_capacidade,
+                              metodo_instalacao,
+                              numero_fases,
+                              fator_sobra=1.00,
+                              curva=None,
+                              fabricante=None):
+    """
+    Retorna (In_escolhido, secao_final_ajustada).
+    Garante a relação Ib ≤ In ≤ Iz; aumenta a seção se necessário.
+    fator_sobra: opcional (ex.: 1.10 para folga).
+    curva/fabricante: opcionais, restringem os disjuntores do catálogo.
+    """
+    exigida = float(corrente_corrigida) * float(fator_sobra)
+    secoes_ordenadas = sorted(tabela_capacidade['Seção do condutor'].unique())
+    if secao_inicial not in secoes_ordenadas:
+        raise ValueError(f"Seção inicial {secao_inicial} mm² fora da tabela.")
+
+    secoes_idx = secoes_ordenadas.index(secao_inicial)
+    secoes_para_testar = secoes_ordenadas[secoes_idx:]  # começa na inicial e vai aumentando
+
+    # valida o número de fases e se há disjuntores cadastrados para o tipo
+    _disjuntores_padrao_por_tipo(tabela_disjuntores, numero_fases)
+
+    # pega o menor disjuntor padrão ≥ exigida (não depende da seção)
+    In_escolhido = obter_catalogo(tabela_disjuntores).menor_atende(numero_fases, exigida, curva, fabricante)
+
+    for secao in secoes_para_testar:
+        if In_escolhido is None:
+            # nem o maior disjuntor padrão atende à corrente exigida
+            break
+
+        Iz = _capacidade_da_secao(secao, tabela_capacidade, metodo_instalacao)
+
+        if In_escolhido <= Iz:
+            return In_escolhido, secao  # achou combinação válida (Ib ≤ In ≤ Iz)
+
+        # caso contrário, aumenta a seção e tenta de novo
+        # (segue o loop)
+
+    # Se chegou aqui, nem com a maior seção disponível coube
+    raise ValueError(
+        f"Não foi possível selecionar disjuntor seguro: corrente corrigida={corrente_corrigida:.2f} A, "
+        f"mesmo com a maior seção disponível."
+    )
+
+def calcular_queda_tensao(corrente_nominal, comprimento, secao_condutor, tabela_queda_tensao):
+    valor_queda_tensao = tabela_queda_tensao.loc[tabela_queda_tensao['seção do condutor'] == secao_condutor, 'Queda de tensão (V/A.km)'].iloc[0]
+    queda_tensao = valor_queda_tensao * corrente_nominal * comprimento
+    return queda_tensao
+
+def ajustar_secao_condutor_para_queda_tensao(secao_atual, tabela_capacidade):
+    secoes_disponiveis = tabela_capacidade['Seção do condutor']
+    secoes_maiores = secoes_disponiveis[secoes_disponiveis > secao_atual]
+    if not secoes_maiores.empty:
+        return secoes_maiores.iloc[0]
+    else:
+        raise ValueError("Não há seções de condutor maiores disponíveis.")
+
+def ajustar_condutor_queda_tensao(corrente_nominal, comprimento, secao_inicial, queda_tensao_max_admitida, tabela_capacidade, tabela_queda_tensao):
+    secao_condutor = secao_inicial
+    queda_tensao = calcular_queda_tensao(corrente_nominal, comprimento, secao_condutor, tabela_queda_tensao)
+    while queda_tensao > queda_tensao_max_admitida:
+        secao_condutor = ajustar_secao_condutor_para_queda_tensao(secao_condutor, tabela_capacidade)
+        queda_tensao = calcular_queda_tensao(corrente_nominal, comprimento, secao_condutor, tabela_queda_tensao)
+    return secao_condutor, queda_tensao
+
+def calcular_parametros_circuitos(lista_circuitos, data_tables):
+    if isinstance(lista_circuitos, TabelaCircuitos):
+        return _calcular_parametros_tabela(lista_circuitos, data_tables)
+    resultados = []
+    for circuito in lista_circuitos:
+        corrente_nominal = calcular_corrente_nominal(circuito['potencia'], circuito['tensao'], circuito['fator_potencia'], circuito['num_fases'])
+        fator_correcao_temp = encontrar_fator_correcao(circuito['temperatura'], data_tables['Fator de correção de temperatur'])
+        fator_agrupamento = encontrar_fator_agrupamento(circuito['num_circuitos'], data_tables['Fator de agrupamento'])
+        corrente_corrigida = corrente_nominal / (fator_correcao_temp * fator_agrupamento)
+        installmet=circuito['num_fases1']
+
+        secao_inicial = determinar_secao_condutor(corrente_corrigida,
+                                          data_tables['Capacidade de corrente'],
+                                          circuito['met_instala'],
+                                          circuito['nome'])
+
+# 2) Ajuste por queda de tensão (pode aumentar a seção)
+        secao_queda, queda_tensao_final = ajustar_condutor_queda_tensao(
+            corrente_nominal, circuito['comprimento'], secao_inicial,
+            circuito['queda_tensao_max_admitida'],
+            data_tables['Capacidade de corrente'], data_tables['queda de tensão']
+        )
+
+# 3) Escolha do disjuntor garantindo Ib ≤ In ≤ Iz,
+#    aumentando seção se precisar (volta com a seção final aceita)
+        disjuntor, secao_final = escolher_disjuntor_seguro(
+            corrente_corrigida=corrente_corrigida,
+            secao_inicial=secao_queda,
+            tabela_disjuntores=data_tables['valores nominais de disjuntores'],
+            tabela_capacidade=data_tables['Capacidade de corrente'],
+            metodo_instalacao=circuito['met_instala'],
+            numero_fases=circuito['num_fases'],
+            fator_sobra=1.00  # pode usar 1.10 se quiser folga
+        )
+
+# 4) (opcional) Se a seção foi aumentada no passo 3, recalcule a queda de tensão
+        if secao_final != secao_queda:
+            queda_tensao_final = calcular_queda_tensao(
+                corrente_nominal, circuito['comprimento'], secao_final,
+                data_tables['queda de tensão']
+            )
+
+        resultados.append({
+            "Nome do Circuito": circuito['nome'],
+            "Seção do Condutor (mm²)": secao_final,
+            "Disjuntor": disjuntor,
+            "Queda de Tensão (Volts)": queda_tensao_final,
+            "Corrente corrigida": corrente_corrigida,
+            "Corrente Nominal": corrente_nominal,
+            "Fator correção temperatura": fator_correcao_temp,
+            "Fator Agrupamento": fator_agrupamento,
+            "Número de fases" : circuito['num_fases'],
+            "Comprimento": circuito['comprimento'], 
+            "Tipo de alimentação": installmet
+
+        })
+
+        # Atualizando circuito com novos dados
+        circuito.update({
+            'Seção do Condutor (mm²)': secao_final,
+            'Disjuntor (Ampere)': disjuntor,
+            'Queda de Tensão (Volts)': queda_tensao_final,
+            'Corrente corrigida': corrente_corrigida,
+            'Corrente Nominal': corrente_nominal,
+            'Fator correção temperatura': fator_correcao_temp,
+            'Fator Agrupamento': fator_agrupamento
+        })
+
+    return pd.DataFrame(resultados), lista_circuitos
+
+def _calcular_parametros_tabela(tabela, data_tables):
+    # Mesmo resultado do laço acima, calculado de uma vez pelo motor vetorizado
+    from motor_vetorizado import MENSAGENS_ERRO, compilar_tabelas, dimensionar_lote, preparar_arrays
+
+    tabelas = compilar_tabelas(data_tables)
+    arrays = preparar_arrays(tabela, tabelas)
+    resultado = dimensionar_lote(
+        arrays['potencia'], arrays['tensao'], arrays['fator_potencia'], arrays['num_fases'],
+        arrays['temperatura'], arrays['num_circuitos'], arrays['comprimento'],
+        arrays['queda_tensao_max'], arrays['indice_metodo'], arrays['iluminacao'], tabelas)
+    invalidos = np.flatnonzero(resultado['erro'])
+    if len(invalidos):
+        i = invalidos[0]
+        raise ValueError(f"{MENSAGENS_ERRO[int(resultado['erro'][i])]} Circuito '{tabela['nome'][i]}'.")
+
+    disjuntor = resultado['disjuntor']
+    if np.all(disjuntor == np.round(disjuntor)):
+        disjuntor = disjuntor.astype(np.int64)
+    tabela.definir('Seção do Condutor (mm²)', resultado['secao'])
+    tabela.definir('Disjuntor (Ampere)', disjuntor)
+    tabela.definir('Queda de Tensão (Volts)', resultado['queda_tensao'])
+    tabela.definir('Corrente corrigida', resultado['corrente_corrigida'])
+    tabela.definir('Corrente Nominal', resultado['corrente_nominal'])
+    tabela.definir('Fator correção temperatura', resultado['fator_temperatura'])
+    tabela.definir('Fator Agrupamento', resultado['fator_agrupamento'])
+
+    resultados = pd.DataFrame({
+        "Nome do Circuito": tabela['nome'],
+        "Seção do Condutor (mm²)": resultado['secao'],
+        "Disjuntor": disjuntor,
+        "Queda de Tensão (Volts)": resultado['queda_tensao'],
+        "Corrente corrigida": resultado['corrente_corrigida'],
+        "Corrente Nominal": resultado['corrente_nominal'],
+        "Fator correção temperatura": resultado['fator_temperatura'],
+        "Fator Agrupamento": resultado['fator_agrupamento'],
+        "Número de fases": tabela['num_fases'].astype(np.int64),
+        "Comprimento": tabela['comprimento'],
+        "Tipo de alimentação": tabela['num_fases1'],
+    })
+    return resultados, tabela
+
+def calcular_disjuntor_geral(circuitos, tabela_fator_demanda, tensao_nominal, tabela_disjuntores):
+    if isinstance(circuitos, TabelaCircuitos):
+        return _disjuntor_geral_tabela(circuitos, tabela_fator_demanda, tensao_nominal, tabela_disjuntores)
+    disjuntores_gerais = {}
+    quadros = {}
+    for circuito in circuitos:
+        quadro = circuito['Quadro']
+        if quadro not in quadros:
+            quadros[quadro] = []
+        quadros[quadro].append(circuito)
+    for quadro, circuitos_quadro in quadros.items():
+        num_circuitos_quadro = len(circuitos_quadro)
+        fator_demanda_quadro = tabela_fator_demanda.get(num_circuitos_quadro, 1)
+        potencia_total_quadro = sum(circuito['potencia'] for circuito in circuitos_quadro)
+        corrente_total_quadro = calcular_corrente_nominal(potencia_total_quadro * fator_demanda_quadro, tensao_nominal, 0.9, 3)
+        disjuntor_quadro = encontrar_disjuntor_menor(corrente_total_quadro, tabela_disjuntores)
+        disjuntores_gerais[quadro] = disjuntor_quadro
+    return disjuntores_gerais
+
+def _disjuntor_geral_tabela(tabela, tabela_fator_demanda, tensao_nominal, tabela_disjuntores):
+    codigos, quadros = tabela.codigos('Quadro')
+    com_quadro = codigos >= 0
+    contagem = np.bincount(codigos[com_quadro], minlength=len(quadros))
+    potencia_total = np.bincount(codigos[com_quadro], weights=tabela['potencia'][com_quadro], minlength=len(quadros))
+    disjuntores_gerais = {}
+    for quadro, num_circuitos_quadro, potencia_total_quadro in zip(quadros, contagem, potencia_total):
+        if num_circuitos_quadro == 0:
+            continue
+        fator_demanda_quadro = tabela_fator_demanda.get(int(num_circuitos_quadro), 1)
+        corrente_total_quadro = calcular_corrente_nominal(potencia_total_quadro * fator_demanda_quadro, tensao_nominal, 0.9, 3)
+        disjuntores_gerais[quadro] = encontrar_disjuntor_menor(corrente_total_quadro, tabela_disjuntores)
+    return disjuntores_gerais
+
+def calcular_disjuntor_qgbt(disjuntores_gerais, tabela_fator_demanda_qgbt, tensao_nominal):
+    corrente_total = sum(disjuntores_gerais.values())
+    num_quadros = len(disjuntores_gerais)
+    fator_demanda_qgbt = tabela_fator_demanda_qgbt.loc[tabela_fator_demanda_qgbt['num_circuitos'] == num_quadros, 'FatordeDemanda'].iloc[0]
+    corrente_ajustada = corrente_total * fator_demanda_qgbt
+    disjuntor_qgbt = corrente_ajustada
+    return disjuntor_qgbt
+
+AVISO_FASES = 'Existem circuitos que necessitam de mais de uma fase, reveja a Configuração da Alimentação Geral'
+
+
+def _avisar_streamlit(mensagem):
+    st.warning(mensagem, icon="⚠️")
+
+
+def distribuir_fases(circuitos, fases_qd, avisar=_avisar_streamlit):
+    # avisar: recebe os avisos (no app, st.warning; fora dele, ex.: uma lista, ou None para ignorar)
+    avisar = avisar or (lambda mensagem: None)
+    if isinstance(circuitos, TabelaCircuitos):
+        return _distribuir_fases_tabela(circuitos, fases_qd, avisar)
+    carga_fase = {'R': 0, 'S': 0, 'T': 0}
+    
+    for circuito in circuitos:
+        num_fases = circuito['num_fases']
+        potencia = circuito['potencia']
+        
+        if fases_qd == 3:
+            if num_fases == 1:
+                fase = min(carga_fase, key=carga_fase.get)
+                carga_fase[fase] += potencia
+                circuito['Fases'] = fase
+            elif num_fases == 2:
+                fases = sorted(carga_fase, key=carga_fase.get)[:2]
+                carga_fase[fases[0]] += potencia / 2
+                carga_fase[fases[1]] += potencia / 2
+                circuito['Fases'] = fases[0] + fases[1]
+            elif num_fases == 3:
+                carga_fase['R'] += potencia / 3
+                carga_fase['S'] += potencia / 3
+                carga_fase['T'] += potencia / 3
+                circuito['Fases'] = 'RST'
+        
+        elif fases_qd == 2:
+            if num_fases == 1:
+                fase = min(['R', 'S'], key=lambda f: carga_fase[f])
+                carga_fase[fase] += potencia
+                circuito['Fases'] = fase
+            elif num_fases == 2:
+                carga_fase['R'] += potencia / 2
+                carga_fase['S'] += potencia / 2
+                circuito['Fases'] = 'RS'
+        
+        elif fases_qd == 1:
+            if num_fases == 1:
+                carga_fase['R'] += potencia
+                circuito['Fases'] = 'R'
+            else:
+                avisar(AVISO_FASES)
+    
+    return circuitos
+
+def _distribuir_fases_tabela(tabela, fases_qd, avisar):
+    # Balanceamento sequencial: cada circuito depende da carga acumulada dos anteriores
+    carga_fase = {'R': 0, 'S': 0, 'T': 0}
+    fases_circuitos = []
+    for num_fases, potencia in zip(tabela['num_fases'].tolist(), tabela['potencia'].tolist()):
+        fase_circuito = None
+        if fases_qd == 3:
+            if num_fases == 1:
+                fase_circuito = min(carga_fase, key=carga_fase.get)
+                carga_fase[fase_circuito] += potencia
+            elif num_fases == 2:
+                fases = sorted(carga_fase, key=carga_fase.get)[:2]
+                carga_fase[fases[0]] += potencia / 2
+                carga_fase[fases[1]] += potencia / 2
+                fase_circuito = fases[0] + fases[1]
+            elif num_fases == 3:
+                for fase in carga_fase:
+                    carga_fase[fase] += potencia / 3
+                fase_circuito = 'RST'
+        elif fases_qd == 2:
+            if num_fases == 1:
+                fase_circuito = min(['R', 'S'], key=lambda f: carga_fase[f])
+                carga_fase[fase_circuito] += potencia
+            elif num_fases == 2:
+                carga_fase['R'] += potencia / 2
+                carga_fase['S'] += potencia / 2
+                fase_circuito = 'RS'
+        elif fases_qd == 1:
+            if num_fases == 1:
+                carga_fase['R'] += potencia
+                fase_circuito = 'R'
+            else:
+                avisar(AVISO_FASES)
+        fases_circuitos.append(fase_circuito)
+    tabela.definir('Fases', np.array(fases_circuitos, dtype=object))
+    return tabela
+
+
+def encontrar_disjuntor_menor(corrente, tabela_disjuntores):
+    return obter_catalogo(tabela_disjuntores).maior_abaixo(corrente)
+
+def ordenar_circuitos(circuitos):
+    def extrair_numero(nome):
+        # Extrai o número antes do traço do nome do circuito
+        partes = nome.split('-')
+        if len(partes) > 0:
+            try:
+                return int(''.join(filter(str.isdigit, partes[0])))
+            except ValueError:
+                return float('inf')  # Caso não tenha número, coloca no final
+        return float('inf')
+    
+    return sorted(circuitos, key=lambda x: extrair_numero(x['nome']))
+
+def criar_lista_materiais(circuitos, disjuntores_gerais):
+    materiais = {}
+    for circuito in circuitos:
+        num_fases = circuito['num_fases']
+        disjuntor = circuito['Disjuntor (Ampere)']
+        if num_fases not in materiais:
+            materiais[num_fases] = {}
+        if disjuntor not in materiais[num_fases]:
+            materiais[num_fases][disjuntor] = 0
+        materiais[num_fases][disjuntor] += 1
+    for quadro, disjuntor_quadro in disjuntores_gerais.items():
+        num_fases = 3
+        if num_fases not in materiais:
+            materiais[num_fases] = {}
+        if disjuntor_quadro not in materiais[num_fases]:
+            materiais[num_fases][disjuntor_quadro] = 0
+        materiais[num_fases][disjuntor_quadro] += 1
+    return materiais
+
+def ler_materiais_existentes(nome_arquivo):
+    df = pd.read_excel(nome_arquivo)
+    materiais_existentes = {}
+    quantidades = df.groupby(['num_fases', 'corrente'], sort=False)['Quantidade'].sum()
+    for (num_fases, corrente), quantidade in quantidades.items():
+        materiais_existentes.setdefault(num_fases, {})[corrente] = quantidade
+    return materiais_existentes
+
+def cruzar_listas_materiais(materiais_necessarios, materiais_existentes):
+    materiais_compra = {}
+    materiais_ociosos = {k: v.copy() for k, v in materiais_existentes.items()}
+    for num_fases, disjuntores in materiais_necessarios.items():
+        for corrente, quantidade_necessaria in disjuntores.items():
+            if num_fases not in materiais_ociosos:
+                materiais_ociosos[num_fases] = {}
+            quantidade_existente = materiais_ociosos[num_fases].get(corrente, 0)
+            quantidade_comprar = max(0, quantidade_necessaria - quantidade_existente)
+            if quantidade_comprar > 0:
+                if num_fases not in materiais_compra:
+                    materiais_compra[num_fases] = {}
+                materiais_compra[num_fases][corrente] = quantidade_comprar
+            materiais_ociosos[num_fases][corrente] = max(0, quantidade_existente - quantidade_necessaria)
+    for num_fases in materiais_existentes:
+        for corrente in materiais_existentes[num_fases]:
+            if num_fases not in materiais_necessarios or corrente not in materiais_necessarios[num_fases]:
+                quantidade_existente = materiais_existentes[num_fases].get(corrente, 0)
+                materiais_ociosos[num_fases][corrente] = max(materiais_ociosos[num_fases].get(corrente, 0), quantidade_existente)
+    return materiais_compra, materiais_ociosos
+
+# Função para ler os dados dos circuitos da planilha Excel
+def ler_circuitos_de_excel(file_path):
+    circuito_data = pd.read_excel(file_path)
+    circuitos = circuito_data.to_dict(orient='records')
+    return circuitos
+
+def selecionar_dr(corrente_disjuntor, catalogo=None):
+    # Menor DR do catálogo com corrente nominal acima da do disjuntor (None se não houver)
+    return (catalogo or catalogo_padrao).selecionar_dr(corrente_disjuntor)
+
+seção_neutro_map = {
+    25: 25,
+    35: 35,
+    50: 35,
+    70: 50,
+    95: 50,
+    120: 70,
+    150: 70,
+    185: 95,
+    240: 120,
+    300: 150,
+    400: 185
+}
+
+seção_terra_map = {
+    25: 16,
+    35: 16,
+    50: 25,
+    70: 35,
+    95: 50,
+    120: 70,
+    150: 95,
+    185: 95,
+    240: 120,
+    300: 150
+    }
+
+condutores_mapping = {
+    '1.5': 91925,
+    '2.5': 91926,
+    '4.0': 91928,
+    '6.0': 91930,
+    '10.0': 91932,
+    '16.0': 91934,
+    '10.0': 92979,
+    '16.0': 92981,
+    '25.0': 92984,
+    '35.0': 92986,
+    '50.0': 92988,
+    '70.0': 92990,
+    '95.0': 92992,
+    '120.0': 92994,
+    '150.0': 92996,
+    '185.0': 92998,
+    '240.0': 93000,
+    '300.0': 93002
+}
+
+sinapi_quadros = {
+    3: 101877,
+    6: 101876,
+    12: 101875,
+    18: 101878,
+    24: 101879,
+    30: 101880,
+    40: 101881
+}
+
+def get_disjuntor_sinapi(row, catalogo=None):
+    fases = row['Número de fases']
+    if catalogo is not None:
+        return catalogo.codigo_sinapi(fases, row['Disjuntor'])
+    disjuntor = f"{row['Disjuntor']}A"
+    return disjuntores_mapping.get(fases, {}).get(disjuntor)
+def calcular_custo_total(df, sinapi_df1):
+    # Criar um dicionário para mapeamento
+    custo_dict = sinapi_df1.set_index('CODIGO  DA COMPOSICAO')['CUSTO TOTAL'].to_dict()
+    nome_dict = sinapi_df1.set_index('CODIGO  DA COMPOSICAO')['DESCRICAO DA COMPOSICAO'].to_dict()
+    df['Descrição da Composição']=df['Codigo'].map(nome_dict)
+    # Mapear os custos totais para cada código no DataFrame df_agrupado
+    df['Custo Unitário'] = df['Codigo'].map(custo_dict)
+
+    # Multiplicar a quantidade pelo custo total para obter o custo total final
+    df['Custo Total'] = df['Quantidade'] * df['Custo Unitário']
+    return df
+
+def calcular_custo_totaldisj(df, sinapi_df1):
+    # Criar um dicionário para mapeamento
+    custo_dict = sinapi_df1.set_index('CODIGO  DA COMPOSICAO')['CUSTO TOTAL'].to_dict()
+    nome_dict = sinapi_df1.set_index('CODIGO  DA COMPOSICAO')['DESCRICAO DA COMPOSICAO'].to_dict()
+    df_agrupado = df['Codigo'].value_counts().reset_index()
+    df_agrupado.columns = ['Codigo', 'Quantidade']
+    # Mapear os custos totais e descrições para cada código no DataFrame df
+    df_agrupado['Descrição da Composição'] = df_agrupado['Codigo'].map(nome_dict)
+    df_agrupado['Custo Unitário'] = df_agrupado['Codigo'].map(custo_dict)
+    # Agrupar por código e calcular a quantidade total e custo total
+    df_agrupado['Custo Total'] = df_agrupado['Quantidade'] * df_agrupado['Custo Unitário']
+    
+    return df_agrupado
+
+def escolher_quadro(circuitos, sinapi_quadros):
+    for max_circuitos in sorted(sinapi_quadros.keys()):
+        if circuitos <= max_circuitos - 2:
+            return sinapi_quadros[max_circuitos]
+    return sinapi_quadros[max(sinapi_quadros.keys())]
+
+def calcular_custo_totalquadros(df, sinapi_df1):
+    # Criar um dicionário para mapeamento
+    custo_dict = sinapi_df1.set_index('CODIGO  DA COMPOSICAO')['CUSTO TOTAL'].to_dict()
+    nome_dict = sinapi_df1.set_index('CODIGO  DA COMPOSICAO')['DESCRICAO DA COMPOSICAO'].to_dict()
+    
+    # Mapear os custos totais e descrições para cada código no DataFrame df
+    df['Descrição da Composição'] = df['Codigo'].map(nome_dict)
+    df['Custo Unitário'] = df['Codigo'].map(custo_dict)
+    
+    # Agrupar por código e calcular a quantidade total e custo total
+    df_agrupado = df['Codigo'].value_counts().reset_index()
+    df_agrupado.columns = ['Codigo', 'Quantidade']
+    df_agrupado['Descrição da Composição'] = df_agrupado['Codigo'].map(nome_dict)
+    df_agrupado['Custo Unitário'] = df_agrupado['Codigo'].map(custo_dict)
+    df_agrupado['Custo Total'] = df_agrupado['Quantidade'] * df_agrupado['Custo Unitário']
+    
+    return df_agrupado
+
+NUM_FASES_POR_ALIMENTACAO = {"F+N": 1, "F+N+T": 1, "F+F+T": 2, "F+F+F+T": 3}
+
+def definir_num_fases(circuitos):
+    # Determina 'num_fases' a partir do tipo de alimentação escolhido em 'num_fases1'
+    if isinstance(circuitos, TabelaCircuitos):
+        codigos, categorias = circuitos.codigos('num_fases1')
+        mapa = np.array([NUM_FASES_POR_ALIMENTACAO.get(c, 0) for c in categorias] + [0], dtype=np.int8)
+        circuitos.definir('num_fases', mapa[codigos])
+        return circuitos
+    for ckt in circuitos:
+        if ckt['num_fases1'] in ["F+N", "F+N+T"]:
+            ckt['num_fases']=1
+        elif ckt['num_fases1']  == "F+F+T":
+            ckt['num_fases']=2
+        elif ckt['num_fases1']  == "F+F+F+T":
+            ckt['num_fases']=3
+    return circuitos
+
+def preparar_circuitos_para_calculo(circuitos):
+    # Comprimento digitado em metros -> km; queda máxima admitida de 5% da tensão
+    if isinstance(circuitos, TabelaCircuitos):
+        circuitos.definir('comprimento', circuitos['comprimento'] / 1000)
+        circuitos.definir('queda_tensao_max_admitida', 0.05 * circuitos['tensao'])
+        return circuitos
+    for circuito in circuitos:
+        circuito['comprimento'] = circuito['comprimento'] / 1000
+        circuito['queda_tensao_max_admitida'] = 0.05 * circuito['tensao']
+    return circuitos
+
+def escolher_quadros_sinapi(circuitos):
+    if isinstance(circuitos, TabelaCircuitos):
+        codigos, quadros = circuitos.codigos('Quadro')
+        quadros_counts = pd.Series(np.bincount(codigos[codigos >= 0], minlength=len(quadros)),
+                                   index=pd.Index(quadros, name='Quadro')).sort_index()
+        quadros_counts = quadros_counts[quadros_counts > 0]
+    else:
+        circuitos_df = pd.DataFrame(circuitos)
+        quadros_counts = circuitos_df.groupby('Quadro').size()
+    quadros_escolhidos = quadros_counts.apply(lambda x: escolher_quadro(x, sinapi_quadros))
+    return pd.DataFrame(quadros_escolhidos, columns=['Codigo'])
+
+def montar_tabela_materiais(resultados_circuitos, catalogo=None):
+    df_selecionado = resultados_circuitos[['Nome do Circuito', 'Seção do Condutor (mm²)', 'Disjuntor','Comprimento','Número de fases','Tipo de alimentação']].copy()
+    df_selecionado['Quantidade de condutor fase'] = df_selecionado['Comprimento'] * df_selecionado['Número de fases']*1000
+    # Adicionar coluna para "Seção do Condutor Neutro" com regra de s <= 25
+    df_selecionado['Seção do Condutor Neutro (mm²)'] = df_selecionado['Seção do Condutor (mm²)'].apply(
+        lambda x: x if x <= 25 else seção_neutro_map.get(x, x)
+    )
+    # Adicionar coluna para "comprimento neutro"
+    df_selecionado['Comprimento neutro'] = df_selecionado.apply(
+        lambda row: row['Comprimento'] * 1000 if row['Número de fases'] == 1 else 0,
+        axis=1
+    )
+    # Adicionar coluna para "Seção do Condutor de Terra" com regra de s <= 16
+    df_selecionado['Seção do Condutor de Terra (mm²)'] = df_selecionado['Seção do Condutor (mm²)'].apply(
+        lambda x: x if x <= 16 else seção_terra_map.get(x, x)
+    )
+    # Adicionar coluna para "comprimento terra"
+    df_selecionado['Comprimento terra'] = df_selecionado.apply(
+        lambda row: row['Comprimento'] * 1000 if row['Tipo de alimentação'] != "F+N" else 0,
+        axis=1
+    )
+    df_selecionado['Codigo SINAPI Condutor Fase'] = df_selecionado['Seção do Condutor (mm²)'].astype(str).map(condutores_mapping)
+    df_selecionado['Codigo SINAPI Condutor Neutro'] = df_selecionado['Seção do Condutor Neutro (mm²)'].astype(str).map(condutores_mapping)
+    df_selecionado['Codigo SINAPI Condutor de Terra'] = df_selecionado['Seção do Condutor de Terra (mm²)'].astype(str).map(condutores_mapping)
+    df_selecionado['Codigo SINAPI Disjuntor'] = df_selecionado.apply(get_disjuntor_sinapi, axis=1, catalogo=catalogo)
+    return df_selecionado
+
+def montar_orcamento(df_selecionado, quadros_escolhidos_df, sinapi_df):
+    df_fase = df_selecionado[['Codigo SINAPI Condutor Fase', 'Quantidade de condutor fase']].dropna().rename(
+        columns={'Codigo SINAPI Condutor Fase': 'Codigo', 'Quantidade de condutor fase': 'Quantidade'}
+    )
+    df_neutro = df_selecionado[['Codigo SINAPI Condutor Neutro', 'Comprimento neutro']].dropna().rename(
+        columns={'Codigo SINAPI Condutor Neutro': 'Codigo', 'Comprimento neutro': 'Quantidade'}
+    )
+    df_terra = df_selecionado[['Codigo SINAPI Condutor de Terra', 'Comprimento terra']].dropna().rename(
+        columns={'Codigo SINAPI Condutor de Terra': 'Codigo', 'Comprimento terra': 'Quantidade'}
+    )
+
+    # Concatenar os DataFrames
+    df_conductors = pd.concat([df_fase, df_neutro, df_terra])
+    # Somar as quantidades por código
+    df_conductors = df_conductors.groupby('Codigo', as_index=False).sum()
+
+    custos_df=calcular_custo_total(df_conductors,sinapi_df)
+    df_disjuntores = df_selecionado['Codigo SINAPI Disjuntor'].to_frame(name='Codigo')
+    custos_disj=calcular_custo_totaldisj(df_disjuntores,sinapi_df)
+    custo_total_quadros = calcular_custo_totalquadros(quadros_escolhidos_df.copy(), sinapi_df)
+    return pd.concat([custo_total_quadros, custos_disj, custos_df], axis=0, ignore_index=True)
@@ -0,0 +1,278 @@
+import argparse
+import builtins
+import contextlib
+import logging
+import os
+import threading
+import time
+from unittest.mock import MagicMock
+
+import numpy as np
+import pandas as pd
+from streamlit.runtime import Runtime
+from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+from streamlit.runtime.media_file_manager import MediaFileManager
+from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from streamlit.testing.v1 import AppTest, app_test
+
+from carga_servico import gerar_circuitos
+from editor_circuitos import preparar_base
+
+PASTA = os.path.dirname(os.path.abspath(__file__))
+SCRIPT_APP = os.path.join(PASTA, 'streamlit_app.py')
+BOTAO_CALCULAR = 'Calcular Parâmetros'
+CAMPO_PROJETO = 'Nome do projeto (opcional)'
+# Marca cada sessão simulada na session_state para atribuir a ela as escritas em disco
+CHAVE_SESSAO = '_sessao_carga'
+# Downloads que o app já gravou com nome fixo na pasta de trabalho (conferidos se existirem)
+ARQUIVOS_FIXOS = {
+    'Baixar Diagrama Unifilar': 'diagrama_unifilar_ajustado.dxf',
+    'Baixar Memorial de Cálculo': 'memcalc.tex',
+}
+ACOES = ('carregar', 'editar', 'calcular')
+INTERVALO_MEMORIA = 0.1
+
+
+def memoria_rss():
+    """Memória residente do processo em bytes."""
+    try:
+        with open('/proc/self/statm') as arquivo:
+            return int(arquivo.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _sessao_atual():
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        return None
+    try:
+        return ctx.session_state[CHAVE_SESSAO]
+    except KeyError:
+        return None
+
+
+class MonitorEscritas:
+    """
+    Registra (caminho, sessão, instante) de cada arquivo aberto para escrita dentro de um rerun
+    de uma sessão simulada. Troca builtins.open enquanto está ativo.
+    """
+
+    def __init__(self):
+        self.escritas = []
+        self._open = builtins.open
+
+    def _abrir(self, arquivo, mode='r', *args, **kwargs):
+        if isinstance(arquivo, (str, bytes, os.PathLike)) and any(c in mode for c in 'wax+'):
+            sessao = _sessao_atual()
+            if sessao is not None:
+                self.escritas.append((os.path.abspath(os.fsdecode(arquivo)), sessao, time.perf_counter()))
+        return self._open(arquivo, mode, *args, **kwargs)
+
+    def __enter__(self):
+        builtins.open = self._abrir
+        return self
+
+    def __exit__(self, *exc):
+        builtins.open = self._open
+
+
+class _MidiaPorSessao:
+    """Encaminha cada chamada ao gerenciador de mídia da sessão simulada do rerun em curso."""
+
+    def __init__(self, gerenciadores):
+        self._gerenciadores = gerenciadores
+
+    def __getattr__(self, nome):
+        return getattr(self._gerenciadores[_sessao_atual()], nome)
+
+
+class RuntimeCompartilhado:
+    """
+    Cada AppTest.run instala um runtime falso como global e o remove no fim, o que derruba os
+    reruns das outras sessões em andamento. Enquanto ativo, esses runs passam a mexer numa
+    classe substituta e todas as sessões usam este runtime único, como num servidor. Todas
+    têm o mesmo session_id no AppTest, então a mídia (downloads) fica separada por CHAVE_SESSAO.
+    """
+
+    def __init__(self, sessoes):
+        self.armazenamentos = {i: MemoryMediaFileStorage('/mock/media') for i in [None] + list(range(sessoes))}
+        self._runtime = MagicMock(spec=Runtime)
+        self._runtime.media_file_mgr = _MidiaPorSessao(
+            {i: MediaFileManager(armazenamento) for i, armazenamento in self.armazenamentos.items()})
+        self._runtime.cache_storage_manager = MemoryCacheStorageManager()
+
+    def __enter__(self):
+        self._originais = (app_test.Runtime, Runtime._instance)
+        app_test.Runtime = type('Runtime', (), {'_instance': None})
+        Runtime._instance = self._runtime
+        return self
+
+    def __exit__(self, *exc):
+        app_test.Runtime, Runtime._instance = self._originais
+
+
+def contencao(escritas):
+    """
+    Arquivos escritos por mais de uma sessão, com o número de escritas e de sobrescritas
+    (escritas cuja escrita anterior no mesmo arquivo veio de outra sessão).
+    """
+    df = pd.DataFrame(escritas, columns=['arquivo', 'sessao', 'instante']).sort_values(['arquivo', 'instante'])
+    anterior = df.groupby('arquivo')['sessao'].shift()
+    df['sobrescrita'] = anterior.notna() & (anterior != df['sessao'])
+    resumo = df.groupby('arquivo').agg(sessoes=('sessao', 'nunique'), escritas=('sessao', 'size'),
+                                       sobrescritas=('sobrescrita', 'sum')).reset_index()
+    resumo = resumo[resumo['sessoes'] > 1]
+    resumo['arquivo'] = [os.path.relpath(c, PASTA) for c in resumo['arquivo']]
+    return resumo.sort_values('sobrescritas', ascending=False).reset_index(drop=True)
+
+
+def _botoes_download(no):
+    if getattr(no, 'type', None) == 'download_button':
+        yield no.proto
+    for filho in getattr(no, 'children', {}).values():
+        yield from _botoes_download(filho)
+
+
+def simular_sessao(indice, tabelas, midia, resultado, timeout=600.0, salvar_projeto=False):
+    """
+    Uma sessão do app: abre a página, opcionalmente dá nome ao projeto e, para cada tabela,
+    troca os circuitos do editor, clica em Calcular Parâmetros e baixa os artefatos. Se algum
+    download também existe com nome fixo na pasta do app, é comparado com o arquivo em disco; se
+    outra sessão o sobrescreveu nesse meio tempo, conta como divergente.
+    """
+    def medir(acao, rerun):
+        inicio = time.perf_counter()
+        at = rerun()
+        resultado['latencias'].append((acao, time.perf_counter() - inicio))
+        resultado['excecoes'] += len(at.exception)
+
+    at = AppTest.from_file(SCRIPT_APP, default_timeout=timeout)
+    at.session_state[CHAVE_SESSAO] = indice
+    medir('carregar', at.run)
+    if salvar_projeto:
+        campo = next(c for c in at.text_input if c.label == CAMPO_PROJETO)
+        medir('editar', lambda: campo.input(f"Carga {indice}").run())
+    for tabela in tabelas:
+        # O mesmo que o app faz ao consolidar uma edição do data_editor
+        at.session_state['circuitos_base'] = tabela
+        at.session_state['circuitos_editados'] = tabela
+        at.session_state['versao_editor'] = at.session_state['versao_editor'] + 1
+        medir('editar', at.run)
+        botao = next(b for b in at.button if b.label == BOTAO_CALCULAR)
+        medir('calcular', lambda: botao.click().run())
+        resultado['calculos'] += 1
+        for download in _botoes_download(at._tree):
+            id_arquivo = os.path.splitext(os.path.basename(download.url))[0]
+            # Os arquivos substituídos saem do armazenamento no fim do rerun seguinte
+            conteudo = midia.get_file(id_arquivo).content
+            resultado['downloads'] += 1
+            resultado['bytes'] += len(conteudo)
+            fixo = os.path.join(PASTA, ARQUIVOS_FIXOS[download.label]) if download.label in ARQUIVOS_FIXOS else None
+            if fixo and os.path.exists(fixo):
+                with open(fixo, 'rb') as arquivo:
+                    resultado['divergentes'] += arquivo.read() != conteudo
+
+
+def executar_carga(sessoes=4, rodadas=3, num_circuitos=30, semente=0, timeout=600.0, salvar_projeto=False):
+    """
+    Roda `sessoes` sessões simultâneas do app, uma thread cada (como os reruns no servidor do
+    Streamlit), com `rodadas` tabelas diferentes por sessão. Retorna (resumo, contenção).
+    """
+    runtime = RuntimeCompartilhado(sessoes)
+    resultados = [{'latencias': [], 'excecoes': 0, 'calculos': 0, 'downloads': 0, 'bytes': 0,
+                   'divergentes': 0, 'falha': None} for _ in range(sessoes)]
+
+    def sessao(indice):
+        tabelas = [preparar_base(gerar_circuitos(num_circuitos, semente + 1000 * indice + rodada))
+                   for rodada in range(rodadas)]
+        try:
+            simular_sessao(indice, tabelas, runtime.armazenamentos[indice], resultados[indice], timeout, salvar_projeto)
+        except Exception as e:
+            resultados[indice]['falha'] = f"{type(e).__name__}: {e}"
+
+    pico = [memoria_rss()]
+    parar = threading.Event()
+
+    def amostrar_memoria():
+        while not parar.wait(INTERVALO_MEMORIA):
+            pico[0] = max(pico[0], memoria_rss())
+
+    rss_inicio = pico[0]
+    amostrador = threading.Thread(target=amostrar_memoria, daemon=True)
+    amostrador.start()
+    threads = [threading.Thread(target=sessao, args=(i,)) for i in range(sessoes)]
+    inicio = time.perf_counter()
+    try:
+        # O app imprime as tabelas a cada rerun
+        with runtime, MonitorEscritas() as monitor, open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+    finally:
+        total = time.perf_counter() - inicio
+        parar.set()
+        amostrador.join()
+
+    latencias = pd.DataFrame([l for r in resultados for l in r['latencias']], columns=['acao', 'segundos'])
+    disputa = contencao(monitor.escritas)
+    calculos = sum(r['calculos'] for r in resultados)
+    resumo = {
+        'sessoes': sessoes,
+        'reruns': len(latencias),
+        'calculos': calculos,
+        'calculos_por_segundo': calculos / total,
+        'excecoes': sum(r['excecoes'] for r in resultados),
+        'falhas': [r['falha'] for r in resultados if r['falha'] is not None],
+        'downloads': sum(r['downloads'] for r in resultados),
+        'mb_baixados': sum(r['bytes'] for r in resultados) / 1e6,
+        'rss_inicio_mb': rss_inicio / 1e6,
+        'rss_pico_mb': pico[0] / 1e6,
+        'crescimento_rss_mb': (memoria_rss() - rss_inicio) / 1e6,
+        'arquivos_disputados': len(disputa),
+        'sobrescritas': int(disputa['sobrescritas'].sum()),
+        'downloads_divergentes': sum(r['divergentes'] for r in resultados),
+    }
+    for acao in ACOES:
+        segundos_ms = latencias.loc[latencias['acao'] == acao, 'segundos'].to_numpy() * 1000
+        for p in (50, 95, 99):
+            resumo[f"{acao}_p{p}_ms"] = float(np.percentile(segundos_ms, p)) if len(segundos_ms) else float('nan')
+    return resumo, disputa
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Teste de carga do app Streamlit com sessões simuladas simultâneas.')
+    parser.add_argument('--sessoes', type=int, nargs='+', default=[1, 2, 4, 8],
+                        help='Níveis de concorrência, do menor para o maior.')
+    parser.add_argument('--rodadas', type=int, default=3, help='Edições seguidas de cálculo em cada sessão.')
+    parser.add_argument('--circuitos', type=int, default=30)
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--timeout', type=float, default=600.0, help='Tempo máximo de cada rerun (s).')
+    parser.add_argument('--salvar-projeto', action='store_true',
+                        help='Preenche o nome do projeto: cada cálculo grava revisão em projetos.sqlite e na carteira.')
+    args = parser.parse_args()
+
+    # Acessos à session_state de fora dos reruns, feitos pelas sessões simuladas
+    logging.getLogger('streamlit.runtime.scriptrunner.script_run_context').setLevel(logging.ERROR)
+    # O app abre as planilhas e grava os artefatos relativos à pasta dele
+    os.chdir(PASTA)
+    for sessoes in args.sessoes:
+        r, disputa = executar_carga(sessoes, args.rodadas, args.circuitos, args.semente, args.timeout,
+                                    args.salvar_projeto)
+        print(f"{r['sessoes']} sessão(ões): {r['reruns']} reruns, {r['calculos']} cálculos "
+              f"({r['calculos_por_segundo']:.2f}/s), {r['excecoes']} exceções, {len(r['falhas'])} falhas, "
+              f"{r['downloads']} downloads ({r['mb_baixados']:.1f} MB)")
+        for acao in ACOES:
+            print(f"  {acao}: p50 {r[f'{acao}_p50_ms']:.0f} ms, p95 {r[f'{acao}_p95_ms']:.0f} ms, "
+                  f"p99 {r[f'{acao}_p99_ms']:.0f} ms")
+        print(f"  memória: {r['rss_inicio_mb']:.0f} MB no início, pico {r['rss_pico_mb']:.0f} MB, "
+              f"crescimento {r['crescimento_rss_mb']:+.0f} MB")
+        print(f"  arquivos disputados: {r['arquivos_disputados']}, sobrescritas entre sessões: {r['sobrescritas']}, "
+              f"downloads diferentes do arquivo em disco: {r['downloads_divergentes']}")
+        if not disputa.empty:
+            print('    ' + disputa.to_string(index=False).replace('\n', '\n    '))
+        for falha in r['falhas']:
+            print(f"  falha: {falha}")
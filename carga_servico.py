@@ -0,0 +1,107 @@
+import argparse
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import numpy as np
+
+METODO = "3 condutores carregados – método B1"
+
+
+def gerar_circuitos(quantidade, semente=0):
+    """Circuitos sintéticos no formato da tabela do app (comprimento em metros)."""
+    rng = np.random.default_rng(semente)
+    tipos = ["F+N", "F+N+T", "F+F+T", "F+F+F+T"]
+    circuitos = []
+    for i in range(quantidade):
+        circuitos.append({
+            "nome": f"{i + 1}-{'Iluminação' if i % 4 == 0 else 'TUG'}",
+            "potencia": int(rng.integers(100, 4000)),
+            "tensao": 220,
+            "fator_potencia": 0.92,
+            "num_fases1": tipos[int(rng.integers(0, len(tipos)))],
+            "temperatura": 30,
+            "num_circuitos": int(rng.integers(1, 4)),
+            "comprimento": int(rng.integers(5, 40)),
+            "met_instala": METODO,
+            "DR": bool(i % 3 == 0),
+            "Quadro": f"QD{i % 3 + 1}",
+        })
+    return circuitos
+
+
+def _postar(url, corpo):
+    requisicao = urllib.request.Request(url, data=corpo, headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(requisicao, timeout=120) as resposta:
+            resposta.read()
+            return resposta.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def executar_carga(url_base, rota='/dimensionar', concorrencia=8, duracao=10.0, num_circuitos=30):
+    """Dispara requisições em paralelo durante 'duracao' segundos e mede a latência de cada uma."""
+    corpo = json.dumps({'circuitos': gerar_circuitos(num_circuitos), 'fases_qd': 3}).encode('utf-8')
+    url = url_base.rstrip('/') + rota
+    latencias, status = [], []
+    trava = threading.Lock()
+    fim = time.perf_counter() + duracao
+
+    def cliente():
+        while time.perf_counter() < fim:
+            inicio = time.perf_counter()
+            codigo = _postar(url, corpo)
+            decorrido = time.perf_counter() - inicio
+            with trava:
+                latencias.append(decorrido)
+                status.append(codigo)
+
+    inicio = time.perf_counter()
+    threads = [threading.Thread(target=cliente) for _ in range(concorrencia)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    total = time.perf_counter() - inicio
+
+    latencias_ms = np.array(latencias) * 1000
+    return {
+        'rota': rota,
+        'concorrencia': concorrencia,
+        'requisicoes': len(latencias),
+        'erros': int(sum(1 for s in status if s != 200)),
+        'req_por_segundo': len(latencias) / total,
+        'p50_ms': float(np.percentile(latencias_ms, 50)) if len(latencias_ms) else float('nan'),
+        'p95_ms': float(np.percentile(latencias_ms, 95)) if len(latencias_ms) else float('nan'),
+        'p99_ms': float(np.percentile(latencias_ms, 99)) if len(latencias_ms) else float('nan'),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Teste de carga do serviço HTTP de dimensionamento.')
+    parser.add_argument('--url', help='URL de um serviço já em execução; sem ela, sobe um serviço local.')
+    parser.add_argument('--rota', default='/dimensionar')
+    parser.add_argument('--concorrencia', type=int, default=8)
+    parser.add_argument('--duracao', type=float, default=10.0)
+    parser.add_argument('--circuitos', type=int, default=30)
+    parser.add_argument('--processos', type=int, default=2)
+    args = parser.parse_args()
+
+    servico = None
+    url = args.url
+    if url is None:
+        from servico_http import ServicoDimensionamento
+        servico = ServicoDimensionamento(porta=0, processos=args.processos,
+                                         max_concorrencia=args.concorrencia).iniciar()
+        url = servico.endereco
+    try:
+        r = executar_carga(url, args.rota, args.concorrencia, args.duracao, args.circuitos)
+    finally:
+        if servico is not None:
+            servico.encerrar()
+    print(f"{r['rota']}: {r['requisicoes']} requisições, {r['erros']} erros, "
+          f"{r['req_por_segundo']:.1f} req/s, p50 {r['p50_ms']:.1f} ms, "
+          f"p95 {r['p95_ms']:.1f} ms, p99 {r['p99_ms']:.1f} ms")
@@ -0,0 +1,216 @@
+import datetime
+import re
+import uuid
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+CAMINHO_PADRAO = 'carteira'
+LINHAS_POR_LOTE = 256_000
+PARCIAIS_POR_COMPACTACAO = 64
+
+# Uma pasta por mês (mes=AAAA-MM): consultas por período nem abrem os meses fora do intervalo
+PARTICIONAMENTO = ds.partitioning(pa.schema([('mes', pa.string())]), flavor='hive')
+
+ESQUEMA_LEVANTAMENTO = pa.schema([
+    ('projeto', pa.string()),
+    ('revisao', pa.int32()),
+    ('data', pa.timestamp('s')),
+    ('circuito', pa.string()),
+    ('categoria', pa.string()),   # 'condutor' ou 'disjuntor'
+    ('papel', pa.string()),       # fase, neutro ou terra (condutores)
+    ('secao', pa.float64()),
+    ('polos', pa.int8()),
+    ('corrente', pa.float64()),
+    ('codigo', pa.int64()),
+    ('quantidade', pa.float64()),  # metros de condutor ou unidades
+])
+
+ESQUEMA_ORCAMENTO = pa.schema([
+    ('projeto', pa.string()),
+    ('revisao', pa.int32()),
+    ('data', pa.timestamp('s')),
+    ('codigo', pa.int64()),
+    ('descricao', pa.string()),
+    ('quantidade', pa.float64()),
+    ('custo_unitario', pa.float64()),
+    ('custo_total', pa.float64()),
+])
+
+CONJUNTOS = {'levantamento': ESQUEMA_LEVANTAMENTO, 'orcamento': ESQUEMA_ORCAMENTO}
+
+# Colunas da tabela de materiais por papel do condutor: (seção, quantidade, código SINAPI)
+COLUNAS_CONDUTORES = {
+    'fase': ('Seção do Condutor (mm²)', 'Quantidade de condutor fase', 'Codigo SINAPI Condutor Fase'),
+    'neutro': ('Seção do Condutor Neutro (mm²)', 'Comprimento neutro', 'Codigo SINAPI Condutor Neutro'),
+    'terra': ('Seção do Condutor de Terra (mm²)', 'Comprimento terra', 'Codigo SINAPI Condutor de Terra'),
+}
+
+
+def _inteiros(valores):
+    # Códigos SINAPI chegam como float (NaN quando não há código)
+    return pd.array(pd.to_numeric(pd.Series(valores), errors='coerce').round(), dtype='Int64')
+
+
+def levantamento(df_materiais):
+    """Tabela de materiais (montar_tabela_materiais) em formato longo: uma linha por condutor e por disjuntor."""
+    partes = []
+    for papel, (secao, quantidade, codigo) in COLUNAS_CONDUTORES.items():
+        partes.append(pd.DataFrame({
+            'circuito': df_materiais['Nome do Circuito'].astype(str).to_numpy(),
+            'categoria': 'condutor',
+            'papel': papel,
+            'secao': df_materiais[secao].to_numpy(dtype=float),
+            'polos': pd.array([pd.NA] * len(df_materiais), dtype='Int8'),
+            'corrente': np.nan,
+            'codigo': _inteiros(df_materiais[codigo]),
+            'quantidade': df_materiais[quantidade].to_numpy(dtype=float),
+        }))
+    partes.append(pd.DataFrame({
+        'circuito': df_materiais['Nome do Circuito'].astype(str).to_numpy(),
+        'categoria': 'disjuntor',
+        'papel': None,
+        'secao': np.nan,
+        'polos': pd.array(df_materiais['Número de fases'].to_numpy(), dtype='Int8'),
+        'corrente': df_materiais['Disjuntor'].to_numpy(dtype=float),
+        'codigo': _inteiros(df_materiais['Codigo SINAPI Disjuntor']),
+        'quantidade': 1.0,
+    }))
+    tabela = pd.concat(partes, ignore_index=True)
+    # Condutores sem comprimento (neutro só existe no monofásico, terra não existe em F+N) não entram
+    return tabela[(tabela['categoria'] == 'disjuntor') | (tabela['quantidade'] > 0)].reset_index(drop=True)
+
+
+def _orcamento_longo(orcamento):
+    def coluna(nome):
+        return orcamento[nome] if nome in orcamento else pd.Series(np.nan, index=orcamento.index)
+
+    descricao = coluna('Descrição da Composição')
+    return pd.DataFrame({
+        'codigo': _inteiros(orcamento['Codigo']),
+        'descricao': descricao.astype(object).where(descricao.notna(), None).to_numpy(),
+        'quantidade': orcamento['Quantidade'].to_numpy(dtype=float),
+        'custo_unitario': coluna('Custo Unitário').to_numpy(dtype=float),
+        'custo_total': orcamento['Custo Total'].to_numpy(dtype=float),
+    })
+
+
+def _gravar(caminho, nome, tabela, projeto, revisao, data):
+    tabela = tabela.assign(projeto=projeto, revisao=revisao, data=pd.Timestamp(data).floor('s'))
+    esquema = CONJUNTOS[nome]
+    arrow = pa.Table.from_pandas(tabela[esquema.names], schema=esquema, preserve_index=False)
+    arrow = arrow.append_column('mes', pa.array([data.strftime('%Y-%m')] * len(tabela), pa.string()))
+    # Nome único por execução: gravações novas nunca sobrescrevem as anteriores
+    prefixo = re.sub(r'[^0-9A-Za-z_-]+', '_', str(projeto))[:40]
+    ds.write_dataset(arrow, f"{caminho}/{nome}", format='parquet', partitioning=PARTICIONAMENTO,
+                     basename_template=f"{prefixo}-r{revisao}-{uuid.uuid4().hex}-{{i}}.parquet",
+                     existing_data_behavior='overwrite_or_ignore')
+
+
+def gravar_execucao(projeto, revisao, df_materiais, orcamento, caminho=CAMINHO_PADRAO, data=None):
+    """
+    Acrescenta o levantamento (tabela de materiais) e o orçamento SINAPI de uma execução
+    aos conjuntos Parquet da carteira, particionados por mês.
+    """
+    data = data or datetime.datetime.now()
+    _gravar(caminho, 'levantamento', levantamento(df_materiais), projeto, revisao, data)
+    _gravar(caminho, 'orcamento', _orcamento_longo(orcamento), projeto, revisao, data)
+
+
+def _agrupar_soma(tabela, chaves, valores):
+    """Soma das colunas valores por chaves, com as colunas na ordem chaves + valores."""
+    agregado = tabela.group_by(chaves).aggregate([(v, 'sum') for v in valores])
+    return agregado.select(chaves + [f"{v}_sum" for v in valores]).rename_columns(chaves + valores)
+
+
+class ConsultaCarteira:
+    """
+    Agregações sobre todos os projetos gravados por gravar_execucao, sem carregar os dados inteiros:
+    os filtros de período e projeto descem até a leitura (partições e estatísticas dos arquivos
+    Parquet), e as somas são feitas lote a lote, guardando só os totais parciais de cada grupo.
+    """
+
+    def __init__(self, caminho=CAMINHO_PADRAO, linhas_por_lote=LINHAS_POR_LOTE):
+        self.caminho = caminho
+        self.linhas_por_lote = linhas_por_lote
+
+    def _conjunto(self, nome):
+        return ds.dataset(f"{self.caminho}/{nome}", format='parquet', partitioning=PARTICIONAMENTO,
+                          schema=CONJUNTOS[nome].append(pa.field('mes', pa.string())))
+
+    def _filtro(self, inicio, fim, projetos, extra=None):
+        filtro = extra
+        condicoes = []
+        if inicio is not None:
+            condicoes.append(ds.field('mes') >= inicio)
+        if fim is not None:
+            condicoes.append(ds.field('mes') <= fim)
+        if projetos is not None:
+            condicoes.append(ds.field('projeto').isin(list(projetos)))
+        for condicao in condicoes:
+            filtro = condicao if filtro is None else filtro & condicao
+        return filtro
+
+    def _lotes(self, nome, colunas, filtro):
+        scanner = self._conjunto(nome).scanner(columns=colunas, filter=filtro, batch_size=self.linhas_por_lote)
+        for lote in scanner.to_batches():
+            if lote.num_rows:
+                yield pa.Table.from_batches([lote])
+
+    def _ultimas_revisoes(self, nome, filtro):
+        """Maior revisão de cada projeto dentro do filtro, lendo só as duas colunas."""
+        parciais = [lote.group_by('projeto').aggregate([('revisao', 'max')]).to_pandas()
+                    for lote in self._lotes(nome, ['projeto', 'revisao'], filtro)]
+        if not parciais:
+            return None
+        return pd.concat(parciais).groupby('projeto')['revisao_max'].max()
+
+    def _somar(self, nome, chaves, valores, filtro, apenas_ultima_revisao):
+        ultimas = self._ultimas_revisoes(nome, filtro) if apenas_ultima_revisao else None
+        colunas = list(dict.fromkeys(chaves + valores + (['projeto', 'revisao'] if apenas_ultima_revisao else [])))
+        if ultimas is not None:
+            projetos_ultimas = pa.array(ultimas.index, pa.string())
+            revisoes_ultimas = pa.array(ultimas.to_numpy(), pa.int32())
+        parciais = []
+        for lote in self._lotes(nome, colunas, filtro):
+            if ultimas is not None:
+                # Revisão máxima do projeto de cada linha, sem sair do Arrow
+                maxima = revisoes_ultimas.take(pc.index_in(lote['projeto'], value_set=projetos_ultimas))
+                lote = lote.filter(pc.equal(lote['revisao'], maxima))
+            parciais.append(_agrupar_soma(lote, chaves, valores))
+            if len(parciais) >= PARCIAIS_POR_COMPACTACAO:
+                parciais = [_agrupar_soma(pa.concat_tables(parciais), chaves, valores)]
+        if not parciais:
+            return pd.DataFrame(columns=chaves + valores)
+        total = _agrupar_soma(pa.concat_tables(parciais), chaves, valores).to_pandas()
+        return total.sort_values(chaves).reset_index(drop=True)
+
+    def metros_por_secao(self, inicio=None, fim=None, projetos=None, apenas_ultima_revisao=True):
+        """Metros de condutor por seção, separados em fase, neutro e terra. inicio/fim: 'AAAA-MM'."""
+        filtro = self._filtro(inicio, fim, projetos, ds.field('categoria') == 'condutor')
+        soma = self._somar('levantamento', ['secao', 'papel'], ['quantidade'], filtro, apenas_ultima_revisao)
+        tabela = soma.pivot_table(index='secao', columns='papel', values='quantidade', aggfunc='sum', fill_value=0.0)
+        tabela = tabela.reindex(columns=list(COLUNAS_CONDUTORES), fill_value=0.0)
+        tabela['total'] = tabela.sum(axis=1)
+        tabela.columns.name = None
+        return tabela.reset_index().rename(columns={'secao': 'Seção do Condutor (mm²)'})
+
+    def disjuntores_por_codigo(self, inicio=None, fim=None, projetos=None, apenas_ultima_revisao=True):
+        """Quantidade de disjuntores por código SINAPI (disjuntores_mapping), polos e corrente."""
+        filtro = self._filtro(inicio, fim, projetos, ds.field('categoria') == 'disjuntor')
+        soma = self._somar('levantamento', ['codigo', 'polos', 'corrente'], ['quantidade'], filtro,
+                           apenas_ultima_revisao)
+        return (soma.astype({'codigo': 'Int64', 'polos': 'Int64'})
+                .rename(columns={'quantidade': 'quantidade_disjuntores'}))
+
+    def gasto_por_mes(self, inicio=None, fim=None, projetos=None, por_projeto=False, apenas_ultima_revisao=True):
+        """
+        Custo SINAPI orçado por mês (e por projeto, se por_projeto=True), no mês em que a revisão
+        foi gravada. apenas_ultima_revisao=False soma todas as revisões de cada projeto.
+        """
+        chaves = ['mes', 'projeto'] if por_projeto else ['mes']
+        return self._somar('orcamento', chaves, ['custo_total'], self._filtro(inicio, fim, projetos),
+                           apenas_ultima_revisao)
@@ -0,0 +1,149 @@
+import bisect
+import weakref
+
+import pandas as pd
+
+TIPOS_POLOS = {'Monopolar': 1, 'Bipolar': 2, 'Tripolar': 3}
+
+# Correntes nominais dos DRs disponíveis
+CORRENTES_DR = [25, 40, 63, 80]
+
+# Faixa de disparo magnético (múltiplos de In) por curva
+FAIXA_DISPARO_CURVA = {'B': (3, 5), 'C': (5, 10), 'D': (10, 20)}
+
+CURVA_PADRAO = 'C'
+FABRICANTE_PADRAO = 'Genérico'
+
+disjuntores_mapping = {
+    1: {  # Monopolar
+        '4A': 93653, '6A': 93653, '10A': 93653, '16A': 93654, '20A': 93655, '25A': 93656, '32A': 93657, '40A': 93658, '50A': 93659
+    },
+    2: {  # Bipolar
+        '10A': 93660, '16A': 93661, '20A': 93662, '25A': 93663, '32A': 93664, '40A': 93665, '50A': 93666
+    },
+    3: {  # Tripolar
+        '10A': 93667, '16A': 93668, '20A': 93669, '25A': 93670, '32A': 93671, '40A': 93672, '50A': 93673
+    }
+}
+
+
+class CatalogoProtecao:
+    """
+    Catálogo de disjuntores e DRs indexado por (polos, curva, fabricante).
+
+    Cada índice guarda as correntes nominais ordenadas, então as seleções são feitas com
+    bisect em vez de filtrar e ordenar a tabela de disjuntores a cada chamada.
+    Colunas opcionais na tabela de disjuntores: 'Curva', 'Fabricante', 'Codigo SINAPI'
+    e 'Capacidade de interrupção (kA)'.
+    """
+
+    def __init__(self, disjuntores, correntes_dr=CORRENTES_DR):
+        self.disjuntores = list(disjuntores)
+        self.correntes_dr = sorted(correntes_dr)
+        self._indice = {}
+        self._codigos = {}
+        self._icn = {}
+        todas = []
+        for d in self.disjuntores:
+            todas.append(d['corrente'])
+            if d['polos'] is None:
+                # Tipo não reconhecido (ex.: 'Tripolar ' com espaço) só entra na lista geral
+                continue
+            for curva in (d['curva'], None):
+                for fabricante in (d['fabricante'], None):
+                    self._indice.setdefault((d['polos'], curva, fabricante), set()).add(d['corrente'])
+            if d.get('codigo_sinapi') is not None:
+                for fabricante in (d['fabricante'], None):
+                    self._codigos.setdefault((d['polos'], d['corrente'], fabricante), d['codigo_sinapi'])
+            if d.get('icn_ka') is not None:
+                # Com vários fabricantes para o mesmo disjuntor, vale a menor capacidade de interrupção
+                chave = (d['polos'], d['corrente'])
+                self._icn[chave] = min(self._icn.get(chave, d['icn_ka']), d['icn_ka'])
+        self._indice = {chave: sorted(valores) for chave, valores in self._indice.items()}
+        self._todas = sorted(todas)
+
+    @classmethod
+    def de_tabela(cls, tabela_disjuntores, correntes_dr=CORRENTES_DR):
+        """Monta o catálogo a partir da aba 'valores nominais de disjuntores' (ou de um catálogo de fabricante)."""
+        colunas = tabela_disjuntores.columns
+        disjuntores = []
+        for linha in tabela_disjuntores.to_dict('records'):
+            polos = TIPOS_POLOS.get(linha['Tipo de disjuntor'])
+            corrente = linha['Corrente nominal']
+            codigo = linha.get('Codigo SINAPI') if 'Codigo SINAPI' in colunas else None
+            if codigo is None or pd.isna(codigo):
+                # Chaves do mapeamento no formato '10A', também quando a tabela traz 10.0
+                codigo = disjuntores_mapping.get(polos, {}).get(f"{float(corrente):g}A")
+            icn = linha.get('Capacidade de interrupção (kA)') if 'Capacidade de interrupção (kA)' in colunas else None
+            disjuntores.append({
+                'polos': polos,
+                'corrente': corrente,
+                'curva': linha['Curva'] if 'Curva' in colunas and pd.notna(linha['Curva']) else CURVA_PADRAO,
+                'fabricante': (linha['Fabricante'] if 'Fabricante' in colunas and pd.notna(linha['Fabricante'])
+                               else FABRICANTE_PADRAO),
+                'codigo_sinapi': int(codigo) if codigo is not None else None,
+                'icn_ka': float(icn) if icn is not None and pd.notna(icn) else None,
+            })
+        return cls(disjuntores, correntes_dr)
+
+    def combinar(self, outro):
+        """Novo catálogo com os disjuntores dos dois (ex.: tabela base + catálogo de outro fabricante)."""
+        return CatalogoProtecao(self.disjuntores + outro.disjuntores,
+                                sorted(set(self.correntes_dr) | set(outro.correntes_dr)))
+
+    def padroes(self, polos, curva=None, fabricante=None):
+        """Correntes nominais ordenadas para o número de polos (filtros opcionais de curva/fabricante)."""
+        return self._indice.get((polos, curva, fabricante), [])
+
+    def menor_atende(self, polos, corrente, curva=None, fabricante=None):
+        """Menor disjuntor com In >= corrente, ou None."""
+        padroes = self.padroes(polos, curva, fabricante)
+        i = bisect.bisect_left(padroes, corrente)
+        return padroes[i] if i < len(padroes) else None
+
+    def maior_abaixo(self, corrente):
+        """Maior disjuntor do catálogo (qualquer tipo) com In < corrente, ou None."""
+        i = bisect.bisect_left(self._todas, corrente)
+        return self._todas[i - 1] if i > 0 else None
+
+    def selecionar_dr(self, corrente_disjuntor):
+        """Menor DR com corrente nominal acima da do disjuntor, ou None."""
+        i = bisect.bisect_right(self.correntes_dr, corrente_disjuntor)
+        return self.correntes_dr[i] if i < len(self.correntes_dr) else None
+
+    def codigo_sinapi(self, polos, corrente, fabricante=None):
+        """
+        Código SINAPI do disjuntor do fabricante; sem fabricante, o do primeiro cadastrado com
+        esses polos e corrente (a composição SINAPI não distingue fabricante).
+        """
+        return self._codigos.get((polos, corrente, fabricante))
+
+    def capacidade_interrupcao(self, polos, corrente):
+        """Capacidade de interrupção (kA) cadastrada para o disjuntor, ou None."""
+        return self._icn.get((polos, corrente))
+
+    def fabricantes(self):
+        return sorted(set(d['fabricante'] for d in self.disjuntores))
+
+    def curvas(self):
+        return sorted(set(d['curva'] for d in self.disjuntores))
+
+
+_catalogos = {}
+
+
+def obter_catalogo(tabela_disjuntores, correntes_dr=CORRENTES_DR):
+    """Catálogo da tabela, montado uma única vez por objeto DataFrame."""
+    chave = (id(tabela_disjuntores), tuple(correntes_dr))
+    item = _catalogos.get(chave)
+    if item is not None and item[0]() is tabela_disjuntores:
+        return item[1]
+    catalogo = CatalogoProtecao.de_tabela(tabela_disjuntores, correntes_dr)
+    # Tabelas já liberadas (ex.: recebidas a cada requisição por um worker) saem do cache
+    for velha in [k for k, (ref, _) in _catalogos.items() if ref() is None]:
+        del _catalogos[velha]
+    _catalogos[chave] = (weakref.ref(tabela_disjuntores), catalogo)
+    return catalogo
+
+
+catalogo_padrao = CatalogoProtecao([], CORRENTES_DR)
@@ -0,0 +1,279 @@
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from calculos import sinapi_quadros
+from motor_vetorizado import compilar_tabelas, indices_metodos
+
+# Categorias de ambiente da NBR 5410 (9.5.2), reconhecidas por palavras no tipo (sem acentos)
+PALAVRAS_TIPO = {
+    'banheiro': ('banheiro', 'lavabo', 'wc', 'sanitario', 'vestiario'),
+    'cozinha': ('cozinha', 'copa', 'servico', 'lavanderia'),
+    'varanda': ('varanda', 'sacada', 'terraco', 'externa'),
+    'sala': ('sala', 'dormitorio', 'quarto', 'suite'),
+}
+# Outros locais que pedem DR (5.1.3.2.2) sem mudar a regra de tomadas
+PALAVRAS_DR = ('garagem',)
+
+# Circuitos: categorias na ordem em que aparecem no quadro
+ILUMINACAO, ILUMINACAO_DR, TUG, TUG_DR, TUG_COZINHA, TUE = range(6)
+PREFIXOS = ['Iluminação', 'Iluminação', 'TUG', 'TUG', 'TUG cozinha/serviço', 'TUE']
+COM_DR = np.array([False, True, False, True, True, False])
+FATOR_POTENCIA = np.array([1.0, 1.0, 0.8, 0.8, 0.8, 1.0])
+# Seção mínima de cada categoria: define o maior disjuntor, e com ele a corrente máxima por circuito
+SECAO_MINIMA = np.array([1.5, 1.5, 2.5, 2.5, 2.5, 2.5])
+
+METODO_PADRAO = "2 condutores carregados – método B1"
+TENSAO_PADRAO = 127
+TENSAO_TUE_PADRAO = 220
+# 35 °C: a mais próxima da referência de 30 °C entre as da tabela de correção (e do editor), a favor da segurança
+TEMPERATURA_PADRAO = 35
+COMPRIMENTO_PADRAO = 15.0
+# Um quadro com mais circuitos que o maior quadro SINAPI (2 posições de reserva) é dividido
+CIRCUITOS_POR_QUADRO = max(sinapi_quadros) - 2
+QUADRO_PADRAO = 'QD1'
+
+COLUNAS_CIRCUITOS = ['nome', 'potencia', 'tensao', 'fator_potencia', 'num_fases1', 'temperatura', 'num_circuitos',
+                     'comprimento', 'met_instala', 'DR', 'Quadro']
+COLUNAS_CARGAS = ['Ambiente', 'Quadro', 'Circuito', 'Potência (VA)', 'Pontos']
+
+
+def _sem_acentos(texto):
+    return ''.join(c for c in unicodedata.normalize('NFKD', str(texto).lower()) if not unicodedata.combining(c))
+
+
+def _classificar(tipos):
+    unicos, inversos = np.unique(np.asarray(tipos, dtype=object).astype(str), return_inverse=True)
+    categorias, dr = [], []
+    for tipo in map(_sem_acentos, unicos):
+        categorias.append(next((c for c, palavras in PALAVRAS_TIPO.items() if any(p in tipo for p in palavras)), 'outro'))
+        dr.append(any(p in tipo for p in PALAVRAS_DR))
+    return np.array(categorias, dtype=object)[inversos], np.array(dr, dtype=bool)[inversos]
+
+
+def ler_ambientes(origem):
+    """
+    Quadro de ambientes a partir de uma planilha ou DataFrame. Colunas: Tipo e Area (m²),
+    obrigatórias; Ambiente, Perimetro (m; sem ele, o de um quadrado de mesma área), Area molhada,
+    Unidade (cada unidade ganha um quadro), Quadro, Distancia (m, do quadro ao ambiente) e TUE
+    (W de um equipamento de uso específico do ambiente), opcionais.
+    """
+    df = origem if isinstance(origem, pd.DataFrame) else pd.read_excel(origem)
+    faltantes = [c for c in ('Tipo', 'Area') if c not in df]
+    if faltantes:
+        raise ValueError(f"Quadro de ambientes sem a(s) coluna(s): {', '.join(faltantes)}.")
+    n = len(df)
+    area = pd.to_numeric(df['Area'], errors='coerce').to_numpy(dtype=float)
+    if np.isnan(area).any() or (area <= 0).any():
+        linhas = np.flatnonzero(~(area > 0)) + 1
+        raise ValueError(f"Área ausente ou não positiva na(s) linha(s) {', '.join(map(str, linhas[:10]))}.")
+
+    def opcional(coluna, padrao, dtype=float):
+        if coluna not in df:
+            return np.full(n, padrao, dtype=dtype)
+        return pd.to_numeric(df[coluna], errors='coerce').fillna(padrao).to_numpy(dtype=dtype)
+
+    perimetro = opcional('Perimetro', np.nan)
+    perimetro = np.where(np.isnan(perimetro), 4 * np.sqrt(area), perimetro)
+    if 'Quadro' in df:
+        quadro = df['Quadro']
+    else:
+        quadro = pd.Series(np.nan, index=df.index, dtype=object)
+    if 'Unidade' in df:
+        quadro = quadro.where(quadro.notna(), 'QD ' + df['Unidade'].astype(str))
+    quadro = quadro.fillna(QUADRO_PADRAO).astype(str)
+    molhado = df['Area molhada'].fillna(False).astype(bool).to_numpy() if 'Area molhada' in df else np.zeros(n, bool)
+    nomes = df['Ambiente'].astype(str) if 'Ambiente' in df else pd.Series([f"Ambiente {i + 1}" for i in range(n)], dtype=object)
+    return pd.DataFrame({
+        'Ambiente': nomes.to_numpy(),
+        'Tipo': df['Tipo'].astype(str).to_numpy(),
+        'Area': area,
+        'Perimetro': perimetro,
+        'Area molhada': molhado,
+        'Quadro': quadro.to_numpy(),
+        'Distancia': opcional('Distancia', np.nan),
+        'TUE': opcional('TUE', 0.0),
+    })
+
+
+def cargas_minimas(ambientes):
+    """
+    Previsão mínima de cargas da NBR 5410 (9.5.2) por ambiente: iluminação de 100 VA nos
+    primeiros 6 m² mais 60 VA a cada 4 m² inteiros; pontos de tomada por perímetro (um a cada
+    3,5 m em cozinhas, copas e áreas de serviço, no mínimo dois; um a cada 5 m em salas e
+    dormitórios; um em banheiros e varandas; um nos demais até 6 m²); 600 VA nos três
+    primeiros pontos de banheiros, cozinhas e áreas de serviço e 100 VA nos demais.
+    """
+    ambientes = ler_ambientes(ambientes)
+    area, perimetro = ambientes['Area'].to_numpy(), ambientes['Perimetro'].to_numpy()
+    categoria, dr_tipo = _classificar(ambientes['Tipo'])
+    cozinha, banheiro = categoria == 'cozinha', categoria == 'banheiro'
+
+    iluminacao = np.where(area <= 6, 100.0, 100.0 + 60.0 * np.floor((area - 6) / 4 + 1e-9))
+    por_perimetro = np.ceil(perimetro / 5 - 1e-9)
+    pontos = np.select(
+        [cozinha, banheiro | (categoria == 'varanda'), categoria == 'sala'],
+        [np.maximum(np.ceil(perimetro / 3.5 - 1e-9), 2), 1, np.maximum(por_perimetro, 1)],
+        np.where(area <= 6, 1, np.maximum(por_perimetro, 1))).astype(np.int64)
+    cheios = np.where(cozinha | banheiro, np.minimum(pontos, 3), 0)
+    return ambientes.assign(
+        Categoria=categoria,
+        DR=ambientes['Area molhada'].to_numpy() | dr_tipo | np.isin(categoria, ['banheiro', 'cozinha', 'varanda']),
+        **{'Iluminação (VA)': iluminacao, 'Pontos TUG': pontos,
+           'TUG (VA)': 600.0 * cheios + 100.0 * (pontos - cheios)})
+
+
+def _fator(tabela, valor):
+    # Mesma regra do dimensionamento: última linha da tabela com chave <= valor
+    validas = np.flatnonzero(tabela.iloc[:, 0].to_numpy(dtype=float) <= valor)
+    if not len(validas):
+        raise ValueError(f"Valor {valor} fora da tabela '{tabela.columns[0]}'.")
+    return float(tabela.iloc[validas[-1], 1])
+
+
+def correntes_maximas(data_tables, metodo=METODO_PADRAO, temperatura=TEMPERATURA_PADRAO, num_circuitos=1,
+                      num_fases=(1, 1, 1, 1, 1, 2)):
+    """
+    Corrente de projeto máxima de cada categoria de circuito: o maior disjuntor padrão que a
+    seção mínima protege (In <= Iz), vezes os fatores de temperatura e agrupamento, para que
+    o dimensionamento não precise passar da seção mínima por capacidade de corrente.
+    """
+    tabelas = compilar_tabelas(data_tables)
+    coluna = indices_metodos([metodo], tabelas)[0]
+    if coluna < 0:
+        raise ValueError(f"Método de instalação '{metodo}' fora da tabela de capacidade.")
+    fatores = (_fator(data_tables['Fator de correção de temperatur'], temperatura)
+               * _fator(data_tables['Fator de agrupamento'], num_circuitos))
+    maximas = np.empty(len(SECAO_MINIMA))
+    for i, (secao, fases) in enumerate(zip(SECAO_MINIMA, num_fases)):
+        capacidade = tabelas['capacidade'][np.searchsorted(tabelas['secoes'], secao), coluna]
+        disjuntores = tabelas['disjuntores'][fases]
+        protegidos = disjuntores[disjuntores <= capacidade]
+        if not len(protegidos):
+            raise ValueError(f"Nenhum disjuntor de {fases} polo(s) protege a seção de {secao} mm².")
+        maximas[i] = protegidos.max() * fatores
+    return maximas
+
+
+def _agrupar_sequencial(inicio_grupo, cargas, limites):
+    """
+    Divide cada grupo (faixas contíguas que começam em inicio_grupo) em circuitos na ordem das
+    cargas, fechando um circuito quando a próxima carga passaria do limite do grupo. Cada
+    passada fecha um circuito de todos os grupos ao mesmo tempo; retorna o circuito de cada carga.
+    """
+    fim_grupo = np.r_[inicio_grupo[1:], len(cargas)]
+    acumulada = np.r_[0.0, np.cumsum(cargas)]
+    abre_circuito = np.zeros(len(cargas), dtype=bool)
+    posicao, grupos = inicio_grupo.copy(), np.arange(len(inicio_grupo))
+    while len(grupos):
+        abre_circuito[posicao] = True
+        corte = np.searchsorted(acumulada, acumulada[posicao] + limites[grupos] * (1 + 1e-9), side='right') - 1
+        # ao menos uma carga por circuito, mesmo que sozinha passe do limite
+        posicao = np.clip(corte, posicao + 1, fim_grupo[grupos])
+        restam = posicao < fim_grupo[grupos]
+        posicao, grupos = posicao[restam], grupos[restam]
+    return np.cumsum(abre_circuito) - 1
+
+
+def gerar_circuitos_ambientes(ambientes, data_tables, tensao=TENSAO_PADRAO, tensao_tue=TENSAO_TUE_PADRAO,
+                              metodo=METODO_PADRAO, temperatura=TEMPERATURA_PADRAO, num_circuitos=1,
+                              comprimento=COMPRIMENTO_PADRAO, circuitos_por_quadro=CIRCUITOS_POR_QUADRO):
+    """
+    Circuitos prontos para dimensionar a partir de um quadro de ambientes (ler_ambientes).
+
+    Iluminação e tomadas em circuitos separados (9.5.3.2), tomadas de cozinhas, copas e áreas
+    de serviço em circuitos exclusivos (9.5.3.3), cada TUE em circuito próprio (9.5.3.1) e os
+    ambientes que pedem DR agrupados entre si. Cargas maiores que o limite da categoria
+    (correntes_maximas) são divididas em partes iguais. A potência vai em VA, como na previsão
+    de cargas; o comprimento é a maior Distancia dos ambientes do circuito, ou `comprimento`.
+    Um quadro com mais de `circuitos_por_quadro` circuitos é dividido em QD-1, QD-2, ...
+    Retorna (circuitos no formato do editor, cargas de cada ambiente em cada circuito).
+    """
+    cargas = cargas_minimas(ambientes)
+    n = len(cargas)
+    if not n:
+        return pd.DataFrame(columns=COLUNAS_CIRCUITOS), pd.DataFrame(columns=COLUNAS_CARGAS)
+    tensoes = np.where(np.arange(len(PREFIXOS)) == TUE, tensao_tue, tensao).astype(float)
+    fases = np.where(tensoes > tensao, 2, 1)
+    limite_va = correntes_maximas(data_tables, metodo, temperatura, num_circuitos, fases) * tensoes
+
+    # Uma linha por carga: a iluminação do ambiente, cada ponto de tomada e a TUE
+    dr = cargas['DR'].to_numpy()
+    cozinha = cargas['Categoria'].to_numpy() == 'cozinha'
+    pontos = cargas['Pontos TUG'].to_numpy()
+    # Os três primeiros pontos de banheiros e cozinhas são de 600 VA, os demais de 100 VA
+    ordem_ponto = np.arange(pontos.sum()) - np.repeat(np.cumsum(pontos) - pontos, pontos)
+    com_600 = np.repeat(np.isin(cargas['Categoria'].to_numpy(), ['banheiro', 'cozinha']), pontos)
+    va_ponto = np.where(com_600, np.where(ordem_ponto < 3, 600.0, 100.0), 100.0)
+    tue = cargas['TUE'].to_numpy() > 0
+    ambiente = np.concatenate([np.arange(n), np.repeat(np.arange(n), pontos), np.flatnonzero(tue)])
+    categoria = np.concatenate([
+        np.where(dr, ILUMINACAO_DR, ILUMINACAO),
+        np.repeat(np.select([cozinha, dr], [TUG_COZINHA, TUG_DR], TUG), pontos),
+        np.full(tue.sum(), TUE),
+    ])
+    va = np.concatenate([cargas['Iluminação (VA)'].to_numpy(), va_ponto, cargas['TUE'].to_numpy()[tue]])
+    num_pontos = np.concatenate([np.zeros(n, np.int64), np.ones(len(va_ponto), np.int64), np.zeros(tue.sum(), np.int64)])
+
+    # Cargas maiores que o limite viram partes iguais que cabem nele (uma TUE nunca é dividida)
+    partes = np.maximum(np.ceil(va / limite_va[categoria] - 1e-9), 1).astype(np.int64)
+    partes[categoria == TUE] = 1
+    ambiente, categoria, num_pontos = (np.repeat(a, partes) for a in (ambiente, categoria, num_pontos))
+    va = np.repeat(va / partes, partes)
+
+    # Ordem de montagem: quadro, categoria, ambiente; TUEs sempre sozinhas no circuito
+    codigos_quadro, quadros = pd.factorize(cargas['Quadro'], sort=True)
+    quadro = codigos_quadro[ambiente]
+    separador = np.where(categoria == TUE, np.arange(len(va)), -1)
+    ordem = np.lexsort((np.arange(len(va)), separador, categoria, quadro))
+    ambiente, categoria, quadro, va, num_pontos, separador = (
+        a[ordem] for a in (ambiente, categoria, quadro, va, num_pontos, separador))
+    muda = np.r_[True, (np.diff(quadro) != 0) | (np.diff(categoria) != 0) | (np.diff(separador) != 0)]
+    inicio_grupo = np.flatnonzero(muda)
+    circuito = _agrupar_sequencial(inicio_grupo, va, limite_va[categoria[inicio_grupo]])
+
+    # Um registro por circuito
+    primeira = np.flatnonzero(np.r_[True, np.diff(circuito) != 0])
+    cat_circuito, quadro_circuito = categoria[primeira], quadro[primeira]
+    distancia = cargas['Distancia'].to_numpy()[ambiente]
+    maior_distancia = pd.Series(distancia).groupby(circuito).max().to_numpy()
+    prefixo = np.array(PREFIXOS, dtype=object)[cat_circuito]
+    numero = pd.DataFrame({'q': quadro_circuito, 'p': prefixo}).groupby(['q', 'p'], sort=False).cumcount().to_numpy() + 1
+    nome = pd.Series(prefixo).str.cat(numero.astype(str), sep=' ')
+    e_tue = cat_circuito == TUE
+    nome[e_tue] = nome[e_tue] + ' (' + cargas['Ambiente'].to_numpy()[ambiente[primeira][e_tue]] + ')'
+    tensao_circuito = tensoes[cat_circuito]
+    nome_quadro = pd.Series(np.asarray(quadros, dtype=object)[quadro_circuito])
+    # A numeração recomeça em cada quadro; com mais de um, o quadro entra no nome para não repetir
+    if len(quadros) > 1:
+        nome = nome + ' - ' + nome_quadro
+    # Quadro com circuitos demais: divide em QD-1, QD-2, ... na ordem dos circuitos
+    ordinal = nome_quadro.groupby(nome_quadro, sort=False).cumcount().to_numpy()
+    excede = nome_quadro.map(nome_quadro.value_counts() > circuitos_por_quadro).to_numpy()
+    nome_quadro[excede] = nome_quadro[excede] + '-' + (ordinal[excede] // circuitos_por_quadro + 1).astype(str)
+
+    circuitos = pd.DataFrame({
+        'nome': nome.to_numpy(),
+        'potencia': np.round(np.bincount(circuito, weights=va), 1),
+        'tensao': tensao_circuito.astype(np.int64),
+        'fator_potencia': FATOR_POTENCIA[cat_circuito],
+        'num_fases1': np.where(tensao_circuito > tensao, 'F+F+T', 'F+N+T'),
+        'temperatura': temperatura,
+        'num_circuitos': num_circuitos,
+        'comprimento': np.where(np.isnan(maior_distancia), comprimento, maior_distancia),
+        'met_instala': metodo,
+        'DR': COM_DR[cat_circuito] | ((cat_circuito == TUE) & dr[ambiente[primeira]]),
+        'Quadro': nome_quadro.to_numpy(),
+    }, columns=COLUNAS_CIRCUITOS)
+
+    detalhe = pd.DataFrame({'linha': ambiente, 'circuito': circuito, 'va': va, 'pontos': num_pontos})
+    detalhe = detalhe.groupby(['linha', 'circuito'], sort=False, as_index=False).sum()
+    cargas_circuitos = pd.DataFrame({
+        'Ambiente': cargas['Ambiente'].to_numpy()[detalhe['linha']],
+        'Quadro': circuitos['Quadro'].to_numpy()[detalhe['circuito']],
+        'Circuito': circuitos['nome'].to_numpy()[detalhe['circuito']],
+        'Potência (VA)': np.round(detalhe['va'].to_numpy(), 1),
+        'Pontos': detalhe['pontos'].to_numpy(),
+    }, columns=COLUNAS_CARGAS)
+    return circuitos, cargas_circuitos
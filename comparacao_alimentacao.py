@@ -0,0 +1,95 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from calculos import (
+    calcular_corrente_nominal,
+    calcular_parametros_circuitos,
+    calcular_disjuntor_geral,
+    calcular_disjuntor_qgbt,
+    distribuir_fases,
+    definir_num_fases,
+    preparar_circuitos_para_calculo,
+    escolher_quadros_sinapi,
+    montar_tabela_materiais,
+    montar_orcamento,
+)
+from catalogo_protecao import obter_catalogo
+from pool_processos import executar_em_pool
+from tabela_circuitos import TabelaCircuitos
+from validacao import validar_circuitos
+
+NOMES_ALIMENTACAO = {1: "Monofásica", 2: "Bifásica", 3: "Trifásica"}
+FASES_POR_ALIMENTACAO = {1: 'R', 2: 'RS', 3: 'RST'}
+
+
+def cargas_por_fase(circuitos):
+    """Potência (W) em R, S e T conforme a coluna 'Fases' preenchida por distribuir_fases."""
+    fases = pd.Series(np.asarray(circuitos['Fases'], dtype=object)).fillna('').astype(str)
+    potencia = np.asarray(circuitos['potencia'], dtype=float)
+    num_letras = fases.str.len().to_numpy()
+    parcela = np.divide(potencia, num_letras, out=np.zeros_like(potencia), where=num_letras > 0)
+    return {fase: float(parcela[fases.str.contains(fase, regex=False).to_numpy()].sum()) for fase in 'RST'}
+
+
+def avaliar_alimentacao(circuitos, fases_qd, data_tables, sinapi_df, tensao_nominal=127):
+    """
+    Executa fases, dimensionamento, disjuntores gerais e orçamento para uma alimentação.
+    circuitos: DataFrame no formato do editor (comprimento em metros).
+    """
+    inicio = time.perf_counter()
+    resumo = {'Alimentação': NOMES_ALIMENTACAO[fases_qd], 'fases_qd': fases_qd}
+    tabela = TabelaCircuitos.de_registros(circuitos)
+    problemas = validar_circuitos(tabela, data_tables, fases_qd)
+    resumo['Viável'] = problemas.empty
+    resumo['Problemas'] = len(problemas)
+    if not problemas.empty:
+        resumo['Tempo (s)'] = time.perf_counter() - inicio
+        return resumo
+
+    definir_num_fases(tabela)
+    distribuir_fases(tabela, fases_qd, avisar=None)
+    preparar_circuitos_para_calculo(tabela)
+    resultados, tabela = calcular_parametros_circuitos(tabela, data_tables)
+    tabela_disjuntores = data_tables['valores nominais de disjuntores']
+    disjuntores_gerais = calcular_disjuntor_geral(tabela, data_tables['FatordeDemanda'], tensao_nominal, tabela_disjuntores)
+    corrente_qgbt = calcular_disjuntor_qgbt(disjuntores_gerais, data_tables['FatordeDemanda'], tensao_nominal)
+    catalogo = obter_catalogo(tabela_disjuntores)
+    orcamento = montar_orcamento(montar_tabela_materiais(resultados, catalogo), escolher_quadros_sinapi(tabela), sinapi_df)
+
+    cargas = cargas_por_fase(tabela)
+    usadas = np.array([cargas[f] for f in FASES_POR_ALIMENTACAO[fases_qd]])
+    media = usadas.mean()
+    corrente_fase = calcular_corrente_nominal(usadas.max(), tensao_nominal, 0.9, 1)
+    resumo.update({
+        'Carga R (W)': cargas['R'],
+        'Carga S (W)': cargas['S'],
+        'Carga T (W)': cargas['T'],
+        'Desequilíbrio (%)': float((usadas.max() - media) / media * 100) if media > 0 else 0.0,
+        'Corrente na fase mais carregada (A)': float(corrente_fase),
+        'Disjuntor de entrada (A)': catalogo.menor_atende(fases_qd, corrente_fase),
+        'Disjuntores gerais': ", ".join(f"{q}: {d} A" for q, d in disjuntores_gerais.items()),
+        'Corrente QGBT (A)': float(corrente_qgbt),
+        'Custo total (R$)': float(orcamento['Custo Total'].sum()),
+        'Tempo (s)': time.perf_counter() - inicio,
+    })
+    return resumo
+
+
+def comparar_alimentacoes(circuitos, data_tables, sinapi_df, opcoes=(1, 2, 3), processos=3, tensao_nominal=127):
+    """
+    Avalia as alimentações em paralelo (um processo por opção) e devolve um DataFrame lado a lado.
+    processos <= 1 executa tudo no processo atual.
+    """
+    if isinstance(circuitos, TabelaCircuitos):
+        circuitos = circuitos.para_dataframe()
+    elif not isinstance(circuitos, pd.DataFrame):
+        circuitos = pd.DataFrame(list(circuitos))
+    if processos and processos > 1:
+        chamadas = [(avaliar_alimentacao, (circuitos, f, data_tables, sinapi_df, tensao_nominal)) for f in opcoes]
+        prontas = dict(executar_em_pool(processos, chamadas))
+        linhas = [prontas[i] for i in range(len(opcoes))]
+    else:
+        linhas = [avaliar_alimentacao(circuitos, f, data_tables, sinapi_df, tensao_nominal) for f in opcoes]
+    return pd.DataFrame(linhas).set_index('Alimentação')
@@ -0,0 +1,292 @@
+import datetime
+import hashlib
+import io
+import json
+import os
+import uuid
+from collections import OrderedDict
+
+import pandas as pd
+
+from catalogo_protecao import obter_catalogo
+from motor_vetorizado import compilar_tabelas
+
+PASTA_PADRAO = 'referencias'
+PLANILHA_PADRAO = 'Dados para o gpt.xls'
+NOME_PADRAO = 'Padrão'
+DESCRICAO_PADRAO = 'Tabelas NBR 5410 de cobre/PVC do app'
+CONJUNTOS_EM_MEMORIA = 4
+
+ABAS_OBRIGATORIAS = (
+    'Capacidade de corrente',
+    'Fator de correção de temperatur',
+    'Fator de agrupamento',
+    'queda de tensão',
+    'valores nominais de disjuntores',
+    'FatordeDemanda',
+)
+
+
+def _validar(abas):
+    faltantes = [aba for aba in ABAS_OBRIGATORIAS if aba not in abas]
+    if faltantes:
+        raise ValueError(f"Conjunto de referência sem a(s) aba(s): {', '.join(faltantes)}.")
+
+
+def hash_arquivo(caminho):
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(1 << 20), b''):
+            h.update(bloco)
+    return h.hexdigest()[:16]
+
+
+def _hash_bytes(conteudo):
+    return hashlib.sha256(conteudo).hexdigest()[:16]
+
+
+def _gravar_atomico(destino, gravar):
+    # Nome temporário único: vários processos podem gravar na mesma pasta ao mesmo tempo
+    temporario = f"{destino}.{uuid.uuid4().hex}.tmp"
+    try:
+        gravar(temporario)
+        os.replace(temporario, destino)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+
+def _hash_abas(abas):
+    h = hashlib.sha256()
+    for nome in sorted(abas):
+        tabela = abas[nome]
+        h.update(nome.encode('utf-8'))
+        h.update(repr(list(tabela.columns)).encode('utf-8'))
+        h.update(pd.util.hash_pandas_object(tabela, index=False).to_numpy().tobytes())
+    return h.hexdigest()[:16]
+
+
+class ConjuntoReferencia:
+    """
+    Uma versão de um conjunto de tabelas de referência (as abas de 'Dados para o gpt.xls').
+    data_tables tem o mesmo formato usado em todo o app; as formas compiladas (arrays do
+    motor vetorizado e catálogo de proteção) são montadas na primeira vez que são pedidas.
+    As abas são compartilhadas entre os usos do conjunto e não devem ser alteradas.
+    """
+
+    def __init__(self, nome, versao, data_tables):
+        self.nome = nome
+        self.versao = versao
+        self.data_tables = data_tables
+        self._tabelas = None
+        self._catalogo = None
+
+    @property
+    def tabelas(self):
+        if self._tabelas is None:
+            self._tabelas = compilar_tabelas(self.data_tables)
+        return self._tabelas
+
+    @property
+    def catalogo(self):
+        if self._catalogo is None:
+            self._catalogo = obter_catalogo(self.data_tables['valores nominais de disjuntores'])
+        return self._catalogo
+
+    def compilar(self):
+        """Monta todas as formas compiladas de uma vez (ex.: para aquecer o cache)."""
+        _ = self.tabelas
+        _ = self.catalogo
+        return self
+
+    def __repr__(self):
+        return f"ConjuntoReferencia({self.nome!r}, versao={self.versao!r})"
+
+
+class RegistroReferencias:
+    """
+    Registro de conjuntos de tabelas de referência versionados (ex.: cobre/PVC, alumínio,
+    EPR/XLPE, outra linha de disjuntores). Cada versão é identificada pelo hash do conteúdo e
+    guardada na pasta do registro já convertida (pickle das abas), então voltar a um conjunto
+    nunca relê a planilha. Os dados de cada versão ficam num arquivo próprio em versoes/, então
+    vários processos podem registrar na mesma pasta sem perder os registros uns dos outros, e
+    cada um enxerga os dos demais. Até `capacidade` conjuntos ficam compilados em memória; o usado
+    há mais tempo sai primeiro; os anexados com anexar() ficam sempre. Com pasta=None o registro
+    vive só em memória.
+    """
+
+    def __init__(self, pasta=PASTA_PADRAO, capacidade=CONJUNTOS_EM_MEMORIA):
+        self.pasta = pasta
+        self.capacidade = capacidade
+        self._carregados = OrderedDict()
+        self._fixos = {}
+        self._fontes = {}
+        self._indice = {}
+        self._lido_em = None
+        if pasta is not None:
+            os.makedirs(os.path.join(pasta, 'versoes'), exist_ok=True)
+
+    # ------------------------------------------------------------------ registro
+    def registrar(self, nome, origem, descricao=''):
+        """
+        Registra uma versão do conjunto `nome` e retorna o hash dela.
+        origem: caminho ou bytes de uma planilha com as abas de referência, ou {aba: DataFrame}.
+        Uma planilha já registrada (mesmo hash do arquivo) não é lida de novo.
+        """
+        if isinstance(origem, (str, os.PathLike)):
+            versao = hash_arquivo(origem)
+            if self._versao_conhecida(nome, versao):
+                return versao
+            abas = pd.read_excel(origem, sheet_name=None)
+            descricao = descricao or os.path.basename(origem)
+        elif isinstance(origem, (bytes, bytearray)):
+            versao = _hash_bytes(origem)
+            if self._versao_conhecida(nome, versao):
+                return versao
+            abas = pd.read_excel(io.BytesIO(origem), sheet_name=None)
+        else:
+            abas = dict(origem)
+            versao = _hash_abas(abas)
+            if self._versao_conhecida(nome, versao):
+                return versao
+        _validar(abas)
+        self._adicionar(nome, versao, abas, descricao)
+        self._manter(nome, versao, abas)
+        return versao
+
+    def anexar(self, nome, versao, abas, descricao=''):
+        """
+        Registra abas já carregadas em outro lugar (ex.: o instantâneo em memória compartilhada)
+        sob a versão informada, que deve ser o hash da planilha de origem. O conjunto fica fixo
+        em memória com essas mesmas abas, fora do limite de `capacidade`.
+        """
+        _validar(abas)
+        if not self._versao_conhecida(nome, versao):
+            self._adicionar(nome, versao, abas, descricao)
+        self._fixos[(nome, versao)] = ConjuntoReferencia(nome, versao, abas)
+        self._carregados.pop((nome, versao), None)
+        return versao
+
+    def _adicionar(self, nome, versao, abas, descricao):
+        self._guardar(versao, abas)
+        entrada = {
+            'versao': versao,
+            'descricao': descricao,
+            'registrada_em': datetime.datetime.now().isoformat(timespec='microseconds'),
+        }
+        if self.pasta is None:
+            self._indice.setdefault(nome, []).append(entrada)
+            return
+        caminho = os.path.join(self.pasta, 'versoes', f"{_hash_bytes(nome.encode('utf-8'))}-{versao}.json")
+
+        def gravar(temporario):
+            with open(temporario, 'w', encoding='utf-8') as arquivo:
+                json.dump(dict(entrada, nome=nome), arquivo, ensure_ascii=False, indent=2)
+
+        _gravar_atomico(caminho, gravar)
+
+    def registrar_variante(self, nome, base, substituicoes, descricao='', versao_base=None):
+        """
+        Novo conjunto a partir de outro trocando algumas abas, ex.:
+        registrar_variante('Alumínio', 'Padrão', {'Capacidade de corrente': cap_al, 'queda de tensão': queda_al}).
+        """
+        abas = dict(self.obter(base, versao_base).data_tables)
+        abas.update(substituicoes)
+        return self.registrar(nome, abas, descricao or f"Variante de {base}: {', '.join(substituicoes)}")
+
+    def _atualizar_indice(self):
+        # Relê versoes/ só quando aparece um arquivo novo (ex.: versão registrada por outro processo)
+        if self.pasta is None:
+            return self._indice
+        pasta = os.path.join(self.pasta, 'versoes')
+        arquivos = frozenset(a for a in os.listdir(pasta) if a.endswith('.json'))
+        if arquivos == self._lido_em:
+            return self._indice
+        indice = {}
+        for arquivo in arquivos:
+            with open(os.path.join(pasta, arquivo), encoding='utf-8') as f:
+                entrada = json.load(f)
+            indice.setdefault(entrada.pop('nome'), []).append(entrada)
+        # indice.json das versões anteriores do registro: só lido, as novas entradas vão para versoes/
+        caminho_antigo = os.path.join(self.pasta, 'indice.json')
+        if os.path.exists(caminho_antigo):
+            with open(caminho_antigo, encoding='utf-8') as f:
+                for nome, entradas in json.load(f).items():
+                    conhecidas = {v['versao'] for v in indice.get(nome, [])}
+                    indice.setdefault(nome, []).extend(v for v in entradas if v['versao'] not in conhecidas)
+        for entradas in indice.values():
+            entradas.sort(key=lambda v: v['registrada_em'])
+        self._indice, self._lido_em = indice, arquivos
+        return indice
+
+    def _versao_conhecida(self, nome, versao):
+        return any(v['versao'] == versao for v in self._atualizar_indice().get(nome, []))
+
+    def _caminho(self, versao):
+        return os.path.join(self.pasta, f"{versao}.pkl")
+
+    def _guardar(self, versao, abas):
+        if self.pasta is None:
+            self._fontes[versao] = abas
+        elif not os.path.exists(self._caminho(versao)):
+            _gravar_atomico(self._caminho(versao), lambda temporario: pd.to_pickle(abas, temporario))
+
+    # ------------------------------------------------------------------ consulta
+    def nomes(self):
+        return sorted(self._atualizar_indice())
+
+    def versoes(self, nome):
+        """Versões registradas do conjunto, da mais antiga para a mais nova."""
+        indice = self._atualizar_indice()
+        if nome not in indice:
+            raise KeyError(f"Conjunto de referência '{nome}' não registrado.")
+        return pd.DataFrame(indice[nome])
+
+    def obter(self, nome, versao=None):
+        """Conjunto compilado (a versão mais nova se versao=None)."""
+        indice = self._atualizar_indice()
+        if nome not in indice:
+            raise KeyError(f"Conjunto de referência '{nome}' não registrado.")
+        if versao is None:
+            versao = indice[nome][-1]['versao']
+        elif not self._versao_conhecida(nome, versao):
+            raise KeyError(f"Versão '{versao}' não encontrada para o conjunto '{nome}'.")
+        chave = (nome, versao)
+        if chave in self._fixos:
+            return self._fixos[chave]
+        if chave in self._carregados:
+            self._carregados.move_to_end(chave)
+            return self._carregados[chave]
+        abas = self._fontes[versao] if self.pasta is None else pd.read_pickle(self._caminho(versao))
+        return self._manter(nome, versao, abas)
+
+    def _manter(self, nome, versao, abas):
+        conjunto = ConjuntoReferencia(nome, versao, abas)
+        self._carregados[(nome, versao)] = conjunto
+        self._carregados.move_to_end((nome, versao))
+        while len(self._carregados) > self.capacidade:
+            self._carregados.popitem(last=False)
+        return conjunto
+
+    def em_memoria(self):
+        """(nome, versão) dos conjuntos carregados, do usado há mais tempo para o mais recente."""
+        return list(self._carregados)
+
+
+# Registros reaproveitados entre reruns do Streamlit, como os pools de processos
+_registros = {}
+
+
+def obter_registro(pasta=PASTA_PADRAO, capacidade=CONJUNTOS_EM_MEMORIA, instantaneo=None):
+    """
+    Registro da pasta (um por processo), já com a planilha padrão do app registrada.
+    Com um instantâneo (instantaneo_referencias), o conjunto padrão usa as abas dele.
+    """
+    if pasta not in _registros:
+        registro = RegistroReferencias(pasta, capacidade)
+        if instantaneo is not None:
+            registro.anexar(NOME_PADRAO, instantaneo.versao_dados, instantaneo.data_tables, DESCRICAO_PADRAO)
+        elif os.path.exists(PLANILHA_PADRAO):
+            registro.registrar(NOME_PADRAO, PLANILHA_PADRAO, DESCRICAO_PADRAO)
+        _registros[pasta] = registro
+    return _registros[pasta]
@@ -0,0 +1,145 @@
+import numpy as np
+import pandas as pd
+
+from calculos import calcular_corrente_nominal, encontrar_disjuntor_menor
+from tabela_circuitos import TabelaCircuitos
+
+HORAS_ANO = 8760
+
+# Perfis diários típicos (fração da potência instalada em cada hora, 0h a 23h)
+PERFIS_DIARIOS = {
+    'iluminacao': [0.05, 0.05, 0.05, 0.05, 0.05, 0.10, 0.30, 0.35, 0.20, 0.10, 0.10, 0.10,
+                   0.10, 0.10, 0.10, 0.10, 0.15, 0.40, 0.80, 0.95, 1.00, 0.90, 0.60, 0.20],
+    'tomada': [0.05, 0.05, 0.05, 0.05, 0.05, 0.10, 0.25, 0.30, 0.25, 0.20, 0.20, 0.30,
+               0.35, 0.25, 0.20, 0.20, 0.25, 0.35, 0.50, 0.55, 0.50, 0.40, 0.25, 0.10],
+    'chuveiro': [0.00, 0.00, 0.00, 0.00, 0.05, 0.25, 0.60, 0.45, 0.10, 0.05, 0.05, 0.05,
+                 0.10, 0.05, 0.05, 0.05, 0.10, 0.30, 0.70, 0.80, 0.50, 0.30, 0.10, 0.05],
+    'ar_condicionado': [0.40, 0.35, 0.30, 0.30, 0.25, 0.20, 0.20, 0.20, 0.25, 0.35, 0.50, 0.65,
+                        0.80, 0.90, 1.00, 1.00, 0.95, 0.85, 0.75, 0.70, 0.65, 0.60, 0.55, 0.45],
+    'geral': [0.30, 0.30, 0.30, 0.30, 0.30, 0.35, 0.45, 0.60, 0.70, 0.75, 0.75, 0.75,
+              0.70, 0.75, 0.75, 0.75, 0.70, 0.65, 0.60, 0.55, 0.50, 0.40, 0.35, 0.30],
+}
+
+PALAVRAS_TIPO = [
+    ('ilumina', 'iluminacao'),
+    ('chuveiro', 'chuveiro'),
+    ('ar cond', 'ar_condicionado'),
+    ('ar-cond', 'ar_condicionado'),
+    ('split', 'ar_condicionado'),
+    ('tug', 'tomada'),
+    ('tomada', 'tomada'),
+]
+
+
+def classificar_tipo_carga(circuito):
+    # Coluna 'tipo_carga' tem prioridade; senão, classifica pelo nome do circuito
+    tipo = circuito.get('tipo_carga')
+    if isinstance(tipo, str) and tipo in PERFIS_DIARIOS:
+        return tipo
+    nome = str(circuito.get('nome', '')).lower()
+    for palavra, tipo in PALAVRAS_TIPO:
+        if palavra in nome:
+            return tipo
+    return 'geral'
+
+
+def gerar_perfis(passos_por_hora=1, perfis_diarios=PERFIS_DIARIOS):
+    """
+    Matriz (tipos x passos) com a fração da potência instalada ao longo de um ano.
+    Fins de semana reduzem cargas gerais e o ar condicionado segue a estação (pico em janeiro).
+    """
+    tipos = list(perfis_diarios)
+    dias = np.arange(HORAS_ANO) // 24
+    horas = np.arange(HORAS_ANO) % 24
+    fim_de_semana = (dias % 7) >= 5
+    sazonal = 0.55 + 0.45 * np.cos(2 * np.pi * (dias - 15) / 365)
+
+    perfis = np.empty((len(tipos), HORAS_ANO), dtype=np.float32)
+    for i, tipo in enumerate(tipos):
+        perfil = np.asarray(perfis_diarios[tipo], dtype=np.float32)[horas]
+        if tipo == 'geral':
+            perfil = np.where(fim_de_semana, perfil * 0.7, perfil)
+        elif tipo == 'ar_condicionado':
+            perfil = perfil * sazonal
+        perfis[i] = perfil
+    if passos_por_hora > 1:
+        perfis = np.repeat(perfis, passos_por_hora, axis=1)
+    return tipos, perfis
+
+
+def simular_demanda(circuitos, passos_por_hora=1, diversidade=0, semente=0,
+                    circuitos_por_bloco=256, perfis_diarios=PERFIS_DIARIOS):
+    """
+    Demanda coincidente por quadro e no QGBT ao longo de 8760 h (ou passos mais finos).
+
+    diversidade: deslocamento aleatório máximo, em passos, aplicado a cada circuito para
+    representar que cargas iguais não ligam todas no mesmo instante. Com diversidade=0 os
+    circuitos são agregados por quadro e tipo antes da multiplicação pelas curvas.
+
+    Retorna (resumo, total, curvas): resumo por quadro, o mesmo resumo para o conjunto (QGBT)
+    num dicionário à parte, para não se confundir com um quadro de mesmo nome, e a matriz
+    quadros x passos em W.
+    """
+    if isinstance(circuitos, TabelaCircuitos):
+        df = circuitos.para_dataframe([c for c in ('nome', 'Quadro', 'potencia', 'tipo_carga') if c in circuitos])
+    else:
+        df = circuitos if isinstance(circuitos, pd.DataFrame) else pd.DataFrame(circuitos)
+    tipos, perfis = gerar_perfis(passos_por_hora, perfis_diarios)
+    indice_tipo = {t: i for i, t in enumerate(tipos)}
+    tipo_circuito = np.array([indice_tipo[classificar_tipo_carga(c)] for c in df.to_dict('records')])
+    quadros, indice_quadro = np.unique(df['Quadro'].astype(str).to_numpy(), return_inverse=True)
+    potencia = df['potencia'].to_numpy(dtype=np.float64)
+    passos = perfis.shape[1]
+
+    if diversidade <= 0:
+        # (quadros x tipos) @ (tipos x passos)
+        pesos = np.zeros((len(quadros), len(tipos)))
+        np.add.at(pesos, (indice_quadro, tipo_circuito), potencia)
+        curvas = pesos.astype(np.float32) @ perfis
+    else:
+        rng = np.random.default_rng(semente)
+        deslocamentos = rng.integers(-diversidade, diversidade + 1, size=len(df))
+        curvas = np.zeros((len(quadros), passos), dtype=np.float32)
+        tempo = np.arange(passos)
+        for inicio in range(0, len(df), circuitos_por_bloco):
+            fim = min(inicio + circuitos_por_bloco, len(df))
+            idx = (tempo[None, :] - deslocamentos[inicio:fim, None]) % passos
+            bloco = perfis[tipo_circuito[inicio:fim, None], idx] * potencia[inicio:fim, None].astype(np.float32)
+            incidencia = np.zeros((len(quadros), fim - inicio), dtype=np.float32)
+            incidencia[indice_quadro[inicio:fim], np.arange(fim - inicio)] = 1
+            curvas += incidencia @ bloco
+
+    instalada = np.bincount(indice_quadro, weights=potencia, minlength=len(quadros))
+    soma = curvas.sum(axis=0)
+    resumo = _resumo(instalada, curvas.max(axis=1), curvas.argmax(axis=1))
+    resumo.insert(0, 'Quadro', quadros)
+    total = _resumo([instalada.sum()], [soma.max()], [soma.argmax()]).to_dict('records')[0]
+    return resumo, total, curvas
+
+
+def _resumo(instalada, pico, passo):
+    resumo = pd.DataFrame({
+        'Potência instalada (W)': np.asarray(instalada, dtype=float),
+        'Pico coincidente (W)': np.asarray(pico, dtype=float),
+        'Passo do pico': np.asarray(passo, dtype=np.int64),
+    })
+    resumo['Fator de coincidência'] = np.where(
+        resumo['Potência instalada (W)'] > 0,
+        resumo['Pico coincidente (W)'] / resumo['Potência instalada (W)'].where(resumo['Potência instalada (W)'] > 0, 1),
+        0.0)
+    return resumo
+
+
+def calcular_disjuntores_simulados(circuitos, tabela_disjuntores, tensao_nominal, simulacao=None, **kwargs):
+    """
+    Alternativa a calcular_disjuntor_geral/calcular_disjuntor_qgbt usando o pico coincidente
+    simulado no lugar de soma(potência) x fator de demanda. simulacao: resultado de
+    simular_demanda já calculado (senão, simula com kwargs). Retorna (disjuntores_gerais, corrente_qgbt).
+    """
+    resumo, total, _ = simular_demanda(circuitos, **kwargs) if simulacao is None else simulacao
+    disjuntores_gerais = {}
+    for linha in resumo.to_dict('records'):
+        corrente = calcular_corrente_nominal(linha['Pico coincidente (W)'], tensao_nominal, 0.9, 3)
+        disjuntores_gerais[linha['Quadro']] = encontrar_disjuntor_menor(corrente, tabela_disjuntores)
+    corrente_qgbt = calcular_corrente_nominal(total['Pico coincidente (W)'], tensao_nominal, 0.9, 3)
+    return disjuntores_gerais, corrente_qgbt
@@ -0,0 +1,416 @@
+import hashlib
+import io
+import os
+
+import pandas as pd
+import ezdxf
+from ezdxf import recover
+from ezdxf.enums import TextEntityAlignment
+from ezdxf.filemanagement import dxf_stream_info
+
+from calculos import selecionar_dr
+from tabela_circuitos import TabelaCircuitos
+
+
+# Pasta com os blocos .dxf usados no unifilar (Disjuntor_mono.dxf, fios_mono.dxf, DR.dxf, ...)
+PASTA_MODELOS = os.path.dirname(os.path.abspath(__file__))
+
+ARQUIVOS_MODELOS = [
+    'Disjuntor_mono.dxf', 'Disjuntor_bi.dxf', 'Disjuntor_tri.dxf',
+    'fios_mono.dxf', 'fios_mono2.dxf', 'fios_bi.dxf', 'fios_tri.dxf',
+    'DR.dxf', 'entrada_mono.dxf', 'entrada_bi.dxf', 'entrada_tri.dxf',
+]
+
+ARQUIVOS_ENTRADA = {1: 'entrada_mono.dxf', 2: 'entrada_bi.dxf', 3: 'entrada_tri.dxf'}
+
+# Aplicação registrada no XDATA dos blocos: quadro, nome do circuito, papel e assinatura do conteúdo
+APPID = 'IEBT_UNIFILAR'
+# Propriedade do cabeçalho com a alimentação usada no bloco 'entrada'
+VARIAVEL_FASES = 'IEBT_FASES_Q'
+
+_modelos = {}
+# Texto DXF dos modelos vindo de outra fonte (ex.: instantâneo em memória compartilhada), por caminho
+_fontes_modelos = {}
+
+
+def carregar_modelo(block_filename, pasta=None):
+    # Cada arquivo de bloco é lido uma única vez por processo
+    caminho = os.path.join(pasta or PASTA_MODELOS, block_filename)
+    if caminho not in _modelos:
+        fonte = _fontes_modelos.get(caminho)
+        if fonte is None:
+            _modelos[caminho] = ezdxf.readfile(caminho)
+        else:
+            _modelos[caminho] = ezdxf.read(io.StringIO(bytes(fonte).decode('utf-8')))
+    return _modelos[caminho]
+
+
+def pre_carregar_modelos(pasta=None):
+    for arquivo in ARQUIVOS_MODELOS:
+        carregar_modelo(arquivo, pasta)
+
+
+def extrair_blocos(block_filename, pasta=None):
+    """
+    Texto DXF só com as definições de bloco do modelo (sem cabeçalho, layouts e entidades do
+    desenho original), bem menor e mais rápido de ler que o arquivo inteiro.
+    """
+    modelo = carregar_modelo(block_filename, pasta)
+    doc = ezdxf.new(dxfversion=modelo.dxfversion)
+    for bloco in modelo.blocks:
+        if bloco.is_any_layout:
+            continue
+        novo = doc.blocks.new(name=bloco.name)
+        for entity in bloco:
+            novo.add_entity(entity.copy())
+    texto = io.StringIO()
+    doc.write(texto)
+    return texto.getvalue()
+
+
+def usar_modelos(fontes, pasta=None):
+    """
+    Passa a ler os modelos de fontes = {arquivo: texto DXF (str, bytes ou buffer)} em vez da pasta.
+    Modelos já carregados neste processo são descartados.
+    """
+    for arquivo, fonte in fontes.items():
+        caminho = os.path.join(pasta or PASTA_MODELOS, arquivo)
+        _fontes_modelos[caminho] = fonte.encode('utf-8') if isinstance(fonte, str) else fonte
+        _modelos.pop(caminho, None)
+
+
+def gerar_diagrama_unifilar(exemplos_circuitos,disjuntores_gerais,fases_Q,output_path='diagrama_unifilar_ajustado.dxf'):
+    doc = montar_diagrama_unifilar(exemplos_circuitos, disjuntores_gerais, fases_Q)
+    doc.saveas(output_path)
+    return output_path
+
+def montar_diagrama_unifilar(exemplos_circuitos,disjuntores_gerais,fases_Q):
+    doc = ezdxf.new(dxfversion='R2010')
+    doc.appids.new(APPID)
+    doc.header.custom_vars.append(VARIAVEL_FASES, str(fases_Q))
+    msp = doc.modelspace()
+    # Agrupa os circuitos pelo quadro
+    quadros = _linhas_unifilar(exemplos_circuitos)
+
+    x_offset = 0
+    y_offset = 0
+    y_offset_last=50
+    for nome_quadro, df_ordenado_unifilar in quadros:
+        # Adiciona um bloco para o quadro
+
+        y_offset -= 50  # Espaçamento entre o quadro e seus circuitos
+
+        quadro_min_x = float('inf')
+        quadro_min_y = float('inf')
+        quadro_max_x = float('-inf')
+        quadro_max_y = float('-inf')
+        num_circuitos = len(df_ordenado_unifilar)
+        circuito_central_index = num_circuitos // 2
+        for index, row in enumerate(df_ordenado_unifilar):
+            _inserir_circuito(msp, nome_quadro, row, (x_offset, y_offset))
+            if index == circuito_central_index:
+                _inserir_entrada(msp, nome_quadro, fases_Q, disjuntores_gerais[nome_quadro], (x_offset, y_offset + 30))
+            y_offset -= 30
+
+
+            quadro_min_x = -70
+            quadro_min_y = y_offset
+            quadro_max_x = 90
+            quadro_max_y = y_offset_last-30
+
+
+        y_offset_last=y_offset-30
+        # Adiciona o retângulo em torno do quadro
+        padding = 10
+        msp.add_text(nome_quadro, dxfattribs={'height': 10}).set_placement((quadro_min_x-padding, quadro_max_y + 20), align=TextEntityAlignment.TOP_LEFT)
+        msp.add_lwpolyline([
+            (quadro_min_x - padding, quadro_max_y + padding),
+            (quadro_max_x + padding, quadro_max_y + padding),
+            (quadro_max_x + padding, quadro_min_y - padding),
+            (quadro_min_x - padding, quadro_min_y - padding),
+            (quadro_min_x - padding, quadro_max_y + padding)
+        ], close=True)
+
+        y_offset -= 70  # Espaçamento entre diferentes quadros
+
+    return doc
+
+def _linhas_unifilar(exemplos_circuitos):
+    # [(quadro, [linha formatada do circuito, ...]), ...] na ordem do groupby por quadro
+    if isinstance(exemplos_circuitos, TabelaCircuitos):
+        exemplos_circuitos = exemplos_circuitos.para_dataframe()
+    elif not isinstance(exemplos_circuitos, pd.DataFrame):
+        exemplos_circuitos = pd.DataFrame(exemplos_circuitos)
+    quadros = []
+    for nome_quadro, df_quadro in exemplos_circuitos.groupby('Quadro'):
+        linhas = [{
+            'num_fases': circuito['num_fases'],
+            'nome': circuito['nome'],
+            'potencia': f"{circuito['potencia']} W",
+            'Seção do Condutor (mm²)': f"{circuito['Seção do Condutor (mm²)']} mm2",
+            'Disjuntor (Ampere)': f"{circuito['Disjuntor (Ampere)']} A",
+            'Fases': circuito['Fases'],
+            'num_fases1': circuito['num_fases1'],
+            'DR': circuito['DR'],
+        } for circuito in df_quadro.to_dict('records')]
+        quadros.append((nome_quadro, linhas))
+    return quadros
+
+def _blocos_circuito(row):
+    """Blocos de um circuito: [(papel, arquivo, bloco, deslocamento a partir do disjuntor, atributos)]."""
+    if row['num_fases'] == 1 and row['num_fases1'] == "F+N+T":
+        disjuntor_filename, disjuntor_block_name = 'Disjuntor_mono.dxf', 'Disjuntor_Mono'
+        fios_filename, fios_block_name = 'fios_mono.dxf', 'Fios_Mono'
+    elif row['num_fases'] == 1 and row['num_fases1'] == "F+N":
+        disjuntor_filename, disjuntor_block_name = 'Disjuntor_mono.dxf', 'Disjuntor_Mono'
+        fios_filename, fios_block_name = 'fios_mono2.dxf', 'Fios_Mono2'
+    elif row['num_fases'] == 2:
+        disjuntor_filename, disjuntor_block_name = 'Disjuntor_bi.dxf', 'Disjuntor_Bi'
+        fios_filename, fios_block_name = 'fios_bi.dxf', 'Fios_Bi'
+    elif row['num_fases'] == 3:
+        disjuntor_filename, disjuntor_block_name = 'Disjuntor_tri.dxf', 'Disjuntor_Tri'
+        fios_filename, fios_block_name = 'fios_tri.dxf', 'Fios_Tri'
+    else:
+        raise ValueError(f"Circuito '{row['nome']}' sem número de fases válido para o unifilar.")
+    blocos = [('disjuntor', disjuntor_filename, disjuntor_block_name, (0, 0),
+               {'corrente': str(row['Disjuntor (Ampere)'])})]
+    deslocamento_fios = (70, 30)
+    if row['DR'] == True:
+        corrente_dr = selecionar_dr(int(row['Disjuntor (Ampere)'].replace(' A', '')))
+        if corrente_dr:
+            blocos.append(('dr', 'DR.dxf', 'DR', (70, 30), {'corrente': f'{str(corrente_dr)} A'}))  # Ajusta a posição do DR
+            deslocamento_fios = (80, 30)  # Ajusta a posição dos fios após o DR
+    blocos.append(('fios', fios_filename, fios_block_name, deslocamento_fios, {
+        'seção': str(row['Seção do Condutor (mm²)']),
+        'Potência': str(row['potencia']),
+        'nome': row['nome'],
+        'fases': row['Fases']
+    }))
+    return blocos
+
+def _assinatura(*partes):
+    return hashlib.sha1(repr(partes).encode('utf-8')).hexdigest()[:16]
+
+def _marcar(block_ref, quadro, nome, papel, assinatura):
+    # XDATA com a identidade do bloco, usada na atualização incremental
+    if block_ref is not None:
+        block_ref.set_xdata(APPID, [(1000, str(quadro)), (1000, str(nome)), (1000, papel), (1000, assinatura)])
+
+def _inserir_circuito(msp, nome_quadro, row, origem):
+    assinatura = _assinatura(*sorted(row.items()))
+    for papel, arquivo, bloco, (dx, dy), atributos in _blocos_circuito(row):
+        block_ref = insert_dxf_block_with_attributes(msp, arquivo, bloco, (origem[0] + dx, origem[1] + dy), atributos)
+        _marcar(block_ref, nome_quadro, row['nome'], papel, assinatura)
+
+def _inserir_entrada(msp, nome_quadro, fases_Q, corrente, ponto):
+    arquivo = ARQUIVOS_ENTRADA.get(fases_Q)
+    if arquivo is None:
+        return
+    block_ref = insert_dxf_block_with_attributes(msp, arquivo, 'entrada', ponto, {'CORRENTE': str(corrente)})
+    _marcar(block_ref, nome_quadro, '', 'entrada', _assinatura(fases_Q, str(corrente)))
+
+def atualizar_diagrama_unifilar(diagrama_anterior, exemplos_circuitos, disjuntores_gerais, fases_Q, output_path=None):
+    """
+    Atualiza um unifilar gerado anteriormente sem redesenhá-lo.
+
+    diagrama_anterior: caminho, bytes do .dxf ou Drawing do ezdxf. Os blocos são casados
+    com os circuitos por (quadro, nome) gravados no XDATA; desenhos antigos, sem XDATA,
+    são casados pelo atributo 'nome' dos fios. Só os atributos alterados são reescritos,
+    circuitos removidos são apagados e os novos vão para baixo do desenho. As demais
+    entidades (anotações feitas no CAD) não são tocadas.
+    Retorna (doc, resumo) com a contagem de circuitos inalterados, atualizados, inseridos e removidos.
+    """
+    doc = _abrir_diagrama(diagrama_anterior)
+    if APPID not in doc.appids:
+        doc.appids.new(APPID)
+    msp = doc.modelspace()
+    quadros = _linhas_unifilar(exemplos_circuitos)
+    existentes, entradas = _indexar_blocos(msp, quadros)
+
+    resumo = {'inalterados': 0, 'atualizados': 0, 'inseridos': 0, 'removidos': 0}
+    novos = {}
+    vistos = set()
+    for nome_quadro, linhas in quadros:
+        for row in linhas:
+            chave = (nome_quadro, row['nome'])
+            vistos.add(chave)
+            atual = existentes.get(chave)
+            if atual is None:
+                novos.setdefault(nome_quadro, []).append(row)
+                continue
+            assinatura = _assinatura(*sorted(row.items()))
+            if atual['assinatura'] == assinatura:
+                resumo['inalterados'] += 1
+                continue
+            _atualizar_circuito(msp, nome_quadro, row, atual['blocos'], assinatura)
+            resumo['atualizados'] += 1
+
+    for chave, atual in existentes.items():
+        if chave not in vistos:
+            for block_ref in atual['blocos'].values():
+                msp.delete_entity(block_ref)
+            resumo['removidos'] += 1
+
+    # Entradas: o bloco 'entrada' é único no desenho, então trocar a alimentação redefine todos
+    quadros_atuais = {nome_quadro for nome_quadro, _ in quadros}
+    mesma_alimentacao = (doc.header.custom_vars.has_tag(VARIAVEL_FASES)
+                         and doc.header.custom_vars.get(VARIAVEL_FASES) == str(fases_Q))
+    if not mesma_alimentacao:
+        pontos = {q: tuple(block_ref.dxf.insert)[:2] for q, block_ref in entradas.items()}
+        for block_ref in entradas.values():
+            msp.delete_entity(block_ref)
+        if 'entrada' in doc.blocks:
+            doc.blocks.delete_block('entrada', safe=False)
+        entradas = {}
+        for nome_quadro, ponto in pontos.items():
+            if nome_quadro in quadros_atuais:
+                _inserir_entrada(msp, nome_quadro, fases_Q, disjuntores_gerais[nome_quadro], ponto)
+                entradas[nome_quadro] = None
+        if doc.header.custom_vars.has_tag(VARIAVEL_FASES):
+            doc.header.custom_vars.replace(VARIAVEL_FASES, str(fases_Q))
+        else:
+            doc.header.custom_vars.append(VARIAVEL_FASES, str(fases_Q))
+    else:
+        for nome_quadro, block_ref in list(entradas.items()):
+            if nome_quadro not in quadros_atuais:
+                msp.delete_entity(block_ref)
+                del entradas[nome_quadro]
+                continue
+            corrente = str(disjuntores_gerais[nome_quadro])
+            _atualizar_atributos(block_ref, {'CORRENTE': corrente})
+            _marcar(block_ref, nome_quadro, '', 'entrada', _assinatura(fases_Q, corrente))
+
+    if novos:
+        y_offset = _limite_inferior(msp) - 50
+        for nome_quadro, linhas in novos.items():
+            y_offset -= 50
+            msp.add_text(f"{nome_quadro} - circuitos adicionados", dxfattribs={'height': 10}).set_placement((-80, y_offset + 40), align=TextEntityAlignment.TOP_LEFT)
+            if nome_quadro not in entradas:
+                _inserir_entrada(msp, nome_quadro, fases_Q, disjuntores_gerais[nome_quadro], (0, y_offset + 30))
+            for row in linhas:
+                _inserir_circuito(msp, nome_quadro, row, (0, y_offset))
+                y_offset -= 30
+                resumo['inseridos'] += 1
+
+    if output_path:
+        doc.saveas(output_path)
+    return doc, resumo
+
+def _abrir_diagrama(diagrama):
+    if isinstance(diagrama, ezdxf.document.Drawing):
+        return diagrama
+    if isinstance(diagrama, (bytes, bytearray)):
+        # Mesma detecção de codificação do ezdxf.readfile; recover só se o arquivo vier corrompido
+        info = dxf_stream_info(io.StringIO(bytes(diagrama[:65536]).decode('utf-8', errors='ignore')))
+        try:
+            return ezdxf.read(io.StringIO(bytes(diagrama).decode(info.encoding, errors='surrogateescape')))
+        except ezdxf.DXFStructureError:
+            doc, _ = recover.read(io.BytesIO(diagrama))
+            return doc
+    return ezdxf.readfile(diagrama)
+
+def _indexar_blocos(msp, quadros):
+    """
+    {(quadro, nome): {'blocos': {papel: INSERT}, 'assinatura': str}} e {quadro: INSERT da entrada}.
+    """
+    existentes = {}
+    entradas = {}
+    legado = []
+    for block_ref in msp.query('INSERT'):
+        if block_ref.has_xdata(APPID):
+            quadro, nome, papel, assinatura = [valor for _, valor in block_ref.get_xdata(APPID)]
+            if papel == 'entrada':
+                entradas[quadro] = block_ref
+            else:
+                atual = existentes.setdefault((quadro, nome), {'blocos': {}, 'assinatura': assinatura})
+                atual['blocos'][papel] = block_ref
+        else:
+            legado.append(block_ref)
+    if legado and not existentes:
+        _indexar_legado(legado, quadros, existentes, entradas)
+    return existentes, entradas
+
+def _indexar_legado(blocos, quadros, existentes, entradas):
+    # Desenho sem XDATA: os fios trazem o nome; disjuntor fica 30 abaixo dos fios, o DR na mesma linha
+    # e a entrada do quadro na linha dos fios do circuito central.
+    quadro_do_nome = {}
+    for nome_quadro, linhas in quadros:
+        for row in linhas:
+            quadro_do_nome.setdefault(row['nome'], nome_quadro)
+    por_linha = {}
+    fios = []
+    for block_ref in blocos:
+        nome_bloco = block_ref.dxf.name
+        y = round(block_ref.dxf.insert.y, 6)
+        if nome_bloco.startswith('Fios_') and block_ref.has_attrib('nome'):
+            fios.append((block_ref, y))
+        elif nome_bloco.startswith('Disjuntor_'):
+            por_linha.setdefault(y, {})['disjuntor'] = block_ref
+        elif nome_bloco == 'DR':
+            por_linha.setdefault(y, {})['dr'] = block_ref
+        elif nome_bloco == 'entrada':
+            por_linha.setdefault(y, {})['entrada'] = block_ref
+    for block_ref, y in fios:
+        nome = block_ref.get_attrib_text('nome')
+        quadro = quadro_do_nome.get(nome)
+        atual = existentes.setdefault((quadro, nome), {'blocos': {}, 'assinatura': None})
+        atual['blocos']['fios'] = block_ref
+        if 'disjuntor' in por_linha.get(round(y - 30, 6), {}):
+            atual['blocos']['disjuntor'] = por_linha[round(y - 30, 6)]['disjuntor']
+        linha = por_linha.get(y, {})
+        if 'dr' in linha:
+            atual['blocos']['dr'] = linha['dr']
+        if 'entrada' in linha and quadro is not None:
+            entradas[quadro] = linha['entrada']
+
+def _atualizar_atributos(block_ref, atributos):
+    for attrib in block_ref.attribs:
+        valor = atributos.get(attrib.dxf.tag)
+        if valor is not None and attrib.dxf.text != valor:
+            attrib.dxf.text = valor
+
+def _atualizar_circuito(msp, nome_quadro, row, blocos_atuais, assinatura):
+    blocos = _blocos_circuito(row)
+    mesmos_blocos = ({papel: bloco for papel, _, bloco, _, _ in blocos}
+                     == {papel: block_ref.dxf.name for papel, block_ref in blocos_atuais.items()})
+    if mesmos_blocos:
+        for papel, _, _, _, atributos in blocos:
+            _atualizar_atributos(blocos_atuais[papel], atributos)
+            _marcar(blocos_atuais[papel], nome_quadro, row['nome'], papel, assinatura)
+        return
+    # Mudou o tipo de bloco (número de fases, DR): substitui os blocos na mesma posição
+    if 'disjuntor' in blocos_atuais:
+        origem = tuple(blocos_atuais['disjuntor'].dxf.insert)[:2]
+    else:
+        x, y = tuple(blocos_atuais['fios'].dxf.insert)[:2]
+        origem = (x - 70, y - 30)
+    for block_ref in blocos_atuais.values():
+        msp.delete_entity(block_ref)
+    _inserir_circuito(msp, nome_quadro, row, origem)
+
+def _limite_inferior(msp):
+    # Menor y entre pontos de inserção e vértices; basta para posicionar abaixo do desenho
+    ys = [entidade.dxf.insert.y for entidade in msp.query('INSERT TEXT MTEXT')]
+    for polilinha in msp.query('LWPOLYLINE'):
+        ys.extend(y for _, y in polilinha.vertices())
+    for linha in msp.query('LINE'):
+        ys.extend((linha.dxf.start.y, linha.dxf.end.y))
+    return min(ys, default=0)
+
+def insert_dxf_block_with_attributes(msp, block_filename, block_name, insert_point, attributes):
+    try:
+        doc = msp.doc
+        block_doc = carregar_modelo(block_filename)
+        if block_name not in block_doc.blocks:
+            raise ValueError(f"Block {block_name} not found in the file {block_filename}")
+        block = block_doc.blocks.get(block_name)
+        if block_name not in doc.blocks:
+            new_block = doc.blocks.new(name=block_name)
+            for entity in block:
+                new_block.add_entity(entity.copy())
+        block_ref = msp.add_blockref(block_name, insert_point)
+        for tag, value in attributes.items():
+            block_ref.add_attrib(tag, value)
+        return block_ref
+    except Exception as e:
+        print(f"Error inserting block {block_name} from {block_filename}: {e}")
@@ -0,0 +1,216 @@
+import numpy as np
+import pandas as pd
+
+from calculos import definir_num_fases, distribuir_fases, preparar_circuitos_para_calculo
+from motor_vetorizado import (
+    compilar_tabelas,
+    compilar_precos,
+    preparar_arrays,
+    dimensionar_lote,
+    custo_lote,
+    MENSAGENS_ERRO,
+)
+from tabela_circuitos import TabelaCircuitos
+
+CHAVE = ['quadro', 'nome']
+CAMPOS_NUMERICOS = ['potencia', 'tensao', 'fator_potencia', 'temperatura', 'num_circuitos', 'comprimento']
+CAMPOS_TEXTO = ['num_fases1', 'met_instala']
+CAMPOS_ENTRADA = CAMPOS_NUMERICOS + CAMPOS_TEXTO + ['dr']
+CAMPOS_RESULTADO = ['secao', 'disjuntor', 'fases']
+
+SITUACAO_NOVO = 'novo'
+SITUACAO_REMOVIDO = 'removido'
+SITUACAO_ALTERADO = 'alterado'
+SITUACAO_INALTERADO = 'inalterado'
+
+
+def _canonico(df):
+    """Entradas no formato do banco de projetos (chave quadro/nome, comprimento em km)."""
+    saida = pd.DataFrame({'quadro': np.asarray(df['quadro']).astype(str), 'nome': np.asarray(df['nome']).astype(str)})
+    for campo in CAMPOS_NUMERICOS:
+        saida[campo] = pd.to_numeric(pd.Series(np.asarray(df[campo])), errors='coerce').astype(float).to_numpy()
+    for campo in CAMPOS_TEXTO:
+        saida[campo] = pd.Series(np.asarray(df[campo], dtype=object)).astype(str).to_numpy()
+    saida['dr'] = pd.Series(np.asarray(df['dr'], dtype=object)).fillna(False).astype(bool).to_numpy()
+    duplicados = saida.duplicated(CHAVE)
+    if duplicados.any():
+        quadro, nome = saida.loc[duplicados, CHAVE].iloc[0]
+        raise ValueError(f"Circuito '{nome}' aparece mais de uma vez no quadro '{quadro}'.")
+    return saida
+
+
+def _iguais(a, b):
+    # Igualdade elemento a elemento considerando NaN == NaN
+    a, b = np.asarray(a), np.asarray(b)
+    if a.dtype.kind == 'f' or b.dtype.kind == 'f':
+        a, b = a.astype(float), b.astype(float)
+        return (a == b) | (np.isnan(a) & np.isnan(b))
+    return a == b
+
+
+def _custos(secao, disjuntor, num_fases, comprimento, num_fases1, tabelas, precos):
+    """custo_lote a partir dos valores de seção e disjuntor (e não dos índices nas tabelas)."""
+    secoes = tabelas['secoes']
+    indice_secao = np.clip(np.searchsorted(secoes, secao), 0, len(secoes) - 1)
+    valido = np.isfinite(secao) & (secoes[indice_secao] == secao)
+    indice_disjuntor = np.full(len(secao), -1, dtype=np.int64)
+    for fases, padroes in tabelas['disjuntores'].items():
+        linhas = np.flatnonzero(num_fases == fases)
+        if len(linhas) == 0 or len(padroes) == 0:
+            continue
+        k = np.clip(np.searchsorted(padroes, disjuntor[linhas]), 0, len(padroes) - 1)
+        achou = padroes[k] == disjuntor[linhas]
+        indice_disjuntor[linhas[achou]] = k[achou]
+    valido &= indice_disjuntor >= 0
+    resultado = {'indice_secao': np.where(valido, indice_secao, -1), 'indice_disjuntor': np.clip(indice_disjuntor, 0, None)}
+    return custo_lote(resultado, num_fases, comprimento, num_fases1, precos)
+
+
+def _dimensionar_nova(tabela, fases_qd, precisa_dimensionar, tabelas):
+    """Fases de todos os circuitos novos e seção/disjuntor só das linhas marcadas."""
+    definir_num_fases(tabela)
+    distribuir_fases(tabela, fases_qd)
+    preparar_circuitos_para_calculo(tabela)
+    arrays = preparar_arrays(tabela, tabelas)
+    linhas = np.flatnonzero(precisa_dimensionar)
+    sub = {k: np.asarray(v)[linhas] for k, v in arrays.items()}
+    resultado = dimensionar_lote(
+        sub['potencia'], sub['tensao'], sub['fator_potencia'], sub['num_fases'], sub['temperatura'],
+        sub['num_circuitos'], sub['comprimento'], sub['queda_tensao_max'], sub['indice_metodo'],
+        sub['iluminacao'], tabelas)
+    return tabela, arrays, linhas, resultado
+
+
+def comparar_revisao(anterior, nova, data_tables, sinapi_df, fases_qd, apenas_alteracoes=True):
+    """
+    Diferença entre a revisão salva de um projeto e uma nova lista de circuitos.
+
+    anterior: circuitos de ArmazemProjetos.carregar_circuitos (entradas e resultados).
+    nova: circuitos no formato do editor (lista, DataFrame ou TabelaCircuitos, comprimento em metros).
+    As revisões são unidas por (Quadro, nome); só os circuitos novos ou com alguma entrada
+    alterada são redimensionados, os demais reaproveitam a seção e o disjuntor salvos (o que
+    supõe as mesmas tabelas de referência nas duas revisões). As fases são redistribuídas em
+    todo o projeto, já que distribuir_fases depende da ordem e da carga acumulada.
+
+    Retorna (relatorio, resumo, resultados): o relatório por circuito com os campos alterados
+    e os deltas de seção, disjuntor, fases e custo; um dicionário com as contagens e o delta
+    do orçamento; e seção/disjuntor/fases/custo de todos os circuitos da nova revisão.
+    """
+    tabelas = compilar_tabelas(data_tables)
+    precos = compilar_precos(tabelas, sinapi_df)
+
+    ant = _canonico(anterior)
+    for campo in CAMPOS_RESULTADO + ['num_fases']:
+        ant[campo] = np.asarray(anterior[campo])
+    ant['_linha_anterior'] = np.arange(len(ant))
+
+    # Cópia: fases e preparação para o cálculo alteram a tabela
+    tabela = TabelaCircuitos.de_registros(nova)
+    tabela = tabela.copiar() if tabela is nova else tabela
+    nov = _canonico({'quadro': tabela['Quadro'], 'nome': tabela['nome'], 'dr': tabela['DR'],
+                     'comprimento': np.asarray(tabela['comprimento'], dtype=float) / 1000,
+                     **{campo: tabela[campo] for campo in CAMPOS_NUMERICOS[:-1] + CAMPOS_TEXTO}})
+    nov['_linha_nova'] = np.arange(len(nov))
+
+    # Junção por hash da chave (quadro, nome)
+    uniao = ant.merge(nov, on=CHAVE, how='outer', suffixes=('_anterior', '_nova'), indicator=True)
+    nas_duas = (uniao['_merge'] == 'both').to_numpy()
+    so_nova = (uniao['_merge'] == 'right_only').to_numpy()
+    so_anterior = (uniao['_merge'] == 'left_only').to_numpy()
+
+    alterados = np.zeros((len(uniao), len(CAMPOS_ENTRADA)), dtype=bool)
+    for j, campo in enumerate(CAMPOS_ENTRADA):
+        alterados[:, j] = nas_duas & ~_iguais(uniao[f"{campo}_anterior"], uniao[f"{campo}_nova"])
+    entrada_alterada = alterados.any(axis=1)
+
+    # Redimensiona só o que mudou; o resto vem da revisão anterior
+    linha_nova = uniao['_linha_nova'].fillna(-1).to_numpy(dtype=np.int64)
+    precisa = np.zeros(len(nov), dtype=bool)
+    precisa[linha_nova[so_nova | entrada_alterada]] = True
+    tabela, arrays, linhas, resultado = _dimensionar_nova(tabela, fases_qd, precisa, tabelas)
+
+    linha_anterior = uniao['_linha_anterior'].fillna(-1).to_numpy(dtype=np.int64)
+    secao_nova = np.full(len(nov), np.nan)
+    disjuntor_novo = np.full(len(nov), np.nan)
+    erro_novo = np.zeros(len(nov), dtype=np.int8)
+    reaproveitados = linha_nova[nas_duas & ~entrada_alterada]
+    secao_nova[reaproveitados] = ant['secao'].to_numpy(dtype=float)[linha_anterior[nas_duas & ~entrada_alterada]]
+    disjuntor_novo[reaproveitados] = ant['disjuntor'].to_numpy(dtype=float)[linha_anterior[nas_duas & ~entrada_alterada]]
+    secao_nova[linhas] = resultado['secao']
+    disjuntor_novo[linhas] = resultado['disjuntor']
+    erro_novo[linhas] = resultado['erro']
+    fases_novas = np.asarray(tabela['Fases'], dtype=object)
+    custo_novo = _custos(secao_nova, disjuntor_novo, arrays['num_fases'], arrays['comprimento'],
+                         arrays['num_fases1'], tabelas, precos)
+    custo_anterior = _custos(ant['secao'].to_numpy(dtype=float), ant['disjuntor'].to_numpy(dtype=float),
+                             ant['num_fases'].to_numpy(dtype=float), ant['comprimento'].to_numpy(),
+                             ant['num_fases1'].to_numpy(dtype=object), tabelas, precos)
+
+    def da_anterior(valores, vazio=np.nan):
+        saida = np.full(len(uniao), vazio, dtype=object if vazio is None else float)
+        saida[linha_anterior >= 0] = np.asarray(valores)[linha_anterior[linha_anterior >= 0]]
+        return saida
+
+    def da_nova(valores, vazio=np.nan):
+        saida = np.full(len(uniao), vazio, dtype=object if vazio is None else float)
+        saida[linha_nova >= 0] = np.asarray(valores)[linha_nova[linha_nova >= 0]]
+        return saida
+
+    secao = (da_anterior(ant['secao']), da_nova(secao_nova))
+    disjuntor = (da_anterior(ant['disjuntor']), da_nova(disjuntor_novo))
+    fases = (da_anterior(ant['fases'], None), da_nova(fases_novas, None))
+    custo = (da_anterior(custo_anterior), da_nova(custo_novo))
+    resultado_alterado = np.column_stack([
+        nas_duas & ~_iguais(secao[0], secao[1]),
+        nas_duas & ~_iguais(disjuntor[0], disjuntor[1]),
+        nas_duas & (pd.Series(fases[0]).fillna('').to_numpy() != pd.Series(fases[1]).fillna('').to_numpy()),
+    ])
+
+    # Lista de campos alterados montada coluna a coluna
+    campos = np.column_stack([alterados, resultado_alterado])
+    nomes_campos = np.array([f"{c}, " for c in CAMPOS_ENTRADA + CAMPOS_RESULTADO], dtype=object)
+    lista_campos = np.where(campos, nomes_campos[None, :], '').sum(axis=1).astype(str)
+    lista_campos = np.char.rstrip(lista_campos, ', ')
+
+    situacao = np.select([so_nova, so_anterior, campos.any(axis=1)],
+                         [SITUACAO_NOVO, SITUACAO_REMOVIDO, SITUACAO_ALTERADO], SITUACAO_INALTERADO)
+    relatorio = pd.DataFrame({
+        'Quadro': uniao['quadro'].to_numpy(),
+        'Nome do Circuito': uniao['nome'].to_numpy(),
+        'Situação': situacao,
+        'Campos alterados': lista_campos,
+        'Seção anterior (mm²)': secao[0],
+        'Seção nova (mm²)': secao[1],
+        'Disjuntor anterior': disjuntor[0],
+        'Disjuntor novo': disjuntor[1],
+        'Fases anteriores': fases[0],
+        'Fases novas': fases[1],
+        'Custo anterior (R$)': custo[0],
+        'Custo novo (R$)': custo[1],
+        'Delta custo (R$)': np.nan_to_num(custo[1]) - np.nan_to_num(custo[0]),
+        'Erro': da_nova([MENSAGENS_ERRO.get(e, '') for e in erro_novo], None),
+    })
+    if apenas_alteracoes:
+        relatorio = relatorio[situacao != SITUACAO_INALTERADO].reset_index(drop=True)
+
+    resumo = {
+        SITUACAO_NOVO: int(so_nova.sum()),
+        SITUACAO_REMOVIDO: int(so_anterior.sum()),
+        SITUACAO_ALTERADO: int((situacao == SITUACAO_ALTERADO).sum()),
+        SITUACAO_INALTERADO: int((situacao == SITUACAO_INALTERADO).sum()),
+        'redimensionados': int(len(linhas)),
+        'custo_anterior': float(np.nansum(custo_anterior)),
+        'custo_novo': float(np.nansum(custo_novo)),
+    }
+    resumo['delta_custo'] = resumo['custo_novo'] - resumo['custo_anterior']
+
+    resultados = pd.DataFrame({
+        'Quadro': nov['quadro'].to_numpy(),
+        'Nome do Circuito': nov['nome'].to_numpy(),
+        'Seção do Condutor (mm²)': secao_nova,
+        'Disjuntor': disjuntor_novo,
+        'Fases': fases_novas,
+        'Custo (R$)': custo_novo,
+        'Erro': [MENSAGENS_ERRO.get(e, '') for e in erro_novo],
+    })
+    return relatorio, resumo, resultados
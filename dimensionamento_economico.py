@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+
+from motor_vetorizado import (
+    compilar_tabelas,
+    compilar_precos,
+    preparar_arrays,
+    dimensionar_lote,
+    MENSAGENS_ERRO,
+)
+from tabela_circuitos import TabelaCircuitos
+
+TARIFA_PADRAO = 0.85          # R$/kWh
+HORAS_ANUAIS_PADRAO = 2000    # horas equivalentes por ano à corrente nominal
+ANOS_PADRAO = 25
+TAXA_DESCONTO_PADRAO = 0.08
+
+# Perdas Joule = fator x corrente² x queda de tensão unitária da tabela. A queda da tabela é
+# a do laço fase-retorno (2·R, como em verificacao_protecao): com fase e neutro (ou duas fases)
+# ela já cobre os dois condutores percorridos; no trifásico as perdas são 3·R·I² = 1,5 x 2·R·I².
+FATOR_PERDAS = {1: 1.0, 2: 1.0, 3: 1.5}
+
+
+def fator_valor_presente(anos, taxa_desconto, crescimento_carga=0.0, crescimento_tarifa=0.0):
+    """
+    Fator que leva o custo das perdas do primeiro ano ao valor presente da vida útil (NBR 15920):
+    Q / (1 + i), com Q = soma de r^(n-1) para n = 1..N e r = (1 + a)² (1 + b) / (1 + i).
+    """
+    r = (1 + crescimento_carga) ** 2 * (1 + crescimento_tarifa) / (1 + taxa_desconto)
+    q = anos if np.isclose(r, 1.0) else (1 - r ** anos) / (1 - r)
+    return q / (1 + taxa_desconto)
+
+
+def custo_ciclo_vida_lote(resultado, num_fases, comprimento, num_fases1, tabelas, precos,
+                          tarifa, horas_anuais, valor_presente):
+    """
+    Custo de condutores e de perdas de todas as seções candidatas para N circuitos de uma vez.
+    resultado: saída de dimensionar_lote (a seção técnica é a menor candidata).
+    comprimento em km. Retorna (custo dos condutores, perdas anuais em kWh, custo total), matrizes (N, S);
+    seções que não atendem ou sem preço SINAPI ficam com custo total infinito.
+    """
+    num_fases = np.asarray(num_fases, dtype=float)
+    comprimento = np.asarray(comprimento, dtype=float)
+    metros = comprimento * 1000
+    sem_terra = np.asarray(num_fases1, dtype=object) == "F+N"
+
+    # Mesmas quantidades de custo_lote, agora para cada seção candidata
+    custo_metro = num_fases[:, None] * precos['fase'][None, :]
+    custo_metro += (num_fases == 1)[:, None] * precos['neutro'][None, :]
+    custo_metro += (~sem_terra)[:, None] * precos['terra'][None, :]
+    custo_condutores = metros[:, None] * custo_metro
+
+    fator = np.select([num_fases == 1, num_fases == 2, num_fases == 3],
+                      [FATOR_PERDAS[1], FATOR_PERDAS[2], FATOR_PERDAS[3]], np.nan)
+    corrente = resultado['corrente_nominal']
+    perdas_kw = (fator * corrente ** 2 * comprimento)[:, None] * tabelas['queda_por_secao'][None, :] / 1000
+    perdas_anuais = perdas_kw * horas_anuais
+
+    posicoes = np.arange(len(tabelas['secoes']))[None, :]
+    candidata = posicoes >= resultado['indice_secao'][:, None]
+    candidata &= (resultado['indice_secao'] >= 0)[:, None]
+    candidata &= (precos['fase'] > 0)[None, :] & ~np.isnan(tabelas['queda_por_secao'])[None, :]
+    custo_total = custo_condutores + perdas_anuais * tarifa * valor_presente
+    custo_total = np.where(candidata, custo_total, np.inf)
+    return custo_condutores, perdas_anuais, custo_total
+
+
+def dimensionar_economico(circuitos, data_tables, sinapi_df,
+                          tarifa=TARIFA_PADRAO,
+                          horas_anuais=HORAS_ANUAIS_PADRAO,
+                          anos=ANOS_PADRAO,
+                          taxa_desconto=TAXA_DESCONTO_PADRAO,
+                          crescimento_carga=0.0,
+                          crescimento_tarifa=0.0):
+    """
+    Seção de menor custo ao longo da vida útil (condutores SINAPI + perdas Joule) por circuito,
+    escolhida entre a seção técnica de calcular_parametros_circuitos e todas as maiores.
+
+    circuitos: lista, DataFrame ou TabelaCircuitos já preparada para o cálculo (comprimento em km).
+    tarifa em R$/kWh; horas_anuais são as horas equivalentes de operação à corrente nominal;
+    taxa_desconto, crescimento_carga e crescimento_tarifa são taxas anuais (0.08 = 8%).
+    """
+    df = circuitos if isinstance(circuitos, (pd.DataFrame, TabelaCircuitos)) else pd.DataFrame(circuitos)
+    tabelas = compilar_tabelas(data_tables)
+    precos = compilar_precos(tabelas, sinapi_df)
+    arrays = preparar_arrays(df, tabelas)
+    resultado = dimensionar_lote(
+        arrays['potencia'], arrays['tensao'], arrays['fator_potencia'], arrays['num_fases'],
+        arrays['temperatura'], arrays['num_circuitos'], arrays['comprimento'],
+        arrays['queda_tensao_max'], arrays['indice_metodo'], arrays['iluminacao'], tabelas)
+
+    valor_presente = fator_valor_presente(anos, taxa_desconto, crescimento_carga, crescimento_tarifa)
+    custo_condutores, perdas_anuais, custo_total = custo_ciclo_vida_lote(
+        resultado, arrays['num_fases'], arrays['comprimento'], arrays['num_fases1'],
+        tabelas, precos, tarifa, horas_anuais, valor_presente)
+
+    linhas = np.arange(len(custo_total))
+    valido = resultado['erro'] == 0
+    tecnica = np.clip(resultado['indice_secao'], 0, None)
+    economica = np.argmin(custo_total, axis=1)
+    secoes = tabelas['secoes']
+
+    def por_secao(matriz, indices):
+        return np.where(valido, matriz[linhas, indices], np.nan)
+
+    custo_tecnica = por_secao(custo_total, tecnica)
+    custo_economica = por_secao(custo_total, economica)
+    return pd.DataFrame({
+        "Nome do Circuito": np.asarray(df['nome']),
+        "Seção técnica (mm²)": np.where(valido, secoes[tecnica], np.nan),
+        "Seção econômica (mm²)": np.where(valido, secoes[economica], np.nan),
+        "Custo condutores técnica (R$)": por_secao(custo_condutores, tecnica),
+        "Custo condutores econômica (R$)": por_secao(custo_condutores, economica),
+        "Perdas anuais técnica (kWh)": por_secao(perdas_anuais, tecnica),
+        "Perdas anuais econômica (kWh)": por_secao(perdas_anuais, economica),
+        "Custo vida útil técnica (R$)": custo_tecnica,
+        "Custo vida útil econômica (R$)": custo_economica,
+        "Economia (R$)": custo_tecnica - custo_economica,
+        "Erro": [MENSAGENS_ERRO.get(e, '') for e in resultado['erro']],
+    })
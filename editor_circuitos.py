@@ -0,0 +1,67 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+# Acima deste número de circuitos o editor passa a mostrar uma página por vez
+LIMITE_EDITOR_COMPLETO = 1000
+LINHAS_POR_PAGINA = 500
+TODOS_QUADROS = "Todos"
+
+
+def preparar_base(circuitos):
+    """Tabela mestre do editor: um DataFrame com chave estável por circuito no índice 'id'."""
+    base = pd.DataFrame(circuitos).reset_index(drop=True)
+    base.index.name = 'id'
+    return base
+
+
+def quadros_da_base(base):
+    return sorted(base['Quadro'].dropna().astype(str).unique())
+
+
+def fatiar(base, quadro=None, pagina=0, linhas_por_pagina=LINHAS_POR_PAGINA):
+    """
+    Fatia visível da tabela mestre, filtrada por quadro e paginada.
+    Retorna (fatia com índice 0..k-1, chaves das linhas na tabela mestre, número de páginas).
+    """
+    chaves = base.index.to_numpy()
+    if quadro not in (None, TODOS_QUADROS):
+        chaves = chaves[(base['Quadro'].astype(str) == quadro).to_numpy()]
+    num_paginas = max(1, math.ceil(len(chaves) / linhas_por_pagina))
+    pagina = min(max(pagina, 0), num_paginas - 1)
+    chaves = chaves[pagina * linhas_por_pagina:(pagina + 1) * linhas_por_pagina]
+    return base.loc[chaves].reset_index(drop=True), chaves, num_paginas
+
+
+def mesclar_edicoes(base, chaves, editado, quadro=None):
+    """
+    Aplica na tabela mestre o resultado do data_editor sobre uma fatia.
+
+    O editor recebe a fatia com índice 0..k-1, então no DataFrame devolvido os
+    rótulos < k são as linhas originais (pela posição em 'chaves'), rótulos >= k
+    são linhas novas e as posições ausentes foram apagadas.
+    """
+    k = len(chaves)
+    rotulos = editado.index.to_numpy()
+    mantidos = rotulos[rotulos < k].astype(np.int64)
+    removidas = np.setdiff1d(chaves, chaves[mantidos])
+    novas = editado.loc[rotulos >= k]
+
+    resultado = base.drop(index=removidas) if len(removidas) else base.copy()
+    if len(mantidos):
+        alteradas = editado.loc[mantidos]
+        for coluna in editado.columns:
+            valores = alteradas[coluna].to_numpy()
+            if coluna not in resultado.columns:
+                resultado[coluna] = None
+            if not np.array_equal(resultado.loc[chaves[mantidos], coluna].to_numpy(), valores):
+                resultado.loc[chaves[mantidos], coluna] = valores
+    if len(novas):
+        novas = novas.copy()
+        if quadro not in (None, TODOS_QUADROS):
+            novas['Quadro'] = novas['Quadro'].where(novas['Quadro'].notna(), quadro)
+        inicio = int(base.index.max()) + 1 if len(base) else 0
+        novas.index = pd.RangeIndex(inicio, inicio + len(novas), name='id')
+        resultado = pd.concat([resultado, novas])
+    return resultado
@@ -0,0 +1,214 @@
+import numpy as np
+import pandas as pd
+
+from calculos import escolher_quadro, seção_neutro_map, seção_terra_map, sinapi_quadros
+from catalogo_protecao import catalogo_padrao
+from tabela_circuitos import TabelaCircuitos
+
+# Um item de material é identificado por categoria, polos e valor nominal (A, mm² ou nº de circuitos)
+ITEM = ['Categoria', 'Polos', 'Valor', 'Unidade']
+UNIDADES = {'disjuntor': 'un', 'condutor': 'm', 'dr': 'un', 'quadro': 'un'}
+DEPOSITO_PADRAO = 'Principal'
+
+COLUNAS_DEMANDA = ['Projeto'] + ITEM + ['Quantidade']
+COLUNAS_ESTOQUE = ['Deposito'] + ITEM + ['Quantidade']
+
+# Diferenças menores que isso (metros de cabo somados em float) são tratadas como zero
+TOLERANCIA = 1e-6
+
+
+def _secao_neutro(secoes):
+    return secoes.where(secoes <= 25, secoes.map(seção_neutro_map).fillna(secoes))
+
+
+def _secao_terra(secoes):
+    return secoes.where(secoes <= 16, secoes.map(seção_terra_map).fillna(secoes))
+
+
+def _capacidade_quadro(num_circuitos):
+    # Mesmo critério de escolher_quadro (2 posições de reserva), devolvendo a capacidade
+    codigo_para_capacidade = {codigo: capacidade for capacidade, codigo in sinapi_quadros.items()}
+    return codigo_para_capacidade[escolher_quadro(num_circuitos, sinapi_quadros)]
+
+
+def _itens(projeto, categoria, polos, valor, quantidade):
+    return pd.DataFrame({
+        'Projeto': np.asarray(projeto, dtype=object),
+        'Categoria': categoria,
+        'Polos': np.asarray(polos, dtype=np.int64),
+        'Valor': np.asarray(valor, dtype=float),
+        'Unidade': UNIDADES[categoria],
+        'Quantidade': np.asarray(quantidade, dtype=float),
+    })
+
+
+def demanda_materiais(circuitos, disjuntores_gerais=None, projeto='Projeto', catalogo=None):
+    """
+    Materiais necessários (disjuntores, condutores por seção em metros, DRs e quadros)
+    de um ou vários projetos já dimensionados.
+
+    circuitos: TabelaCircuitos, DataFrame ou lista após calcular_parametros_circuitos (comprimento em km).
+    Uma coluna 'Projeto' nos circuitos permite calcular vários projetos de uma vez.
+    disjuntores_gerais: {quadro: corrente} do projeto, ou DataFrame com Projeto, Quadro e Disjuntor.
+    """
+    catalogo = catalogo or catalogo_padrao
+    colunas = ['Seção do Condutor (mm²)', 'Disjuntor (Ampere)', 'comprimento', 'num_fases', 'num_fases1', 'DR', 'Quadro']
+    if isinstance(circuitos, TabelaCircuitos):
+        df = circuitos.para_dataframe(colunas + (['Projeto'] if 'Projeto' in circuitos else []))
+    else:
+        df = circuitos if isinstance(circuitos, pd.DataFrame) else pd.DataFrame(list(circuitos))
+    if 'Projeto' not in df:
+        df = df.assign(Projeto=projeto)
+    num_fases = df['num_fases'].to_numpy(dtype=np.int64)
+    disjuntor = df['Disjuntor (Ampere)'].to_numpy(dtype=float)
+    secao = df['Seção do Condutor (mm²)'].astype(float)
+    metros = df['comprimento'].to_numpy(dtype=float) * 1000
+    projetos = df['Projeto'].to_numpy(dtype=object)
+    partes = []
+
+    # Disjuntores dos circuitos e disjuntores gerais dos quadros (tripolares, como em criar_lista_materiais)
+    partes.append(_itens(projetos, 'disjuntor', num_fases, disjuntor, 1))
+    if disjuntores_gerais is not None:
+        if isinstance(disjuntores_gerais, dict):
+            gerais = pd.DataFrame({'Projeto': projeto, 'Quadro': list(disjuntores_gerais),
+                                   'Disjuntor': list(disjuntores_gerais.values())})
+        else:
+            gerais = disjuntores_gerais
+        gerais = gerais.dropna(subset=['Disjuntor'])
+        partes.append(_itens(gerais['Projeto'], 'disjuntor', 3, gerais['Disjuntor'], 1))
+
+    # Condutores: fase, neutro (monofásicos) e terra (exceto F+N), com as regras de montar_tabela_materiais
+    partes.append(_itens(projetos, 'condutor', 0, secao, metros * num_fases))
+    mono = num_fases == 1
+    partes.append(_itens(projetos[mono], 'condutor', 0, _secao_neutro(secao)[mono], metros[mono]))
+    com_terra = (df['num_fases1'] != "F+N").to_numpy()
+    partes.append(_itens(projetos[com_terra], 'condutor', 0, _secao_terra(secao)[com_terra], metros[com_terra]))
+
+    # DRs: menor corrente nominal acima do disjuntor (selecionar_dr); 2 polos até bifásico, 4 no trifásico
+    if 'DR' in df:
+        com_dr = df['DR'].fillna(False).astype(bool).to_numpy()
+        correntes_dr = np.asarray(catalogo.correntes_dr, dtype=float)
+        k = np.searchsorted(correntes_dr, disjuntor, side='right')
+        com_dr &= k < len(correntes_dr)
+        partes.append(_itens(projetos[com_dr], 'dr', np.where(num_fases[com_dr] == 3, 4, 2),
+                             correntes_dr[k[com_dr]], 1))
+
+    # Quadros: capacidade pelo número de circuitos de cada quadro
+    contagem = df.groupby(['Projeto', 'Quadro'], sort=False).size().reset_index(name='n')
+    partes.append(_itens(contagem['Projeto'], 'quadro', 0, contagem['n'].map(_capacidade_quadro), 1))
+
+    demanda = pd.concat(partes, ignore_index=True)
+    demanda = demanda[demanda['Quantidade'] > 0]
+    return demanda.groupby(['Projeto'] + ITEM, as_index=False, sort=False)['Quantidade'].sum()
+
+
+def demanda_armazem(armazem, projetos=None, catalogo=None):
+    """Demanda de materiais da última revisão de cada projeto salvo no ArmazemProjetos."""
+    filtro, parametros = '', ()
+    if projetos is not None:
+        projetos = list(projetos)
+        filtro = f"WHERE p.nome IN ({', '.join('?' * len(projetos))})"
+        parametros = tuple(projetos)
+    circuitos = armazem.consultar(
+        "SELECT p.nome AS Projeto, c.quadro AS Quadro, c.secao AS \"Seção do Condutor (mm²)\", "
+        "c.disjuntor AS \"Disjuntor (Ampere)\", c.comprimento, c.num_fases, c.num_fases1, c.dr AS DR "
+        "FROM circuitos c JOIN ultimas_revisoes r ON r.id = c.revisao_id "
+        f"JOIN projetos p ON p.id = r.projeto_id {filtro}", parametros)
+    gerais = armazem.consultar(
+        "SELECT p.nome AS Projeto, q.quadro AS Quadro, q.disjuntor_geral AS Disjuntor "
+        "FROM quadros q JOIN ultimas_revisoes r ON r.id = q.revisao_id "
+        f"JOIN projetos p ON p.id = r.projeto_id {filtro}", parametros)
+    return demanda_materiais(circuitos, gerais, catalogo=catalogo)
+
+
+def ler_estoque(origem, deposito=DEPOSITO_PADRAO):
+    """
+    Estoque por depósito a partir de uma planilha ou DataFrame com as colunas
+    Deposito, Categoria, Polos, Valor e Quantidade. O formato antigo de
+    ler_materiais_existentes (num_fases, corrente, Quantidade) é lido como disjuntores.
+    """
+    df = origem if isinstance(origem, pd.DataFrame) else pd.read_excel(origem)
+    if 'Categoria' not in df and {'num_fases', 'corrente'} <= set(df.columns):
+        df = df.rename(columns={'num_fases': 'Polos', 'corrente': 'Valor'}).assign(Categoria='disjuntor')
+    if 'Deposito' not in df:
+        df = df.assign(Deposito=deposito)
+    if 'Polos' not in df:
+        df = df.assign(Polos=0)
+    categoria = df['Categoria'].astype(str).str.strip().str.lower()
+    desconhecidas = sorted(set(categoria) - set(UNIDADES))
+    if desconhecidas:
+        raise ValueError(f"Categorias de estoque desconhecidas: {', '.join(desconhecidas)}.")
+    estoque = pd.DataFrame({
+        'Deposito': df['Deposito'].astype(str).to_numpy(),
+        'Categoria': categoria.to_numpy(),
+        'Polos': df['Polos'].fillna(0).to_numpy(dtype=np.int64),
+        'Valor': df['Valor'].to_numpy(dtype=float),
+        'Unidade': categoria.map(UNIDADES).to_numpy(),
+        'Quantidade': df['Quantidade'].to_numpy(dtype=float),
+    })
+    return estoque.groupby(['Deposito'] + ITEM, as_index=False, sort=False)['Quantidade'].sum()
+
+
+def _fins_acumulados(quantidades, itens, deslocamento):
+    # Fim de cada linha na reta acumulada do seu item (linhas já ordenadas por item)
+    acumulado = np.cumsum(quantidades)
+    inicio_item = np.r_[0, np.flatnonzero(np.diff(itens)) + 1]
+    base = np.repeat(acumulado[inicio_item] - quantidades[inicio_item], np.diff(np.r_[inicio_item, len(itens)]))
+    return deslocamento[itens] + acumulado - base
+
+
+def reconciliar(demanda, estoque, ordem_projetos=None, ordem_depositos=None):
+    """
+    Abate o estoque de todos os depósitos contra a demanda de todos os projetos.
+
+    Alocação gulosa por item: projetos na ordem de prioridade consomem os depósitos na
+    ordem de prioridade (padrão: ordem de aparição). Cada projeto e cada depósito viram
+    intervalos na reta acumulada do item, e a alocação é a sobreposição entre eles, sem laço
+    por item. Retorna (compras, ociosos, alocacao).
+    """
+    ordem_projetos = list(ordem_projetos) if ordem_projetos is not None else list(pd.unique(demanda['Projeto']))
+    ordem_depositos = list(ordem_depositos) if ordem_depositos is not None else list(pd.unique(estoque['Deposito']))
+    d = demanda.groupby(['Projeto'] + ITEM, as_index=False, sort=False)['Quantidade'].sum()
+    e = estoque.groupby(['Deposito'] + ITEM, as_index=False, sort=False)['Quantidade'].sum()
+
+    itens = pd.concat([d[ITEM], e[ITEM]], ignore_index=True).groupby(ITEM, sort=False).ngroup().to_numpy()
+    d['_item'], e['_item'] = itens[:len(d)], itens[len(d):]
+    d['_prioridade'] = d['Projeto'].map({p: i for i, p in enumerate(ordem_projetos)}).fillna(len(ordem_projetos))
+    e['_prioridade'] = e['Deposito'].map({p: i for i, p in enumerate(ordem_depositos)}).fillna(len(ordem_depositos))
+    d = d.sort_values(['_item', '_prioridade'], kind='stable').reset_index(drop=True)
+    e = e.sort_values(['_item', '_prioridade'], kind='stable').reset_index(drop=True)
+
+    num_itens = int(itens.max()) + 1 if len(itens) else 0
+    qd = d['Quantidade'].to_numpy(dtype=float)
+    qe = e['Quantidade'].to_numpy(dtype=float)
+    di, ei = d['_item'].to_numpy(), e['_item'].to_numpy()
+    extensao = np.maximum(np.bincount(di, weights=qd, minlength=num_itens),
+                          np.bincount(ei, weights=qe, minlength=num_itens))
+    deslocamento = np.r_[0, np.cumsum(extensao)[:-1]] if num_itens else np.zeros(0)
+    d_fim = _fins_acumulados(qd, di, deslocamento) if len(d) else np.zeros(0)
+    e_fim = _fins_acumulados(qe, ei, deslocamento) if len(e) else np.zeros(0)
+    d_ini, e_ini = d_fim - qd, e_fim - qe
+
+    pontos = np.unique(np.concatenate([d_ini, d_fim, e_ini, e_fim]))
+    seg_ini, seg_fim = pontos[:-1], pontos[1:]
+    i = np.searchsorted(d_fim, seg_ini, side='right')
+    j = np.searchsorted(e_fim, seg_ini, side='right')
+    ok = (i < len(d)) & (j < len(e))
+    i, j, seg_ini, seg_fim = i[ok], j[ok], seg_ini[ok], seg_fim[ok]
+    # Pontos do mesmo valor calculados por somas diferentes podem diferir no último bit; sem
+    # conferir o item, essa sobra de arredondamento vira alocação entre itens vizinhos na reta
+    ok = (d_ini[i] <= seg_ini) & (e_ini[j] <= seg_ini) & (di[i] == ei[j])
+    i, j, quantidade = i[ok], j[ok], (seg_fim - seg_ini)[ok]
+
+    alocacao = pd.DataFrame({'_d': i, '_e': j, 'Quantidade': quantidade}).groupby(['_d', '_e'], as_index=False).sum()
+    alocacao = pd.concat([
+        d.loc[alocacao['_d'], ['Projeto'] + ITEM].reset_index(drop=True),
+        e.loc[alocacao['_e'], ['Deposito']].reset_index(drop=True),
+        alocacao['Quantidade'],
+    ], axis=1)[['Projeto', 'Deposito'] + ITEM + ['Quantidade']]
+
+    faltante = qd - np.bincount(i, weights=quantidade, minlength=len(d))
+    sobra = qe - np.bincount(j, weights=quantidade, minlength=len(e))
+    compras = d.loc[faltante > TOLERANCIA, ['Projeto'] + ITEM].assign(Quantidade=faltante[faltante > TOLERANCIA])
+    ociosos = e.loc[sobra > TOLERANCIA, ['Deposito'] + ITEM].assign(Quantidade=sobra[sobra > TOLERANCIA])
+    return compras.reset_index(drop=True), ociosos.reset_index(drop=True), alocacao
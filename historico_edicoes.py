@@ -0,0 +1,198 @@
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+RESULTADOS_EM_MEMORIA = 8
+
+
+class DeltaTabela:
+    """
+    Diferença entre duas revisões da tabela mestre do editor, por linha: as linhas que saem
+    (apagadas ou na versão anterior de uma alteração) e as que entram (novas ou na versão
+    alterada), cada uma com a posição que ocupa na sua tabela. As demais linhas mantêm a ordem
+    relativa, então aplicar o delta ao contrário é só trocar os dois lados.
+    """
+
+    def __init__(self, saem, posicoes_saem, entram, posicoes_entram):
+        self.saem = saem
+        self.posicoes_saem = posicoes_saem
+        self.entram = entram
+        self.posicoes_entram = posicoes_entram
+        # Só valores alterados: mesmas linhas nas mesmas posições dos dois lados
+        self._no_lugar = saem.index.equals(entram.index) and np.array_equal(posicoes_saem, posicoes_entram)
+
+    def __len__(self):
+        return len(self.saem) + len(self.entram)
+
+    def nbytes(self):
+        return int(self.saem.memory_usage(deep=True).sum() + self.entram.memory_usage(deep=True).sum()
+                   + self.posicoes_saem.nbytes + self.posicoes_entram.nbytes)
+
+    def aplicar(self, tabela):
+        if self._no_lugar:
+            return _sobrescrever(tabela, self.posicoes_entram, self.entram)
+        return _substituir(tabela, self.saem.index, self.entram, self.posicoes_entram)
+
+    def reverter(self, tabela):
+        if self._no_lugar:
+            return _sobrescrever(tabela, self.posicoes_saem, self.saem)
+        return _substituir(tabela, self.entram.index, self.saem, self.posicoes_saem)
+
+
+def _sobrescrever(tabela, posicoes, linhas):
+    tabela = tabela.copy()
+    for j, coluna in enumerate(tabela.columns):
+        tabela.iloc[posicoes, j] = linhas[coluna].to_numpy()
+    return tabela
+
+
+def _substituir(tabela, saem, entram, posicoes):
+    restante = tabela.drop(index=saem)
+    if not len(entram):
+        return restante
+    total = len(restante) + len(entram)
+    if np.array_equal(posicoes, np.arange(len(restante), total)):
+        return pd.concat([restante, entram])
+    destino = np.concatenate([np.setdiff1d(np.arange(total), posicoes), posicoes])
+    return pd.concat([restante, entram]).iloc[np.argsort(destino, kind='stable')]
+
+
+def _iguais(a, b):
+    """Linha a linha, True onde todas as colunas coincidem (NaN igual a NaN)."""
+    iguais = np.ones(len(a), dtype=bool)
+    for coluna in a.columns:
+        x, y = a[coluna].to_numpy(), b[coluna].to_numpy()
+        diferentes = np.flatnonzero(x != y)
+        iguais[diferentes[~(pd.isna(x[diferentes]) & pd.isna(y[diferentes]))]] = False
+    return iguais
+
+
+def calcular_delta(antes, depois):
+    """
+    DeltaTabela de `antes` para `depois` (DataFrames com a chave da linha no índice), ou None se
+    as duas tabelas são iguais. Só quando mudam as colunas ou a ordem das linhas mantidas o
+    delta leva a tabela inteira.
+    """
+    estrutura_igual = (list(antes.columns) == list(depois.columns) and antes.dtypes.equals(depois.dtypes)
+                       and antes.index.is_unique and depois.index.is_unique)
+    if estrutura_igual:
+        if antes.index.equals(depois.index):
+            comuns = antes.index
+            alteradas = comuns[~_iguais(antes, depois)]
+        else:
+            comuns = antes.index.intersection(depois.index, sort=False)
+            alteradas = comuns[~_iguais(antes.loc[comuns], depois.loc[comuns])]
+        fica_antes = antes.index.isin(comuns.difference(alteradas))
+        fica_depois = depois.index.isin(comuns.difference(alteradas))
+        if np.array_equal(antes.index[fica_antes], depois.index[fica_depois]):
+            if fica_antes.all() and fica_depois.all():
+                return None
+            sai, entra = np.flatnonzero(~fica_antes), np.flatnonzero(~fica_depois)
+            return DeltaTabela(antes.iloc[sai].copy(), sai, depois.iloc[entra].copy(), entra)
+    return DeltaTabela(antes.copy(), np.arange(len(antes)), depois.copy(), np.arange(len(depois)))
+
+
+class HistoricoEdicoes:
+    """
+    Histórico linear de revisões da tabela mestre do editor de circuitos. Só a revisão atual
+    fica inteira em memória; as demais são alcançadas aplicando deltas por linha, então cada
+    revisão custa o tamanho das linhas alteradas. Uma nova edição depois de desfazer descarta
+    as revisões à frente. Cada revisão pode guardar resultados de cálculo (por chave, ex.:
+    tabelas de referência e alimentação); os `capacidade` mais recentes ficam em memória.
+    """
+
+    def __init__(self, tabela, capacidade=RESULTADOS_EM_MEMORIA):
+        self.capacidade = capacidade
+        self._atual = tabela
+        self._deltas = []
+        self._revisao = 0
+        self._resultados = OrderedDict()
+
+    @property
+    def atual(self):
+        return self._atual
+
+    @property
+    def revisao(self):
+        return self._revisao
+
+    def __len__(self):
+        """Número de revisões (a inicial conta)."""
+        return len(self._deltas) + 1
+
+    def pode_desfazer(self):
+        return self._revisao > 0
+
+    def pode_refazer(self):
+        return self._revisao < len(self._deltas)
+
+    def registrar(self, tabela):
+        """Registra `tabela` como nova revisão se ela difere da atual; retorna a revisão atual."""
+        if tabela is self._atual:
+            return self._revisao
+        delta = calcular_delta(self._atual, tabela)
+        if delta is None:
+            return self._revisao
+        del self._deltas[self._revisao:]
+        for chave in [c for c in self._resultados if c[0] > self._revisao]:
+            del self._resultados[chave]
+        self._deltas.append(delta)
+        self._revisao += 1
+        self._atual = tabela
+        return self._revisao
+
+    def ir_para(self, revisao):
+        """Torna `revisao` a atual e retorna a tabela dela."""
+        if not 0 <= revisao < len(self):
+            raise KeyError(f"Revisão {revisao} não existe no histórico (0 a {len(self) - 1}).")
+        tabela = self._atual
+        while self._revisao > revisao:
+            self._revisao -= 1
+            tabela = self._deltas[self._revisao].reverter(tabela)
+        while self._revisao < revisao:
+            tabela = self._deltas[self._revisao].aplicar(tabela)
+            self._revisao += 1
+        self._atual = tabela
+        return tabela
+
+    def desfazer(self):
+        if not self.pode_desfazer():
+            raise ValueError("Nada a desfazer.")
+        return self.ir_para(self._revisao - 1)
+
+    def refazer(self):
+        if not self.pode_refazer():
+            raise ValueError("Nada a refazer.")
+        return self.ir_para(self._revisao + 1)
+
+    # ------------------------------------------------------------------ resultados
+    def guardar_resultado(self, chave, resultado, revisao=None):
+        revisao = self._revisao if revisao is None else revisao
+        self._resultados[(revisao, chave)] = resultado
+        self._resultados.move_to_end((revisao, chave))
+        while len(self._resultados) > self.capacidade:
+            self._resultados.popitem(last=False)
+
+    def resultado(self, chave, revisao=None):
+        """Resultado guardado para a revisão (a atual se None) e a chave, ou None."""
+        revisao = self._revisao if revisao is None else revisao
+        if (revisao, chave) not in self._resultados:
+            return None
+        self._resultados.move_to_end((revisao, chave))
+        return self._resultados[(revisao, chave)]
+
+    def com_resultado(self):
+        """Revisões com algum resultado guardado."""
+        return {revisao for revisao, _ in self._resultados}
+
+    def revisoes(self):
+        """Uma linha por revisão com as linhas que mudaram e a memória do delta que leva até ela."""
+        linhas = [{'Revisão': 0, 'Linhas que saem': 0, 'Linhas que entram': 0, 'Bytes': 0}]
+        for i, delta in enumerate(self._deltas, start=1):
+            linhas.append({'Revisão': i, 'Linhas que saem': len(delta.saem), 'Linhas que entram': len(delta.entram),
+                           'Bytes': delta.nbytes()})
+        df = pd.DataFrame(linhas)
+        df['Atual'] = df['Revisão'] == self._revisao
+        df['Com resultado'] = df['Revisão'].isin(self.com_resultado())
+        return df
@@ -0,0 +1,137 @@
+import argparse
+import datetime
+import json
+import mmap
+import os
+import pickle
+import struct
+import warnings
+
+import numpy as np
+import pandas as pd
+
+import diagrama
+from conjuntos_referencia import PLANILHA_PADRAO, hash_arquivo
+from motor_vetorizado import compilar_tabelas, associar_compiladas
+
+PASTA = os.path.dirname(os.path.abspath(__file__))
+CAMINHO_PADRAO = os.path.join(PASTA, 'referencias.snap')
+CAMINHO_DADOS = os.path.join(PASTA, PLANILHA_PADRAO)
+CAMINHO_SINAPI = os.path.join(PASTA, 'sinapi.xls')
+
+MAGICO = b'IEBTREF1'
+ALINHAMENTO = 64  # início de cada buffer alinhado para a leitura direta como array
+
+
+class Instantaneo:
+    """
+    Tabelas de referência, SINAPI, tabelas compiladas e blocos DXF de um arquivo gerado por
+    construir_instantaneo, mapeado em memória só para leitura. Os arrays numéricos (inclusive os
+    das colunas dos DataFrames) apontam direto para as páginas do arquivo, que o sistema
+    compartilha entre todos os processos que o abrem; só textos e a estrutura dos objetos são
+    recriados em cada processo. Nada aqui pode ser alterado no lugar.
+    """
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        with open(caminho, 'rb') as arquivo:
+            self._mapa = mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+        visao = memoryview(self._mapa)
+        if len(visao) < len(MAGICO) + 8 or bytes(visao[:len(MAGICO)]) != MAGICO:
+            raise ValueError(f"'{caminho}' não é um instantâneo de referências.")
+        (inicio_indice,) = struct.unpack_from('<Q', self._mapa, len(visao) - 8)
+        indice = json.loads(bytes(visao[inicio_indice:len(visao) - 8]))
+        buffers = [visao[posicao:posicao + tamanho] for posicao, tamanho in indice['buffers']]
+        posicao, tamanho = indice['objetos']
+        conteudo = pickle.loads(visao[posicao:posicao + tamanho], buffers=buffers)
+
+        self.versao_dados = indice['versao_dados']
+        self.criado_em = indice['criado_em']
+        self.data_tables = conteudo['data_tables']
+        self.sinapi_df = conteudo['sinapi_df']
+        self.tabelas = conteudo['tabelas']
+        self.modelos = conteudo['modelos']
+
+    def instalar(self):
+        """Faz compilar_tabelas e os blocos do unifilar usarem o conteúdo do instantâneo."""
+        associar_compiladas(self.data_tables, self.tabelas)
+        diagrama.usar_modelos(self.modelos)
+        return self
+
+    def __repr__(self):
+        return f"Instantaneo({self.caminho!r}, versao_dados={self.versao_dados!r}, criado_em={self.criado_em!r})"
+
+
+def construir_instantaneo(caminho=CAMINHO_PADRAO, caminho_dados=CAMINHO_DADOS, caminho_sinapi=CAMINHO_SINAPI,
+                          pasta_modelos=None):
+    """
+    Etapa de build: lê as planilhas e os modelos DXF uma vez e grava tudo já convertido em
+    `caminho`. Os buffers dos arrays ficam fora do pickle (protocolo 5), alinhados no arquivo,
+    para que Instantaneo os use sem cópia; o índice com as posições vai no fim. A gravação é
+    atômica: processos que já mapearam a versão anterior continuam com ela até reabri-la.
+    """
+    data_sheets = pd.read_excel(caminho_dados, sheet_name=None)
+    data_tables = {sheet_name: data_sheets[sheet_name] for sheet_name in data_sheets}
+    conteudo = {
+        'data_tables': data_tables,
+        'sinapi_df': pd.read_excel(caminho_sinapi, sheet_name='Planilha1'),
+        'tabelas': compilar_tabelas(data_tables),
+        # Texto DXF como array de bytes: também vai para fora do pickle
+        'modelos': {arquivo: np.frombuffer(diagrama.extrair_blocos(arquivo, pasta_modelos).encode('utf-8'), np.uint8)
+                    for arquivo in diagrama.ARQUIVOS_MODELOS},
+    }
+    buffers = []
+    objetos = pickle.dumps(conteudo, protocol=5, buffer_callback=buffers.append)
+    posicoes = []
+    temporario = f"{caminho}.tmp"
+    with open(temporario, 'wb') as arquivo:
+        arquivo.write(MAGICO)
+        for dados in [memoryview(objetos)] + [buffer.raw() for buffer in buffers]:
+            arquivo.write(b'\0' * (-arquivo.tell() % ALINHAMENTO))
+            posicoes.append([arquivo.tell(), dados.nbytes])
+            arquivo.write(dados)
+        inicio_indice = arquivo.tell()
+        arquivo.write(json.dumps({
+            'versao_dados': hash_arquivo(caminho_dados),
+            'criado_em': datetime.datetime.now().isoformat(timespec='seconds'),
+            'objetos': posicoes[0],
+            'buffers': posicoes[1:],
+        }).encode('utf-8'))
+        arquivo.write(struct.pack('<Q', inicio_indice))
+    os.replace(temporario, caminho)
+    return caminho
+
+
+# Um mapeamento por arquivo em cada processo, como os registros de conjuntos de referência
+_instantaneos = {}
+
+
+def obter_instantaneo(caminho=CAMINHO_PADRAO, caminho_dados=CAMINHO_DADOS, avisar=warnings.warn):
+    """
+    Instantâneo do arquivo já instalado neste processo, ou None se o arquivo não existe ou foi
+    gerado de outra versão da planilha de dados. No segundo caso o app volta a ler a planilha e
+    `avisar` (None = silencioso) recebe o motivo; o instantâneo só é aceito quando reconstruído.
+    """
+    if caminho not in _instantaneos:
+        if not os.path.exists(caminho):
+            return None
+        instantaneo = Instantaneo(caminho)
+        if os.path.exists(caminho_dados) and instantaneo.versao_dados != hash_arquivo(caminho_dados):
+            if avisar is not None:
+                avisar(f"Instantâneo '{caminho}' gerado de outra versão de '{os.path.basename(caminho_dados)}' "
+                       f"({instantaneo.versao_dados}); usando a planilha. Gere de novo com "
+                       f"python instantaneo_referencias.py.")
+            return None
+        _instantaneos[caminho] = instantaneo.instalar()
+    return _instantaneos[caminho]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Gera o instantâneo das tabelas de referência para os processos do app.')
+    parser.add_argument('--saida', default=CAMINHO_PADRAO)
+    parser.add_argument('--dados', default=CAMINHO_DADOS)
+    parser.add_argument('--sinapi', default=CAMINHO_SINAPI)
+    parser.add_argument('--modelos', default=diagrama.PASTA_MODELOS)
+    args = parser.parse_args()
+    caminho = construir_instantaneo(args.saida, args.dados, args.sinapi, args.modelos)
+    print(f"Instantâneo gravado em {caminho} ({os.path.getsize(caminho) / 1e6:.1f} MB)")
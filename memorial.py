@@ -0,0 +1,310 @@
+from pylatex import Document, Section, Command, Package, Subsection
+from pylatex.utils import NoEscape
+import requests
+
+from calculos import ordenar_circuitos
+
+
+def formatar_tabela_latex(circuitos, disjuntores_gerais, disjuntor_qgbt):
+    tabela_latex = "\\begin{landscape} \n"
+    tabela_latex +="\\section{Memória de Cálculo dos Circuitos - Tabelas} \n"
+    tabela_latex +="\\fontsize{5}{5}\selectfont \n"
+    tabela_latex += "\\begin{tabular}{|l|l|l|l|l|l|l|l|l|l|l|l|l|}\n\\hline\n"
+    tabela_latex += "Nome do Circuito & Potência (W) & Tensão (V) & FP & Nº de Fases & Temp (°C) & Nº de Circuitos & Comprimento (km) & Condutor(mm²) & Disjuntor(A) & delta (V) & Fases & Quadro \\\\ \\hline\n"
+    circuitos_ordenados = ordenar_circuitos(circuitos)
+    for circuito in circuitos_ordenados:
+        linha = f"{circuito['nome']} & {circuito['potencia']} & {circuito['tensao']} & {circuito['fator_potencia']} & {circuito['num_fases']} & {circuito['temperatura']} & {circuito['num_circuitos']} & {circuito['comprimento']} & {circuito['Seção do Condutor (mm²)']} & {circuito['Disjuntor (Ampere)']} & {round(circuito['Queda de Tensão (Volts)'],2)} & {circuito['Fases']} & {circuito['Quadro']} \\\\ \\hline\n"
+        tabela_latex += linha
+    tabela_latex += "\\end{tabular}\n\n"
+    tabela_latex += "\\begin{tabular}{|l|l|}\n\\hline\n"
+    tabela_latex += "Quadro & Disjuntor Geral (A) \\\\ \\hline\n"
+    for quadro, disjuntor in disjuntores_gerais.items():
+        linha_disjuntor = f"{quadro} & {disjuntor} \\\\ \\hline\n"
+        tabela_latex += linha_disjuntor
+    tabela_latex += "\\hline\n"
+    tabela_latex += f"QGBT & {disjuntor_qgbt} \\\\ \\hline\n"
+    tabela_latex += "\\end{tabular} \n"
+    tabela_latex += "\\end{landscape}"
+    return tabela_latex
+
+def memcalc(circuitos, resultados_circuitos, tabela_queda_tensao):
+    latex_content = "\\section{Memória de Cálculo dos Circuitos}\n\n"
+    circuitos_ordenados = ordenar_circuitos(circuitos)
+    for circuito in circuitos_ordenados:
+        nome = circuito['nome']
+        potencia = circuito['potencia']
+        tensao = circuito['tensao']
+        fator_potencia = circuito['fator_potencia']
+        num_fases = circuito['num_fases']
+        secao_condutor = circuito['Seção do Condutor (mm²)']
+        comprimento = circuito['comprimento']
+        resultado = resultados_circuitos.loc[resultados_circuitos['Nome do Circuito'] == nome].iloc[0]
+        corrente_nominal = resultado['Corrente Nominal']
+        corrente_nominal = round(corrente_nominal, 2)
+        fator_agrupamento = resultado['Fator Agrupamento']
+        fator_correcao_temp = resultado['Fator correção temperatura']
+        corrente_corrigida = resultado['Corrente corrigida']
+        corrente_corrigida = round(corrente_corrigida, 2)
+        valor_queda_tensao = tabela_queda_tensao.loc[tabela_queda_tensao['seção do condutor'] == secao_condutor, 'Queda de tensão (V/A.km)'].iloc[0]
+        queda_tensao = valor_queda_tensao * corrente_nominal * comprimento
+        queda_tensao = round(queda_tensao,2)
+
+        n_factor = '0' if num_fases == 1 else '1' if num_fases == 2 else '2'
+        latex_content += f"\\subsection*{{Circuito: {nome}}}\n"
+        latex_content += "\\begin{itemize}\n"
+        latex_content += f"    \\item \\textbf{{Dados do Circuito:}} Potência = {potencia}W, Tensão = {tensao}V, Fator de Potência = {fator_potencia}, Número de Fases = {num_fases}.\n"
+        latex_content += f"    \\item \\textbf{{Cálculo da Corrente Nominal (Inominal):}} \[ I_{{\\text{{nominal}}}} = \\frac{{{potencia}}}{{\\sqrt{{3}}^{{{n_factor}}} \\times {tensao} \\times {fator_potencia}}} \] = {corrente_nominal} A.\n"
+        latex_content += f"    \\item \\textbf{{Cálculo da Corrente Corrigida (Icorrigida):}} \n"
+        latex_content += f"    \\[ I_{{\\text{{corrigida}}}} = \\frac{{I_{{\\text{{nominal}}}}}}{{\\text{{Fator Temperatura}} \\times \\text{{Fator Agrupamento}}}} = \\frac{{{corrente_nominal}}}{{{fator_correcao_temp} \\times {fator_agrupamento}}} \\] = {corrente_corrigida} A.\n"
+        latex_content += "    \\item \\textbf{{Cálculo da Queda de Tensão:}}\n"
+        latex_content += "    A queda de tensão é calculada pela fórmula: \n"
+        latex_content += "    \\[ $\\Delta V = I_{\\text{nominal}} \\times \\text{Comprimento} \\times \\text{(V/A.km)}$ \\]\n"
+        latex_content += f"    Onde para este circuito, \n"
+        latex_content += f"    \\begin{{align*}}\n"
+        latex_content += f"    I_{{\\text{{nominal}}}} &= {corrente_nominal} \\text{{ A}}, \\\\\n"
+        latex_content += f"    \\text{{Comprimento}} &= {comprimento} \\text{{ km}}, \\\\\n"
+        latex_content += f"    \\text{{Seção do Condutor (mm²)}} &= {circuito['Seção do Condutor (mm²)']} \\text{{ mm²}}, \\\\\n"
+        latex_content += f"    \\text{{Queda de Tensão (V/A.km)}} &= {valor_queda_tensao} \\text{{ V/A.km}}. \n"
+        latex_content += f"    \\end{{align*}}\n"
+        latex_content += f"    Portanto, a queda de tensão calculada é: \n"
+        latex_content += f"    \\[ \\Delta V = {valor_queda_tensao} \\times {corrente_nominal} \\times {comprimento} = {queda_tensao} \\text{{ V}}. \\]\n"
+        latex_content += "\\end{itemize}\n\n"
+    return latex_content
+
+def criar_relatorio_latex(circuitos, resultados, caminho_salvar, disjuntores_gerais, disjuntor_qgbt, data_tables):
+    doc = montar_relatorio_latex(circuitos, resultados, disjuntores_gerais, disjuntor_qgbt, data_tables)
+    # Salvar o arquivo .tex
+    doc.generate_tex(caminho_salvar)
+
+def montar_relatorio_latex(circuitos, resultados, disjuntores_gerais, disjuntor_qgbt, data_tables):
+    doc = Document(documentclass='article', document_options='11pt')
+    
+    # Adiciona os pacotes necessários
+    doc.packages.append(Package('makeidx'))
+    doc.packages.append(Package('multirow'))
+    doc.packages.append(Package('multicol'))
+    doc.packages.append(Package('xcolor', options='dvipsnames,svgnames,table'))
+    doc.packages.append(Package('graphicx'))
+    doc.packages.append(Package('epstopdf'))
+    doc.packages.append(Package('ulem'))
+    doc.packages.append(Package('hyperref'))
+    doc.packages.append(Package('amsmath'))
+    doc.packages.append(Package('lmodern'))
+    doc.packages.append(Package('amssymb'))
+    doc.packages.append(Package('pdflscape'))
+    doc.packages.append(Package('geometry', options='paperwidth=595pt,paperheight=841pt,top=23pt,right=56pt,bottom=56pt,left=56pt'))
+    
+    # Adiciona o autor e título
+    doc.preamble.append(Command('author', 'CHRISTINE CACERES BURGHART'))
+    doc.preamble.append(Command('title', ''))
+    
+    # Adiciona o novo ambiente de indentação
+    doc.preamble.append(NoEscape(r"""
+    \makeatletter
+    \newenvironment{indentation}[3]%
+    {\par\setlength{\parindent}{#3}
+    \setlength{\leftmargin}{#1}       \setlength{\rightmargin}{#2}%
+    \advance\linewidth -\leftmargin       \advance\linewidth -\rightmargin%
+    \advance\@totalleftmargin\leftmargin  \@setpar{{\@@par}}%
+    \parshape 1\@totalleftmargin \linewidth\ignorespaces}{\par}%
+    \makeatother
+    """))
+    
+    # Adiciona o início do documento
+    doc.append(NoEscape(r'\begin{document}'))
+    doc.append(NoEscape(r'\begin{center}'))
+    doc.append(NoEscape(r'\large \textbf{OBJETO:} Memorial de dimensionamento para os circuitos do NOMEDOPROJETO'))
+    doc.append(NoEscape(r'\end{center}'))
+    
+    # Adiciona seções ao documento
+    with doc.create(Section('Introdução')):
+        doc.append('Este documento descreve o procedimento técnico detalhado para o dimensionamento de condutores e disjuntores em circuitos elétricos residenciais, baseando-se nas normas técnicas ABNT NBR 5410 e ABNT NBR 5471. A metodologia aborda a determinação da seção transversal dos condutores e a escolha de disjuntores, levando em consideração critérios como capacidade de condução de corrente, queda de tensão, e proteção contra sobrecarga e curto-circuito.')
+    
+    with doc.create(Section('Metodologia e Normas Aplicadas')):
+        doc.append('O dimensionamento dos condutores elétricos segue as diretrizes estabelecidas pelas normas ABNT NBR 5410 e ABNT NBR 5471, que definem os padrões para instalações elétricas de baixa tensão e para condutores de energia elétrica, respectivamente.')
+    
+    with doc.create(Section('Cálculos e Resultados')):
+        with doc.create(Subsection('Cálculo da Corrente Nominal do Circuito')):
+            doc.append(NoEscape(r'A corrente nominal (\(I_{\text{nominal}}\)) é calculada pela fórmula:'))
+            doc.append(NoEscape(r'\[ I_{\text{nominal}} = \frac{P}{\sqrt{3} \cdot V \cdot \cos(\phi)} \]'))
+            doc.append(NoEscape(r'para circuitos trifásicos, e'))
+            doc.append(NoEscape(r'\[ I_{\text{nominal}} = \frac{P}{V \cdot \cos(\phi)} \]'))
+            doc.append(NoEscape(r'para circuitos monofásicos, onde \(P\) é a potência, \(V\) a tensão e \(\cos(\phi)\) o fator de potência.'))
+        
+        with doc.create(Subsection('Cálculo da Corrente Corrigida')):
+            doc.append(NoEscape(r'A corrente corrigida (\(I_{\text{corrigida}}\)) considera os fatores de temperatura e agrupamento:'))
+            doc.append(NoEscape(r'\[ I_{\text{corrigida}} = \frac{I_{\text{nominal}}}{\text{Fator\_Temperatura} \times \text{Fator\_Agrupamento}} \]'))
+        
+        with doc.create(Subsection('Seleção do Condutor')):
+            doc.append('A seleção do condutor é realizada garantindo que sua capacidade de corrente seja maior que \( I_{\text{corrigida}} \). A seção mínima é determinada pelo método de instalação e as especificações da norma ABNT NBR 5410.')
+        
+        with doc.create(Subsection('Cálculo da Queda de Tensão')):
+            doc.append('A queda de tensão é calculada considerando a resistência e a reatância do condutor, bem como a distância do circuito:')
+            doc.append(NoEscape(r'\[ \Delta V =  {I_{\text{nominal}} \times \text{comprimento} \times \text{V/A.km} \]'))
+        
+        with doc.create(Subsection('Escolha do Disjuntor')):
+            doc.append(NoEscape(r'O disjuntor é selecionado assegurando que \( I_{\text{corrigida}} < \) I_{\text{disjuntor}} \( < \) Capacidade de corrente do condutor.'))
+
+    tabela_latex = formatar_tabela_latex(circuitos, disjuntores_gerais, disjuntor_qgbt)
+    doc.append(NoEscape(tabela_latex))
+    memcal = memcalc(circuitos, resultados, data_tables['queda de tensão'])
+    doc.append(NoEscape(memcal))
+    doc.append(NoEscape(r"""
+                        \newpage
+                        """))
+    with doc.create(Section('Anexo - Tabelas da NBR 5410')):
+        doc.append(NoEscape(r"""
+            As tabelas apresentadas a seguir são utilizadas no memorial de cálculo e foram retiradas da norma NBR 5410. 
+            Elas servem como referência para determinar capacidades de condução de corrente, fatores de correção de temperatura, fatores de agrupamento de circuitos, queda de tensão por seção de condutor, e seções mínimas dos condutores de proteção (terra) e neutro. 
+            Essas informações são essenciais para garantir a segurança e a eficiência das instalações elétricas, conforme os padrões exigidos pela norma.
+
+            \begin{table}[h]
+            \centering
+            \resizebox{\textwidth}{!}{%
+            \begin{tabular}{|c|c|c|c|c|c|c|}
+            \hline
+            \multirow{2}{*}{\textbf{Seção do condutor}} & \multicolumn{2}{c|}{\textbf{Método B1}} & \multicolumn{2}{c|}{\textbf{Método B2}} & \multicolumn{2}{c|}{\textbf{Método C}} \\ \cline{2-7}
+            & \textbf{2 condutores carregados} & \textbf{3 condutores carregados} & \textbf{2 condutores carregados} & \textbf{3 condutores carregados} & \textbf{2 condutores carregados} & \textbf{3 condutores carregados} \\ \hline
+            2.5 mm² & 31 A & 28 A & 30 A & 26 A & 33 A & 30 A \\ \hline
+            4 mm² & 42 A & 37 A & 40 A & 35 A & 45 A & 40 A \\ \hline
+            6 mm² & 54 A & 48 A & 51 A & 44 A & 58 A & 52 A \\ \hline
+            10 mm² & 75 A & 66 A & 69 A & 60 A & 80 A & 71 A \\ \hline
+            16 mm² & 100 A & 88 A & 91 A & 80 A & 107 A & 96 A \\ \hline
+            25 mm² & 133 A & 117 A & 119 A & 105 A & 138 A & 119 A \\ \hline
+            35 mm² & 164 A & 144 A & 146 A & 128 A & 171 A & 147 A \\ \hline
+            50 mm² & 198 A & 175 A & 175 A & 154 A & 209 A & 179 A \\ \hline
+            70 mm² & 253 A & 222 A & 221 A & 194 A & 269 A & 229 A \\ \hline
+            95 mm² & 306 A & 269 A & 265 A & 233 A & 328 A & 278 A \\ \hline
+            120 mm² & 354 A & 312 A & 305 A & 268 A & 382 A & 322 A \\ \hline
+            150 mm² & 407 A & 358 A & 349 A & 307 A & 441 A & 371 A \\ \hline
+            185 mm² & 464 A & 408 A & 395 A & 348 A & 508 A & 424 A \\ \hline
+            240 mm² & 546 A & 481 A & 462 A & 407 A & 599 A & 500 A \\ \hline
+            \end{tabular}
+            }
+            \caption{Tabela de capacidades de condução de corrente para diferentes seções de condutores e métodos de instalação.}
+            \label{tab:capacidades}
+            \end{table}
+
+            \vspace{0.3cm} % Espaço vertical reduzido
+
+            \begin{table}[h]
+            \centering
+            \begin{tabular}{|c|c|}
+            \hline
+            \textbf{Temperatura} & \textbf{Fator de correção de Temperatura} \\ \hline
+            10 ºC & 1.15 \\ \hline
+            15 ºC & 1.12 \\ \hline
+            20 ºC & 1.08 \\ \hline
+            25 ºC & 1.04 \\ \hline
+            35 ºC & 0.96 \\ \hline
+            40 ºC & 0.91 \\ \hline
+            45 ºC & 0.87 \\ \hline
+            \end{tabular}
+            \caption{Tabela de Fatores de Temperatura}
+            \label{tab:fatores_temperatura}
+            \end{table}
+
+            \vspace{0.3cm} % Espaço vertical reduzido
+
+            \begin{table}[h]
+            \centering
+            \begin{tabular}{|c|c|}
+            \hline
+            \textbf{Agrupamento de circuitos} & \textbf{Fator de Agrupamento} \\ \hline
+            1 & 1 \\ \hline
+            2 & 0.8 \\ \hline
+            3 & 0.7 \\ \hline
+            4 & 0.65 \\ \hline
+            5 & 0.65 \\ \hline
+            6 & 0.57 \\ \hline
+            7 & 0.54 \\ \hline
+            8 & 0.52 \\ \hline
+            9 & 0.5 \\ \hline
+            10 & 0.5 \\ \hline
+            \end{tabular}
+            \caption{Tabela de Fatores de Agrupamento de Circuitos}
+            \label{tab:fatores_agrupamento}
+            \end{table}
+
+            \vspace{0.3cm} % Espaço vertical reduzido
+
+            \begin{table}[h]
+            \centering
+            \begin{tabular}{|c|c|}
+            \hline
+            \textbf{Seção do condutor} & \textbf{Queda de tensão (V/A.km)} \\ \hline
+            2.5 mm² & 18 \\ \hline
+            4 mm² & 12 \\ \hline
+            6 mm² & 7.6 \\ \hline
+            10 mm² & 4.5 \\ \hline
+            16 mm² & 2.7 \\ \hline
+            25 mm² & 1.7 \\ \hline
+            35 mm² & 1.2 \\ \hline
+            50 mm² & 0.96 \\ \hline
+            70 mm² & 0.67 \\ \hline
+            95 mm² & 0.48 \\ \hline
+            120 mm² & 0.38 \\ \hline
+            150 mm² & 0.31 \\ \hline
+            185 mm² & 0.25 \\ \hline
+            240 mm² & 0.19 \\ \hline
+            \end{tabular}
+            \caption{Tabela de Queda de Tensão por Seção do Condutor}
+            \label{tab:queda_tensao}
+            \end{table}
+
+            \vspace{0.3cm} % Espaço vertical reduzido
+
+            \begin{table}[h]
+            \centering
+            \resizebox{\textwidth}{!}{%
+            \begin{tabular}{|c|c|}
+            \hline
+            \textbf{Seção dos condutores de fase S (mm²)} & \textbf{Seção mínima do condutor de proteção (mm²)} \\ \hline
+            S $\leq$ 16 & S \\ \hline
+            16 $<$ S $\leq$ 35 & 16 \\ \hline
+            S $>$ 35 & S/2 \\ \hline
+            \end{tabular}
+            }
+            \caption{Seção mínima do condutor de proteção (terra)}
+            \label{tab:secao_condutor_protecao}
+            \end{table}
+
+            \vspace{0.3cm} % Espaço vertical reduzido
+
+            \begin{table}[h]
+            \centering
+            \resizebox{\textwidth}{!}{%
+            \begin{tabular}{|c|c|}
+            \hline
+            \textbf{Seção dos condutores de fase (mm²)} & \textbf{Seção reduzida do condutor neutro (mm²)} \\ \hline
+            S $\leq$ 25 & S \\ \hline
+            35 & 25 \\ \hline
+            50 & 25 \\ \hline
+            70 & 35 \\ \hline
+            95 & 50 \\ \hline
+            120 & 70 \\ \hline
+            150 & 70 \\ \hline
+            185 & 95 \\ \hline
+            240 & 120 \\ \hline
+            300 & 150 \\ \hline
+            400 & 185 \\ \hline
+            \end{tabular}
+            }
+            \caption{Seção reduzida do condutor neutro}
+            \label{tab:secao_condutor_neutro}
+            \end{table}
+
+            """))
+    return doc
+
+def compile_tex_online(tex_content):
+    url = "https://latexonline.cc/compile"
+    params = {
+        "text": tex_content,  # Enviando o conteúdo do arquivo .tex
+        "command": "pdflatex"
+    }
+    response = requests.post(url, params=params)
+    if response.status_code == 200:
+        return response.content  # Retornando o conteúdo do PDF gerado
+    else:
+        return None
@@ -0,0 +1,317 @@
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from calculos import (
+    condutores_mapping,
+    seção_neutro_map,
+    seção_terra_map,
+)
+from catalogo_protecao import obter_catalogo
+from tabela_circuitos import TabelaCircuitos
+
+# Códigos de erro por circuito (0 = dimensionado com sucesso)
+ERRO_OK = 0
+ERRO_FASES = 1
+ERRO_TEMPERATURA = 2
+ERRO_AGRUPAMENTO = 3
+ERRO_METODO = 4
+ERRO_CORRENTE = 5
+ERRO_QUEDA = 6
+ERRO_DISJUNTOR = 7
+
+MENSAGENS_ERRO = {
+    ERRO_FASES: "Número de fases inválido.",
+    ERRO_TEMPERATURA: "Temperatura fora do alcance da tabela.",
+    ERRO_AGRUPAMENTO: "Número de circuitos fora do alcance da tabela.",
+    ERRO_METODO: "Método de instalação não encontrado na tabela de capacidade.",
+    ERRO_CORRENTE: "Corrente muito alta para as seções disponíveis.",
+    ERRO_QUEDA: "Não há seções de condutor maiores disponíveis.",
+    ERRO_DISJUNTOR: "Não foi possível selecionar disjuntor seguro.",
+}
+
+ABAS_COMPILADAS = ('Fator de correção de temperatur', 'Fator de agrupamento', 'Capacidade de corrente',
+                   'queda de tensão', 'valores nominais de disjuntores')
+
+_compiladas = {}
+
+
+def compilar_tabelas(data_tables):
+    """
+    Converte as tabelas da planilha 'Dados para o gpt.xls' em arrays NumPy,
+    na mesma semântica usada por calcular_parametros_circuitos.
+    O resultado é reaproveitado enquanto as mesmas abas (os mesmos DataFrames) forem usadas.
+    """
+    abas = [data_tables[nome] for nome in ABAS_COMPILADAS]
+    chave = tuple(id(aba) for aba in abas)
+    item = _compiladas.get(chave)
+    if item is not None and all(ref() is aba for ref, aba in zip(item[0], abas)):
+        return item[1]
+    tabelas = _compilar(*abas)
+    _guardar_compiladas(abas, tabelas)
+    return tabelas
+
+
+def associar_compiladas(data_tables, tabelas):
+    """Usa tabelas já compiladas (ex.: lidas de um instantâneo) para estas abas, sem recompilar."""
+    _guardar_compiladas([data_tables[nome] for nome in ABAS_COMPILADAS], tabelas)
+
+
+def _guardar_compiladas(abas, tabelas):
+    # Sem referência forte às abas: o cache não impede que um conjunto descartado seja liberado
+    for velha in [k for k, (refs, _) in _compiladas.items() if any(ref() is None for ref in refs)]:
+        del _compiladas[velha]
+    _compiladas[tuple(id(aba) for aba in abas)] = ([weakref.ref(aba) for aba in abas], tabelas)
+
+
+def _compilar(tabela_temp, tabela_agrup, tabela_cap, tabela_queda, tabela_disj):
+    tabela_cap = tabela_cap.sort_values('Seção do condutor', kind='stable')
+    tabela_cap = tabela_cap.drop_duplicates('Seção do condutor', keep='first')
+    secoes = tabela_cap['Seção do condutor'].to_numpy(dtype=float)
+    metodos = [c for c in tabela_cap.columns if c != 'Seção do condutor']
+
+    queda_dict = (tabela_queda.drop_duplicates('seção do condutor', keep='first')
+                  .set_index('seção do condutor')['Queda de tensão (V/A.km)'].to_dict())
+    queda_por_secao = np.array([queda_dict.get(s, np.nan) for s in secoes], dtype=float)
+
+    catalogo = obter_catalogo(tabela_disj)
+    disjuntores = {n: np.array(catalogo.padroes(n), dtype=float) for n in (1, 2, 3)}
+    codigos_disjuntores = {n: [catalogo.codigo_sinapi(n, c) for c in catalogo.padroes(n)] for n in (1, 2, 3)}
+
+    return {
+        'temperaturas': tabela_temp.iloc[:, 0].to_numpy(dtype=float),
+        'fatores_temperatura': tabela_temp.iloc[:, 1].to_numpy(dtype=float),
+        'agrupamentos': tabela_agrup['Agrupamento de circuitos'].to_numpy(dtype=float),
+        'fatores_agrupamento': tabela_agrup['FatordeAgrupamento'].to_numpy(dtype=float),
+        'secoes': secoes,
+        'metodos': metodos,
+        'capacidade': tabela_cap[metodos].to_numpy(dtype=float),
+        'queda_por_secao': queda_por_secao,
+        'disjuntores': disjuntores,
+        'codigos_disjuntores': codigos_disjuntores,
+    }
+
+
+def compilar_precos(tabelas, sinapi_df):
+    """Custos unitários SINAPI por seção (fase, neutro, terra) e por disjuntor."""
+    custo_dict = sinapi_df.set_index('CODIGO  DA COMPOSICAO')['CUSTO TOTAL'].to_dict()
+
+    def custo_condutor(secao):
+        codigo = condutores_mapping.get(str(float(secao)))
+        return float(custo_dict.get(codigo, 0.0)) if codigo is not None else 0.0
+
+    secoes = tabelas['secoes']
+    neutro = [s if s <= 25 else seção_neutro_map.get(s, s) for s in secoes]
+    terra = [s if s <= 16 else seção_terra_map.get(s, s) for s in secoes]
+
+    disjuntores = {}
+    for num_fases, codigos in tabelas['codigos_disjuntores'].items():
+        disjuntores[num_fases] = np.array(
+            [float(custo_dict.get(cod, 0.0)) if cod is not None else 0.0 for cod in codigos])
+
+    return {
+        'fase': np.array([custo_condutor(s) for s in secoes]),
+        'neutro': np.array([custo_condutor(s) for s in neutro]),
+        'terra': np.array([custo_condutor(s) for s in terra]),
+        'disjuntores': disjuntores,
+    }
+
+
+def indices_metodos(metodos_instalacao, tabelas):
+    # Mesma regra de determinar_secao_condutor: primeira coluna que contém o texto do método
+    unicos, inversos = np.unique(np.asarray(metodos_instalacao, dtype=object).astype(str), return_inverse=True)
+    mapa = np.full(len(unicos), -1, dtype=np.int64)
+    for i, metodo in enumerate(unicos):
+        colunas = [j for j, col in enumerate(tabelas['metodos']) if metodo in col]
+        if colunas:
+            mapa[i] = colunas[0]
+    return mapa[inversos]
+
+
+def _ultimo_menor_igual(valores, chaves, fatores):
+    # Equivale a tabela[tabela[chave] <= valor].iloc[-1], na ordem original da tabela
+    mascara = chaves[None, :] <= valores[:, None]
+    existe = mascara.any(axis=1)
+    idx = len(chaves) - 1 - np.argmax(mascara[:, ::-1], axis=1)
+    return np.where(existe, fatores[idx], np.nan), existe
+
+
+def dimensionar_lote(potencia, tensao, fator_potencia, num_fases, temperatura,
+                     num_circuitos, comprimento, queda_tensao_max, indice_metodo,
+                     iluminacao, tabelas):
+    """
+    Versão vetorizada de calcular_parametros_circuitos para N circuitos.
+    Todos os argumentos são arrays de tamanho N (comprimento em km).
+    Em vez de abortar no primeiro circuito inválido, devolve o código de erro por circuito.
+    """
+    potencia = np.asarray(potencia, dtype=float)
+    tensao = np.asarray(tensao, dtype=float)
+    fator_potencia = np.asarray(fator_potencia, dtype=float)
+    num_fases = np.asarray(num_fases, dtype=float)
+    comprimento = np.asarray(comprimento, dtype=float)
+    queda_tensao_max = np.asarray(queda_tensao_max, dtype=float)
+    indice_metodo = np.asarray(indice_metodo, dtype=np.int64)
+    iluminacao = np.asarray(iluminacao, dtype=bool)
+    n = len(potencia)
+    erro = np.zeros(n, dtype=np.int8)
+
+    # 1) Corrente nominal
+    divisor = np.select([num_fases == 1, num_fases == 2, num_fases == 3],
+                        [tensao, np.sqrt(3) * tensao, 3 * tensao], np.nan)
+    erro[np.isnan(divisor)] = ERRO_FASES
+    corrente_nominal = potencia * fator_potencia / divisor
+
+    # 2) Fatores de correção e corrente corrigida
+    fator_temp, ok_temp = _ultimo_menor_igual(np.asarray(temperatura, dtype=float),
+                                              tabelas['temperaturas'], tabelas['fatores_temperatura'])
+    erro[(erro == 0) & ~ok_temp] = ERRO_TEMPERATURA
+    fator_agrup, ok_agrup = _ultimo_menor_igual(np.asarray(num_circuitos, dtype=float),
+                                                tabelas['agrupamentos'], tabelas['fatores_agrupamento'])
+    erro[(erro == 0) & ~ok_agrup] = ERRO_AGRUPAMENTO
+    corrente_corrigida = corrente_nominal / (fator_temp * fator_agrup)
+
+    # 3) Seção inicial pela capacidade de corrente (1.5 mm² só para iluminação)
+    erro[(erro == 0) & (indice_metodo < 0)] = ERRO_METODO
+    secoes = tabelas['secoes']
+    colunas = np.clip(indice_metodo, 0, None)
+    capacidade = tabelas['capacidade'].T[colunas]  # (N, S)
+    atende = capacidade >= corrente_corrigida[:, None]
+    atende &= ~((secoes[None, :] == 1.5) & ~iluminacao[:, None])
+    idx_inicial = np.argmax(atende, axis=1)
+    erro[(erro == 0) & ~atende.any(axis=1)] = ERRO_CORRENTE
+
+    # 4) Ajuste por queda de tensão a partir da seção inicial
+    posicoes = np.arange(len(secoes))[None, :]
+    queda = tabelas['queda_por_secao'][None, :] * corrente_nominal[:, None] * comprimento[:, None]
+    atende_queda = (queda <= queda_tensao_max[:, None]) & (posicoes >= idx_inicial[:, None])
+    idx_queda = np.argmax(atende_queda, axis=1)
+    erro[(erro == 0) & ~atende_queda.any(axis=1)] = ERRO_QUEDA
+
+    # 5) Menor disjuntor padrão >= corrente corrigida e seção com Iz >= In
+    disjuntor, indice_disjuntor, idx_final, ok_disj = escolher_disjuntores_lote(
+        corrente_corrigida, num_fases, capacidade, idx_queda, tabelas)
+    erro[(erro == 0) & ~ok_disj] = ERRO_DISJUNTOR
+
+    linhas = np.arange(n)
+    valido = erro == 0
+    return {
+        'indice_secao': np.where(valido, idx_final, -1),
+        'secao': np.where(valido, secoes[idx_final], np.nan),
+        'disjuntor': np.where(valido, disjuntor, np.nan),
+        'indice_disjuntor': np.where(valido, indice_disjuntor, -1),
+        'queda_tensao': np.where(valido, queda[linhas, idx_final], np.nan),
+        'corrente_corrigida': corrente_corrigida,
+        'corrente_nominal': corrente_nominal,
+        'fator_temperatura': fator_temp,
+        'fator_agrupamento': fator_agrup,
+        'erro': erro,
+    }
+
+
+def escolher_disjuntores_lote(corrente_corrigida, num_fases, capacidade, indice_secao_inicial, tabelas):
+    """
+    Versão vetorizada de escolher_disjuntor_seguro: menor disjuntor padrão >= corrente
+    corrigida e a primeira seção, a partir de indice_secao_inicial, com Iz >= In.
+    capacidade: (N, S) com a capacidade de cada seção no método de instalação de cada circuito.
+    Retorna (disjuntor, indice do disjuntor, indice da seção, ok).
+    """
+    corrente_corrigida = np.asarray(corrente_corrigida, dtype=float)
+    num_fases = np.asarray(num_fases, dtype=float)
+    n = len(corrente_corrigida)
+    disjuntor = np.full(n, np.nan)
+    indice_disjuntor = np.full(n, -1, dtype=np.int64)
+    for fases, padroes in tabelas['disjuntores'].items():
+        linhas = np.flatnonzero(num_fases == fases)
+        if len(linhas) == 0 or len(padroes) == 0:
+            continue
+        k = np.searchsorted(padroes, corrente_corrigida[linhas], side='left')
+        valido = k < len(padroes)
+        disjuntor[linhas[valido]] = padroes[k[valido]]
+        indice_disjuntor[linhas[valido]] = k[valido]
+    posicoes = np.arange(capacidade.shape[1])[None, :]
+    atende = (capacidade >= disjuntor[:, None]) & (posicoes >= np.asarray(indice_secao_inicial)[:, None])
+    return disjuntor, indice_disjuntor, np.argmax(atende, axis=1), atende.any(axis=1)
+
+
+def custo_lote(resultado, num_fases, comprimento, num_fases1, precos):
+    """Custo SINAPI de condutores e disjuntor por circuito, com as regras da tabela de materiais."""
+    idx = resultado['indice_secao']
+    valido = idx >= 0
+    idx = np.clip(idx, 0, None)
+    num_fases = np.asarray(num_fases, dtype=float)
+    metros = np.asarray(comprimento, dtype=float) * 1000
+    sem_terra = np.asarray(num_fases1, dtype=object) == "F+N"
+
+    custo = metros * num_fases * precos['fase'][idx]
+    custo += np.where(num_fases == 1, metros, 0) * precos['neutro'][idx]
+    custo += np.where(sem_terra, 0, metros) * precos['terra'][idx]
+    for fases, custos_disj in precos['disjuntores'].items():
+        linhas = np.flatnonzero(valido & (num_fases == fases))
+        if len(linhas) > 0:
+            custo[linhas] += custos_disj[resultado['indice_disjuntor'][linhas]]
+    return np.where(valido, custo, np.nan)
+
+
+def preparar_arrays(circuitos, tabelas):
+    """Extrai os arrays de entrada de uma TabelaCircuitos, DataFrame ou lista de circuitos já preparada para o cálculo."""
+    if isinstance(circuitos, TabelaCircuitos):
+        return _arrays_da_tabela(circuitos, tabelas)
+    df = circuitos if isinstance(circuitos, pd.DataFrame) else pd.DataFrame(circuitos)
+    return {
+        'potencia': df['potencia'].to_numpy(dtype=float),
+        'tensao': df['tensao'].to_numpy(dtype=float),
+        'fator_potencia': df['fator_potencia'].to_numpy(dtype=float),
+        'num_fases': df['num_fases'].to_numpy(dtype=float),
+        'temperatura': df['temperatura'].to_numpy(dtype=float),
+        'num_circuitos': df['num_circuitos'].to_numpy(dtype=float),
+        'comprimento': df['comprimento'].to_numpy(dtype=float),
+        'queda_tensao_max': df['queda_tensao_max_admitida'].to_numpy(dtype=float),
+        'indice_metodo': indices_metodos(df['met_instala'], tabelas),
+        'iluminacao': df['nome'].astype(str).str.lower().str.contains('iluminação', regex=False).to_numpy(),
+        'num_fases1': df['num_fases1'].to_numpy(dtype=object),
+    }
+
+
+def _arrays_da_tabela(tabela, tabelas):
+    # Métodos de instalação resolvidos uma vez por categoria, não por circuito
+    codigos_metodo, metodos = tabela.codigos('met_instala')
+    nomes = tabela['nome']
+    return {
+        'potencia': tabela['potencia'].astype(float),
+        'tensao': tabela['tensao'].astype(float),
+        'fator_potencia': tabela['fator_potencia'].astype(float),
+        'num_fases': tabela['num_fases'].astype(float),
+        'temperatura': tabela['temperatura'].astype(float),
+        'num_circuitos': tabela['num_circuitos'].astype(float),
+        'comprimento': tabela['comprimento'].astype(float),
+        'queda_tensao_max': tabela['queda_tensao_max_admitida'].astype(float),
+        'indice_metodo': np.append(indices_metodos(metodos, tabelas), -1)[codigos_metodo],
+        'iluminacao': np.fromiter(('iluminação' in str(nome).lower() for nome in nomes), dtype=bool, count=len(nomes)),
+        'num_fases1': tabela['num_fases1'],
+    }
+
+
+def dimensionar_circuitos(circuitos, tabelas):
+    """Equivalente vetorizado de calcular_parametros_circuitos, devolvendo o DataFrame de resultados."""
+    if not isinstance(circuitos, (pd.DataFrame, TabelaCircuitos)):
+        circuitos = pd.DataFrame(circuitos)
+    arrays = preparar_arrays(circuitos, tabelas)
+    resultado = dimensionar_lote(
+        arrays['potencia'], arrays['tensao'], arrays['fator_potencia'], arrays['num_fases'],
+        arrays['temperatura'], arrays['num_circuitos'], arrays['comprimento'],
+        arrays['queda_tensao_max'], arrays['indice_metodo'], arrays['iluminacao'], tabelas)
+    return pd.DataFrame({
+        "Nome do Circuito": np.asarray(circuitos['nome']),
+        "Seção do Condutor (mm²)": resultado['secao'],
+        "Disjuntor": resultado['disjuntor'],
+        "Queda de Tensão (Volts)": resultado['queda_tensao'],
+        "Corrente corrigida": resultado['corrente_corrigida'],
+        "Corrente Nominal": resultado['corrente_nominal'],
+        "Fator correção temperatura": resultado['fator_temperatura'],
+        "Fator Agrupamento": resultado['fator_agrupamento'],
+        "Número de fases": np.asarray(circuitos['num_fases']),
+        "Comprimento": np.asarray(circuitos['comprimento']),
+        "Tipo de alimentação": np.asarray(circuitos['num_fases1']),
+        "Erro": resultado['erro'],
+    })
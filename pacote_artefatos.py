@@ -0,0 +1,102 @@
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+import zipfile
+
+from pylatex.errors import CompilerError
+
+from diagrama import montar_diagrama_unifilar, atualizar_diagrama_unifilar
+from memorial import montar_relatorio_latex
+from pool_processos import executar_em_pool
+
+NOME_PACOTE = 'projeto_eletrico.zip'
+COMPILADORES_LATEX = ('latexmk', 'pdflatex')
+
+
+def planilha_xlsx(df, index=False):
+    output = io.BytesIO()
+    df.to_excel(output, index=index)
+    return output.getvalue()
+
+
+def diagrama_dxf(exemplos_circuitos, disjuntores_gerais, fases_Q, diagrama_anterior=None):
+    """
+    Bytes do unifilar (o mesmo conteúdo de gerar_diagrama_unifilar) e o resumo da
+    atualização incremental quando um diagrama anterior é informado (None caso contrário).
+    """
+    if diagrama_anterior is None:
+        doc, resumo = montar_diagrama_unifilar(exemplos_circuitos, disjuntores_gerais, fases_Q), None
+    else:
+        doc, resumo = atualizar_diagrama_unifilar(diagrama_anterior, exemplos_circuitos, disjuntores_gerais, fases_Q)
+    stream = io.StringIO()
+    doc.write(stream)
+    return doc.encode(stream.getvalue()), resumo
+
+
+def memorial_tex(circuitos, resultados, disjuntores_gerais, disjuntor_qgbt, data_tables):
+    doc = montar_relatorio_latex(circuitos, resultados, disjuntores_gerais, disjuntor_qgbt, data_tables)
+    return doc.dumps().encode('utf-8')
+
+
+def compilador_latex():
+    for compilador in COMPILADORES_LATEX:
+        if shutil.which(compilador):
+            return compilador
+    return None
+
+
+def memorial_pdf(circuitos, resultados, disjuntores_gerais, disjuntor_qgbt, data_tables):
+    """PDF do memorial, ou None se não houver compilador LaTeX instalado ou a compilação falhar."""
+    compilador = compilador_latex()
+    if compilador is None:
+        return None
+    doc = montar_relatorio_latex(circuitos, resultados, disjuntores_gerais, disjuntor_qgbt, data_tables)
+    # O LaTeX só trabalha com arquivos; a pasta temporária some junto com os auxiliares
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, 'memcalc')
+        try:
+            doc.generate_pdf(caminho, compiler=compilador, clean_tex=False)
+        except (subprocess.CalledProcessError, CompilerError):
+            return None
+        with open(caminho + '.pdf', 'rb') as arquivo:
+            return arquivo.read()
+
+
+def gerar_pacote(tarefas, processos=None):
+    """
+    Gera os artefatos em paralelo e os grava num ZIP em memória à medida que ficam prontos.
+
+    tarefas: {nome do arquivo no ZIP: (função, argumentos) ou bytes já prontos}; a função
+    devolve bytes, (bytes, detalhe) ou None para não incluir o arquivo. processos <= 1
+    executa tudo no processo atual. Retorna (bytes do ZIP, {nome: bytes}, {nome: detalhe}).
+    """
+    processos = min(len(tarefas), os.cpu_count() or 1) if processos is None else processos
+    buffer = io.BytesIO()
+    arquivos = {}
+    detalhes = {}
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as pacote:
+        def incluir(nome, resultado):
+            if isinstance(resultado, tuple):
+                resultado, detalhes[nome] = resultado
+            if resultado is not None:
+                pacote.writestr(nome, resultado)
+                arquivos[nome] = resultado
+
+        pendentes = {}
+        for nome, tarefa in tarefas.items():
+            if isinstance(tarefa, bytes):
+                incluir(nome, tarefa)
+            else:
+                pendentes[nome] = tarefa
+        if processos and processos > 1 and len(pendentes) > 1:
+            nomes = list(pendentes)
+            for i, resultado in executar_em_pool(processos, [pendentes[nome] for nome in nomes]):
+                incluir(nomes[i], resultado)
+        else:
+            for nome, (funcao, args) in pendentes.items():
+                incluir(nome, funcao(*args))
+    # Ordem das tarefas, não de conclusão, para os botões e o banco de projetos
+    arquivos = {nome: arquivos[nome] for nome in tarefas if nome in arquivos}
+    return buffer.getvalue(), arquivos, detalhes
@@ -0,0 +1,376 @@
+import heapq
+import math
+
+import numpy as np
+import pandas as pd
+from ezdxf import path as trajetos_dxf
+
+from diagrama import _abrir_diagrama
+from tabela_circuitos import TabelaCircuitos
+
+CAMADA_ELETRODUTOS = 'IEBT_ELETRODUTOS'
+CAMADA_QUADROS = 'IEBT_QUADROS'
+CAMADA_PONTOS = 'IEBT_PONTOS'
+ATRIBUTO_QUADRO = 'QUADRO'
+ATRIBUTO_CIRCUITO = 'CIRCUITO'
+
+TOLERANCIA_PADRAO = 0.01       # m: extremidades mais próximas que isso são o mesmo ponto
+DISTANCIA_MAXIMA_PADRAO = 5.0  # m: maior distância de um quadro ou ponto até o eletroduto
+PRECISAO_ARCOS = 0.05          # m: flecha máxima ao trocar arcos e splines por segmentos
+# $INSUNITS -> metros por unidade (desenhos sem unidade são tratados como em metros)
+ESCALA_UNIDADES = {1: 0.0254, 2: 0.3048, 4: 0.001, 5: 0.01, 6: 1.0}
+
+ERRO_SEM_QUADRO = "Quadro não encontrado na planta."
+ERRO_SEM_ELETRODUTO = "Ponto ou quadro longe de qualquer eletroduto."
+ERRO_SEM_CAMINHO = "Ponto sem caminho pelos eletrodutos até o quadro."
+
+
+def _atributos(insert):
+    return {attrib.dxf.tag.upper(): attrib.dxf.text.strip() for attrib in insert.attribs}
+
+
+def ler_planta(origem, camada_eletrodutos=CAMADA_ELETRODUTOS, camada_quadros=CAMADA_QUADROS,
+               camada_pontos=CAMADA_PONTOS, escala=None):
+    """
+    Eletrodutos, quadros e pontos de carga de uma planta baixa DXF, em metros.
+
+    origem: caminho, bytes do .dxf ou Drawing do ezdxf.
+    Eletrodutos e eletrocalhas são as linhas, polilinhas, arcos e splines da camada de eletrodutos;
+    quadros são blocos na camada de quadros com o atributo QUADRO; pontos são blocos na camada de
+    pontos com os atributos CIRCUITO e QUADRO (QUADRO pode faltar se a planta tem um só quadro).
+    escala: metros por unidade do desenho (padrão: a unidade do $INSUNITS do arquivo).
+    Retorna (segmentos S x 4 com x1, y1, x2, y2; quadros [quadro, x, y]; pontos [Quadro, nome, x, y]).
+    """
+    doc = _abrir_diagrama(origem)
+    if escala is None:
+        escala = ESCALA_UNIDADES.get(doc.header.get('$INSUNITS', 0), 1.0)
+    camada_eletrodutos, camada_quadros, camada_pontos = (
+        camada_eletrodutos.upper(), camada_quadros.upper(), camada_pontos.upper())
+
+    segmentos, quadros, pontos = [], [], []
+    for entity in doc.modelspace():
+        camada = entity.dxf.layer.upper()
+        tipo = entity.dxftype()
+        if camada == camada_eletrodutos:
+            if tipo == 'LINE':
+                segmentos.append((entity.dxf.start.x, entity.dxf.start.y, entity.dxf.end.x, entity.dxf.end.y))
+                continue
+            try:
+                vertices = [(v.x, v.y) for v in trajetos_dxf.make_path(entity).flattening(PRECISAO_ARCOS / escala)]
+            except TypeError:
+                continue  # textos, cotas etc. esquecidos na camada
+            segmentos.extend((a[0], a[1], b[0], b[1]) for a, b in zip(vertices, vertices[1:]))
+        elif tipo == 'INSERT' and camada in (camada_quadros, camada_pontos):
+            atributos = _atributos(entity)
+            x, y = entity.dxf.insert.x * escala, entity.dxf.insert.y * escala
+            if camada == camada_quadros:
+                if not atributos.get(ATRIBUTO_QUADRO):
+                    raise ValueError(f"Quadro em ({x:.2f}, {y:.2f}) sem o atributo {ATRIBUTO_QUADRO}.")
+                quadros.append((atributos[ATRIBUTO_QUADRO], x, y))
+            else:
+                if not atributos.get(ATRIBUTO_CIRCUITO):
+                    raise ValueError(f"Ponto em ({x:.2f}, {y:.2f}) sem o atributo {ATRIBUTO_CIRCUITO}.")
+                pontos.append((atributos.get(ATRIBUTO_QUADRO) or None, atributos[ATRIBUTO_CIRCUITO], x, y))
+
+    if not segmentos:
+        raise ValueError(f"Nenhum eletroduto na camada '{camada_eletrodutos}'.")
+    quadros = pd.DataFrame(quadros, columns=['quadro', 'x', 'y'])
+    repetidos = quadros['quadro'][quadros['quadro'].duplicated()].unique()
+    if len(repetidos):
+        raise ValueError(f"Quadro(s) repetido(s) na planta: {', '.join(repetidos)}.")
+    pontos = pd.DataFrame(pontos, columns=['Quadro', 'nome', 'x', 'y'])
+    sem_quadro = pontos['Quadro'].isna()
+    if sem_quadro.any():
+        if len(quadros) != 1:
+            raise ValueError(f"{int(sem_quadro.sum())} ponto(s) sem o atributo {ATRIBUTO_QUADRO} "
+                             f"numa planta com {len(quadros)} quadros.")
+        pontos.loc[sem_quadro, 'Quadro'] = quadros['quadro'].iloc[0]
+    return np.array(segmentos, dtype=float) * escala, quadros, pontos
+
+
+def _chave_celula(cx, cy):
+    return cx * (1 << 32) + cy
+
+
+def _pares_proximos(px, py, segmentos, raio, celula):
+    """
+    Pares (ponto, segmento) a até `raio`, com o parâmetro t da projeção no segmento e a distância.
+    Índice espacial em grade: cada segmento (em pedaços de até 4 células, para que um trecho longo
+    e inclinado não ocupe células demais) entra nas células tocadas pela sua caixa ampliada pelo
+    raio, e cada ponto só é comparado com os pedaços da própria célula.
+    """
+    x1, y1, x2, y2 = segmentos.T
+    comprimento = np.hypot(x2 - x1, y2 - y1)
+    partes = np.maximum(1, np.ceil(comprimento / (4 * celula))).astype(np.int64)
+    pai = np.repeat(np.arange(len(segmentos)), partes)
+    k = np.arange(partes.sum()) - np.repeat(np.cumsum(partes) - partes, partes)
+    t0, t1 = k / partes[pai], (k + 1) / partes[pai]
+    ax, ay = x1[pai] + t0 * (x2 - x1)[pai], y1[pai] + t0 * (y2 - y1)[pai]
+    bx, by = x1[pai] + t1 * (x2 - x1)[pai], y1[pai] + t1 * (y2 - y1)[pai]
+
+    ix0 = np.floor((np.minimum(ax, bx) - raio) / celula).astype(np.int64)
+    ix1 = np.floor((np.maximum(ax, bx) + raio) / celula).astype(np.int64)
+    iy0 = np.floor((np.minimum(ay, by) - raio) / celula).astype(np.int64)
+    iy1 = np.floor((np.maximum(ay, by) + raio) / celula).astype(np.int64)
+    ny = iy1 - iy0 + 1
+    total = (ix1 - ix0 + 1) * ny
+    pedaco = np.repeat(np.arange(len(pai)), total)
+    k = np.arange(total.sum()) - np.repeat(np.cumsum(total) - total, total)
+    chaves = _chave_celula(ix0[pedaco] + k // ny[pedaco], iy0[pedaco] + k % ny[pedaco])
+    ordem = np.argsort(chaves, kind='stable')
+    chaves, pedaco = chaves[ordem], pedaco[ordem]
+
+    chave_ponto = _chave_celula(np.floor(px / celula).astype(np.int64), np.floor(py / celula).astype(np.int64))
+    inicio = np.searchsorted(chaves, chave_ponto, 'left')
+    quantos = np.searchsorted(chaves, chave_ponto, 'right') - inicio
+    ip = np.repeat(np.arange(len(px)), quantos)
+    jp = pedaco[np.repeat(inicio, quantos) + np.arange(quantos.sum()) - np.repeat(np.cumsum(quantos) - quantos, quantos)]
+
+    dx, dy = bx[jp] - ax[jp], by[jp] - ay[jp]
+    l2 = np.where(dx * dx + dy * dy > 0, dx * dx + dy * dy, 1.0)
+    tp = np.clip(((px[ip] - ax[jp]) * dx + (py[ip] - ay[jp]) * dy) / l2, 0.0, 1.0)
+    d = np.hypot(ax[jp] + tp * dx - px[ip], ay[jp] + tp * dy - py[ip])
+    perto = d <= raio
+    ip, jp, tp, d = ip[perto], jp[perto], tp[perto], d[perto]
+    t = t0[jp] + tp * (t1[jp] - t0[jp])
+    js = pai[jp]
+    # Um ponto perto da divisa de dois pedaços aparece duas vezes para o mesmo segmento
+    ordem = np.lexsort((d, js, ip))
+    ip, js, t, d = ip[ordem], js[ordem], t[ordem], d[ordem]
+    primeiro = np.ones(len(ip), dtype=bool)
+    primeiro[1:] = (ip[1:] != ip[:-1]) | (js[1:] != js[:-1])
+    return ip[primeiro], js[primeiro], t[primeiro], d[primeiro]
+
+
+def _raiz(pais, n):
+    while pais[n] != n:
+        pais[n] = pais[pais[n]]
+        n = pais[n]
+    return n
+
+
+def _montar_grafo(segmentos, dispositivos, tolerancia, distancia_maxima):
+    """
+    Grafo de roteamento: nós nas extremidades dos eletrodutos (unidas por tolerância), nas
+    derivações em T e nas projeções dos quadros e pontos, que ligam ao eletroduto mais
+    próximo por uma aresta de descida. Arestas cruzadas sem nó comum (eletrodutos que
+    se sobrepõem na planta) não se ligam.
+    """
+    x1, y1, x2, y2 = segmentos.T
+    comprimento = np.hypot(x2 - x1, y2 - y1)
+    usados = comprimento > tolerancia
+    if not usados.any():
+        raise ValueError("Os eletrodutos da planta são todos menores que a tolerância.")
+    segmentos, comprimento = segmentos[usados], comprimento[usados]
+    x1, y1, x2, y2 = segmentos.T
+    s = len(segmentos)
+    celula = max(float(np.median(comprimento)), distancia_maxima, tolerancia)
+
+    # Extremidades: mesmo nó se caem na mesma célula de tolerância; depois, junções por proximidade
+    ex, ey = np.concatenate([x1, x2]), np.concatenate([y1, y2])
+    _, no_extremidade = np.unique(np.round(np.column_stack([ex, ey]) / tolerancia).astype(np.int64),
+                                  axis=0, return_inverse=True)
+    no_extremidade = no_extremidade.ravel()
+    pais = list(range(int(no_extremidade.max()) + 1))
+    ie, js, t, _ = _pares_proximos(ex, ey, segmentos, tolerancia, celula)
+    outro = js != ie % s
+    ie, js, t = ie[outro], js[outro], t[outro]
+    no_inicio = t * comprimento[js] <= tolerancia
+    no_fim = ~no_inicio & ((1 - t) * comprimento[js] <= tolerancia)
+    for a, b in zip(no_extremidade[ie[no_inicio]], no_extremidade[js[no_inicio]]):
+        pais[_raiz(pais, a)] = _raiz(pais, b)
+    for a, b in zip(no_extremidade[ie[no_fim]], no_extremidade[js[no_fim] + s]):
+        pais[_raiz(pais, a)] = _raiz(pais, b)
+    raizes = np.array([_raiz(pais, n) for n in range(len(pais))], dtype=np.int64)
+    _, rotulo = np.unique(raizes, return_inverse=True)
+    no_extremidade = rotulo.ravel()[no_extremidade]
+    meio = ~no_inicio & ~no_fim
+    divisoes = [(js[meio], t[meio], no_extremidade[ie[meio]])]
+    n = int(no_extremidade.max()) + 1
+
+    # Quadros e pontos: nó próprio + descida até a projeção no eletroduto mais próximo
+    no_dispositivo = np.arange(n, n + len(dispositivos))
+    n += len(dispositivos)
+    ip, js, t, d = _pares_proximos(dispositivos[:, 0], dispositivos[:, 1], segmentos, distancia_maxima, celula)
+    ordem = np.lexsort((d, ip))
+    ip, js, t, d = ip[ordem], js[ordem], t[ordem], d[ordem]
+    primeiro = np.ones(len(ip), dtype=bool)
+    primeiro[1:] = ip[1:] != ip[:-1]
+    ip, js, t, d = ip[primeiro], js[primeiro], t[primeiro], d[primeiro]
+    ligado = np.zeros(len(dispositivos), dtype=bool)
+    ligado[ip] = True
+    conexao = np.where(t * comprimento[js] <= tolerancia, no_extremidade[js],
+                       np.where((1 - t) * comprimento[js] <= tolerancia, no_extremidade[js + s], -1))
+    novos = conexao < 0
+    conexao[novos] = np.arange(n, n + novos.sum())
+    n += int(novos.sum())
+    divisoes.append((js[novos], t[novos], conexao[novos]))
+
+    # Trechos: cada eletroduto cortado nas extremidades e divisões, em ordem ao longo dele
+    seg = np.concatenate([np.arange(s), np.arange(s)] + [dv[0] for dv in divisoes])
+    tt = np.concatenate([np.zeros(s), np.ones(s)] + [dv[1] for dv in divisoes])
+    no = np.concatenate([no_extremidade] + [dv[2] for dv in divisoes])
+    ordem = np.lexsort((tt, seg))
+    seg, tt, no = seg[ordem], tt[ordem], no[ordem]
+    consecutivos = np.flatnonzero((seg[1:] == seg[:-1]) & (no[1:] != no[:-1]))
+    js, ta, tb = seg[consecutivos], tt[consecutivos], tt[consecutivos + 1]
+    dx, dy = x2[js] - x1[js], y2[js] - y1[js]
+    trechos = pd.DataFrame({
+        'x1': x1[js] + ta * dx, 'y1': y1[js] + ta * dy,
+        'x2': x1[js] + tb * dx, 'y2': y1[js] + tb * dy,
+        'comprimento': (tb - ta) * comprimento[js],
+    })
+    u = np.concatenate([no[consecutivos], no_dispositivo[ip]])
+    v = np.concatenate([no[consecutivos + 1], conexao])
+    peso = np.concatenate([trechos['comprimento'].to_numpy(), d])
+    return n, u, v, peso, len(trechos), trechos, no_dispositivo, ligado
+
+
+def _dijkstra(origem, alvos, n, indptr, vizinho, peso, aresta):
+    """
+    Menor distância de origem aos nós e a aresta pela qual cada nó foi alcançado. Para assim
+    que todos os alvos são fixados: o caminho até eles já está completo.
+    """
+    distancia = [math.inf] * n
+    anterior = [-1] * n
+    distancia[origem] = 0.0
+    fila = [(0.0, origem)]
+    faltam = set(alvos)
+    while fila and faltam:
+        d, u = heapq.heappop(fila)
+        if d > distancia[u]:
+            continue
+        faltam.discard(u)
+        for k in range(indptr[u], indptr[u + 1]):
+            alternativa = d + peso[k]
+            w = vizinho[k]
+            if alternativa < distancia[w]:
+                distancia[w] = alternativa
+                anterior[w] = aresta[k]
+                heapq.heappush(fila, (alternativa, w))
+    return distancia, anterior
+
+
+def calcular_rotas(segmentos, quadros, pontos, tolerancia=TOLERANCIA_PADRAO,
+                   distancia_maxima=DISTANCIA_MAXIMA_PADRAO, acrescimo_por_ponto=0.0):
+    """
+    Comprimento e agrupamento de cada circuito roteado pelos eletrodutos.
+
+    O cabo de um circuito segue a árvore de menores caminhos do quadro até os seus pontos: o
+    comprimento é a soma dos trechos da união desses caminhos (um trecho comum a dois pontos
+    conta uma vez) mais acrescimo_por_ponto (ex.: descidas na parede). O agrupamento de um
+    trecho é o número de circuitos que passam por ele, e o num_circuitos de cada circuito é o
+    maior agrupamento ao longo do seu percurso (as descidas até quadros e pontos não contam).
+    Entradas como as de ler_planta, em metros.
+    Retorna (circuitos [Quadro, nome, comprimento, num_circuitos, pontos, Erro], trechos com o
+    agrupamento e os circuitos de cada trecho de eletroduto).
+    """
+    dispositivos = np.concatenate([quadros[['x', 'y']].to_numpy(dtype=float).reshape(-1, 2),
+                                   pontos[['x', 'y']].to_numpy(dtype=float).reshape(-1, 2)])
+    n, u, v, peso, num_trechos, trechos, no_dispositivo, ligado = _montar_grafo(
+        np.asarray(segmentos, dtype=float).reshape(-1, 4), dispositivos, tolerancia, distancia_maxima)
+
+    # Lista de adjacência compacta (CSR), nos dois sentidos
+    origem = np.concatenate([u, v])
+    ordem = np.argsort(origem, kind='stable')
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(origem, minlength=n))]).tolist()
+    vizinho = np.concatenate([v, u])[ordem].tolist()
+    peso_adj = np.concatenate([peso, peso])[ordem].tolist()
+    aresta_adj = np.concatenate([np.arange(len(u)), np.arange(len(u))])[ordem].tolist()
+    extremos_u, extremos_v, peso = u.tolist(), v.tolist(), peso.tolist()
+
+    indice_quadro = {q: i for i, q in enumerate(quadros['quadro'])}
+    no_ponto = no_dispositivo[len(quadros):]
+    ponto_ligado = ligado[len(quadros):]
+    alvos = pd.Series(no_ponto).groupby(pontos['Quadro'].to_numpy()).agg(list).to_dict()
+    arvores = {}
+    linhas, pares_circuito, pares_aresta = [], [], []
+    for (nome_quadro, nome), linhas_grupo in pontos.groupby(['Quadro', 'nome'], sort=False).indices.items():
+        linha = {'Quadro': nome_quadro, 'nome': nome, 'comprimento': np.nan, 'num_circuitos': np.nan,
+                 'pontos': len(linhas_grupo), 'Erro': ''}
+        linhas.append(linha)
+        i = indice_quadro.get(nome_quadro)
+        if i is None:
+            linha['Erro'] = ERRO_SEM_QUADRO
+            continue
+        if not ligado[i] or not ponto_ligado[linhas_grupo].all():
+            linha['Erro'] = ERRO_SEM_ELETRODUTO
+            continue
+        raiz = int(no_dispositivo[i])
+        if raiz not in arvores:
+            arvores[raiz] = _dijkstra(raiz, alvos[nome_quadro], n, indptr, vizinho, peso_adj, aresta_adj)
+        distancia, anterior = arvores[raiz]
+        if any(math.isinf(distancia[p]) for p in no_ponto[linhas_grupo]):
+            linha['Erro'] = ERRO_SEM_CAMINHO
+            continue
+        # União dos caminhos: sobe pela árvore até a raiz ou até um nó já visitado neste circuito
+        visitados, arestas = {raiz}, []
+        for p in no_ponto[linhas_grupo].tolist():
+            while p not in visitados:
+                visitados.add(p)
+                e = anterior[p]
+                arestas.append(e)
+                p = extremos_u[e] if extremos_v[e] == p else extremos_v[e]
+        linha['comprimento'] = round(sum(peso[e] for e in arestas) + acrescimo_por_ponto * len(linhas_grupo), 2)
+        pares_circuito.extend([len(linhas) - 1] * len(arestas))
+        pares_aresta.extend(arestas)
+
+    circuitos = pd.DataFrame(linhas, columns=['Quadro', 'nome', 'comprimento', 'num_circuitos', 'pontos', 'Erro'])
+    pares_circuito = np.array(pares_circuito, dtype=np.int64)
+    pares_aresta = np.array(pares_aresta, dtype=np.int64)
+    de_trecho = pares_aresta < num_trechos
+    pares_circuito, pares_aresta = pares_circuito[de_trecho], pares_aresta[de_trecho]
+    agrupamento = np.bincount(pares_aresta, minlength=num_trechos)
+    maior = np.zeros(len(circuitos), dtype=np.int64)
+    np.maximum.at(maior, pares_circuito, agrupamento[pares_aresta])
+    calculado = (circuitos['Erro'] == '').to_numpy()
+    circuitos['num_circuitos'] = pd.array(np.where(calculado, np.maximum(maior, 1), 0), dtype='Int64')
+    circuitos.loc[~calculado, 'num_circuitos'] = pd.NA
+
+    trechos['num_circuitos'] = agrupamento
+    rotulos = (circuitos['Quadro'].astype(str) + '/' + circuitos['nome'].astype(str)).to_numpy()
+    ordem = np.argsort(pares_aresta, kind='stable')
+    pares_aresta, nomes = pares_aresta[ordem], rotulos[pares_circuito[ordem]]
+    cortes = np.flatnonzero(pares_aresta[1:] != pares_aresta[:-1]) + 1
+    por_trecho = np.full(num_trechos, '', dtype=object)
+    if len(pares_aresta):
+        por_trecho[pares_aresta[np.concatenate([[0], cortes])]] = [', '.join(g) for g in np.split(nomes, cortes)]
+    trechos['circuitos'] = por_trecho
+    return circuitos, trechos
+
+
+def extrair_circuitos(origem, camada_eletrodutos=CAMADA_ELETRODUTOS, camada_quadros=CAMADA_QUADROS,
+                      camada_pontos=CAMADA_PONTOS, escala=None, tolerancia=TOLERANCIA_PADRAO,
+                      distancia_maxima=DISTANCIA_MAXIMA_PADRAO, acrescimo_por_ponto=0.0):
+    """ler_planta + calcular_rotas: comprimento (m) e num_circuitos por circuito a partir da planta."""
+    segmentos, quadros, pontos = ler_planta(origem, camada_eletrodutos, camada_quadros, camada_pontos, escala)
+    return calcular_rotas(segmentos, quadros, pontos, tolerancia, distancia_maxima, acrescimo_por_ponto)
+
+
+def preencher_circuitos(circuitos, extraidos):
+    """
+    Copia comprimento e num_circuitos extraídos da planta para a tabela de circuitos (lista,
+    DataFrame ou TabelaCircuitos no formato do editor), casando por (Quadro, nome); circuitos com
+    erro na planta ficam como estavam. Retorna (DataFrame atualizado com o mesmo índice,
+    circuitos da planta que não estão na tabela).
+    """
+    if isinstance(circuitos, TabelaCircuitos):
+        tabela = circuitos.para_dataframe()
+    else:
+        tabela = pd.DataFrame(circuitos).copy()
+    validos = extraidos[extraidos['Erro'] == '']
+    chaves = pd.MultiIndex.from_arrays([validos['Quadro'].astype(str), validos['nome'].astype(str)])
+    posicao = chaves.get_indexer(pd.MultiIndex.from_arrays([tabela['Quadro'].astype(str),
+                                                            tabela['nome'].astype(str)]))
+    achados = posicao >= 0
+    for coluna in ('comprimento', 'num_circuitos'):
+        valores = validos[coluna].to_numpy()[posicao[achados]]
+        if coluna not in tabela:
+            tabela[coluna] = np.nan
+        tabela[coluna] = tabela[coluna].astype(float)
+        tabela.loc[achados, coluna] = valores.astype(float)
+    if tabela['num_circuitos'].notna().all():
+        tabela['num_circuitos'] = tabela['num_circuitos'].round().astype(np.int64)
+    na_tabela = np.zeros(len(validos), dtype=bool)
+    na_tabela[posicao[achados]] = True
+    return tabela, validos[~na_tabela].reset_index(drop=True)
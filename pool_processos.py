@@ -0,0 +1,48 @@
+import atexit
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+# Pools reaproveitados entre chamadas (e entre reruns do Streamlit) para não pagar a criação dos processos
+_pools = {}
+
+
+def obter_pool(processos):
+    if processos not in _pools:
+        _pools[processos] = ProcessPoolExecutor(max_workers=processos)
+    return _pools[processos]
+
+
+def descartar_pool(processos):
+    executor = _pools.pop(processos, None)
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+@atexit.register
+def _encerrar_pools():
+    for processos in list(_pools):
+        descartar_pool(processos)
+
+
+def _submeter(executor, chamadas):
+    return {executor.submit(funcao, *args): i for i, (funcao, args) in enumerate(chamadas)}
+
+
+def executar_em_pool(processos, chamadas):
+    """
+    Executa as chamadas [(função, argumentos), ...] no pool de `processos` processos e gera
+    (posição da chamada, resultado) à medida que ficam prontas. Um pool quebrado (processo de
+    trabalho morto) sai do cache: se já estava quebrado, as chamadas vão para um pool novo; se
+    quebra durante elas, o erro sobe e a próxima execução já começa com outro pool.
+    """
+    try:
+        futuros = _submeter(obter_pool(processos), chamadas)
+    except BrokenProcessPool:
+        descartar_pool(processos)
+        futuros = _submeter(obter_pool(processos), chamadas)
+    try:
+        for futuro in as_completed(futuros):
+            yield futuros[futuro], futuro.result()
+    except BrokenProcessPool:
+        descartar_pool(processos)
+        raise
@@ -0,0 +1,159 @@
+import hashlib
+from html import escape
+
+from ezdxf import path
+
+from diagrama import ARQUIVOS_ENTRADA, carregar_modelo, _blocos_circuito, _linhas_unifilar
+
+# Mesmos espaçamentos de montar_diagrama_unifilar (primeiro quadro do desenho)
+Y_PRIMEIRO_CIRCUITO = -50
+PASSO_CIRCUITO = 30
+X_MIN_QUADRO, X_MAX_QUADRO = -70, 90
+MARGEM_QUADRO = 10
+TOPO_QUADRO = 20
+
+DISTANCIA_CURVAS = 0.25  # tolerância (unidades do desenho) ao aproximar arcos e círculos por segmentos
+LIMITE_CACHE = 256
+
+_simbolos = {}
+_svgs = {}
+
+
+def _fmt(valor):
+    return f"{valor:.2f}".rstrip('0').rstrip('.')
+
+
+def _pontos_svg(pontos):
+    # DXF tem y para cima, SVG para baixo
+    return " ".join(f"{_fmt(p.x)},{_fmt(-p.y)}" for p in pontos)
+
+
+class _Simbolo:
+    """Geometria de um bloco modelo em SVG, posições dos ATTDEF e extensão do desenho."""
+
+    def __init__(self, ident, arquivo, nome_bloco):
+        bloco = carregar_modelo(arquivo).blocks.get(nome_bloco)
+        self.ident = ident
+        self.atributos = {}
+        self.elementos = []
+        xs, ys = [], []
+        for entidade in bloco:
+            tipo = entidade.dxftype()
+            if tipo == 'ATTDEF':
+                self.atributos[entidade.dxf.tag.upper()] = (entidade.dxf.insert.x, entidade.dxf.insert.y,
+                                                            entidade.dxf.height, entidade.dxf.rotation)
+            elif tipo in ('TEXT', 'MTEXT'):
+                texto = entidade.dxf.text if tipo == 'TEXT' else entidade.plain_text()
+                altura = entidade.dxf.height if tipo == 'TEXT' else entidade.dxf.char_height
+                x, y = entidade.dxf.insert.x, entidade.dxf.insert.y
+                self.elementos.append(f'<g fill="black" stroke="none">'
+                                      f'{_texto(x, y, altura, texto, entidade.dxf.get("rotation", 0))}</g>')
+                xs += [x, x + 0.6 * altura * len(texto)]
+                ys += [y, y + altura]
+            elif tipo in ('LINE', 'CIRCLE', 'ARC', 'LWPOLYLINE', 'HATCH'):
+                caminhos = path.from_hatch(entidade) if tipo == 'HATCH' else [path.make_path(entidade)]
+                for caminho in caminhos:
+                    pontos = list(caminho.flattening(DISTANCIA_CURVAS))
+                    if len(pontos) < 2:
+                        continue
+                    xs += [p.x for p in pontos]
+                    ys += [p.y for p in pontos]
+                    if tipo == 'HATCH':
+                        self.elementos.append(f'<polygon points="{_pontos_svg(pontos)}" fill="black"/>')
+                    else:
+                        self.elementos.append(f'<polyline points="{_pontos_svg(pontos)}"/>')
+        for x, y, altura, _ in self.atributos.values():
+            xs += [x, x + 10 * altura]
+            ys += [y, y + altura]
+        self.extensao = (min(xs, default=0), min(ys, default=0), max(xs, default=0), max(ys, default=0))
+
+    def definicao(self):
+        return f'<g id="{self.ident}">{"".join(self.elementos)}</g>'
+
+
+def simbolo(arquivo, nome_bloco):
+    """Símbolo renderizado de um bloco modelo; cada bloco é convertido uma única vez por processo."""
+    chave = (arquivo, nome_bloco)
+    if chave not in _simbolos:
+        _simbolos[chave] = _Simbolo(f"b{len(_simbolos)}", arquivo, nome_bloco)
+    return _simbolos[chave]
+
+
+def _texto(x, y, altura, texto, rotacao=0):
+    rotacao = f' transform="rotate({_fmt(-rotacao)} {_fmt(x)} {_fmt(-y)})"' if rotacao else ''
+    return (f'<text x="{_fmt(x)}" y="{_fmt(-y)}" font-size="{_fmt(altura)}"{rotacao}>'
+            f'{escape(str(texto))}</text>')
+
+
+def _blocos_quadro(linhas, fases_Q, corrente_geral):
+    """[(arquivo, bloco, (x, y), atributos)] do quadro, nas posições usadas por montar_diagrama_unifilar."""
+    blocos = []
+    central = len(linhas) // 2
+    y_offset = Y_PRIMEIRO_CIRCUITO
+    for index, row in enumerate(linhas):
+        for _, arquivo, bloco, (dx, dy), atributos in _blocos_circuito(row):
+            blocos.append((arquivo, bloco, (dx, y_offset + dy), atributos))
+        if index == central and fases_Q in ARQUIVOS_ENTRADA:
+            blocos.append((ARQUIVOS_ENTRADA[fases_Q], 'entrada', (0, y_offset + 30), {'CORRENTE': str(corrente_geral)}))
+        y_offset -= PASSO_CIRCUITO
+    return blocos, y_offset
+
+
+def svg_quadro(nome_quadro, linhas, fases_Q, corrente_geral):
+    """
+    SVG do unifilar de um quadro. O resultado fica em cache pelo hash do conteúdo,
+    então redesenhar um quadro que não mudou é só uma consulta ao dicionário.
+    """
+    chave = hashlib.sha1(repr((nome_quadro, [sorted(row.items()) for row in linhas],
+                               fases_Q, str(corrente_geral))).encode('utf-8')).hexdigest()
+    if chave in _svgs:
+        return _svgs[chave]
+
+    blocos, y_final = _blocos_quadro(linhas, fases_Q, corrente_geral)
+    usados = {}
+    geometria = []
+    textos = []
+    x_min, y_min = X_MIN_QUADRO - MARGEM_QUADRO - 10, y_final - MARGEM_QUADRO
+    x_max, y_max = X_MAX_QUADRO + MARGEM_QUADRO, TOPO_QUADRO + 2 * MARGEM_QUADRO
+    for arquivo, nome_bloco, (x, y), atributos in blocos:
+        simb = simbolo(arquivo, nome_bloco)
+        usados[simb.ident] = simb
+        geometria.append(f'<use href="#{simb.ident}" x="{_fmt(x)}" y="{_fmt(-y)}"/>')
+        # Atributos na posição do ATTDEF, como ficam no AutoCAD depois do BATTMAN
+        for tag, valor in atributos.items():
+            definicao = simb.atributos.get(tag.upper())
+            if definicao is not None:
+                ax, ay, altura, rotacao = definicao
+                textos.append(_texto(x + ax, y + ay, altura, valor, rotacao))
+        ex_min, ey_min, ex_max, ey_max = simb.extensao
+        x_min, y_min = min(x_min, x + ex_min), min(y_min, y + ey_min)
+        x_max, y_max = max(x_max, x + ex_max), max(y_max, y + ey_max)
+
+    topo = TOPO_QUADRO + MARGEM_QUADRO
+    base = y_final - MARGEM_QUADRO
+    esquerda, direita = X_MIN_QUADRO - MARGEM_QUADRO, X_MAX_QUADRO + MARGEM_QUADRO
+    moldura = (f'<polygon points="{_fmt(esquerda)},{_fmt(-topo)} {_fmt(direita)},{_fmt(-topo)} '
+               f'{_fmt(direita)},{_fmt(-base)} {_fmt(esquerda)},{_fmt(-base)}"/>')
+    textos.append(_texto(esquerda, TOPO_QUADRO + 10, 10, nome_quadro))
+
+    x_min, y_min, x_max, y_max = x_min - MARGEM_QUADRO, y_min - MARGEM_QUADRO, x_max + MARGEM_QUADRO, y_max + MARGEM_QUADRO
+    largura, altura = x_max - x_min, y_max - y_min
+    svg = (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="{_fmt(x_min)} {_fmt(-y_max)} {_fmt(largura)} {_fmt(altura)}" '
+        f'width="{_fmt(largura * 2)}" height="{_fmt(altura * 2)}">'
+        f'<defs>{"".join(s.definicao() for s in usados.values())}</defs>'
+        f'<rect x="{_fmt(x_min)}" y="{_fmt(-y_max)}" width="{_fmt(largura)}" height="{_fmt(altura)}" fill="white"/>'
+        f'<g fill="none" stroke="black" stroke-width="0.4">{moldura}{"".join(geometria)}</g>'
+        f'<g font-family="Arial, Helvetica, sans-serif" fill="black">{"".join(textos)}</g>'
+        '</svg>'
+    )
+    if len(_svgs) >= LIMITE_CACHE:
+        del _svgs[next(iter(_svgs))]
+    _svgs[chave] = svg
+    return svg
+
+
+def previa_unifilar(exemplos_circuitos, disjuntores_gerais, fases_Q):
+    """{quadro: SVG} com o unifilar de cada quadro, a partir dos mesmos dados de gerar_diagrama_unifilar."""
+    return {nome_quadro: svg_quadro(nome_quadro, linhas, fases_Q, disjuntores_gerais[nome_quadro])
+            for nome_quadro, linhas in _linhas_unifilar(exemplos_circuitos)}
@@ -0,0 +1,356 @@
+import argparse
+import base64
+import io
+import json
+import math
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturoTimeout
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pandas as pd
+
+import diagrama
+from calculos import (
+    calcular_parametros_circuitos,
+    calcular_disjuntor_geral,
+    calcular_disjuntor_qgbt,
+    distribuir_fases,
+    definir_num_fases,
+    preparar_circuitos_para_calculo,
+    escolher_quadros_sinapi,
+    montar_tabela_materiais,
+    montar_orcamento,
+)
+from catalogo_protecao import obter_catalogo
+from instantaneo_referencias import Instantaneo
+from memorial import montar_relatorio_latex
+from tabela_circuitos import TabelaCircuitos
+from validacao import validar_circuitos, formatar_relatorio
+
+PASTA = os.path.dirname(os.path.abspath(__file__))
+CAMINHO_DADOS = os.path.join(PASTA, 'Dados para o gpt.xls')
+CAMINHO_SINAPI = os.path.join(PASTA, 'sinapi.xls')
+
+# Estado carregado uma vez em cada processo de trabalho (tabelas, catálogo e blocos DXF)
+_estado = {}
+
+
+class EntradaInvalida(ValueError):
+    """Corpo da requisição mal formado ou circuitos reprovados na validação (HTTP 422)."""
+
+
+def inicializar_worker(caminho_dados, caminho_sinapi, pasta_modelos, caminho_instantaneo=None):
+    diagrama.PASTA_MODELOS = pasta_modelos
+    if caminho_instantaneo:
+        # Tabelas, SINAPI e blocos mapeados do instantâneo, compartilhados entre os workers
+        instantaneo = Instantaneo(caminho_instantaneo).instalar()
+        data_tables = instantaneo.data_tables
+        _estado['sinapi_df'] = instantaneo.sinapi_df
+    else:
+        data_sheets = pd.read_excel(caminho_dados, sheet_name=None)
+        data_tables = {sheet_name: data_sheets[sheet_name] for sheet_name in data_sheets}
+        _estado['sinapi_df'] = pd.read_excel(caminho_sinapi, sheet_name='Planilha1')
+    _estado['data_tables'] = data_tables
+    _estado['catalogo'] = obter_catalogo(data_tables['valores nominais de disjuntores'])
+    diagrama.pre_carregar_modelos()
+
+
+def _aquecer():
+    # Mantém o processo ocupado um instante para que o pool crie todos os workers
+    time.sleep(0.1)
+    return os.getpid()
+
+
+def _registros(df):
+    return json.loads(df.to_json(orient='records', force_ascii=False))
+
+
+def _ler_circuitos(corpo):
+    """Circuitos validados e fases da alimentação geral do corpo; EntradaInvalida se algo não serve."""
+    fases_qd = corpo.get('fases_qd', 3)
+    if isinstance(fases_qd, bool) or fases_qd not in (1, 2, 3):
+        raise EntradaInvalida("'fases_qd' deve ser 1, 2 ou 3.")
+    registros = corpo.get('circuitos')
+    if not isinstance(registros, list) or not registros:
+        raise EntradaInvalida("'circuitos' deve ser uma lista com pelo menos um circuito.")
+    try:
+        circuitos = TabelaCircuitos.de_registros(registros)
+    except KeyError as e:
+        raise EntradaInvalida(f"Campo obrigatório ausente: {e}.") from e
+    except (ValueError, TypeError) as e:
+        raise EntradaInvalida(str(e)) from e
+    relatorio = validar_circuitos(circuitos, _estado['data_tables'], int(fases_qd))
+    if not relatorio.empty:
+        raise EntradaInvalida(formatar_relatorio(relatorio))
+    return circuitos, int(fases_qd)
+
+
+def _tensao_nominal(corpo):
+    tensao = corpo.get('tensao_nominal', 127)
+    if isinstance(tensao, bool) or not isinstance(tensao, (int, float)) or not tensao > 0:
+        raise EntradaInvalida("'tensao_nominal' deve ser um número positivo.")
+    return tensao
+
+
+def _distribuir(circuitos, fases_qd):
+    # Nos workers não há página do Streamlit: os avisos voltam na resposta
+    avisos = []
+    circuitos = distribuir_fases(circuitos, fases_qd, avisar=avisos.append)
+    return circuitos, list(dict.fromkeys(avisos))
+
+
+def _calcular(corpo):
+    circuitos, fases_qd = _ler_circuitos(corpo)
+    definir_num_fases(circuitos)
+    circuitos, _ = _distribuir(circuitos, fases_qd)
+    preparar_circuitos_para_calculo(circuitos)
+    resultados, circuitos = calcular_parametros_circuitos(circuitos, _estado['data_tables'])
+    return circuitos, resultados, fases_qd
+
+
+def _disjuntores_gerais(circuitos, corpo):
+    data_tables = _estado['data_tables']
+    tensao = _tensao_nominal(corpo)
+    gerais = calcular_disjuntor_geral(circuitos, data_tables['FatordeDemanda'], tensao,
+                                      data_tables['valores nominais de disjuntores'])
+    qgbt = calcular_disjuntor_qgbt(gerais, data_tables['FatordeDemanda'], tensao)
+    return gerais, qgbt
+
+
+def rota_dimensionar(corpo):
+    circuitos, resultados, _ = _calcular(corpo)
+    return {'resultados': _registros(resultados), 'circuitos': _registros(circuitos.para_dataframe())}
+
+
+def rota_fases(corpo):
+    circuitos, fases_qd = _ler_circuitos(corpo)
+    definir_num_fases(circuitos)
+    circuitos, avisos = _distribuir(circuitos, fases_qd)
+    return {'circuitos': _registros(circuitos.para_dataframe()), 'avisos': avisos}
+
+
+def rota_orcamento(corpo):
+    circuitos, resultados, _ = _calcular(corpo)
+    quadros_escolhidos_df = escolher_quadros_sinapi(circuitos)
+    materiais = montar_tabela_materiais(resultados, _estado['catalogo'])
+    orcamento = montar_orcamento(materiais, quadros_escolhidos_df, _estado['sinapi_df'])
+    return {
+        'materiais': _registros(materiais),
+        'orcamento': _registros(orcamento),
+        'custo_total': float(orcamento['Custo Total'].sum()),
+    }
+
+
+def rota_diagrama(corpo):
+    circuitos, _, fases_qd = _calcular(corpo)
+    gerais, _ = _disjuntores_gerais(circuitos, corpo)
+    doc = diagrama.montar_diagrama_unifilar(circuitos, gerais, fases_qd)
+    saida = io.StringIO()
+    doc.write(saida)
+    return saida.getvalue().encode('utf-8'), 'application/dxf'
+
+
+def rota_memorial(corpo):
+    circuitos, resultados, _ = _calcular(corpo)
+    gerais, qgbt = _disjuntores_gerais(circuitos, corpo)
+    doc = montar_relatorio_latex(circuitos, resultados, gerais, qgbt, _estado['data_tables'])
+    return doc.dumps().encode('utf-8'), 'application/x-tex'
+
+
+ROTAS = {
+    '/dimensionar': rota_dimensionar,
+    '/fases': rota_fases,
+    '/orcamento': rota_orcamento,
+    '/diagrama': rota_diagrama,
+    '/memorial': rota_memorial,
+}
+
+
+def _erro(status, mensagem):
+    return status, 'application/json', json.dumps({'erro': mensagem}, ensure_ascii=False).encode('utf-8')
+
+
+def executar(rota, corpo):
+    """
+    Executa uma rota no worker. Retorna (status, tipo de conteúdo, bytes): 422 para entrada
+    inválida e 500, com o erro, para qualquer falha interna do cálculo.
+    """
+    if not isinstance(rota, str) or rota not in ROTAS:
+        return _erro(404, f"Rota '{rota}' não encontrada.")
+    if not isinstance(corpo, dict):
+        return _erro(400, 'O corpo deve ser um objeto JSON.')
+    try:
+        resposta = ROTAS[rota](corpo)
+    except EntradaInvalida as e:
+        return _erro(422, str(e))
+    except Exception as e:
+        return _erro(500, f"Erro interno: {type(e).__name__}: {e}")
+    if isinstance(resposta, tuple):
+        return 200, resposta[1], resposta[0]
+    return 200, 'application/json', json.dumps(resposta, ensure_ascii=False).encode('utf-8')
+
+
+def executar_lote(requisicoes):
+    # Respostas binárias (DXF, .tex) vão em base64 dentro do JSON do lote
+    respostas = []
+    for requisicao in requisicoes:
+        status, tipo, dados = executar(requisicao.get('rota'), requisicao.get('corpo', {}))
+        if tipo == 'application/json':
+            conteudo = json.loads(dados)
+        else:
+            conteudo = base64.b64encode(dados).decode('ascii')
+        respostas.append({'status': status, 'tipo': tipo, 'conteudo': conteudo})
+    return respostas
+
+
+def _verificar_corpo(rota, corpo):
+    """Mensagem de erro se o JSON não tem a forma esperada pela rota, ou None."""
+    if not isinstance(corpo, dict):
+        return 'O corpo deve ser um objeto JSON.'
+    if rota != '/lote':
+        return None
+    requisicoes = corpo.get('requisicoes', [])
+    if not isinstance(requisicoes, list) or not all(isinstance(r, dict) for r in requisicoes):
+        return "'requisicoes' deve ser uma lista de objetos {\"rota\": ..., \"corpo\": ...}."
+    return None
+
+
+class ServicoDimensionamento:
+    """
+    Servidor HTTP local com pool de processos pré-aquecido.
+
+    POST /dimensionar, /fases, /orcamento, /diagrama, /memorial recebem
+    {"circuitos": [...], "fases_qd": 3} no mesmo formato da tabela do app (comprimento em m).
+    POST /lote recebe {"requisicoes": [{"rota": ..., "corpo": ...}, ...]} e divide o lote
+    entre os processos. GET /saude informa o estado. Requisições acima de max_concorrencia
+    esperam até tempo_fila segundos e depois recebem 503. Com caminho_instantaneo, os workers
+    mapeiam o instantâneo de referências em vez de lerem as planilhas e os modelos DXF.
+    """
+
+    def __init__(self, host='127.0.0.1', porta=8765, processos=2, max_concorrencia=8,
+                 tempo_fila=5.0, tempo_limite=60.0, caminho_dados=CAMINHO_DADOS,
+                 caminho_sinapi=CAMINHO_SINAPI, pasta_modelos=diagrama.PASTA_MODELOS, caminho_instantaneo=None):
+        self.processos = processos
+        self.tempo_fila = tempo_fila
+        self.tempo_limite = tempo_limite
+        self.semaforo = threading.BoundedSemaphore(max_concorrencia)
+        self.executor = ProcessPoolExecutor(
+            max_workers=processos, initializer=inicializar_worker,
+            initargs=(caminho_dados, caminho_sinapi, pasta_modelos, caminho_instantaneo))
+        # Pré-aquecimento: todos os workers carregam tabelas e blocos antes da primeira requisição
+        self.pids = sorted(set(f.result() for f in [self.executor.submit(_aquecer) for _ in range(processos)]))
+        self.httpd = ThreadingHTTPServer((host, porta), self._criar_handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def endereco(self):
+        host, porta = self.httpd.server_address[:2]
+        return f"http://{host}:{porta}"
+
+    def _executar_lote(self, requisicoes):
+        if not requisicoes:
+            return []
+        por_processo = math.ceil(len(requisicoes) / self.processos)
+        futuros = [self.executor.submit(executar_lote, requisicoes[i:i + por_processo])
+                   for i in range(0, len(requisicoes), por_processo)]
+        respostas = []
+        for futuro in futuros:
+            respostas.extend(futuro.result(timeout=self.tempo_limite))
+        return respostas
+
+    def _criar_handler(self):
+        servico = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, formato, *args):
+                pass
+
+            def _responder(self, status, tipo, dados):
+                self.send_response(status)
+                self.send_header('Content-Type', tipo)
+                self.send_header('Content-Length', str(len(dados)))
+                self.end_headers()
+                self.wfile.write(dados)
+
+            def _responder_json(self, status, objeto):
+                self._responder(status, 'application/json',
+                                json.dumps(objeto, ensure_ascii=False).encode('utf-8'))
+
+            def do_GET(self):
+                if self.path == '/saude':
+                    self._responder_json(200, {'status': 'ok', 'processos': servico.pids})
+                else:
+                    self._responder_json(404, {'erro': f"Rota '{self.path}' não encontrada."})
+
+            def do_POST(self):
+                if self.path not in ROTAS and self.path != '/lote':
+                    self._responder_json(404, {'erro': f"Rota '{self.path}' não encontrada."})
+                    return
+                try:
+                    tamanho = int(self.headers.get('Content-Length', 0))
+                    corpo = json.loads(self.rfile.read(tamanho) or b'{}')
+                except (ValueError, json.JSONDecodeError):
+                    self._responder_json(400, {'erro': 'JSON inválido.'})
+                    return
+                erro = _verificar_corpo(self.path, corpo)
+                if erro:
+                    self._responder_json(400, {'erro': erro})
+                    return
+                if not servico.semaforo.acquire(timeout=servico.tempo_fila):
+                    self._responder_json(503, {'erro': 'Servidor ocupado, tente novamente.'})
+                    return
+                try:
+                    if self.path == '/lote':
+                        self._responder_json(200, servico._executar_lote(corpo.get('requisicoes', [])))
+                    else:
+                        futuro = servico.executor.submit(executar, self.path, corpo)
+                        self._responder(*futuro.result(timeout=servico.tempo_limite))
+                except FuturoTimeout:
+                    self._responder_json(504, {'erro': 'Tempo limite excedido.'})
+                except Exception as e:
+                    self._responder_json(500, {'erro': f"Erro interno: {type(e).__name__}: {e}"})
+                finally:
+                    servico.semaforo.release()
+
+        return Handler
+
+    def iniciar(self):
+        """Atende em uma thread de fundo (uso em testes e no script de carga)."""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def servir(self):
+        self.httpd.serve_forever()
+
+    def encerrar(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.executor.shutdown(wait=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serviço HTTP local de dimensionamento (NBR 5410).')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=8765)
+    parser.add_argument('--processos', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--max-concorrencia', type=int, default=16)
+    parser.add_argument('--dados', default=CAMINHO_DADOS)
+    parser.add_argument('--sinapi', default=CAMINHO_SINAPI)
+    parser.add_argument('--modelos', default=diagrama.PASTA_MODELOS)
+    parser.add_argument('--instantaneo', default=None,
+                        help='Arquivo gerado por instantaneo_referencias.py; substitui --dados, --sinapi e --modelos')
+    args = parser.parse_args()
+    servico = ServicoDimensionamento(args.host, args.porta, args.processos, args.max_concorrencia,
+                                     caminho_dados=args.dados, caminho_sinapi=args.sinapi,
+                                     pasta_modelos=args.modelos, caminho_instantaneo=args.instantaneo)
+    print(f"Serviço de dimensionamento em {servico.endereco} ({args.processos} processos)")
+    try:
+        servico.servir()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servico.encerrar()
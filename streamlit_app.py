@@ -1,382 +1,51 @@
-import numpy as np
 import pandas as pd
-import ezdxf
 import streamlit as st
 from io import BytesIO
-from ezdxf.enums import TextEntityAlignment
-from pylatex import Document, Section, Command, Package, Subsection
-from pylatex.utils import NoEscape
-import requests
 import json
-
-# Evita erros de compatibilidade Arrow no data_editor (ex.: LargeUtf8)
-try:
-    st.set_option("global.dataFrameSerialization", "legacy")
-except Exception:
-    pass
-# Funções para cálculos elétricos
-def calcular_corrente_nominal(potencia, tensao, fator_potencia, num_fases):
-    if num_fases == 1:
-        return potencia * fator_potencia / (tensao)
-    elif num_fases == 2:
-        return potencia * fator_potencia / (np.sqrt(3) * tensao)
-    elif num_fases == 3:
-        return potencia * fator_potencia / (3 * tensao)
-    else:
-        raise ValueError("Número de fases inválido.")
-
-def encontrar_fator_correcao(temperatura, tabela_temperatura):
-    coluna_temperatura = tabela_temperatura.columns[0]
-    coluna_fator = tabela_temperatura.columns[1]
-    fatores = tabela_temperatura[tabela_temperatura[coluna_temperatura] <= temperatura]
-    if not fatores.empty:
-        return fatores.iloc[-1][coluna_fator]
-    else:
-        raise ValueError("Temperatura fora do alcance da tabela.")
-
-def encontrar_fator_agrupamento(num_circuitos, tabela_agrupamento):
-    fatores = tabela_agrupamento[tabela_agrupamento['Agrupamento de circuitos'] <= num_circuitos]
-    if not fatores.empty:
-        return fatores.iloc[-1]['FatordeAgrupamento']
-    else:
-        raise ValueError("Número de circuitos fora do alcance da tabela.")
-
-def determinar_secao_condutor(corrente, tabela_capacidade, metodo_instalacao, nome_circuito):
-    coluna_capacidade = [col for col in tabela_capacidade.columns if metodo_instalacao in col][0]
-    secoes_suportadas = tabela_capacidade[tabela_capacidade[coluna_capacidade] >= corrente]
-
-    # Filtrar 1.5 mm² se o nome do circuito não contém "iluminação"
-    if "iluminação" not in nome_circuito.lower():
-        secoes_suportadas = secoes_suportadas[secoes_suportadas['Seção do condutor'] != 1.5]
-
-    if not secoes_suportadas.empty:
-        return secoes_suportadas.iloc[0]['Seção do condutor']
-    else:
-        raise ValueError(f"Corrente muito alta para as seções disponíveis. Nenhuma seção adequada encontrada para o circuito '{nome_circuito}'.")
-
-def encontrar_capacidade_corrente(secao_condutor, tabela_capacidade, metodo_instalacao):
-    colunas_validas = [col for col in tabela_capacidade.columns if metodo_instalacao in col]
-    if not colunas_validas:
-        raise ValueError(f"O método de instalação '{metodo_instalacao}' não foi encontrado na tabela de capacidade.")
-    coluna_capacidade = colunas_validas[0]
-    capacidade = tabela_capacidade.loc[tabela_capacidade['Seção do condutor'] == secao_condutor, coluna_capacidade].iloc[0]
-    return capacidade
-
-def _proxima_secao_maior(secao_atual, tabela_capacidade):
-    secoes = sorted(tabela_capacidade['Seção do condutor'].unique())
-    for s in secoes:
-        if s > secao_atual:
-            return s
-    return None  # não há maior
-
-def _capacidade_da_secao(secao, tabela_capacidade, metodo_instalacao):
-    colunas_validas = [c for c in tabela_capacidade.columns if metodo_instalacao in c]
-    if not colunas_validas:
-        raise ValueError(f"Método de instalação '{metodo_instalacao}' não encontrado na tabela.")
-    col = colunas_validas[0]
-    linha = tabela_capacidade.loc[tabela_capacidade['Seção do condutor'] == secao]
-    if linha.empty:
-        raise ValueError(f"Seção {secao} mm² não encontrada na tabela de capacidade.")
-    return float(linha[col].iloc[0])
-
-def _disjuntores_padrao_por_tipo(tabela_disjuntores, numero_fases):
-    if numero_fases == 1:
-        tipo = 'Monopolar'
-    elif numero_fases == 2:
-        tipo = 'Bipolar'
-    elif numero_fases == 3:
-        tipo = 'Tripolar'
-    else:
-        raise ValueError("Número de fases inválido. Deve ser 1, 2 ou 3.")
-
-    df = tabela_disjuntores[tabela_disjuntores['Tipo de disjuntor'] == tipo].copy()
-    if df.empty:
-        raise ValueError(f"Não há disjuntores cadastrados para o tipo '{tipo}'.")
-    return sorted(df['Corrente nominal'].unique())
-
-def escolher_disjuntor_seguro(corrente_corrigida,
-                              secao_inicial,
-                              tabela_disjuntores,
-                              tabela_capacidade,
-                              metodo_instalacao,
-                              numero_fases,
-                              fator_sobra=1.00):
-    """
-    Retorna (In_escolhido, secao_final_ajustada).
-    Garante a relação Ib ≤ In ≤ Iz; aumenta a seção se necessário.
-    fator_sobra: opcional (ex.: 1.10 para folga).
-    """
-    exigida = float(corrente_corrigida) * float(fator_sobra)
-    secoes_ordenadas = sorted(tabela_capacidade['Seção do condutor'].unique())
-    if secao_inicial not in secoes_ordenadas:
-        raise ValueError(f"Seção inicial {secao_inicial} mm² fora da tabela.")
-
-    secoes_idx = secoes_ordenadas.index(secao_inicial)
-    secoes_para_testar = secoes_ordenadas[secoes_idx:]  # começa na inicial e vai aumentando
-
-    padroes = _disjuntores_padrao_por_tipo(tabela_disjuntores, numero_fases)
-
-    for secao in secoes_para_testar:
-        Iz = _capacidade_da_secao(secao, tabela_capacidade, metodo_instalacao)
-
-        # pega o menor disjuntor padrão ≥ exigida
-        In_candidates = [x for x in padroes if x >= exigida]
-
-        if not In_candidates:
-            # nem o maior disjuntor padrão atende à corrente exigida -> precisamos aumentar a seção
-            # (segue o loop para próxima seção)
-            continue
-
-        In_escolhido = In_candidates[0]
-
-        if In_escolhido <= Iz:
-            return In_escolhido, secao  # achou combinação válida (Ib ≤ In ≤ Iz)
-
-        # caso contrário, aumenta a seção e tenta de novo
-        # (segue o loop)
-
-    # Se chegou aqui, nem com a maior seção disponível coube
-    raise ValueError(
-        f"Não foi possível selecionar disjuntor seguro: corrente corrigida={corrente_corrigida:.2f} A, "
-        f"mesmo com a maior seção disponível."
-    )
-
-def calcular_queda_tensao(corrente_nominal, comprimento, secao_condutor, tabela_queda_tensao):
-    valor_queda_tensao = tabela_queda_tensao.loc[tabela_queda_tensao['seção do condutor'] == secao_condutor, 'Queda de tensão (V/A.km)'].iloc[0]
-    queda_tensao = valor_queda_tensao * corrente_nominal * comprimento
-    return queda_tensao
-
-def ajustar_secao_condutor_para_queda_tensao(secao_atual, tabela_capacidade):
-    secoes_disponiveis = tabela_capacidade['Seção do condutor']
-    secoes_maiores = secoes_disponiveis[secoes_disponiveis > secao_atual]
-    if not secoes_maiores.empty:
-        return secoes_maiores.iloc[0]
-    else:
-        raise ValueError("Não há seções de condutor maiores disponíveis.")
-
-def ajustar_condutor_queda_tensao(corrente_nominal, comprimento, secao_inicial, queda_tensao_max_admitida, tabela_capacidade, tabela_queda_tensao):
-    secao_condutor = secao_inicial
-    queda_tensao = calcular_queda_tensao(corrente_nominal, comprimento, secao_condutor, tabela_queda_tensao)
-    while queda_tensao > queda_tensao_max_admitida:
-        secao_condutor = ajustar_secao_condutor_para_queda_tensao(secao_condutor, tabela_capacidade)
-        queda_tensao = calcular_queda_tensao(corrente_nominal, comprimento, secao_condutor, tabela_queda_tensao)
-    return secao_condutor, queda_tensao
-
-def calcular_parametros_circuitos(lista_circuitos, data_tables):
-    resultados = []
-    for circuito in lista_circuitos:
-        corrente_nominal = calcular_corrente_nominal(circuito['potencia'], circuito['tensao'], circuito['fator_potencia'], circuito['num_fases'])
-        fator_correcao_temp = encontrar_fator_correcao(circuito['temperatura'], data_tables['Fator de correção de temperatur'])
-        fator_agrupamento = encontrar_fator_agrupamento(circuito['num_circuitos'], data_tables['Fator de agrupamento'])
-        corrente_corrigida = corrente_nominal / (fator_correcao_temp * fator_agrupamento)
-        installmet=circuito['num_fases1']
-
-        secao_inicial = determinar_secao_condutor(corrente_corrigida,
-                                          data_tables['Capacidade de corrente'],
-                                          circuito['met_instala'],
-                                          circuito['nome'])
-
-# 2) Ajuste por queda de tensão (pode aumentar a seção)
-        secao_queda, queda_tensao_final = ajustar_condutor_queda_tensao(
-            corrente_nominal, circuito['comprimento'], secao_inicial,
-            circuito['queda_tensao_max_admitida'],
-            data_tables['Capacidade de corrente'], data_tables['queda de tensão']
-        )
-
-# 3) Escolha do disjuntor garantindo Ib ≤ In ≤ Iz,
-#    aumentando seção se precisar (volta com a seção final aceita)
-        disjuntor, secao_final = escolher_disjuntor_seguro(
-            corrente_corrigida=corrente_corrigida,
-            secao_inicial=secao_queda,
-            tabela_disjuntores=data_tables['valores nominais de disjuntores'],
-            tabela_capacidade=data_tables['Capacidade de corrente'],
-            metodo_instalacao=circuito['met_instala'],
-            numero_fases=circuito['num_fases'],
-            fator_sobra=1.00  # pode usar 1.10 se quiser folga
-        )
-
-# 4) (opcional) Se a seção foi aumentada no passo 3, recalcule a queda de tensão
-        if secao_final != secao_queda:
-            queda_tensao_final = calcular_queda_tensao(
-                corrente_nominal, circuito['comprimento'], secao_final,
-                data_tables['queda de tensão']
-            )
-
-        resultados.append({
-            "Nome do Circuito": circuito['nome'],
-            "Seção do Condutor (mm²)": secao_final,
-            "Disjuntor": disjuntor,
-            "Queda de Tensão (Volts)": queda_tensao_final,
-            "Corrente corrigida": corrente_corrigida,
-            "Corrente Nominal": corrente_nominal,
-            "Fator correção temperatura": fator_correcao_temp,
-            "Fator Agrupamento": fator_agrupamento,
-            "Número de fases" : circuito['num_fases'],
-            "Comprimento": circuito['comprimento'], 
-            "Tipo de alimentação": installmet
-
-        })
-
-        # Atualizando circuito com novos dados
-        circuito.update({
-            'Seção do Condutor (mm²)': secao_final,
-            'Disjuntor (Ampere)': disjuntor,
-            'Queda de Tensão (Volts)': queda_tensao_final,
-            'Corrente corrigida': corrente_corrigida,
-            'Corrente Nominal': corrente_nominal,
-            'Fator correção temperatura': fator_correcao_temp,
-            'Fator Agrupamento': fator_agrupamento
-        })
-
-    return pd.DataFrame(resultados), lista_circuitos
-
-def calcular_disjuntor_geral(circuitos, tabela_fator_demanda, tensao_nominal):
-    disjuntores_gerais = {}
-    quadros = {}
-    for circuito in circuitos:
-        quadro = circuito['Quadro']
-        if quadro not in quadros:
-            quadros[quadro] = []
-        quadros[quadro].append(circuito)
-    for quadro, circuitos_quadro in quadros.items():
-        num_circuitos_quadro = len(circuitos_quadro)
-        fator_demanda_quadro = tabela_fator_demanda.get(num_circuitos_quadro, 1)
-        potencia_total_quadro = sum(circuito['potencia'] for circuito in circuitos_quadro)
-        corrente_total_quadro = calcular_corrente_nominal(potencia_total_quadro * fator_demanda_quadro, tensao_nominal, 0.9, 3)
-        disjuntor_quadro = encontrar_disjuntor_menor(corrente_total_quadro, data_tables['valores nominais de disjuntores'])
-        disjuntores_gerais[quadro] = disjuntor_quadro
-    return disjuntores_gerais
-
-def calcular_disjuntor_qgbt(disjuntores_gerais, tabela_fator_demanda_qgbt, tensao_nominal):
-    corrente_total = sum(disjuntores_gerais.values())
-    num_quadros = len(disjuntores_gerais)
-    fator_demanda_qgbt = tabela_fator_demanda_qgbt.loc[tabela_fator_demanda_qgbt['num_circuitos'] == num_quadros, 'FatordeDemanda'].iloc[0]
-    corrente_ajustada = corrente_total * fator_demanda_qgbt
-    disjuntor_qgbt = corrente_ajustada
-    return disjuntor_qgbt
-
-def distribuir_fases(circuitos, fases_qd):
-    carga_fase = {'R': 0, 'S': 0, 'T': 0}
-    
-    for circuito in circuitos:
-        num_fases = circuito['num_fases']
-        potencia = circuito['potencia']
-        
-        if fases_qd == 3:
-            if num_fases == 1:
-                fase = min(carga_fase, key=carga_fase.get)
-                carga_fase[fase] += potencia
-                circuito['Fases'] = fase
-            elif num_fases == 2:
-                fases = sorted(carga_fase, key=carga_fase.get)[:2]
-                carga_fase[fases[0]] += potencia / 2
-                carga_fase[fases[1]] += potencia / 2
-                circuito['Fases'] = fases[0] + fases[1]
-            elif num_fases == 3:
-                carga_fase['R'] += potencia / 3
-                carga_fase['S'] += potencia / 3
-                carga_fase['T'] += potencia / 3
-                circuito['Fases'] = 'RST'
-        
-        elif fases_qd == 2:
-            if num_fases == 1:
-                fase = min(['R', 'S'], key=lambda f: carga_fase[f])
-                carga_fase[fase] += potencia
-                circuito['Fases'] = fase
-            elif num_fases == 2:
-                carga_fase['R'] += potencia / 2
-                carga_fase['S'] += potencia / 2
-                circuito['Fases'] = 'RS'
-        
-        elif fases_qd == 1:
-            if num_fases == 1:
-                carga_fase['R'] += potencia
-                circuito['Fases'] = 'R'
-            else:
-                st.warning('Existem circuitos que necessitam de mais de uma fase, reveja a Configuração da Alimentação Geral', icon="⚠️")
-    
-    return circuitos
-
-
-def encontrar_disjuntor_menor(corrente, tabela_disjuntores):
-    tabela_disjuntores_ordenada = tabela_disjuntores.sort_values(by='Corrente nominal', ascending=False)
-    for index, disjuntor in tabela_disjuntores_ordenada.iterrows():
-        if disjuntor['Corrente nominal'] < corrente:
-            return disjuntor['Corrente nominal']
-    return None
-
-def ordenar_circuitos(circuitos):
-    def extrair_numero(nome):
-        # Extrai o número antes do traço do nome do circuito
-        partes = nome.split('-')
-        if len(partes) > 0:
-            try:
-                return int(''.join(filter(str.isdigit, partes[0])))
-            except ValueError:
-                return float('inf')  # Caso não tenha número, coloca no final
-        return float('inf')
-    
-    return sorted(circuitos, key=lambda x: extrair_numero(x['nome']))
-
-def criar_lista_materiais(circuitos, disjuntores_gerais):
-    materiais = {}
-    for circuito in circuitos:
-        num_fases = circuito['num_fases']
-        disjuntor = circuito['Disjuntor (Ampere)']
-        if num_fases not in materiais:
-            materiais[num_fases] = {}
-        if disjuntor not in materiais[num_fases]:
-            materiais[num_fases][disjuntor] = 0
-        materiais[num_fases][disjuntor] += 1
-    for quadro, disjuntor_quadro in disjuntores_gerais.items():
-        num_fases = 3
-        if num_fases not in materiais:
-            materiais[num_fases] = {}
-        if disjuntor_quadro not in materiais[num_fases]:
-            materiais[num_fases][disjuntor_quadro] = 0
-        materiais[num_fases][disjuntor_quadro] += 1
-    return materiais
-
-def ler_materiais_existentes(nome_arquivo):
-    df = pd.read_excel(nome_arquivo)
-    materiais_existentes = {}
-    for _, row in df.iterrows():
-        num_fases = row['num_fases']
-        corrente = row['corrente']
-        quantidade = row['Quantidade']
-        if num_fases not in materiais_existentes:
-            materiais_existentes[num_fases] = {}
-        if corrente not in materiais_existentes[num_fases]:
-            materiais_existentes[num_fases][corrente] = 0
-        materiais_existentes[num_fases][corrente] += quantidade
-    return materiais_existentes
-
-def cruzar_listas_materiais(materiais_necessarios, materiais_existentes):
-    materiais_compra = {}
-    materiais_ociosos = {k: v.copy() for k, v in materiais_existentes.items()}
-    for num_fases, disjuntores in materiais_necessarios.items():
-        for corrente, quantidade_necessaria in disjuntores.items():
-            if num_fases not in materiais_ociosos:
-                materiais_ociosos[num_fases] = {}
-            quantidade_existente = materiais_ociosos[num_fases].get(corrente, 0)
-            quantidade_comprar = max(0, quantidade_necessaria - quantidade_existente)
-            if quantidade_comprar > 0:
-                if num_fases not in materiais_compra:
-                    materiais_compra[num_fases] = {}
-                materiais_compra[num_fases][corrente] = quantidade_comprar
-            materiais_ociosos[num_fases][corrente] = max(0, quantidade_existente - quantidade_necessaria)
-    for num_fases in materiais_existentes:
-        for corrente in materiais_existentes[num_fases]:
-            if num_fases not in materiais_necessarios or corrente not in materiais_necessarios[num_fases]:
-                quantidade_existente = materiais_existentes[num_fases].get(corrente, 0)
-                materiais_ociosos[num_fases][corrente] = max(materiais_ociosos[num_fases].get(corrente, 0), quantidade_existente)
-    return materiais_compra, materiais_ociosos
-
-# Função para ler os dados dos circuitos da planilha Excel
-def ler_circuitos_de_excel(file_path):
-    circuito_data = pd.read_excel(file_path)
-    circuitos = circuito_data.to_dict(orient='records')
-    return circuitos
+from calculos import (
+    calcular_parametros_circuitos,
+    calcular_disjuntor_geral,
+    calcular_disjuntor_qgbt,
+    distribuir_fases,
+    definir_num_fases,
+    preparar_circuitos_para_calculo,
+    escolher_quadros_sinapi,
+    montar_tabela_materiais,
+    montar_orcamento,
+)
+from previa_unifilar import previa_unifilar
+from pacote_artefatos import NOME_PACOTE, planilha_xlsx, diagrama_dxf, memorial_tex, memorial_pdf, gerar_pacote
+from demanda_simulada import simular_demanda, calcular_disjuntores_simulados
+from catalogo_protecao import obter_catalogo
+from armazenamento_projetos import ArmazemProjetos
+from carteira_projetos import gravar_execucao
+from diferenca_revisoes import comparar_revisao
+from conjuntos_referencia import obter_registro, NOME_PADRAO
+from instantaneo_referencias import obter_instantaneo
+from circuitos_por_ambiente import gerar_circuitos_ambientes
+from planta_baixa import extrair_circuitos, preencher_circuitos, CAMADA_ELETRODUTOS, CAMADA_QUADROS, CAMADA_PONTOS
+from tabela_circuitos import TabelaCircuitos
+from validacao import validar_circuitos
+from estoque import demanda_materiais, ler_estoque, reconciliar
+from comparacao_alimentacao import comparar_alimentacoes
+from verificacao_protecao import verificar_protecao, ICC_ORIGEM_PADRAO_KA
+from dimensionamento_economico import (
+    dimensionar_economico,
+    TARIFA_PADRAO,
+    HORAS_ANUAIS_PADRAO,
+    ANOS_PADRAO,
+    TAXA_DESCONTO_PADRAO,
+)
+from editor_circuitos import (
+    LIMITE_EDITOR_COMPLETO,
+    LINHAS_POR_PAGINA,
+    TODOS_QUADROS,
+    preparar_base,
+    quadros_da_base,
+    fatiar,
+    mesclar_edicoes,
+)
+from historico_edicoes import HistoricoEdicoes
 
 # Função para carregar dados
 def ler_dados(file_path):
@@ -390,314 +59,6 @@ def ler_dados(file_path):
     data_tables = {sheet_name: data_sheets[sheet_name] for sheet_name in data_sheets}
     return data_tables
 
-def formatar_tabela_latex(circuitos, disjuntores_gerais, disjuntor_qgbt):
-    tabela_latex = "\\begin{landscape} \n"
-    tabela_latex +="\\section{Memória de Cálculo dos Circuitos - Tabelas} \n"
-    tabela_latex +="\\fontsize{5}{5}\selectfont \n"
-    tabela_latex += "\\begin{tabular}{|l|l|l|l|l|l|l|l|l|l|l|l|l|}\n\\hline\n"
-    tabela_latex += "Nome do Circuito & Potência (W) & Tensão (V) & FP & Nº de Fases & Temp (°C) & Nº de Circuitos & Comprimento (km) & Condutor(mm²) & Disjuntor(A) & delta (V) & Fases & Quadro \\\\ \\hline\n"
-    circuitos_ordenados = ordenar_circuitos(circuitos)
-    for circuito in circuitos_ordenados:
-        linha = f"{circuito['nome']} & {circuito['potencia']} & {circuito['tensao']} & {circuito['fator_potencia']} & {circuito['num_fases']} & {circuito['temperatura']} & {circuito['num_circuitos']} & {circuito['comprimento']} & {circuito['Seção do Condutor (mm²)']} & {circuito['Disjuntor (Ampere)']} & {round(circuito['Queda de Tensão (Volts)'],2)} & {circuito['Fases']} & {circuito['Quadro']} \\\\ \\hline\n"
-        tabela_latex += linha
-    tabela_latex += "\\end{tabular}\n\n"
-    tabela_latex += "\\begin{tabular}{|l|l|}\n\\hline\n"
-    tabela_latex += "Quadro & Disjuntor Geral (A) \\\\ \\hline\n"
-    for quadro, disjuntor in disjuntores_gerais.items():
-        linha_disjuntor = f"{quadro} & {disjuntor} \\\\ \\hline\n"
-        tabela_latex += linha_disjuntor
-    tabela_latex += "\\hline\n"
-    tabela_latex += f"QGBT & {disjuntor_qgbt} \\\\ \\hline\n"
-    tabela_latex += "\\end{tabular} \n"
-    tabela_latex += "\\end{landscape}"
-    return tabela_latex
-
-def memcalc(circuitos, resultados_circuitos, tabela_queda_tensao):
-    latex_content = "\\section{Memória de Cálculo dos Circuitos}\n\n"
-    circuitos_ordenados = ordenar_circuitos(circuitos)
-    for circuito in circuitos_ordenados:
-        nome = circuito['nome']
-        potencia = circuito['potencia']
-        tensao = circuito['tensao']
-        fator_potencia = circuito['fator_potencia']
-        num_fases = circuito['num_fases']
-        secao_condutor = circuito['Seção do Condutor (mm²)']
-        comprimento = circuito['comprimento']
-        resultado = resultados_circuitos.loc[resultados_circuitos['Nome do Circuito'] == nome].iloc[0]
-        corrente_nominal = resultado['Corrente Nominal']
-        corrente_nominal = round(corrente_nominal, 2)
-        fator_agrupamento = resultado['Fator Agrupamento']
-        fator_correcao_temp = resultado['Fator correção temperatura']
-        corrente_corrigida = resultado['Corrente corrigida']
-        corrente_corrigida = round(corrente_corrigida, 2)
-        valor_queda_tensao = tabela_queda_tensao.loc[tabela_queda_tensao['seção do condutor'] == secao_condutor, 'Queda de tensão (V/A.km)'].iloc[0]
-        queda_tensao = valor_queda_tensao * corrente_nominal * comprimento
-        queda_tensao = round(queda_tensao,2)
-
-        n_factor = '0' if num_fases == 1 else '1' if num_fases == 2 else '2'
-        latex_content += f"\\subsection*{{Circuito: {nome}}}\n"
-        latex_content += "\\begin{itemize}\n"
-        latex_content += f"    \\item \\textbf{{Dados do Circuito:}} Potência = {potencia}W, Tensão = {tensao}V, Fator de Potência = {fator_potencia}, Número de Fases = {num_fases}.\n"
-        latex_content += f"    \\item \\textbf{{Cálculo da Corrente Nominal (Inominal):}} \[ I_{{\\text{{nominal}}}} = \\frac{{{potencia}}}{{\\sqrt{{3}}^{{{n_factor}}} \\times {tensao} \\times {fator_potencia}}} \] = {corrente_nominal} A.\n"
-        latex_content += f"    \\item \\textbf{{Cálculo da Corrente Corrigida (Icorrigida):}} \n"
-        latex_content += f"    \\[ I_{{\\text{{corrigida}}}} = \\frac{{I_{{\\text{{nominal}}}}}}{{\\text{{Fator Temperatura}} \\times \\text{{Fator Agrupamento}}}} = \\frac{{{corrente_nominal}}}{{{fator_correcao_temp} \\times {fator_agrupamento}}} \\] = {corrente_corrigida} A.\n"
-        latex_content += "    \\item \\textbf{{Cálculo da Queda de Tensão:}}\n"
-        latex_content += "    A queda de tensão é calculada pela fórmula: \n"
-        latex_content += "    \\[ $\\Delta V = I_{\\text{nominal}} \\times \\text{Comprimento} \\times \\text{(V/A.km)}$ \\]\n"
-        latex_content += f"    Onde para este circuito, \n"
-        latex_content += f"    \\begin{{align*}}\n"
-        latex_content += f"    I_{{\\text{{nominal}}}} &= {corrente_nominal} \\text{{ A}}, \\\\\n"
-        latex_content += f"    \\text{{Comprimento}} &= {comprimento} \\text{{ km}}, \\\\\n"
-        latex_content += f"    \\text{{Seção do Condutor (mm²)}} &= {circuito['Seção do Condutor (mm²)']} \\text{{ mm²}}, \\\\\n"
-        latex_content += f"    \\text{{Queda de Tensão (V/A.km)}} &= {valor_queda_tensao} \\text{{ V/A.km}}. \n"
-        latex_content += f"    \\end{{align*}}\n"
-        latex_content += f"    Portanto, a queda de tensão calculada é: \n"
-        latex_content += f"    \\[ \\Delta V = {valor_queda_tensao} \\times {corrente_nominal} \\times {comprimento} = {queda_tensao} \\text{{ V}}. \\]\n"
-        latex_content += "\\end{itemize}\n\n"
-    return latex_content
-
-def criar_relatorio_latex(circuitos, resultados, caminho_salvar, disjuntores_gerais, disjuntor_qgbt, data_tables):
-    doc = Document(documentclass='article', document_options='11pt')
-    
-    # Adiciona os pacotes necessários
-    doc.packages.append(Package('makeidx'))
-    doc.packages.append(Package('multirow'))
-    doc.packages.append(Package('multicol'))
-    doc.packages.append(Package('xcolor', options='dvipsnames,svgnames,table'))
-    doc.packages.append(Package('graphicx'))
-    doc.packages.append(Package('epstopdf'))
-    doc.packages.append(Package('ulem'))
-    doc.packages.append(Package('hyperref'))
-    doc.packages.append(Package('amsmath'))
-    doc.packages.append(Package('lmodern'))
-    doc.packages.append(Package('amssymb'))
-    doc.packages.append(Package('pdflscape'))
-    doc.packages.append(Package('geometry', options='paperwidth=595pt,paperheight=841pt,top=23pt,right=56pt,bottom=56pt,left=56pt'))
-    
-    # Adiciona o autor e título
-    doc.preamble.append(Command('author', 'CHRISTINE CACERES BURGHART'))
-    doc.preamble.append(Command('title', ''))
-    
-    # Adiciona o novo ambiente de indentação
-    doc.preamble.append(NoEscape(r"""
-    \makeatletter
-    \newenvironment{indentation}[3]%
-    {\par\setlength{\parindent}{#3}
-    \setlength{\leftmargin}{#1}       \setlength{\rightmargin}{#2}%
-    \advance\linewidth -\leftmargin       \advance\linewidth -\rightmargin%
-    \advance\@totalleftmargin\leftmargin  \@setpar{{\@@par}}%
-    \parshape 1\@totalleftmargin \linewidth\ignorespaces}{\par}%
-    \makeatother
-    """))
-    
-    # Adiciona o início do documento
-    doc.append(NoEscape(r'\begin{document}'))
-    doc.append(NoEscape(r'\begin{center}'))
-    doc.append(NoEscape(r'\large \textbf{OBJETO:} Memorial de dimensionamento para os circuitos do NOMEDOPROJETO'))
-    doc.append(NoEscape(r'\end{center}'))
-    
-    # Adiciona seções ao documento
-    with doc.create(Section('Introdução')):
-        doc.append('Este documento descreve o procedimento técnico detalhado para o dimensionamento de condutores e disjuntores em circuitos elétricos residenciais, baseando-se nas normas técnicas ABNT NBR 5410 e ABNT NBR 5471. A metodologia aborda a determinação da seção transversal dos condutores e a escolha de disjuntores, levando em consideração critérios como capacidade de condução de corrente, queda de tensão, e proteção contra sobrecarga e curto-circuito.')
-    
-    with doc.create(Section('Metodologia e Normas Aplicadas')):
-        doc.append('O dimensionamento dos condutores elétricos segue as diretrizes estabelecidas pelas normas ABNT NBR 5410 e ABNT NBR 5471, que definem os padrões para instalações elétricas de baixa tensão e para condutores de energia elétrica, respectivamente.')
-    
-    with doc.create(Section('Cálculos e Resultados')):
-        with doc.create(Subsection('Cálculo da Corrente Nominal do Circuito')):
-            doc.append(NoEscape(r'A corrente nominal (\(I_{\text{nominal}}\)) é calculada pela fórmula:'))
-            doc.append(NoEscape(r'\[ I_{\text{nominal}} = \frac{P}{\sqrt{3} \cdot V \cdot \cos(\phi)} \]'))
-            doc.append(NoEscape(r'para circuitos trifásicos, e'))
-            doc.append(NoEscape(r'\[ I_{\text{nominal}} = \frac{P}{V \cdot \cos(\phi)} \]'))
-            doc.append(NoEscape(r'para circuitos monofásicos, onde \(P\) é a potência, \(V\) a tensão e \(\cos(\phi)\) o fator de potência.'))
-        
-        with doc.create(Subsection('Cálculo da Corrente Corrigida')):
-            doc.append(NoEscape(r'A corrente corrigida (\(I_{\text{corrigida}}\)) considera os fatores de temperatura e agrupamento:'))
-            doc.append(NoEscape(r'\[ I_{\text{corrigida}} = \frac{I_{\text{nominal}}}{\text{Fator\_Temperatura} \times \text{Fator\_Agrupamento}} \]'))
-        
-        with doc.create(Subsection('Seleção do Condutor')):
-            doc.append('A seleção do condutor é realizada garantindo que sua capacidade de corrente seja maior que \( I_{\text{corrigida}} \). A seção mínima é determinada pelo método de instalação e as especificações da norma ABNT NBR 5410.')
-        
-        with doc.create(Subsection('Cálculo da Queda de Tensão')):
-            doc.append('A queda de tensão é calculada considerando a resistência e a reatância do condutor, bem como a distância do circuito:')
-            doc.append(NoEscape(r'\[ \Delta V =  {I_{\text{nominal}} \times \text{comprimento} \times \text{V/A.km} \]'))
-        
-        with doc.create(Subsection('Escolha do Disjuntor')):
-            doc.append(NoEscape(r'O disjuntor é selecionado assegurando que \( I_{\text{corrigida}} < \) I_{\text{disjuntor}} \( < \) Capacidade de corrente do condutor.'))
-
-    tabela_latex = formatar_tabela_latex(circuitos, disjuntores_gerais, disjuntor_qgbt)
-    doc.append(NoEscape(tabela_latex))
-    memcal = memcalc(circuitos, resultados, data_tables['queda de tensão'])
-    doc.append(NoEscape(memcal))
-    doc.append(NoEscape(r"""
-                        \newpage
-                        """))
-    with doc.create(Section('Anexo - Tabelas da NBR 5410')):
-        doc.append(NoEscape(r"""
-            As tabelas apresentadas a seguir são utilizadas no memorial de cálculo e foram retiradas da norma NBR 5410. 
-            Elas servem como referência para determinar capacidades de condução de corrente, fatores de correção de temperatura, fatores de agrupamento de circuitos, queda de tensão por seção de condutor, e seções mínimas dos condutores de proteção (terra) e neutro. 
-            Essas informações são essenciais para garantir a segurança e a eficiência das instalações elétricas, conforme os padrões exigidos pela norma.
-
-            \begin{table}[h]
-            \centering
-            \resizebox{\textwidth}{!}{%
-            \begin{tabular}{|c|c|c|c|c|c|c|}
-            \hline
-            \multirow{2}{*}{\textbf{Seção do condutor}} & \multicolumn{2}{c|}{\textbf{Método B1}} & \multicolumn{2}{c|}{\textbf{Método B2}} & \multicolumn{2}{c|}{\textbf{Método C}} \\ \cline{2-7}
-            & \textbf{2 condutores carregados} & \textbf{3 condutores carregados} & \textbf{2 condutores carregados} & \textbf{3 condutores carregados} & \textbf{2 condutores carregados} & \textbf{3 condutores carregados} \\ \hline
-            2.5 mm² & 31 A & 28 A & 30 A & 26 A & 33 A & 30 A \\ \hline
-            4 mm² & 42 A & 37 A & 40 A & 35 A & 45 A & 40 A \\ \hline
-            6 mm² & 54 A & 48 A & 51 A & 44 A & 58 A & 52 A \\ \hline
-            10 mm² & 75 A & 66 A & 69 A & 60 A & 80 A & 71 A \\ \hline
-            16 mm² & 100 A & 88 A & 91 A & 80 A & 107 A & 96 A \\ \hline
-            25 mm² & 133 A & 117 A & 119 A & 105 A & 138 A & 119 A \\ \hline
-            35 mm² & 164 A & 144 A & 146 A & 128 A & 171 A & 147 A \\ \hline
-            50 mm² & 198 A & 175 A & 175 A & 154 A & 209 A & 179 A \\ \hline
-            70 mm² & 253 A & 222 A & 221 A & 194 A & 269 A & 229 A \\ \hline
-            95 mm² & 306 A & 269 A & 265 A & 233 A & 328 A & 278 A \\ \hline
-            120 mm² & 354 A & 312 A & 305 A & 268 A & 382 A & 322 A \\ \hline
-            150 mm² & 407 A & 358 A & 349 A & 307 A & 441 A & 371 A \\ \hline
-            185 mm² & 464 A & 408 A & 395 A & 348 A & 508 A & 424 A \\ \hline
-            240 mm² & 546 A & 481 A & 462 A & 407 A & 599 A & 500 A \\ \hline
-            \end{tabular}
-            }
-            \caption{Tabela de capacidades de condução de corrente para diferentes seções de condutores e métodos de instalação.}
-            \label{tab:capacidades}
-            \end{table}
-
-            \vspace{0.3cm} % Espaço vertical reduzido
-
-            \begin{table}[h]
-            \centering
-            \begin{tabular}{|c|c|}
-            \hline
-            \textbf{Temperatura} & \textbf{Fator de correção de Temperatura} \\ \hline
-            10 ºC & 1.15 \\ \hline
-            15 ºC & 1.12 \\ \hline
-            20 ºC & 1.08 \\ \hline
-            25 ºC & 1.04 \\ \hline
-            35 ºC & 0.96 \\ \hline
-            40 ºC & 0.91 \\ \hline
-            45 ºC & 0.87 \\ \hline
-            \end{tabular}
-            \caption{Tabela de Fatores de Temperatura}
-            \label{tab:fatores_temperatura}
-            \end{table}
-
-            \vspace{0.3cm} % Espaço vertical reduzido
-
-            \begin{table}[h]
-            \centering
-            \begin{tabular}{|c|c|}
-            \hline
-            \textbf{Agrupamento de circuitos} & \textbf{Fator de Agrupamento} \\ \hline
-            1 & 1 \\ \hline
-            2 & 0.8 \\ \hline
-            3 & 0.7 \\ \hline
-            4 & 0.65 \\ \hline
-            5 & 0.65 \\ \hline
-            6 & 0.57 \\ \hline
-            7 & 0.54 \\ \hline
-            8 & 0.52 \\ \hline
-            9 & 0.5 \\ \hline
-            10 & 0.5 \\ \hline
-            \end{tabular}
-            \caption{Tabela de Fatores de Agrupamento de Circuitos}
-            \label{tab:fatores_agrupamento}
-            \end{table}
-
-            \vspace{0.3cm} % Espaço vertical reduzido
-
-            \begin{table}[h]
-            \centering
-            \begin{tabular}{|c|c|}
-            \hline
-            \textbf{Seção do condutor} & \textbf{Queda de tensão (V/A.km)} \\ \hline
-            2.5 mm² & 18 \\ \hline
-            4 mm² & 12 \\ \hline
-            6 mm² & 7.6 \\ \hline
-            10 mm² & 4.5 \\ \hline
-            16 mm² & 2.7 \\ \hline
-            25 mm² & 1.7 \\ \hline
-            35 mm² & 1.2 \\ \hline
-            50 mm² & 0.96 \\ \hline
-            70 mm² & 0.67 \\ \hline
-            95 mm² & 0.48 \\ \hline
-            120 mm² & 0.38 \\ \hline
-            150 mm² & 0.31 \\ \hline
-            185 mm² & 0.25 \\ \hline
-            240 mm² & 0.19 \\ \hline
-            \end{tabular}
-            \caption{Tabela de Queda de Tensão por Seção do Condutor}
-            \label{tab:queda_tensao}
-            \end{table}
-
-            \vspace{0.3cm} % Espaço vertical reduzido
-
-            \begin{table}[h]
-            \centering
-            \resizebox{\textwidth}{!}{%
-            \begin{tabular}{|c|c|}
-            \hline
-            \textbf{Seção dos condutores de fase S (mm²)} & \textbf{Seção mínima do condutor de proteção (mm²)} \\ \hline
-            S $\leq$ 16 & S \\ \hline
-            16 $<$ S $\leq$ 35 & 16 \\ \hline
-            S $>$ 35 & S/2 \\ \hline
-            \end{tabular}
-            }
-            \caption{Seção mínima do condutor de proteção (terra)}
-            \label{tab:secao_condutor_protecao}
-            \end{table}
-
-            \vspace{0.3cm} % Espaço vertical reduzido
-
-            \begin{table}[h]
-            \centering
-            \resizebox{\textwidth}{!}{%
-            \begin{tabular}{|c|c|}
-            \hline
-            \textbf{Seção dos condutores de fase (mm²)} & \textbf{Seção reduzida do condutor neutro (mm²)} \\ \hline
-            S $\leq$ 25 & S \\ \hline
-            35 & 25 \\ \hline
-            50 & 25 \\ \hline
-            70 & 35 \\ \hline
-            95 & 50 \\ \hline
-            120 & 70 \\ \hline
-            150 & 70 \\ \hline
-            185 & 95 \\ \hline
-            240 & 120 \\ \hline
-            300 & 150 \\ \hline
-            400 & 185 \\ \hline
-            \end{tabular}
-            }
-            \caption{Seção reduzida do condutor neutro}
-            \label{tab:secao_condutor_neutro}
-            \end{table}
-
-            """))
-    # Salvar o arquivo .tex
-    doc.generate_tex(caminho_salvar)
-
-def compile_tex_online(tex_content):
-    url = "https://latexonline.cc/compile"
-    params = {
-        "text": tex_content,  # Enviando o conteúdo do arquivo .tex
-        "command": "pdflatex"
-    }
-    response = requests.post(url, params=params)
-    if response.status_code == 200:
-        return response.content  # Retornando o conteúdo do PDF gerado
-    else:
-        return None
-    
-def selecionar_dr(corrente_disjuntor):
-    # Lista de correntes nominais dos DRs
-    correntes_dr = [25, 40, 63, 80]
-    for corrente in correntes_dr:
-        if corrente_disjuntor < corrente:
-            return corrente
-    return None  # Retorna None se não encontrar um DR adequado
-
 def adicionar_unidades(df):
     df['potencia'] = df['potencia'].astype(str) + ' W'
     df['Seção do Condutor (mm²)'] = df['Seção do Condutor (mm²)'].astype(str) + ' mm2'
@@ -709,147 +70,6 @@ def ordenar_por_nome(df):
         raise ValueError("A coluna 'nome' não está presente no DataFrame.")
     return df.sort_values(by='nome').reset_index(drop=True)
 
-doc = ezdxf.new(dxfversion='R2010')
-msp = doc.modelspace()
-def gerar_diagrama_unifilar(exemplos_circuitos,disjuntores_gerais,fases_Q):
-    # Agrupa os circuitos pelo quadro
-    if not isinstance(exemplos_circuitos, pd.DataFrame):
-        exemplos_circuitos = pd.DataFrame(exemplos_circuitos)
-    quadros = exemplos_circuitos.groupby('Quadro')
-    
-    x_offset = 0
-    y_offset = 0
-    y_offset_last=50
-    for nome_quadro, df_quadro in quadros:
-        # Adiciona um bloco para o quadro
-        
-        y_offset -= 50  # Espaçamento entre o quadro e seus circuitos
-
-        df_unifilar = pd.DataFrame({
-            'num_fases': [circuito['num_fases'] for circuito in df_quadro.to_dict('records')],
-            'nome': [circuito['nome'] for circuito in df_quadro.to_dict('records')],
-            'potencia': [f"{circuito['potencia']} W" for circuito in df_quadro.to_dict('records')],
-            'Seção do Condutor (mm²)': [f"{circuito['Seção do Condutor (mm²)']} mm2" for circuito in df_quadro.to_dict('records')],
-            'Disjuntor (Ampere)': [f"{circuito['Disjuntor (Ampere)']} A" for circuito in df_quadro.to_dict('records')],
-            'Fases': [circuito['Fases'] for circuito in df_quadro.to_dict('records')],
-            'num_fases1': [circuito['num_fases1'] for circuito in df_quadro.to_dict('records')],
-            'DR': [circuito['DR'] for circuito in df_quadro.to_dict('records')]
-        })
-        df_ordenado_unifilar = df_unifilar
-        quadro_min_x = float('inf')
-        quadro_min_y = float('inf')
-        quadro_max_x = float('-inf')
-        quadro_max_y = float('-inf')
-        num_circuitos = len(df_ordenado_unifilar)
-        circuito_central_index = num_circuitos // 2
-        for index, row in df_ordenado_unifilar.iterrows():
-            if row['num_fases'] == 1 and row['num_fases1'] == "F+N+T":
-                disjuntor_filename = 'Disjuntor_mono.dxf'
-                disjuntor_block_name = 'Disjuntor_Mono'
-                fios_filename = 'fios_mono.dxf'
-                fios_block_name = 'Fios_Mono'
-            elif row['num_fases'] == 1 and row['num_fases1'] == "F+N":
-                disjuntor_filename = 'Disjuntor_mono.dxf'
-                disjuntor_block_name = 'Disjuntor_Mono'
-                fios_filename = 'fios_mono2.dxf'
-                fios_block_name = 'Fios_Mono2'
-            elif row['num_fases'] == 2:
-                disjuntor_filename = 'Disjuntor_bi.dxf'
-                disjuntor_block_name = 'Disjuntor_Bi'
-                fios_filename = 'fios_bi.dxf'
-                fios_block_name = 'Fios_Bi'
-            elif row['num_fases'] == 3:
-                disjuntor_filename = 'Disjuntor_tri.dxf'
-                disjuntor_block_name = 'Disjuntor_Tri'
-                fios_filename = 'fios_tri.dxf'
-                fios_block_name = 'Fios_Tri'
-            disjuntor_attributes = {'corrente': str(row['Disjuntor (Ampere)'])}
-            fios_attributes = {
-                'seção': str(row['Seção do Condutor (mm²)']),
-                'Potência': str(row['potencia']),
-                'nome': row['nome'],
-                'fases': row['Fases']
-            }
-            corrente_disjuntor = int(row['Disjuntor (Ampere)'].replace(' A', ''))
-            insert_point_disjuntor = (x_offset, y_offset)
-            insert_dxf_block_with_attributes(msp, disjuntor_filename, disjuntor_block_name, insert_point_disjuntor, disjuntor_attributes)
-            if row['DR'] == True:
-                corrente_dr = selecionar_dr(corrente_disjuntor)
-                print("corrente_dr")
-                print(corrente_dr)
-                if corrente_dr:
-                    dr_filename = 'DR.dxf'
-                    dr_block_name = 'DR'
-                    dr_attributes = {'corrente': f'{str(corrente_dr)} A'} 
-                    insert_point_dr = (x_offset + 70, y_offset + 30)  # Ajusta a posição do DR
-                    insert_dxf_block_with_attributes(msp, dr_filename, dr_block_name, insert_point_dr, dr_attributes)
-                    insert_point_fios = (x_offset + 80, y_offset + 30)  # Ajusta a posição dos fios após o DR
-            else:
-                insert_point_fios = (x_offset + 70, y_offset + 30)
-            insert_dxf_block_with_attributes(msp, fios_filename, fios_block_name, insert_point_fios, fios_attributes)
-            if index == circuito_central_index:
-                if fases_Q == 3:
-                 entrada_tri_attributes = {
-                    'CORRENTE': str(disjuntores_gerais[nome_quadro])
-                    }
-                 insert_point_entrada_tri = (x_offset, y_offset + 30)
-                 insert_dxf_block_with_attributes(msp, 'entrada_tri.dxf', 'entrada', insert_point_entrada_tri, entrada_tri_attributes)
-                elif fases_Q == 2:
-                 fios_bi_attributes = {
-                    'CORRENTE': str(disjuntores_gerais[nome_quadro])
-                 }
-                 insert_point_fios_bi = (x_offset, y_offset + 30)
-                 insert_dxf_block_with_attributes(msp, 'entrada_bi.dxf', 'entrada', insert_point_fios_bi, fios_bi_attributes)
-                elif fases_Q == 1:
-                 fios_mono_attributes = {
-                    'CORRENTE': str(disjuntores_gerais[nome_quadro])
-                 }
-                 insert_point_fios_mono = (x_offset, y_offset + 30)
-                 insert_dxf_block_with_attributes(msp, 'entrada_mono.dxf', 'entrada', insert_point_fios_mono, fios_mono_attributes)
-            y_offset -= 30
-            
-
-            quadro_min_x = -70
-            quadro_min_y = y_offset
-            quadro_max_x = 90
-            quadro_max_y = y_offset_last-30
-    
-            
-        y_offset_last=y_offset-30
-        # Adiciona o retângulo em torno do quadro
-        padding = 10
-        msp.add_text(nome_quadro, dxfattribs={'height': 10}).set_placement((quadro_min_x-padding, quadro_max_y + 20), align=TextEntityAlignment.TOP_LEFT)
-        msp.add_lwpolyline([
-            (quadro_min_x - padding, quadro_max_y + padding),
-            (quadro_max_x + padding, quadro_max_y + padding),
-            (quadro_max_x + padding, quadro_min_y - padding),
-            (quadro_min_x - padding, quadro_min_y - padding),
-            (quadro_min_x - padding, quadro_max_y + padding)
-        ], close=True)
-
-        y_offset -= 70  # Espaçamento entre diferentes quadros
-
-    output_path = 'diagrama_unifilar_ajustado.dxf'
-    doc.saveas(output_path)
-    
-    return output_path
-
-def insert_dxf_block_with_attributes(msp, block_filename, block_name, insert_point, attributes):
-    try:
-        block_doc = ezdxf.readfile(block_filename)
-        if block_name not in block_doc.blocks:
-            raise ValueError(f"Block {block_name} not found in the file {block_filename}")
-        block = block_doc.blocks.get(block_name)
-        if block_name not in doc.blocks:
-            new_block = doc.blocks.new(name=block_name)
-            for entity in block:
-                new_block.add_entity(entity.copy())
-        block_ref = msp.add_blockref(block_name, insert_point)
-        for tag, value in attributes.items():
-            block_ref.add_attrib(tag, value)
-    except Exception as e:
-        print(f"Error inserting block {block_name} from {block_filename}: {e}")
-
 def reordenar_colunas(df):
     ordem_colunas = ['Potência', 'tensão', 'fator_potencia', 'num_fases', 'temperatura', 'num_circuitos', 'comprimento', 'queda_tensao_max_admitida', 'Quadro', 'met_instala']
     return df.reindex(columns=ordem_colunas)
@@ -928,9 +148,28 @@ Preencha a planilha de Circuitos. Você pode copiar e colar os dados diretamente
 """)
 file_path = 'sample_circuitos.xls'
 
-# Provide download link for the existing Excel file
-data_sheets = pd.read_excel('Dados para o gpt.xls', sheet_name=None)
-uploaded_file_dados = {sheet_name: data_sheets[sheet_name] for sheet_name in data_sheets}
+# Tabelas de referência: a planilha padrão e as variantes registradas ficam compiladas em memória.
+# Se o instantâneo foi gerado (python instantaneo_referencias.py), todos os processos do app o compartilham.
+instantaneo = obter_instantaneo(avisar=st.warning)
+registro_referencias = obter_registro(instantaneo=instantaneo)
+arquivo_referencias = st.file_uploader(
+    "Novo conjunto de tabelas de referência (opcional)", type=['xls', 'xlsx'],
+    help="Planilha com as mesmas abas de 'Dados para o gpt.xls' (ex.: alumínio, EPR/XLPE, outra linha de disjuntores). "
+         "Fica registrada com o nome do arquivo e pode ser escolhida nos próximos projetos."
+)
+if arquivo_referencias is not None:
+    try:
+        registro_referencias.registrar(arquivo_referencias.name.rsplit('.', 1)[0], arquivo_referencias.getvalue(),
+                                       arquivo_referencias.name)
+    except ValueError as erro:
+        st.error(str(erro))
+nomes_conjuntos = registro_referencias.nomes()
+nome_conjunto = st.selectbox(
+    "Tabelas de referência", nomes_conjuntos,
+    index=nomes_conjuntos.index(NOME_PADRAO) if NOME_PADRAO in nomes_conjuntos else 0
+)
+conjunto_referencia = registro_referencias.obter(nome_conjunto)
+uploaded_file_dados = conjunto_referencia.data_tables
 
 methods = [
     "2 condutores carregados – método B1",
@@ -972,12 +211,125 @@ if editor_fn:
     if config is not None:
         editor_kwargs["column_config"] = config
 
-    edited_circuitos = editor_fn(sample_data_df, **editor_kwargs)
-
-    if isinstance(edited_circuitos, pd.DataFrame):
-        uploaded_file_circuitos = edited_circuitos.to_dict(orient="records")
+    # A tabela mestre fica na sessão; o editor recebe só a fatia visível (quadro + página)
+    # e as edições são mescladas de volta pela chave de cada linha.
+    if 'circuitos_base' not in st.session_state:
+        st.session_state['circuitos_base'] = preparar_base(sample_data_df)
+        st.session_state['circuitos_editados'] = st.session_state['circuitos_base']
+        st.session_state['versao_editor'] = 0
+    if 'historico_edicoes' not in st.session_state:
+        st.session_state['historico_edicoes'] = HistoricoEdicoes(st.session_state['circuitos_base'])
+
+    def consolidar_edicoes():
+        st.session_state['circuitos_base'] = st.session_state['circuitos_editados']
+        st.session_state['versao_editor'] += 1
+
+    # Quadro de ambientes: circuitos gerados pela previsão mínima de cargas da NBR 5410
+    arquivo_ambientes = st.file_uploader(
+        "Quadro de ambientes (opcional)", type=['xlsx', 'xls'],
+        help="Substitui a tabela por circuitos gerados pelas cargas mínimas da NBR 5410 (iluminação e tomadas). "
+             "Colunas Tipo (sala, dormitório, cozinha, banheiro, área de serviço, varanda...) e Area (m²); opcionais: "
+             "Ambiente, Perimetro (m), Area molhada, Unidade (um quadro por unidade), Quadro, Distancia (m) e TUE (W)."
+    )
+    if arquivo_ambientes is not None and st.session_state.get('ambientes_aplicados') != (arquivo_ambientes.name, arquivo_ambientes.size):
+        st.session_state['ambientes_aplicados'] = (arquivo_ambientes.name, arquivo_ambientes.size)
+        try:
+            circuitos_gerados, cargas_ambientes = gerar_circuitos_ambientes(arquivo_ambientes, uploaded_file_dados)
+        except ValueError as erro:
+            st.session_state.pop('ambientes_resultado', None)
+            st.error(str(erro))
+        else:
+            base_gerada = preparar_base(circuitos_gerados)
+            st.session_state['circuitos_base'] = base_gerada
+            st.session_state['circuitos_editados'] = base_gerada
+            st.session_state['versao_editor'] += 1
+            st.session_state['ambientes_resultado'] = cargas_ambientes
+    if arquivo_ambientes is not None and 'ambientes_resultado' in st.session_state:
+        cargas_ambientes = st.session_state['ambientes_resultado']
+        st.caption(f"Quadro de ambientes: {cargas_ambientes['Ambiente'].nunique()} ambiente(s) em "
+                   f"{cargas_ambientes['Circuito'].nunique()} circuito(s) e {cargas_ambientes['Quadro'].nunique()} quadro(s).")
+        with st.expander("Cargas dos ambientes por circuito"):
+            st.dataframe(cargas_ambientes)
+
+    # Planta baixa: comprimento e agrupamento calculados pelos caminhos nos eletrodutos
+    arquivo_planta = st.file_uploader(
+        "Planta baixa com eletrodutos (opcional)", type=['dxf'],
+        help=f"Preenche o comprimento e o número de circuitos agrupados pelo menor caminho nos eletrodutos. "
+             f"Eletrodutos e eletrocalhas na camada {CAMADA_ELETRODUTOS}; quadros como blocos na camada "
+             f"{CAMADA_QUADROS} com o atributo QUADRO; pontos como blocos na camada {CAMADA_PONTOS} "
+             f"com os atributos CIRCUITO e QUADRO."
+    )
+    if arquivo_planta is not None and st.session_state.get('planta_aplicada') != (arquivo_planta.name, arquivo_planta.size):
+        st.session_state['planta_aplicada'] = (arquivo_planta.name, arquivo_planta.size)
+        try:
+            extraidos_planta, trechos_planta = extrair_circuitos(arquivo_planta.getvalue())
+        except ValueError as erro:
+            st.session_state.pop('planta_resultado', None)
+            st.error(str(erro))
+        else:
+            base_preenchida, fora_da_tabela = preencher_circuitos(st.session_state['circuitos_editados'], extraidos_planta)
+            st.session_state['circuitos_base'] = base_preenchida
+            st.session_state['circuitos_editados'] = base_preenchida
+            st.session_state['versao_editor'] += 1
+            st.session_state['planta_resultado'] = (extraidos_planta, trechos_planta, fora_da_tabela)
+    if arquivo_planta is not None and 'planta_resultado' in st.session_state:
+        extraidos_planta, trechos_planta, fora_da_tabela = st.session_state['planta_resultado']
+        com_erro = extraidos_planta[extraidos_planta['Erro'] != '']
+        st.caption(f"Planta: {len(extraidos_planta) - len(com_erro)} circuito(s) roteado(s), "
+                   f"{len(fora_da_tabela)} fora da tabela de circuitos.")
+        if not com_erro.empty:
+            st.warning(f"{len(com_erro)} circuito(s) da planta não puderam ser roteados.")
+        with st.expander("Circuitos e agrupamento pela planta"):
+            st.dataframe(extraidos_planta)
+            if not fora_da_tabela.empty:
+                st.markdown("Circuitos da planta que não estão na tabela:")
+                st.dataframe(fora_da_tabela)
+            st.dataframe(trechos_planta[trechos_planta['num_circuitos'] > 0])
+
+    base_circuitos = st.session_state['circuitos_base']
+    quadro_editor, pagina_editor = None, 0
+    if len(base_circuitos) > LIMITE_EDITOR_COMPLETO:
+        col_quadro, col_pagina = st.columns(2)
+        with col_quadro:
+            quadro_editor = st.selectbox("Quadro exibido no editor", [TODOS_QUADROS] + quadros_da_base(base_circuitos),
+                                         on_change=consolidar_edicoes)
+        num_paginas = fatiar(base_circuitos, quadro_editor)[2]
+        with col_pagina:
+            pagina_editor = st.number_input(f"Página (de {num_paginas})", min_value=1, max_value=num_paginas,
+                                            value=1, step=1, on_change=consolidar_edicoes) - 1
+        st.caption(f"{len(base_circuitos)} circuitos no projeto; exibindo até {LINHAS_POR_PAGINA} por página.")
+        fatia, chaves_fatia, _ = fatiar(base_circuitos, quadro_editor, pagina_editor)
     else:
-        uploaded_file_circuitos = edited_circuitos
+        fatia, chaves_fatia, _ = fatiar(base_circuitos, linhas_por_pagina=max(len(base_circuitos), 1))
+
+    edited_circuitos = editor_fn(fatia, key=f"editor_circuitos_{st.session_state['versao_editor']}", **editor_kwargs)
+    circuitos_editados = mesclar_edicoes(base_circuitos, chaves_fatia, edited_circuitos, quadro_editor)
+    st.session_state['circuitos_editados'] = circuitos_editados
+
+    # Histórico da tabela: cada edição vira uma revisão guardada só pelas linhas que mudaram
+    historico = st.session_state['historico_edicoes']
+    historico.registrar(circuitos_editados)
+
+    def ir_para_revisao(revisao):
+        tabela = st.session_state['historico_edicoes'].ir_para(revisao)
+        st.session_state['circuitos_base'] = tabela
+        st.session_state['circuitos_editados'] = tabela
+        st.session_state['versao_editor'] += 1
+
+    col_desfazer, col_refazer, col_revisao = st.columns([1, 1, 3])
+    with col_desfazer:
+        st.button("Desfazer", on_click=ir_para_revisao, args=(historico.revisao - 1,),
+                  disabled=not historico.pode_desfazer())
+    with col_refazer:
+        st.button("Refazer", on_click=ir_para_revisao, args=(historico.revisao + 1,),
+                  disabled=not historico.pode_refazer())
+    with col_revisao:
+        calculadas = historico.com_resultado()
+        rotulos_revisoes = [f"Revisão {r}" + (" (calculada)" if r in calculadas else "") for r in range(len(historico))]
+        st.selectbox("Revisão da tabela", rotulos_revisoes, index=historico.revisao, key='revisao_tabela',
+                     on_change=lambda: ir_para_revisao(rotulos_revisoes.index(st.session_state['revisao_tabela'])))
+
+    uploaded_file_circuitos = TabelaCircuitos.de_dataframe(circuitos_editados)
 else:
     st.info("Seu Streamlit é muito antigo para editor em tabela. Atualize para usar edição tabular.")
     raw_json = st.text_area(
@@ -990,25 +342,19 @@ else:
         parsed = json.loads(raw_json)
         if not isinstance(parsed, list):
             st.error("O JSON deve ser uma lista de circuitos.")
-            uploaded_file_circuitos = sample_data.copy()
+            uploaded_file_circuitos = TabelaCircuitos.de_registros(sample_data)
         else:
-            uploaded_file_circuitos = parsed
+            uploaded_file_circuitos = TabelaCircuitos.de_registros(parsed)
     except json.JSONDecodeError:
         st.error("JSON inválido. Usando dados de exemplo.")
-        uploaded_file_circuitos = sample_data.copy()
+        uploaded_file_circuitos = TabelaCircuitos.de_registros(sample_data)
 
 print("Tipo do objeto:", type(uploaded_file_circuitos))
 
 
 
 # Iterando sobre cada valor na coluna 'num_fases1' para determinar o valor de 'num_fases'
-for ckt in uploaded_file_circuitos:
-    if ckt['num_fases1'] in ["F+N", "F+N+T"]:
-        ckt['num_fases']=1
-    elif ckt['num_fases1']  == "F+F+T":
-        ckt['num_fases']=2
-    elif ckt['num_fases1']  == "F+F+F+T":
-        ckt['num_fases']=3
+definir_num_fases(uploaded_file_circuitos)
 
 
 
@@ -1028,6 +374,43 @@ elif tipo_alimentacao == "Bifásica":
     fases_QD = 2
 elif tipo_alimentacao == "Monofásica":
     fases_QD = 1
+simular_demanda_coincidente = st.checkbox(
+    "Dimensionar disjuntores gerais por simulação de demanda coincidente (8760 h)",
+    help="Usa curvas de carga por tipo de circuito (iluminação, TUG, chuveiro, ar condicionado, geral) "
+         "e o pico coincidente de cada quadro no lugar de soma(potência) x fator de demanda."
+)
+dimensionamento_economico = st.checkbox(
+    "Avaliar a seção econômica dos condutores (custo de perdas na vida útil)",
+    help="Compara, para cada circuito, a seção técnica com todas as seções maiores somando o custo SINAPI "
+         "dos condutores ao valor presente das perdas Joule (critério da NBR 15920)."
+)
+if dimensionamento_economico:
+    tarifa_energia = st.number_input("Tarifa de energia (R$/kWh)", min_value=0.0, value=TARIFA_PADRAO, step=0.05)
+    horas_anuais = st.number_input("Horas equivalentes de carga por ano", min_value=0, max_value=8760,
+                                   value=HORAS_ANUAIS_PADRAO, step=100)
+    vida_util = st.number_input("Vida útil (anos)", min_value=1, value=ANOS_PADRAO, step=1)
+    taxa_desconto = st.number_input("Taxa de desconto anual (%)", min_value=0.0,
+                                    value=TAXA_DESCONTO_PADRAO * 100, step=0.5)
+icc_origem = st.number_input(
+    "Corrente de curto-circuito presumida na entrada (kA)", min_value=0.1, value=ICC_ORIGEM_PADRAO_KA, step=0.5,
+    help="Informada pela concessionária. Usada para verificar a capacidade de interrupção, o disparo magnético, "
+         "a proteção dos condutores (k²S²) e a seletividade com o disjuntor geral."
+)
+arquivo_estoque = st.file_uploader(
+    "Estoque existente (opcional)", type=['xlsx', 'xls'],
+    help="Planilha com Deposito, Categoria (disjuntor, condutor, dr, quadro), Polos, Valor e Quantidade. "
+         "O formato antigo (num_fases, corrente, Quantidade) também é aceito."
+)
+arquivo_diagrama_anterior = st.file_uploader(
+    "Diagrama unifilar anterior (opcional)", type=['dxf'],
+    help="Se enviado, o diagrama é atualizado no lugar de redesenhado: só mudam os atributos dos circuitos alterados, "
+         "circuitos novos entram no fim do desenho e as anotações feitas no CAD são mantidas."
+)
+nome_projeto = st.text_input(
+    "Nome do projeto (opcional)",
+    help="Se preenchido, cada cálculo é salvo como uma nova revisão no banco local de projetos (projetos.sqlite) "
+         "e o levantamento e o orçamento entram na carteira de projetos (pasta carteira)."
+)
 st.sidebar.header("Sobre o Autor")
 st.sidebar.markdown("""
 Este aplicativo foi desenvolvido por [Matheus Vianna](https://matheusvianna.com). Engenheiro Eletricista com especialização em Ciência de Dados. Confira meu site clicando no meu nome!
@@ -1042,147 +425,56 @@ Se você gostou do programa e quer apoiar o desenvolvimento deste e de outros ap
 
 
 
-seção_neutro_map = {
-    25: 25,
-    35: 35,
-    50: 35,
-    70: 50,
-    95: 50,
-    120: 70,
-    150: 70,
-    185: 95,
-    240: 120,
-    300: 150,
-    400: 185
-}
-
-seção_terra_map = {
-    25: 16,
-    35: 16,
-    50: 25,
-    70: 35,
-    95: 50,
-    120: 70,
-    150: 95,
-    185: 95,
-    240: 120,
-    300: 150
-    }
-
-condutores_mapping = {
-    '1.5': 91925,
-    '2.5': 91926,
-    '4.0': 91928,
-    '6.0': 91930,
-    '10.0': 91932,
-    '16.0': 91934,
-    '10.0': 92979,
-    '16.0': 92981,
-    '25.0': 92984,
-    '35.0': 92986,
-    '50.0': 92988,
-    '70.0': 92990,
-    '95.0': 92992,
-    '120.0': 92994,
-    '150.0': 92996,
-    '185.0': 92998,
-    '240.0': 93000,
-    '300.0': 93002
-}
-
-disjuntores_mapping = {
-    1: {  # Monopolar
-        '4A': 93653, '6A': 93653, '10A': 93653, '16A': 93654, '20A': 93655, '25A': 93656, '32A': 93657, '40A': 93658, '50A': 93659
-    },
-    2: {  # Bipolar
-        '10A': 93660, '16A': 93661, '20A': 93662, '25A': 93663, '32A': 93664, '40A': 93665, '50A': 93666
-    },
-    3: {  # Tripolar
-        '10A': 93667, '16A': 93668, '20A': 93669, '25A': 93670, '32A': 93671, '40A': 93672, '50A': 93673
-    }
-}
-
-sinapi_quadros = {
-    3: 101877,
-    6: 101876,
-    12: 101875,
-    18: 101878,
-    24: 101879,
-    30: 101880,
-    40: 101881
-}
-
-sinapi_df = pd.read_excel('sinapi.xls', sheet_name='Planilha1')
-def get_disjuntor_sinapi(row):
-    fases = row['Número de fases']
-    disjuntor = f"{row['Disjuntor']}A"
-    return disjuntores_mapping.get(fases, {}).get(disjuntor)
-def calcular_custo_total(df, sinapi_df1):
-    # Criar um dicionário para mapeamento
-    custo_dict = sinapi_df1.set_index('CODIGO  DA COMPOSICAO')['CUSTO TOTAL'].to_dict()
-    nome_dict = sinapi_df1.set_index('CODIGO  DA COMPOSICAO')['DESCRICAO DA COMPOSICAO'].to_dict()
-    df['Descrição da Composição']=df['Codigo'].map(nome_dict)
-    # Mapear os custos totais para cada código no DataFrame df_agrupado
-    df['Custo Unitário'] = df['Codigo'].map(custo_dict)
-
-    # Multiplicar a quantidade pelo custo total para obter o custo total final
-    df['Custo Total'] = df['Quantidade'] * df['Custo Unitário']
-    return df
-
-def calcular_custo_totaldisj(df, sinapi_df1):
-    # Criar um dicionário para mapeamento
-    custo_dict = sinapi_df1.set_index('CODIGO  DA COMPOSICAO')['CUSTO TOTAL'].to_dict()
-    nome_dict = sinapi_df1.set_index('CODIGO  DA COMPOSICAO')['DESCRICAO DA COMPOSICAO'].to_dict()
-    df_agrupado = df['Codigo'].value_counts().reset_index()
-    df_agrupado.columns = ['Codigo', 'Quantidade']
-    # Mapear os custos totais e descrições para cada código no DataFrame df
-    df_agrupado['Descrição da Composição'] = df_agrupado['Codigo'].map(nome_dict)
-    df_agrupado['Custo Unitário'] = df_agrupado['Codigo'].map(custo_dict)
-    # Agrupar por código e calcular a quantidade total e custo total
-    df_agrupado['Custo Total'] = df_agrupado['Quantidade'] * df_agrupado['Custo Unitário']
-    
-    return df_agrupado
-
-def escolher_quadro(circuitos, sinapi_quadros):
-    for max_circuitos in sorted(sinapi_quadros.keys()):
-        if circuitos <= max_circuitos - 2:
-            return sinapi_quadros[max_circuitos]
-    return sinapi_quadros[max(sinapi_quadros.keys())]
-
-def calcular_custo_totalquadros(df, sinapi_df1):
-    # Criar um dicionário para mapeamento
-    custo_dict = sinapi_df1.set_index('CODIGO  DA COMPOSICAO')['CUSTO TOTAL'].to_dict()
-    nome_dict = sinapi_df1.set_index('CODIGO  DA COMPOSICAO')['DESCRICAO DA COMPOSICAO'].to_dict()
-    
-    # Mapear os custos totais e descrições para cada código no DataFrame df
-    df['Descrição da Composição'] = df['Codigo'].map(nome_dict)
-    df['Custo Unitário'] = df['Codigo'].map(custo_dict)
-    
-    # Agrupar por código e calcular a quantidade total e custo total
-    df_agrupado = df['Codigo'].value_counts().reset_index()
-    df_agrupado.columns = ['Codigo', 'Quantidade']
-    df_agrupado['Descrição da Composição'] = df_agrupado['Codigo'].map(nome_dict)
-    df_agrupado['Custo Unitário'] = df_agrupado['Codigo'].map(custo_dict)
-    df_agrupado['Custo Total'] = df_agrupado['Quantidade'] * df_agrupado['Custo Unitário']
-    
-    return df_agrupado
-
+sinapi_df = instantaneo.sinapi_df if instantaneo is not None else pd.read_excel('sinapi.xls', sheet_name='Planilha1')
+if uploaded_file_dados and st.button('Comparar alimentações (monofásica, bifásica e trifásica)'):
+    comparacao = comparar_alimentacoes(uploaded_file_circuitos, uploaded_file_dados, sinapi_df)
+    st.subheader('Comparação das Alimentações')
+    st.write(comparacao.drop(columns=['fases_qd']).T.astype(str))
+    viaveis = comparacao[comparacao['Viável']]
+    if not viaveis.empty:
+        st.markdown(f"Alimentação viável com menor corrente na fase mais carregada: "
+                    f"**{viaveis['Corrente na fase mais carregada (A)'].idxmin()}**")
 if uploaded_file_dados and st.button('Calcular Parâmetros'):
     data_tables = uploaded_file_dados
     if data_tables is not None:
         exemplos_circuitos = uploaded_file_circuitos
-        exemplos_circuitos_df = pd.DataFrame(exemplos_circuitos)
-        quadros_counts = exemplos_circuitos_df.groupby('Quadro').size()
-        quadros_escolhidos = quadros_counts.apply(lambda x: escolher_quadro(x, sinapi_quadros))
-        quadros_escolhidos_df = pd.DataFrame(quadros_escolhidos, columns=['Codigo'])
+        quadros_escolhidos_df = escolher_quadros_sinapi(exemplos_circuitos)
 
         if exemplos_circuitos is not None:
-            exemplos_circuitos=distribuir_fases(exemplos_circuitos,fases_QD)
-            print(exemplos_circuitos)
-            for circuito in exemplos_circuitos:
-                circuito['comprimento'] = circuito['comprimento'] / 1000 
-                circuito['queda_tensao_max_admitida'] = 0.05 * circuito['tensao']
-            resultados_circuitos, exemplos_circuitos = calcular_parametros_circuitos(exemplos_circuitos, data_tables)
+            relatorio_validacao = validar_circuitos(exemplos_circuitos, data_tables, fases_QD)
+            if not relatorio_validacao.empty:
+                st.error(f"{len(relatorio_validacao)} problema(s) encontrados nos circuitos. Corrija-os antes de calcular.")
+                st.dataframe(relatorio_validacao)
+                st.stop()
+            if nome_projeto:
+                try:
+                    with ArmazemProjetos() as armazem:
+                        circuitos_anteriores = armazem.carregar_circuitos(nome_projeto)
+                except KeyError:
+                    circuitos_anteriores = None
+                if circuitos_anteriores is not None:
+                    alteracoes, resumo_alteracoes, _ = comparar_revisao(
+                        circuitos_anteriores, exemplos_circuitos, data_tables, sinapi_df, fases_QD)
+                    st.subheader('Alterações em relação à revisão anterior')
+                    st.markdown(
+                        f"{resumo_alteracoes['novo']} novo(s), {resumo_alteracoes['removido']} removido(s), "
+                        f"{resumo_alteracoes['alterado']} alterado(s), {resumo_alteracoes['inalterado']} inalterado(s). "
+                        f"Delta do orçamento: **R$ {resumo_alteracoes['delta_custo']:,.2f}**")
+                    if not alteracoes.empty:
+                        st.dataframe(alteracoes)
+            # Voltar a uma revisão já calculada (mesmas tabelas e alimentação) não redimensiona
+            historico = st.session_state.get('historico_edicoes') if editor_fn else None
+            chave_resultado = (conjunto_referencia.nome, conjunto_referencia.versao, fases_QD)
+            calculado = historico.resultado(chave_resultado) if historico is not None else None
+            if calculado is None:
+                exemplos_circuitos=distribuir_fases(exemplos_circuitos,fases_QD)
+                print(exemplos_circuitos)
+                preparar_circuitos_para_calculo(exemplos_circuitos)
+                resultados_circuitos, exemplos_circuitos = calcular_parametros_circuitos(exemplos_circuitos, data_tables)
+                if historico is not None:
+                    historico.guardar_resultado(chave_resultado, (resultados_circuitos.copy(), exemplos_circuitos.copiar()))
+            else:
+                resultados_circuitos, exemplos_circuitos = calculado[0].copy(), calculado[1].copiar()
             st.subheader('Resultados dos Circuitos')
             st.write(resultados_circuitos)
             output = BytesIO()
@@ -1190,55 +482,9 @@ if uploaded_file_dados and st.button('Calcular Parâmetros'):
             output.seek(0)
             st.download_button(label="Baixar Resultados", data=output, file_name='resultados_circuitos.xlsx', mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
             st.subheader('Tabela de Materiais')
-            df_selecionado = resultados_circuitos[['Nome do Circuito', 'Seção do Condutor (mm²)', 'Disjuntor','Comprimento','Número de fases','Tipo de alimentação']]
-            df_selecionado['Quantidade de condutor fase'] = df_selecionado['Comprimento'] * df_selecionado['Número de fases']*1000
-            # Adicionar coluna para "Seção do Condutor Neutro" com regra de s <= 25
-            df_selecionado['Seção do Condutor Neutro (mm²)'] = df_selecionado['Seção do Condutor (mm²)'].apply(
-                lambda x: x if x <= 25 else seção_neutro_map.get(x, x)
-            )
-            # Adicionar coluna para "comprimento neutro"
-            df_selecionado['Comprimento neutro'] = df_selecionado.apply(
-                lambda row: row['Comprimento'] * 1000 if row['Número de fases'] == 1 else 0,
-                axis=1
-            )
-            # Adicionar coluna para "Seção do Condutor de Terra" com regra de s <= 16
-            df_selecionado['Seção do Condutor de Terra (mm²)'] = df_selecionado['Seção do Condutor (mm²)'].apply(
-                lambda x: x if x <= 16 else seção_terra_map.get(x, x)
-            )
-            # Adicionar coluna para "comprimento terra"
-            df_selecionado['Comprimento terra'] = df_selecionado.apply(
-                lambda row: row['Comprimento'] * 1000 if row['Tipo de alimentação'] != "F+N" else 0,
-                axis=1
-            )
-            #st.write(onsolidado_df)
-            df_selecionado['Codigo SINAPI Condutor Fase'] = df_selecionado['Seção do Condutor (mm²)'].astype(str).map(condutores_mapping)
-            df_selecionado['Codigo SINAPI Condutor Neutro'] = df_selecionado['Seção do Condutor Neutro (mm²)'].astype(str).map(condutores_mapping)
-            df_selecionado['Codigo SINAPI Condutor de Terra'] = df_selecionado['Seção do Condutor de Terra (mm²)'].astype(str).map(condutores_mapping)
-            df_selecionado['Codigo SINAPI Disjuntor'] = df_selecionado.apply(get_disjuntor_sinapi, axis=1)
-            print(sinapi_df)
-            df_fase = df_selecionado[['Codigo SINAPI Condutor Fase', 'Quantidade de condutor fase']].dropna().rename(
-                columns={'Codigo SINAPI Condutor Fase': 'Codigo', 'Quantidade de condutor fase': 'Quantidade'}
-            )
-            df_neutro = df_selecionado[['Codigo SINAPI Condutor Neutro', 'Comprimento neutro']].dropna().rename(
-                columns={'Codigo SINAPI Condutor Neutro': 'Codigo', 'Comprimento neutro': 'Quantidade'}
-            )
-            df_terra = df_selecionado[['Codigo SINAPI Condutor de Terra', 'Comprimento terra']].dropna().rename(
-                columns={'Codigo SINAPI Condutor de Terra': 'Codigo', 'Comprimento terra': 'Quantidade'}
-            )
-            
-            # Concatenar os DataFrames
-            df_conductors = pd.concat([df_fase, df_neutro, df_terra])
-            # Somar as quantidades por código
-            df_conductors = df_conductors.groupby('Codigo', as_index=False).sum()
-            print(df_conductors)
-            
-            custos_df=calcular_custo_total(df_conductors,sinapi_df)
-            df_disjuntoresaux = df_selecionado.apply(get_disjuntor_sinapi, axis=1)
-            df_disjuntores = df_disjuntoresaux.to_frame(name='Codigo')
-            custos_disj=calcular_custo_totaldisj(df_disjuntores,sinapi_df)
-            custo_total_quadros = calcular_custo_totalquadros(quadros_escolhidos_df, sinapi_df)
-            df_custosconcat = pd.concat([custo_total_quadros, custos_disj, custos_df], axis=0, ignore_index=True)
-            print(custos_df)
+            catalogo = obter_catalogo(data_tables['valores nominais de disjuntores'])
+            df_selecionado = montar_tabela_materiais(resultados_circuitos, catalogo)
+            df_custosconcat = montar_orcamento(df_selecionado, quadros_escolhidos_df, sinapi_df)
             st.write(df_selecionado[['Nome do Circuito','Seção do Condutor (mm²)','Disjuntor','Quantidade de condutor fase','Seção do Condutor Neutro (mm²)','Comprimento neutro','Seção do Condutor de Terra (mm²)','Comprimento terra']])
             st.subheader('Orçamento com Base SINAPI')
             st.write(df_custosconcat)
@@ -1248,20 +494,76 @@ if uploaded_file_dados and st.button('Calcular Parâmetros'):
                 O custo total é de **R$ {total_custo:,.2f}**
                     """
             ))
-            disjuntoresgerais=calcular_disjuntor_geral(exemplos_circuitos,data_tables['FatordeDemanda'],127)
-            disjQGBT=calcular_disjuntor_qgbt(disjuntoresgerais,data_tables['FatordeDemanda'],127)
-            output_path = gerar_diagrama_unifilar(exemplos_circuitos,disjuntoresgerais,fases_QD)
-            st.success(f"Diagrama salvo em {output_path}")
-            st.success(f"Memorial de Cálculo salvo em memcalc.tex")
-            col1, col2 = st.columns(2)
+            if dimensionamento_economico:
+                economico = dimensionar_economico(exemplos_circuitos, data_tables, sinapi_df, tarifa=tarifa_energia,
+                                                  horas_anuais=horas_anuais, anos=vida_util,
+                                                  taxa_desconto=taxa_desconto / 100)
+                st.subheader('Dimensionamento Econômico dos Condutores')
+                st.write(economico)
+                st.markdown(f"Usando a seção econômica em todos os circuitos, a economia em {vida_util} anos é de "
+                            f"**R$ {economico['Economia (R$)'].sum():,.2f}**")
+            if simular_demanda_coincidente:
+                simulacao = simular_demanda(exemplos_circuitos)
+                disjuntoresgerais, disjQGBT = calcular_disjuntores_simulados(
+                    exemplos_circuitos, data_tables['valores nominais de disjuntores'], 127, simulacao=simulacao)
+                resumo_demanda, total_demanda, _ = simulacao
+                st.subheader('Demanda Coincidente Simulada')
+                st.write(resumo_demanda)
+                st.markdown(f"No QGBT: pico coincidente de **{total_demanda['Pico coincidente (W)']:,.0f} W** "
+                            f"para {total_demanda['Potência instalada (W)']:,.0f} W instalados "
+                            f"(fator de coincidência {total_demanda['Fator de coincidência']:.2f})")
+            else:
+                disjuntoresgerais=calcular_disjuntor_geral(exemplos_circuitos,data_tables['FatordeDemanda'],127,data_tables['valores nominais de disjuntores'])
+                disjQGBT=calcular_disjuntor_qgbt(disjuntoresgerais,data_tables['FatordeDemanda'],127)
+            verificacao = verificar_protecao(exemplos_circuitos, data_tables, disjuntoresgerais, icc_origem_ka=icc_origem)
+            com_violacao = verificacao[verificacao['Violações'] != '']
+            if not com_violacao.empty:
+                st.warning(f"{len(com_violacao)} circuito(s) com problema de curto-circuito ou coordenação da proteção.")
+            with st.expander("Verificação de curto-circuito e coordenação"):
+                st.dataframe(verificacao)
+            if arquivo_estoque is not None:
+                demanda = demanda_materiais(exemplos_circuitos, disjuntoresgerais, nome_projeto or 'Projeto', catalogo)
+                compras, ociosos, _ = reconciliar(demanda, ler_estoque(arquivo_estoque))
+                st.subheader('Conciliação com o Estoque')
+                st.write('Materiais a comprar')
+                st.write(compras)
+                st.write('Estoque que continua ocioso')
+                st.write(ociosos)
+            # Planilhas, unifilar e memorial gerados em paralelo e empacotados num ZIP em memória
+            argumentos_memorial = (exemplos_circuitos, resultados_circuitos, disjuntoresgerais, disjQGBT, data_tables)
+            diagrama_anterior = arquivo_diagrama_anterior.getvalue() if arquivo_diagrama_anterior is not None else None
+            pacote, arquivos, detalhes = gerar_pacote({
+                'resultados_circuitos.xlsx': output.getvalue(),
+                'tabela_materiais.xlsx': (planilha_xlsx, (df_selecionado,)),
+                'orcamento_sinapi.xlsx': (planilha_xlsx, (df_custosconcat,)),
+                'diagrama_unifilar_ajustado.dxf': (diagrama_dxf, (exemplos_circuitos, disjuntoresgerais, fases_QD, diagrama_anterior)),
+                'memcalc.tex': (memorial_tex, argumentos_memorial),
+                'memcalc.pdf': (memorial_pdf, argumentos_memorial),
+            })
+            resumo_diagrama = detalhes.get('diagrama_unifilar_ajustado.dxf')
+            if resumo_diagrama is not None:
+                st.info("Diagrama atualizado: {inalterados} circuitos inalterados, {atualizados} atualizados, "
+                        "{inseridos} inseridos e {removidos} removidos.".format(**resumo_diagrama))
+            with st.expander("Pré-visualização do diagrama unifilar"):
+                for nome_quadro, svg in previa_unifilar(exemplos_circuitos, disjuntoresgerais, fases_QD).items():
+                    st.image(svg, caption=nome_quadro, use_column_width=True)
+            col1, col2, col3 = st.columns(3)
             with col1:
-                st.download_button(label="Baixar Diagrama Unifilar", data=open(output_path, "rb").read(), file_name='diagrama_unifilar_ajustado.dxf')
-            caminho_arquivo = 'memcalc'  # Caminho completo do arquivo latex ser gerado
-            disjuntoresgerais=calcular_disjuntor_geral(exemplos_circuitos,data_tables['FatordeDemanda'],127)
-            disjQGBT=calcular_disjuntor_qgbt(disjuntoresgerais,data_tables['FatordeDemanda'],127)
-            criar_relatorio_latex(exemplos_circuitos, resultados_circuitos, caminho_arquivo,disjuntoresgerais,disjQGBT,data_tables)
+                st.download_button(label="Baixar Diagrama Unifilar", data=arquivos['diagrama_unifilar_ajustado.dxf'], file_name='diagrama_unifilar_ajustado.dxf')
             with col2:
-                st.download_button(label="Baixar Memorial de Cálculo", data=open('memcalc.tex', "rb").read(), file_name='memcalc.tex')
+                st.download_button(label="Baixar Memorial de Cálculo", data=arquivos['memcalc.tex'], file_name='memcalc.tex')
+            with col3:
+                st.download_button(label="Baixar tudo (.zip)", data=pacote, file_name=NOME_PACOTE, mime='application/zip')
+            if nome_projeto:
+                with ArmazemProjetos() as armazem:
+                    revisao = armazem.salvar_revisao(
+                        nome_projeto, exemplos_circuitos, disjuntoresgerais, df_custosconcat,
+                        artefatos={nome: arquivos[nome] for nome in
+                                   ('resultados_circuitos.xlsx', 'diagrama_unifilar_ajustado.dxf', 'memcalc.tex')},
+                        descricao=f"Tabelas de referência: {conjunto_referencia.nome} ({conjunto_referencia.versao})",
+                        fases_qd=fases_QD)
+                gravar_execucao(nome_projeto, revisao, df_selecionado, df_custosconcat)
+                st.success(f"Revisão {revisao} do projeto '{nome_projeto}' salva no banco de projetos")
             with st.expander(("Como abrir o Diagrama Unifilar")):
                 st.markdown((
                     """
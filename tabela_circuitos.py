@@ -0,0 +1,163 @@
+import numpy as np
+import pandas as pd
+
+# Colunas de texto repetitivo guardadas como códigos inteiros + lista de categorias
+COLUNAS_CATEGORICAS = ('met_instala', 'num_fases1', 'Quadro', 'Fases')
+
+# Tipos compactos para as colunas conhecidas (as demais mantêm o tipo de entrada)
+TIPOS_COLUNAS = {
+    'num_fases': np.int8,
+    'num_circuitos': np.int16,
+    'DR': np.bool_,
+}
+
+
+def _tipo_codigos(num_categorias):
+    return np.int16 if num_categorias < np.iinfo(np.int16).max else np.int32
+
+
+def _compactar(valores, tipo):
+    # Só converte quando nada se perde: vazios, frações e textos ficam como vieram, para a
+    # validação apontar o erro (None não pode virar False/True nem NaN virar 0)
+    if np.dtype(tipo) == np.bool_:
+        if valores.dtype == np.bool_:
+            return valores
+        if valores.dtype == object and all(isinstance(v, (bool, np.bool_)) for v in valores):
+            return valores.astype(np.bool_)
+        return valores.astype(object) if valores.dtype.kind == 'U' else valores
+    if valores.dtype.kind not in 'iuf':
+        return valores.astype(object) if valores.dtype.kind == 'U' else valores
+    limites = np.iinfo(tipo)
+    with np.errstate(invalid='ignore'):
+        inteiros = (np.isfinite(valores) & (valores % 1 == 0) & (valores >= limites.min) & (valores <= limites.max)).all()
+    return valores.astype(tipo) if inteiros else valores
+
+
+def _escalar(valor):
+    # Valores NumPy viram tipos Python nativos (mesma formatação de antes no memorial e no DXF)
+    return valor.item() if isinstance(valor, np.generic) else valor
+
+
+class TabelaCircuitos:
+    """
+    Circuitos em colunas: um array NumPy por campo e colunas categóricas
+    (met_instala, num_fases1, Quadro, Fases) como códigos int16 + categorias.
+
+    Substitui a lista de dicionários que o app passava entre distribuir_fases,
+    preparar_circuitos_para_calculo e calcular_parametros_circuitos. Iterar devolve
+    um dicionário por circuito, para as rotinas que montam texto linha a linha
+    (memorial, árvore de distribuição).
+    """
+
+    def __init__(self, num_linhas=0):
+        self._num_linhas = num_linhas
+        self._colunas = {}
+        self._categorias = {}
+
+    @classmethod
+    def de_dataframe(cls, df):
+        tabela = cls(len(df))
+        for coluna in df.columns:
+            tabela.definir(coluna, df[coluna].to_numpy())
+        return tabela
+
+    @classmethod
+    def de_registros(cls, registros):
+        if isinstance(registros, cls):
+            return registros
+        if isinstance(registros, pd.DataFrame):
+            return cls.de_dataframe(registros)
+        return cls.de_dataframe(pd.DataFrame(list(registros)))
+
+    # ------------------------------------------------------------------ colunas
+    def __len__(self):
+        return self._num_linhas
+
+    def __contains__(self, coluna):
+        return coluna in self._colunas
+
+    @property
+    def colunas(self):
+        return list(self._colunas)
+
+    def definir(self, coluna, valores):
+        """Cria ou substitui uma coluna (categórica se estiver em COLUNAS_CATEGORICAS)."""
+        valores = np.asarray(valores)
+        if len(valores) != self._num_linhas:
+            raise ValueError(f"Coluna '{coluna}' com {len(valores)} valores; a tabela tem {self._num_linhas} circuitos.")
+        if coluna in COLUNAS_CATEGORICAS:
+            codigos, categorias = pd.factorize(valores, sort=False)
+            self.definir_codigos(coluna, codigos, np.asarray(categorias, dtype=object))
+            return
+        self._categorias.pop(coluna, None)
+        if coluna in TIPOS_COLUNAS:
+            valores = _compactar(valores, TIPOS_COLUNAS[coluna])
+        elif valores.dtype == np.int64 and len(valores) and np.abs(valores).max() < np.iinfo(np.int32).max:
+            valores = valores.astype(np.int32)
+        elif valores.dtype.kind in 'OU':
+            valores = valores.astype(object)
+        self._colunas[coluna] = valores
+
+    def definir_codigos(self, coluna, codigos, categorias):
+        """Coluna categórica a partir de códigos já calculados (-1 = sem valor)."""
+        categorias = np.asarray(categorias, dtype=object)
+        self._colunas[coluna] = np.asarray(codigos).astype(_tipo_codigos(len(categorias)))
+        self._categorias[coluna] = categorias
+
+    def codigos(self, coluna):
+        """(códigos, categorias) de uma coluna categórica."""
+        return self._colunas[coluna], self._categorias[coluna]
+
+    def __getitem__(self, coluna):
+        valores = self._colunas[coluna]
+        if coluna not in self._categorias:
+            return valores
+        categorias = self._categorias[coluna]
+        decodificado = np.empty(len(valores), dtype=object)
+        validos = valores >= 0
+        decodificado[validos] = categorias[valores[validos]]
+        return decodificado
+
+    def __setitem__(self, coluna, valores):
+        self.definir(coluna, valores)
+
+    # ------------------------------------------------------------------ linhas
+    def linha(self, i):
+        registro = {}
+        for coluna, valores in self._colunas.items():
+            if coluna in self._categorias:
+                codigo = valores[i]
+                registro[coluna] = self._categorias[coluna][codigo] if codigo >= 0 else None
+            else:
+                registro[coluna] = _escalar(valores[i])
+        return registro
+
+    def __iter__(self):
+        for i in range(self._num_linhas):
+            yield self.linha(i)
+
+    def para_dataframe(self, colunas=None):
+        return pd.DataFrame({coluna: self[coluna] for coluna in (colunas or self._colunas)})
+
+    def para_registros(self):
+        return list(self)
+
+    def copiar(self):
+        tabela = TabelaCircuitos(self._num_linhas)
+        tabela._colunas = {c: v.copy() for c, v in self._colunas.items()}
+        tabela._categorias = dict(self._categorias)
+        return tabela
+
+    @property
+    def nbytes(self):
+        total = 0
+        for coluna, valores in self._colunas.items():
+            total += valores.nbytes
+            if valores.dtype == object:
+                total += sum(len(str(v)) for v in valores)
+        for categorias in self._categorias.values():
+            total += sum(len(str(c)) for c in categorias)
+        return total
+
+    def __repr__(self):
+        return f"TabelaCircuitos({self._num_linhas} circuitos, colunas={self.colunas})"
@@ -0,0 +1,405 @@
+import argparse
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+from calculos import (
+    calcular_parametros_circuitos,
+    escolher_disjuntor_seguro,
+    definir_num_fases,
+    preparar_circuitos_para_calculo,
+    montar_tabela_materiais,
+    montar_orcamento,
+)
+from catalogo_protecao import obter_catalogo
+from motor_vetorizado import (
+    compilar_tabelas,
+    compilar_precos,
+    indices_metodos,
+    preparar_arrays,
+    dimensionar_lote,
+    dimensionar_circuitos,
+    escolher_disjuntores_lote,
+    custo_lote,
+)
+from tabela_circuitos import TabelaCircuitos
+
+TIPOS_ALIMENTACAO = ["F+N", "F+N+T", "F+F+T", "F+F+F+T"]
+TENSOES = [127, 220, 380]
+CIRCUITOS_POR_PROJETO = 20
+
+# Diferença numérica aceita entre a referência e um motor alternativo
+TOLERANCIA = 1e-9
+MAX_PASSOS_MINIMIZACAO = 300
+# Reprodutores minimizados por motor; as demais divergências trazem só a entrada original
+MAX_REPRODUTORES = 5
+
+CAMPOS_DIMENSIONAMENTO = ['Seção do Condutor (mm²)', 'Disjuntor', 'Queda de Tensão (Volts)', 'Corrente corrigida',
+                          'Corrente Nominal', 'Fator correção temperatura', 'Fator Agrupamento']
+CAMPOS_DISJUNTOR = ['Disjuntor', 'Seção do Condutor (mm²)']
+CAMPOS_ORCAMENTO = ['Custo Total']
+
+
+# Geração de casos a partir das tabelas reais
+
+def gerar_circuitos(data_tables, quantidade, semente=0):
+    """
+    Circuitos aleatórios no formato do editor do app (comprimento em metros), com métodos,
+    temperaturas e agrupamentos tirados das tabelas de 'Dados para o gpt.xls'.
+    """
+    rng = np.random.default_rng(semente)
+    metodos = [c for c in data_tables['Capacidade de corrente'].columns if c != 'Seção do condutor']
+    temperaturas = data_tables['Fator de correção de temperatur'].iloc[:, 0].to_numpy(dtype=float)
+    agrupamentos = data_tables['Fator de agrupamento']['Agrupamento de circuitos'].to_numpy(dtype=float)
+    circuitos = []
+    for i in range(quantidade):
+        circuitos.append({
+            'nome': f"{'Iluminação' if rng.random() < 0.3 else 'TUG'} {i + 1}",
+            # log-uniforme para cobrir de circuitos de iluminação a alimentadores
+            'potencia': float(np.round(np.exp(rng.uniform(np.log(50), np.log(60000))), 1)),
+            'tensao': float(rng.choice(TENSOES)),
+            'fator_potencia': float(np.round(rng.uniform(0.7, 1.0), 2)),
+            'num_fases1': TIPOS_ALIMENTACAO[int(rng.integers(len(TIPOS_ALIMENTACAO)))],
+            'temperatura': float(np.round(rng.uniform(temperaturas.min(), temperaturas.max()), 1)),
+            'num_circuitos': int(rng.integers(agrupamentos.min(), agrupamentos.max() + 1)),
+            'comprimento': float(np.round(rng.uniform(1, 150), 1)),
+            'met_instala': metodos[int(rng.integers(len(metodos)))],
+            'DR': bool(rng.random() < 0.5),
+            'Quadro': f"QD{int(rng.integers(1, 4))}",
+        })
+    return circuitos
+
+
+def gerar_casos_disjuntor(data_tables, quantidade, semente=0):
+    """Entradas aleatórias de escolher_disjuntor_seguro (seções e métodos da tabela de capacidade)."""
+    rng = np.random.default_rng(semente)
+    tabela = data_tables['Capacidade de corrente']
+    metodos = [c for c in tabela.columns if c != 'Seção do condutor']
+    secoes = sorted(tabela['Seção do condutor'].unique())
+    return [{
+        'corrente_corrigida': float(np.round(np.exp(rng.uniform(np.log(0.5), np.log(500))), 2)),
+        'secao_inicial': float(secoes[int(rng.integers(len(secoes)))]),
+        'metodo_instalacao': metodos[int(rng.integers(len(metodos)))],
+        'numero_fases': int(rng.integers(1, 4)),
+    } for _ in range(quantidade)]
+
+
+def gerar_projetos(data_tables, quantidade, semente=0, circuitos_por_projeto=CIRCUITOS_POR_PROJETO):
+    """Projetos só com circuitos dimensionáveis; os que abortam o cálculo já são cobertos em 'dimensionamento'."""
+    necessarios = quantidade * circuitos_por_projeto
+    circuitos = []
+    while len(circuitos) < necessarios:
+        candidatos = gerar_circuitos(data_tables, 2 * necessarios, semente + len(circuitos))
+        erro = dimensionar_circuitos(_preparar(candidatos), compilar_tabelas(data_tables))['Erro'].to_numpy()
+        circuitos += [c for c, e in zip(candidatos, erro) if e == 0]
+    circuitos = circuitos[:necessarios]
+    return [circuitos[i:i + circuitos_por_projeto] for i in range(0, necessarios, circuitos_por_projeto)]
+
+
+def _preparar(circuitos):
+    preparados = [dict(c) for c in circuitos]
+    definir_num_fases(preparados)
+    preparar_circuitos_para_calculo(preparados)
+    return preparados
+
+
+# Referências: as funções de calculos.py, um caso por vez
+
+def dimensionamento_referencia(circuitos, data_tables, sinapi_df=None):
+    linhas = []
+    for circuito in _preparar(circuitos):
+        try:
+            resultados, _ = calcular_parametros_circuitos([circuito], data_tables)
+            linha = resultados.iloc[0][CAMPOS_DIMENSIONAMENTO].to_dict()
+            linha['Erro'] = False
+        except Exception:
+            linha = dict.fromkeys(CAMPOS_DIMENSIONAMENTO, np.nan)
+            linha['Erro'] = True
+        linhas.append(linha)
+    return pd.DataFrame(linhas, columns=CAMPOS_DIMENSIONAMENTO + ['Erro'])
+
+
+def disjuntor_referencia(casos, data_tables, sinapi_df=None):
+    linhas = []
+    for caso in casos:
+        try:
+            disjuntor, secao = escolher_disjuntor_seguro(
+                caso['corrente_corrigida'], caso['secao_inicial'], data_tables['valores nominais de disjuntores'],
+                data_tables['Capacidade de corrente'], caso['metodo_instalacao'], caso['numero_fases'])
+            linhas.append({'Disjuntor': disjuntor, 'Seção do Condutor (mm²)': secao, 'Erro': False})
+        except Exception:
+            linhas.append({'Disjuntor': np.nan, 'Seção do Condutor (mm²)': np.nan, 'Erro': True})
+    return pd.DataFrame(linhas, columns=CAMPOS_DISJUNTOR + ['Erro'])
+
+
+def orcamento_referencia(projetos, data_tables, sinapi_df):
+    """Custo de condutores e disjuntores de cada projeto por montar_tabela_materiais/montar_orcamento."""
+    catalogo = obter_catalogo(data_tables['valores nominais de disjuntores'])
+    sem_quadros = pd.DataFrame(columns=['Codigo'])
+    linhas = []
+    for projeto in projetos:
+        try:
+            resultados, _ = calcular_parametros_circuitos(_preparar(projeto), data_tables)
+            orcamento = montar_orcamento(montar_tabela_materiais(resultados, catalogo), sem_quadros, sinapi_df)
+            linhas.append({'Custo Total': float(orcamento['Custo Total'].sum()), 'Erro': False})
+        except Exception:
+            linhas.append({'Custo Total': np.nan, 'Erro': True})
+    return pd.DataFrame(linhas, columns=CAMPOS_ORCAMENTO + ['Erro'])
+
+
+# Motores alternativos
+
+def dimensionamento_vetorizado(circuitos, data_tables, sinapi_df=None):
+    resultado = dimensionar_circuitos(_preparar(circuitos), compilar_tabelas(data_tables))
+    resultado['Erro'] = resultado['Erro'] != 0
+    return resultado[CAMPOS_DIMENSIONAMENTO + ['Erro']]
+
+
+def dimensionamento_tabela(circuitos, data_tables, sinapi_df=None):
+    """calcular_parametros_circuitos sobre TabelaCircuitos; circuitos que abortam o lote são retirados e marcados."""
+    preparados = _preparar(circuitos)
+    resultado = pd.DataFrame(np.nan, index=range(len(preparados)), columns=CAMPOS_DIMENSIONAMENTO)
+    resultado['Erro'] = False
+    restantes = list(range(len(preparados)))
+    while restantes:
+        try:
+            resultados, _ = calcular_parametros_circuitos(
+                TabelaCircuitos.de_registros([preparados[i] for i in restantes]), data_tables)
+        except ValueError as e:
+            encontrado = re.search(r"Circuito '(.*)'\.$", str(e))
+            if encontrado is None:
+                raise
+            posicao = next(i for i in restantes if str(preparados[i]['nome']) == encontrado.group(1))
+            resultado.loc[posicao, 'Erro'] = True
+            restantes.remove(posicao)
+            continue
+        resultado.loc[restantes, CAMPOS_DIMENSIONAMENTO] = resultados[CAMPOS_DIMENSIONAMENTO].to_numpy(dtype=float)
+        break
+    return resultado
+
+
+def disjuntor_vetorizado(casos, data_tables, sinapi_df=None):
+    tabelas = compilar_tabelas(data_tables)
+    df = pd.DataFrame(casos)
+    indice_metodo = indices_metodos(df['metodo_instalacao'], tabelas)
+    capacidade = tabelas['capacidade'].T[np.clip(indice_metodo, 0, None)]
+    indice_inicial = np.searchsorted(tabelas['secoes'], df['secao_inicial'].to_numpy(dtype=float))
+    disjuntor, _, indice_secao, ok = escolher_disjuntores_lote(
+        df['corrente_corrigida'].to_numpy(dtype=float), df['numero_fases'].to_numpy(dtype=float),
+        capacidade, indice_inicial, tabelas)
+    ok &= indice_metodo >= 0
+    return pd.DataFrame({
+        'Disjuntor': np.where(ok, disjuntor, np.nan),
+        'Seção do Condutor (mm²)': np.where(ok, tabelas['secoes'][indice_secao], np.nan),
+        'Erro': ~ok,
+    })
+
+
+def orcamento_vetorizado(projetos, data_tables, sinapi_df):
+    tabelas = compilar_tabelas(data_tables)
+    precos = compilar_precos(tabelas, sinapi_df)
+    todos = [c for projeto in projetos for c in projeto]
+    arrays = preparar_arrays(_preparar(todos), tabelas)
+    resultado = dimensionar_lote(
+        arrays['potencia'], arrays['tensao'], arrays['fator_potencia'], arrays['num_fases'],
+        arrays['temperatura'], arrays['num_circuitos'], arrays['comprimento'],
+        arrays['queda_tensao_max'], arrays['indice_metodo'], arrays['iluminacao'], tabelas)
+    custo = custo_lote(resultado, arrays['num_fases'], arrays['comprimento'], arrays['num_fases1'], precos)
+    projeto_de = np.repeat(np.arange(len(projetos)), [len(p) for p in projetos])
+    erro = np.bincount(projeto_de, weights=resultado['erro'] != 0, minlength=len(projetos)) > 0
+    total = np.bincount(projeto_de, weights=np.nan_to_num(custo), minlength=len(projetos))
+    return pd.DataFrame({'Custo Total': np.where(erro, np.nan, total), 'Erro': erro})
+
+
+# Minimização dos casos divergentes
+
+def _simplificacoes_circuito(circuito, data_tables):
+    metodos = [c for c in data_tables['Capacidade de corrente'].columns if c != 'Seção do condutor']
+    valores = {
+        'nome': ['C1', 'Iluminação 1'],
+        'potencia': [max(100.0, float(round(circuito['potencia'], -2))), float(round(circuito['potencia']))],
+        'tensao': [220.0, 127.0],
+        'fator_potencia': [1.0, float(round(circuito['fator_potencia'], 1))],
+        'num_fases1': ['F+N+T'],
+        'temperatura': [30.0, float(round(circuito['temperatura']))],
+        'num_circuitos': [1],
+        'comprimento': [10.0, float(round(circuito['comprimento']))],
+        'met_instala': [metodos[0]],
+        'DR': [False],
+        'Quadro': ['QD1'],
+    }
+    for campo, opcoes in valores.items():
+        for valor in opcoes:
+            if circuito.get(campo) != valor:
+                yield dict(circuito, **{campo: valor})
+
+
+def _simplificacoes_disjuntor(caso, data_tables):
+    metodos = [c for c in data_tables['Capacidade de corrente'].columns if c != 'Seção do condutor']
+    secoes = sorted(data_tables['Capacidade de corrente']['Seção do condutor'].unique())
+    valores = {
+        'corrente_corrigida': [float(round(caso['corrente_corrigida'])), float(np.ceil(caso['corrente_corrigida']))],
+        'secao_inicial': [float(secoes[0])],
+        'metodo_instalacao': [metodos[0]],
+        'numero_fases': [1],
+    }
+    for campo, opcoes in valores.items():
+        for valor in opcoes:
+            if caso[campo] != valor:
+                yield dict(caso, **{campo: valor})
+
+
+def _simplificacoes_projeto(projeto, data_tables):
+    # Primeiro tira circuitos (metades, depois um a um), depois simplifica os que sobraram
+    n = len(projeto)
+    if n > 1:
+        yield projeto[:n // 2]
+        yield projeto[n // 2:]
+        for i in range(n):
+            yield projeto[:i] + projeto[i + 1:]
+    for i, circuito in enumerate(projeto):
+        for simplificado in _simplificacoes_circuito(circuito, data_tables):
+            yield projeto[:i] + [simplificado] + projeto[i + 1:]
+
+
+def minimizar(caso, falha, simplificacoes, max_passos=MAX_PASSOS_MINIMIZACAO):
+    """
+    Aplica simplificações enquanto o caso continuar divergindo (falha(caso) verdadeiro),
+    em passadas sucessivas até nenhuma simplificação ser aceita ou acabar o limite de testes.
+    """
+    passos = 0
+    mudou = True
+    while mudou and passos < max_passos:
+        mudou = False
+        for candidato in simplificacoes(caso):
+            passos += 1
+            if falha(candidato):
+                caso = candidato
+                mudou = True
+                break
+            if passos >= max_passos:
+                break
+    return caso
+
+
+VERIFICACOES = {
+    'dimensionamento': {
+        'referencia': dimensionamento_referencia,
+        'campos': CAMPOS_DIMENSIONAMENTO,
+        'gerar': gerar_circuitos,
+        'simplificacoes': _simplificacoes_circuito,
+    },
+    'disjuntor': {
+        'referencia': disjuntor_referencia,
+        'campos': CAMPOS_DISJUNTOR,
+        'gerar': gerar_casos_disjuntor,
+        'simplificacoes': _simplificacoes_disjuntor,
+    },
+    'orcamento': {
+        'referencia': orcamento_referencia,
+        'campos': CAMPOS_ORCAMENTO,
+        'gerar': gerar_projetos,
+        'simplificacoes': _simplificacoes_projeto,
+    },
+}
+
+MOTORES = {
+    'dimensionamento': {'vetorizado': dimensionamento_vetorizado, 'tabela': dimensionamento_tabela},
+    'disjuntor': {'vetorizado': disjuntor_vetorizado},
+    'orcamento': {'vetorizado': orcamento_vetorizado},
+}
+
+
+def registrar_motor(verificacao, nome, funcao):
+    """
+    Inclui um motor alternativo na verificação. funcao(casos, data_tables, sinapi_df) deve
+    devolver um DataFrame com uma linha por caso, as colunas da verificação e 'Erro'.
+    """
+    if verificacao not in VERIFICACOES:
+        raise ValueError(f"Verificação desconhecida: {verificacao}. Use {', '.join(VERIFICACOES)}.")
+    MOTORES[verificacao][nome] = funcao
+
+
+def comparar(referencia, alternativo, campos):
+    """[(posição, campo, valor da referência, valor do motor)] para cada divergência."""
+    divergencias = []
+    erro_ref = referencia['Erro'].to_numpy(dtype=bool)
+    erro_alt = alternativo['Erro'].to_numpy(dtype=bool)
+    for i in np.flatnonzero(erro_ref != erro_alt):
+        divergencias.append((int(i), 'Erro', bool(erro_ref[i]), bool(erro_alt[i])))
+    validos = ~erro_ref & ~erro_alt
+    for campo in campos:
+        ref = referencia[campo].to_numpy(dtype=float)
+        alt = alternativo[campo].to_numpy(dtype=float)
+        iguais = np.isclose(ref, alt, rtol=TOLERANCIA, atol=TOLERANCIA, equal_nan=True)
+        for i in np.flatnonzero(validos & ~iguais):
+            divergencias.append((int(i), campo, ref[i], alt[i]))
+    return divergencias
+
+
+def executar(data_tables, sinapi_df, casos=300, semente=0, verificacoes=None, minimizar_divergencias=True):
+    """
+    Roda cada verificação na referência e em todos os motores registrados.
+    Retorna (resumo com divergências e aceleração por motor, DataFrame das divergências
+    com o caso original e o reprodutor minimizado).
+    """
+    resumo = []
+    divergencias = []
+    for nome in verificacoes or VERIFICACOES:
+        verificacao = VERIFICACOES[nome]
+        lote = verificacao['gerar'](data_tables, casos, semente)
+        inicio = time.perf_counter()
+        referencia = verificacao['referencia'](lote, data_tables, sinapi_df)
+        tempo_referencia = time.perf_counter() - inicio
+        for motor, funcao in MOTORES[nome].items():
+            inicio = time.perf_counter()
+            alternativo = funcao(lote, data_tables, sinapi_df)
+            tempo_motor = time.perf_counter() - inicio
+            encontradas = comparar(referencia, alternativo, verificacao['campos'])
+
+            def falha(caso, funcao=funcao):
+                return bool(comparar(verificacao['referencia']([caso], data_tables, sinapi_df),
+                                     funcao([caso], data_tables, sinapi_df), verificacao['campos']))
+
+            reprodutores = {}
+            for posicao, campo, valor_ref, valor_motor in encontradas:
+                if posicao not in reprodutores:
+                    minimiza = minimizar_divergencias and len(reprodutores) < MAX_REPRODUTORES
+                    reprodutores[posicao] = (minimizar(lote[posicao], falha,
+                                                       lambda c: verificacao['simplificacoes'](c, data_tables))
+                                             if minimiza else lote[posicao])
+                divergencias.append({
+                    'Verificação': nome, 'Motor': motor, 'Caso': posicao, 'Campo': campo,
+                    'Referência': valor_ref, 'Motor (valor)': valor_motor,
+                    'Entrada': lote[posicao], 'Reprodutor': reprodutores[posicao],
+                })
+            resumo.append({
+                'Verificação': nome, 'Motor': motor, 'Casos': len(lote),
+                'Casos com erro na referência': int(referencia['Erro'].sum()),
+                'Casos divergentes': len({d[0] for d in encontradas}),
+                'Tempo referência (s)': tempo_referencia, 'Tempo motor (s)': tempo_motor,
+                'Aceleração': tempo_referencia / tempo_motor if tempo_motor > 0 else float('inf'),
+            })
+    return pd.DataFrame(resumo), pd.DataFrame(divergencias)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Teste diferencial dos motores alternativos contra as funções de referência.')
+    parser.add_argument('--dados', default='Dados para o gpt.xls')
+    parser.add_argument('--sinapi', default='sinapi.xls')
+    parser.add_argument('--casos', type=int, default=300)
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--verificacoes', nargs='*', choices=list(VERIFICACOES), default=None)
+    args = parser.parse_args()
+
+    data_tables = pd.read_excel(args.dados, sheet_name=None)
+    sinapi_df = pd.read_excel(args.sinapi, sheet_name='Planilha1')
+    resumo, divergencias = executar(data_tables, sinapi_df, args.casos, args.semente, args.verificacoes)
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(resumo.to_string(index=False))
+        for d in divergencias.to_dict('records'):
+            print(f"\n{d['Verificação']}/{d['Motor']} caso {d['Caso']}, {d['Campo']}: "
+                  f"referência={d['Referência']} motor={d['Motor (valor)']}\n  reprodutor: {d['Reprodutor']}")
+    raise SystemExit(1 if len(divergencias) else 0)
@@ -0,0 +1,125 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from estoque import ITEM, TOLERANCIA, UNIDADES, reconciliar
+
+VALORES = {'disjuntor': [10.0, 16.0, 20.0, 25.0, 32.0], 'condutor': [1.5, 2.5, 4.0, 6.0],
+           'dr': [25.0, 40.0], 'quadro': [6.0, 12.0, 18.0]}
+
+
+# Geração de casos
+
+def _linhas(rng, quantidade, coluna, nomes, categorias, maximo):
+    categoria = rng.choice(categorias, quantidade)
+    return pd.DataFrame({
+        coluna: rng.choice(nomes, quantidade),
+        'Categoria': categoria,
+        'Polos': np.where(np.isin(categoria, ['disjuntor', 'dr']), rng.integers(1, 4, quantidade), 0),
+        'Valor': [rng.choice(VALORES[c]) for c in categoria],
+        'Unidade': [UNIDADES[c] for c in categoria],
+        # metade inteira (peças), metade fracionária (metros de cabo somados em float)
+        'Quantidade': np.where(rng.random(quantidade) < 0.5, rng.integers(0, maximo, quantidade),
+                               rng.random(quantidade) * maximo),
+    })
+
+
+def gerar_caso(quantidade, semente=0):
+    """(demanda, estoque, ordem dos projetos, ordem dos depósitos) aleatórios, com itens repetidos."""
+    rng = np.random.default_rng(semente)
+    projetos = [f'P{i}' for i in range(max(1, quantidade // 10))]
+    depositos = [f'D{i}' for i in range(rng.integers(1, 5))]
+    demanda = _linhas(rng, quantidade, 'Projeto', projetos, ['disjuntor', 'condutor', 'quadro'], 10)
+    # 'dr' só no estoque: itens sem demanda precisam voltar inteiros como ociosos
+    estoque = _linhas(rng, max(1, quantidade // 2), 'Deposito', depositos, list(UNIDADES), 20)
+    return demanda, estoque, list(rng.permutation(projetos)), list(rng.permutation(depositos))
+
+
+# Referência: laço guloso item a item
+
+def reconciliar_bruto(demanda, estoque, ordem_projetos, ordem_depositos):
+    """
+    Mesma regra de reconciliar, escrita como laço: cada projeto, na ordem de prioridade,
+    esvazia os depósitos do seu item na ordem de prioridade.
+    Retorna dicionários {chave: quantidade} de compras, ociosos e alocação.
+    """
+    d = demanda.groupby(['Projeto'] + ITEM, as_index=False, sort=False)['Quantidade'].sum()
+    e = estoque.groupby(['Deposito'] + ITEM, as_index=False, sort=False)['Quantidade'].sum()
+    saldos = {}
+    for r in sorted(e.to_dict('records'), key=lambda r: ordem_depositos.index(r['Deposito'])):
+        saldos.setdefault(tuple(r[c] for c in ITEM), []).append([r['Deposito'], r['Quantidade']])
+    compras, alocacao = {}, {}
+    for r in sorted(d.to_dict('records'), key=lambda r: ordem_projetos.index(r['Projeto'])):
+        item = tuple(r[c] for c in ITEM)
+        falta = r['Quantidade']
+        for saldo in saldos.get(item, []):
+            usado = min(falta, saldo[1])
+            if usado > 0:
+                chave = (r['Projeto'], saldo[0]) + item
+                alocacao[chave] = alocacao.get(chave, 0.0) + usado
+            saldo[1] -= usado
+            falta -= usado
+        if falta > TOLERANCIA:
+            compras[(r['Projeto'],) + item] = falta
+    ociosos = {(deposito,) + item: sobra for item, lista in saldos.items() for deposito, sobra in lista
+               if sobra > TOLERANCIA}
+    return compras, ociosos, alocacao
+
+
+def _como_dicionario(df, chave):
+    return {tuple(r[c] for c in chave + ITEM): r['Quantidade'] for r in df.to_dict('records')}
+
+
+def comparar(esperado, obtido, nome):
+    """[(tabela, chave, esperado, obtido)] para cada diferença acima da tolerância."""
+    divergencias = []
+    for chave in sorted(set(esperado) | set(obtido), key=str):
+        a, b = esperado.get(chave, 0.0), obtido.get(chave, 0.0)
+        if abs(a - b) > TOLERANCIA:
+            divergencias.append((nome, chave, a, b))
+    return divergencias
+
+
+def executar(casos=50, linhas=300, semente=0):
+    """
+    Compara reconciliar com o laço guloso em `casos` casos aleatórios.
+    Retorna (resumo por caso, lista de divergências).
+    """
+    resumo = []
+    divergencias = []
+    for caso in range(casos):
+        demanda, estoque, ordem_projetos, ordem_depositos = gerar_caso(linhas, semente + caso)
+        inicio = time.perf_counter()
+        esperado = reconciliar_bruto(demanda, estoque, ordem_projetos, ordem_depositos)
+        tempo_bruto = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        compras, ociosos, alocacao = reconciliar(demanda, estoque, ordem_projetos, ordem_depositos)
+        tempo_vetorizado = time.perf_counter() - inicio
+        obtido = (_como_dicionario(compras, ['Projeto']), _como_dicionario(ociosos, ['Deposito']),
+                  _como_dicionario(alocacao, ['Projeto', 'Deposito']))
+        encontradas = []
+        for nome, a, b in zip(('compras', 'ociosos', 'alocacao'), esperado, obtido):
+            encontradas += comparar(a, b, nome)
+        divergencias += [(caso,) + d for d in encontradas]
+        resumo.append({
+            'Caso': caso, 'Semente': semente + caso, 'Demanda': len(demanda), 'Estoque': len(estoque),
+            'Divergências': len(encontradas), 'Tempo laço (s)': tempo_bruto, 'Tempo vetorizado (s)': tempo_vetorizado,
+        })
+    return pd.DataFrame(resumo), divergencias
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compara estoque.reconciliar com a alocação gulosa em laço.')
+    parser.add_argument('--casos', type=int, default=50)
+    parser.add_argument('--linhas', type=int, default=300, help='Linhas de demanda por caso')
+    parser.add_argument('--semente', type=int, default=0)
+    args = parser.parse_args()
+
+    resumo, divergencias = executar(args.casos, args.linhas, args.semente)
+    print(f"{len(resumo)} casos, {int((resumo['Divergências'] > 0).sum())} com divergência; "
+          f"laço {resumo['Tempo laço (s)'].sum():.2f} s, vetorizado {resumo['Tempo vetorizado (s)'].sum():.2f} s")
+    for caso, tabela, chave, esperado, obtido in divergencias[:20]:
+        print(f"caso {caso}, {tabela} {chave}: laço={esperado} reconciliar={obtido}")
+    raise SystemExit(1 if divergencias else 0)
@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+
+from calculos import NUM_FASES_POR_ALIMENTACAO
+from motor_vetorizado import (
+    ERRO_OK,
+    ERRO_TEMPERATURA,
+    ERRO_AGRUPAMENTO,
+    ERRO_METODO,
+    ERRO_CORRENTE,
+    ERRO_QUEDA,
+    ERRO_DISJUNTOR,
+    MENSAGENS_ERRO,
+    compilar_tabelas,
+    dimensionar_lote,
+    indices_metodos,
+)
+from tabela_circuitos import TabelaCircuitos
+
+CAMPOS_OBRIGATORIOS = ['nome', 'potencia', 'tensao', 'fator_potencia', 'num_fases1', 'temperatura',
+                       'num_circuitos', 'comprimento', 'met_instala', 'Quadro']
+CAMPOS_NUMERICOS = ['potencia', 'tensao', 'fator_potencia', 'temperatura', 'num_circuitos', 'comprimento']
+
+# Campo apontado no relatório para cada erro do dimensionamento
+CAMPO_ERRO_DIMENSIONAMENTO = {
+    ERRO_CORRENTE: 'potencia',
+    ERRO_QUEDA: 'comprimento',
+    ERRO_DISJUNTOR: 'potencia',
+}
+
+COLUNAS_RELATORIO = ['Linha', 'Circuito', 'Quadro', 'Campo', 'Erro']
+
+
+def validar_circuitos(circuitos, data_tables, fases_qd=None):
+    """
+    Confere todos os circuitos contra as tabelas de referência antes do cálculo.
+
+    circuitos: TabelaCircuitos, DataFrame ou lista, com o comprimento em metros (como
+    digitado no editor). Retorna um DataFrame com uma linha por problema encontrado
+    (Linha, Circuito, Quadro, Campo, Erro); vazio se todos os circuitos podem ser dimensionados.
+    """
+    if isinstance(circuitos, TabelaCircuitos):
+        df = circuitos.para_dataframe([c for c in CAMPOS_OBRIGATORIOS if c in circuitos])
+    else:
+        df = circuitos if isinstance(circuitos, pd.DataFrame) else pd.DataFrame(list(circuitos))
+    df = df.reset_index(drop=True)
+    n = len(df)
+    problemas = []
+    invalido = np.zeros(n, dtype=bool)
+
+    def registrar(mascara, campo, mensagem):
+        mascara = np.asarray(mascara, dtype=bool)
+        if mascara.any():
+            problemas.append((np.flatnonzero(mascara), campo, mensagem))
+            invalido[mascara] = True
+
+    # 1) Presença e tipo dos campos
+    for campo in CAMPOS_OBRIGATORIOS:
+        if campo not in df:
+            registrar(np.ones(n, dtype=bool), campo, "Coluna ausente.")
+            df[campo] = np.nan
+            continue
+        vazio = df[campo].isna().to_numpy()
+        if df[campo].dtype == object:
+            vazio |= (df[campo].astype(str).str.strip() == '').to_numpy()
+        registrar(vazio, campo, "Valor não preenchido.")
+
+    valores = {}
+    for campo in CAMPOS_NUMERICOS:
+        valores[campo] = pd.to_numeric(df[campo], errors='coerce').to_numpy(dtype=float)
+        registrar(np.isnan(valores[campo]) & df[campo].notna().to_numpy(), campo, "Valor não numérico.")
+
+    # 2) Faixas
+    with np.errstate(invalid='ignore'):
+        registrar(valores['potencia'] <= 0, 'potencia', "Potência deve ser maior que zero.")
+        registrar(valores['tensao'] <= 0, 'tensao', "Tensão deve ser maior que zero.")
+        registrar((valores['fator_potencia'] <= 0) | (valores['fator_potencia'] > 1), 'fator_potencia',
+                  "Fator de potência deve estar entre 0 e 1.")
+        registrar(valores['comprimento'] < 0, 'comprimento', "Comprimento não pode ser negativo.")
+        registrar((valores['num_circuitos'] < 1) | (valores['num_circuitos'] % 1 != 0), 'num_circuitos',
+                  "Número de circuitos agrupados deve ser um inteiro maior ou igual a 1.")
+
+    # 3) Valores contra as tabelas de referência
+    num_fases = df['num_fases1'].map(NUM_FASES_POR_ALIMENTACAO).to_numpy(dtype=float)
+    registrar(np.isnan(num_fases) & df['num_fases1'].notna().to_numpy(), 'num_fases1',
+              f"Tipo de alimentação inválido; use {', '.join(NUM_FASES_POR_ALIMENTACAO)}.")
+    if fases_qd is not None:
+        registrar(num_fases > fases_qd, 'num_fases1',
+                  f"Circuito precisa de mais fases do que a alimentação geral ({fases_qd}).")
+
+    tabelas = compilar_tabelas(data_tables)
+    with np.errstate(invalid='ignore'):
+        registrar(valores['temperatura'] < tabelas['temperaturas'].min(), 'temperatura',
+                  f"{MENSAGENS_ERRO[ERRO_TEMPERATURA]} Mínima: {tabelas['temperaturas'].min():g} °C.")
+        registrar(valores['num_circuitos'] < tabelas['agrupamentos'].min(), 'num_circuitos', MENSAGENS_ERRO[ERRO_AGRUPAMENTO])
+    indice_metodo = indices_metodos(df['met_instala'].fillna('').astype(str), tabelas)
+    registrar((indice_metodo < 0) & df['met_instala'].notna().to_numpy(), 'met_instala', MENSAGENS_ERRO[ERRO_METODO])
+
+    # Nomes só precisam ser únicos dentro de cada quadro
+    registrar(df['nome'].notna().to_numpy() & df.duplicated(['Quadro', 'nome'], keep=False).to_numpy(), 'nome',
+              "Nome de circuito repetido no quadro.")
+
+    # 4) Dimensionamento das linhas restantes (corrente acima da maior seção, queda, disjuntor)
+    linhas = np.flatnonzero(~invalido)
+    if len(linhas):
+        resultado = dimensionar_lote(
+            valores['potencia'][linhas], valores['tensao'][linhas], valores['fator_potencia'][linhas],
+            num_fases[linhas], valores['temperatura'][linhas], valores['num_circuitos'][linhas],
+            valores['comprimento'][linhas] / 1000, 0.05 * valores['tensao'][linhas], indice_metodo[linhas],
+            df['nome'].astype(str).str.lower().str.contains('iluminação', regex=False).to_numpy()[linhas],
+            tabelas)
+        for codigo in np.unique(resultado['erro']):
+            if codigo == ERRO_OK:
+                continue
+            mascara = np.zeros(n, dtype=bool)
+            mascara[linhas[resultado['erro'] == codigo]] = True
+            registrar(mascara, CAMPO_ERRO_DIMENSIONAMENTO.get(int(codigo), 'potencia'), MENSAGENS_ERRO[int(codigo)])
+
+    if not problemas:
+        return pd.DataFrame(columns=COLUNAS_RELATORIO)
+    posicoes = np.concatenate([p for p, _, _ in problemas])
+    relatorio = pd.DataFrame({
+        'Linha': posicoes + 1,
+        'Circuito': df['nome'].to_numpy()[posicoes],
+        'Quadro': df['Quadro'].to_numpy()[posicoes],
+        'Campo': np.concatenate([[campo] * len(p) for p, campo, _ in problemas]),
+        'Erro': np.concatenate([[mensagem] * len(p) for p, _, mensagem in problemas]),
+    })
+    return relatorio.sort_values('Linha', kind='stable').reset_index(drop=True)
+
+
+def formatar_relatorio(relatorio):
+    return "\n".join(f"Linha {r['Linha']} ({r['Circuito']}) - {r['Campo']}: {r['Erro']}"
+                     for r in relatorio.to_dict('records'))
@@ -0,0 +1,143 @@
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from motor_vetorizado import (
+    compilar_tabelas,
+    compilar_precos,
+    preparar_arrays,
+    dimensionar_lote,
+    custo_lote,
+)
+from tabela_circuitos import TabelaCircuitos
+
+# Quantidade máxima de avaliações (cenário x circuito) processadas por bloco
+AVALIACOES_POR_BLOCO = 200_000
+
+
+def _avaliar(arrays, tabelas, precos, temperatura, fator_comprimento, acrescimo_agrupamento):
+    # temperatura NaN mantém a temperatura informada em cada circuito
+    temperatura = np.where(np.isnan(temperatura), arrays['temperatura'], temperatura)
+    comprimento = arrays['comprimento'] * fator_comprimento
+    resultado = dimensionar_lote(
+        arrays['potencia'], arrays['tensao'], arrays['fator_potencia'], arrays['num_fases'],
+        temperatura, arrays['num_circuitos'] + acrescimo_agrupamento, comprimento,
+        arrays['queda_tensao_max'], arrays['indice_metodo'], arrays['iluminacao'], tabelas)
+    custo = custo_lote(resultado, arrays['num_fases'], comprimento, arrays['num_fases1'], precos)
+    return resultado, custo
+
+
+def _avaliar_bloco(arrays, tabelas, precos, base, grade, inicio, fim, detalhar):
+    n = len(arrays['potencia'])
+    b = fim - inicio
+    # Repete os circuitos para cada cenário do bloco: arrays de tamanho b * n
+    repetidos = {k: np.tile(v, b) for k, v in arrays.items()}
+    temperatura = np.repeat(grade[inicio:fim, 0], n)
+    fator_comprimento = np.repeat(grade[inicio:fim, 1], n)
+    acrescimo = np.repeat(grade[inicio:fim, 2], n)
+    resultado, custo = _avaliar(repetidos, tabelas, precos, temperatura, fator_comprimento, acrescimo)
+
+    secao = resultado['secao'].reshape(b, n)
+    disjuntor = resultado['disjuntor'].reshape(b, n)
+    custo = custo.reshape(b, n)
+    erro = resultado['erro'].reshape(b, n) != 0
+    # Só comparam com o cálculo original os circuitos dimensionados nos dois
+    comparavel = ~erro & ~base['erro'][None, :]
+    mudou_secao = comparavel & (secao != base['secao'][None, :])
+    mudou_disjuntor = comparavel & (disjuntor != base['disjuntor'][None, :])
+    com_custo = comparavel & ~np.isnan(custo) & ~np.isnan(base['custo'])[None, :]
+
+    resumo = {
+        'circuitos_com_mudanca_secao': mudou_secao.sum(axis=1),
+        'circuitos_com_mudanca_disjuntor': mudou_disjuntor.sum(axis=1),
+        'circuitos_com_erro': erro.sum(axis=1),
+        'circuitos_com_erro_novo': (erro & ~base['erro'][None, :]).sum(axis=1),
+        'circuitos_comparados': com_custo.sum(axis=1),
+        'custo_circuitos': np.where(com_custo, custo, 0.0).sum(axis=1),
+        'delta_custo': np.where(com_custo, custo - base['custo'][None, :], 0.0).sum(axis=1),
+    }
+    detalhes = None
+    if detalhar:
+        cen, ckt = np.nonzero(mudou_secao | mudou_disjuntor)
+        detalhes = {
+            'cenario': cen + inicio,
+            'circuito': ckt,
+            'secao': secao[cen, ckt],
+            'disjuntor': disjuntor[cen, ckt],
+            'delta_custo': custo[cen, ckt] - base['custo'][ckt],
+        }
+    return resumo, detalhes
+
+
+def varrer_cenarios(circuitos, data_tables, sinapi_df,
+                    temperaturas=None,
+                    fatores_comprimento=(1.0,),
+                    acrescimos_agrupamento=(0,),
+                    detalhar=False,
+                    processos=None,
+                    avaliacoes_por_bloco=AVALIACOES_POR_BLOCO):
+    """
+    Avalia o dimensionamento sobre o produto cartesiano das grades de temperatura ambiente,
+    fator multiplicativo de comprimento e acréscimo no número de circuitos agrupados.
+
+    circuitos: lista de circuitos já preparada para calcular_parametros_circuitos
+    (num_fases, comprimento em km e queda_tensao_max_admitida preenchidos).
+    temperaturas=None mantém a temperatura de cada circuito.
+    processos: número de processos para dividir os blocos (None = processo atual).
+
+    Retorna (resumo, mudancas): um DataFrame com uma linha por cenário e, se detalhar=True,
+    um DataFrame com cada circuito que mudou de seção ou disjuntor em relação ao cálculo original.
+    custo_circuitos e delta_custo somam só os circuitos dimensionados tanto no cenário quanto no
+    cálculo original (circuitos_comparados); os que falham no cenário são contados à parte, em
+    circuitos_com_erro (circuitos_com_erro_novo: os que não falhavam no original).
+    """
+    df = circuitos if isinstance(circuitos, (pd.DataFrame, TabelaCircuitos)) else pd.DataFrame(circuitos)
+    tabelas = compilar_tabelas(data_tables)
+    precos = compilar_precos(tabelas, sinapi_df)
+    arrays = preparar_arrays(df, tabelas)
+    n = len(df)
+
+    resultado_base, custo_base = _avaliar(arrays, tabelas, precos, np.nan, 1.0, 0)
+    base = {'secao': resultado_base['secao'], 'disjuntor': resultado_base['disjuntor'], 'custo': custo_base,
+            'erro': resultado_base['erro'] != 0}
+
+    lista_temperaturas = [np.nan] if temperaturas is None else list(temperaturas)
+    grade = np.array(list(itertools.product(lista_temperaturas, fatores_comprimento, acrescimos_agrupamento)),
+                     dtype=float)
+    num_cenarios = len(grade)
+    por_bloco = max(1, avaliacoes_por_bloco // max(n, 1))
+    blocos = [(i, min(i + por_bloco, num_cenarios)) for i in range(0, num_cenarios, por_bloco)]
+
+    if processos and processos > 1 and len(blocos) > 1:
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            futuros = [executor.submit(_avaliar_bloco, arrays, tabelas, precos, base, grade, i, f, detalhar)
+                       for i, f in blocos]
+            parciais = [futuro.result() for futuro in futuros]
+    else:
+        parciais = [_avaliar_bloco(arrays, tabelas, precos, base, grade, i, f, detalhar) for i, f in blocos]
+
+    resumo = pd.DataFrame({
+        'temperatura': grade[:, 0],
+        'fator_comprimento': grade[:, 1],
+        'acrescimo_agrupamento': grade[:, 2].astype(int),
+    })
+    for coluna in parciais[0][0]:
+        resumo[coluna] = np.concatenate([p[0][coluna] for p in parciais])
+
+    if not detalhar:
+        return resumo, None
+
+    partes = {k: np.concatenate([p[1][k] for p in parciais]) for k in parciais[0][1]}
+    mudancas = pd.DataFrame({
+        'cenario': partes['cenario'],
+        'Nome do Circuito': np.asarray(df['nome'])[partes['circuito']],
+        'Quadro': np.asarray(df['Quadro'])[partes['circuito']],
+        'Seção original (mm²)': base['secao'][partes['circuito']],
+        'Seção do Condutor (mm²)': partes['secao'],
+        'Disjuntor original': base['disjuntor'][partes['circuito']],
+        'Disjuntor': partes['disjuntor'],
+        'Delta custo': partes['delta_custo'],
+    })
+    return resumo, mudancas
@@ -0,0 +1,160 @@
+import numpy as np
+import pandas as pd
+
+from calculos import seção_neutro_map, seção_terra_map
+from catalogo_protecao import obter_catalogo, FAIXA_DISPARO_CURVA, CURVA_PADRAO
+from motor_vetorizado import compilar_tabelas, indices_metodos, preparar_arrays, dimensionar_lote, MENSAGENS_ERRO
+from arvore_distribuicao import METODO_ALIMENTADOR
+from tabela_circuitos import TabelaCircuitos
+
+ICC_ORIGEM_PADRAO_KA = 3.0    # corrente de curto presumida no ponto de entrega
+ICN_PADRAO_KA = 4.5           # capacidade de interrupção assumida quando o catálogo não informa
+C_MAX = 1.05                  # fatores de tensão da IEC 60909 para baixa tensão
+C_MIN = 0.95
+K_CONDUTOR = 115              # cobre/PVC, 70 °C -> 160 °C (A·s½/mm²)
+TEMPO_DISPARO_INSTANTANEO = 0.01  # s, atuação magnética de um minidisjuntor
+TEMPO_DISPARO_TERMICO = 5.0       # s, limite da verificação adiabática quando só o disparo térmico atua
+
+VIOLACAO_INTERRUPCAO = "Icc no quadro acima da capacidade de interrupção do disjuntor"
+VIOLACAO_INTERRUPCAO_GERAL = "Icc no quadro acima da capacidade de interrupção do disjuntor geral"
+VIOLACAO_DISPARO = "Icc mínima no fim do circuito não garante o disparo magnético"
+VIOLACAO_I2T = "Energia de curto acima de k²S² do condutor"
+VIOLACAO_SELETIVIDADE = "Disjuntor do circuito não é menor que o disjuntor geral"
+VIOLACAO_SEM_GERAL = "Quadro sem disjuntor geral (nenhum valor padrão atende a corrente de demanda)"
+SELETIVIDADE_SEM_GERAL = 'sem disjuntor geral'
+
+
+def _resistencias(tabelas):
+    """
+    Resistência (ohm/km) do condutor de cada seção e dos condutores de neutro e terra associados.
+    A queda de tensão unitária da tabela é a do laço fase-retorno, por isso a divisão por 2.
+    """
+    secoes = tabelas['secoes']
+    r_fase = tabelas['queda_por_secao'] / 2
+    posicao = {s: i for i, s in enumerate(secoes)}
+
+    def r_de(mapa, limite):
+        return np.array([r_fase[posicao.get(s if s <= limite else mapa.get(s, s), i)]
+                         for i, s in enumerate(secoes)])
+
+    return r_fase, r_de(seção_neutro_map, 25), r_de(seção_terra_map, 16)
+
+
+def _secao_alimentador(correntes, tabelas):
+    # Menor seção do método do alimentador com capacidade >= disjuntor geral
+    coluna = indices_metodos([METODO_ALIMENTADOR], tabelas)[0]
+    capacidade = tabelas['capacidade'][:, coluna]
+    atende = capacidade[None, :] >= correntes[:, None]
+    return np.where(atende.any(axis=1), np.argmax(atende, axis=1), len(capacidade) - 1)
+
+
+def verificar_protecao(circuitos, data_tables, disjuntores_gerais,
+                       icc_origem_ka=ICC_ORIGEM_PADRAO_KA,
+                       comprimentos_alimentadores=None,
+                       tensao_nominal=127,
+                       curva=CURVA_PADRAO,
+                       curva_geral=CURVA_PADRAO):
+    """
+    Curto-circuito e coordenação da proteção de todos os circuitos de uma vez.
+
+    Calcula a Icc máxima no quadro (fonte + alimentador) e a mínima fase-terra no fim de cada
+    circuito e verifica a capacidade de interrupção dos disjuntores, o disparo magnético pela
+    curva, a energia de curto contra k²S² do condutor e a seletividade com o disjuntor geral.
+    A energia é verificada na Icc mínima, onde o disjuntor é mais lento; na Icc máxima ela é
+    limitada pelo próprio disjuntor dentro da sua capacidade de interrupção.
+
+    circuitos: lista, DataFrame ou TabelaCircuitos já preparada para o cálculo (comprimento em km).
+    disjuntores_gerais: {quadro: In}, como devolvido por calcular_disjuntor_geral. Quadros com In
+    None (nenhum disjuntor padrão atende) saem com VIOLACAO_SEM_GERAL em todos os circuitos.
+    comprimentos_alimentadores: {quadro: km} da entrada até cada quadro (padrão 0).
+    Retorna um DataFrame por circuito com as grandezas calculadas e a coluna 'Violações'
+    (circuitos que não puderam ser dimensionados ficam com a mensagem em 'Erro').
+    """
+    if curva not in FAIXA_DISPARO_CURVA or curva_geral not in FAIXA_DISPARO_CURVA:
+        raise ValueError(f"Curva de disparo inválida. Use uma de {sorted(FAIXA_DISPARO_CURVA)}.")
+    df = circuitos if isinstance(circuitos, (pd.DataFrame, TabelaCircuitos)) else pd.DataFrame(circuitos)
+    tabelas = compilar_tabelas(data_tables)
+    catalogo = obter_catalogo(data_tables['valores nominais de disjuntores'])
+    arrays = preparar_arrays(df, tabelas)
+    resultado = dimensionar_lote(
+        arrays['potencia'], arrays['tensao'], arrays['fator_potencia'], arrays['num_fases'],
+        arrays['temperatura'], arrays['num_circuitos'], arrays['comprimento'],
+        arrays['queda_tensao_max'], arrays['indice_metodo'], arrays['iluminacao'], tabelas)
+    r_fase, r_neutro, r_terra = _resistencias(tabelas)
+
+    # Quadros: alimentador dimensionado pelo disjuntor geral
+    nomes_quadros, quadro = np.unique(np.asarray(df['Quadro']).astype(str), return_inverse=True)
+    faltantes = [q for q in nomes_quadros if q not in disjuntores_gerais]
+    if faltantes:
+        raise ValueError(f"Disjuntor geral não informado para o(s) quadro(s): {', '.join(faltantes)}.")
+    comprimentos_alimentadores = comprimentos_alimentadores or {}
+    in_geral = np.array([disjuntores_gerais[q] for q in nomes_quadros], dtype=float)
+    sem_geral = np.isnan(in_geral)
+    l_alim = np.array([comprimentos_alimentadores.get(q, 0.0) for q in nomes_quadros], dtype=float)
+    s_alim = _secao_alimentador(in_geral, tabelas)
+    icn_geral = np.array([np.nan if np.isnan(i) else catalogo.capacidade_interrupcao(3, i) or ICN_PADRAO_KA
+                          for i in in_geral])
+
+    z_fonte = C_MAX * tensao_nominal / (icc_origem_ka * 1000)
+    icc_max_quadro = C_MAX * tensao_nominal / (z_fonte + r_fase[s_alim] * l_alim)
+    laco_alimentador = z_fonte + (r_fase[s_alim] + r_terra[s_alim]) * l_alim
+
+    # Circuitos
+    valido = resultado['erro'] == 0
+    secao = np.clip(resultado['indice_secao'], 0, None)
+    disjuntor = resultado['disjuntor']
+    sem_terra = np.asarray(arrays['num_fases1'], dtype=object) == "F+N"
+    r_retorno = np.where(sem_terra, r_neutro[secao], r_terra[secao])
+    icc_min_fim = C_MIN * tensao_nominal / (laco_alimentador[quadro] + (r_fase[secao] + r_retorno) * arrays['comprimento'])
+    icc_quadro = icc_max_quadro[quadro]
+
+    icn = np.full(len(disjuntor), ICN_PADRAO_KA)
+    for fases in (1, 2, 3):
+        linhas = np.flatnonzero(valido & (arrays['num_fases'] == fases))
+        padroes = tabelas['disjuntores'][fases]
+        icn_padroes = np.array([catalogo.capacidade_interrupcao(fases, c) or ICN_PADRAO_KA for c in padroes])
+        icn[linhas] = icn_padroes[resultado['indice_disjuntor'][linhas]]
+
+    disparo_magnetico = FAIXA_DISPARO_CURVA[curva][1] * disjuntor
+    tempo_disparo = np.where(icc_min_fim >= disparo_magnetico, TEMPO_DISPARO_INSTANTANEO, TEMPO_DISPARO_TERMICO)
+    i2t = icc_min_fim ** 2 * tempo_disparo
+    k2s2 = (K_CONDUTOR * tabelas['secoes'][secao]) ** 2
+    limite_seletividade = FAIXA_DISPARO_CURVA[curva_geral][0] * in_geral[quadro]
+
+    violacoes = [
+        (icc_quadro > icn * 1000, VIOLACAO_INTERRUPCAO),
+        (icc_quadro > icn_geral[quadro] * 1000, VIOLACAO_INTERRUPCAO_GERAL),
+        (icc_min_fim < disparo_magnetico, VIOLACAO_DISPARO),
+        (i2t > k2s2, VIOLACAO_I2T),
+        (disjuntor >= in_geral[quadro], VIOLACAO_SELETIVIDADE),
+        # Comparações com NaN dão False: sem esta linha o quadro passaria sem nenhuma violação
+        (sem_geral[quadro], VIOLACAO_SEM_GERAL),
+    ]
+    texto_violacoes = np.full(len(disjuntor), '', dtype=object)
+    for mascara, texto in violacoes:
+        for i in np.flatnonzero(valido & mascara):
+            texto_violacoes[i] = f"{texto_violacoes[i]}; {texto}" if texto_violacoes[i] else texto
+    seletividade = np.where(disjuntor >= in_geral[quadro], 'nenhuma',
+                            np.where(icc_quadro > limite_seletividade, 'parcial', 'total'))
+    seletividade = np.where(sem_geral[quadro], SELETIVIDADE_SEM_GERAL, seletividade)
+
+    def so_validos(valores):
+        return np.where(valido, valores, np.nan)
+
+    return pd.DataFrame({
+        "Nome do Circuito": np.asarray(df['nome']),
+        "Quadro": nomes_quadros[quadro],
+        "Disjuntor": so_validos(disjuntor),
+        "Icn disjuntor (kA)": so_validos(icn),
+        "Disjuntor geral": in_geral[quadro],
+        "Icn disjuntor geral (kA)": icn_geral[quadro],
+        "Icc máx. no quadro (kA)": icc_quadro / 1000,
+        "Icc mín. no fim do circuito (kA)": so_validos(icc_min_fim / 1000),
+        "Disparo magnético garantido (A)": so_validos(disparo_magnetico),
+        "I²t (A²s)": so_validos(i2t),
+        "k²S² (A²s)": so_validos(k2s2),
+        "Limite de seletividade (kA)": limite_seletividade / 1000,
+        "Seletividade": np.where(valido, seletividade, ''),
+        "Violações": np.where(valido, texto_violacoes, ''),
+        "Erro": [MENSAGENS_ERRO.get(e, '') for e in resultado['erro']],
+    })